@@ -1 +1,26 @@
-from .main import *
\ No newline at end of file
+import importlib
+
+# main.py builds the ADK runner, so it is only imported when one of its names is used
+_LAZY_ATTRIBUTES = (
+    "APP_NAME",
+    "USER_ID",
+    "SESSION_ID",
+    "SESSION_ID_SCHEMA_AGENT",
+    "create_agent",
+    "call_agent",
+    "main",
+    "root_agent",
+    "spa_agent",
+)
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(".main", __name__), name)
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,250 @@
+""" Command line scorer: stream poems from JSONL / CSV and write their scores as they are computed.
+
+    avpoetica poems.jsonl -o scores.jsonl --workers 4
+    cat dump.csv | avpoetica --format csv --text-field Qwen_output --tag 68 > scores.jsonl
+
+    Records are read, scored and written chunk by chunk through generators, with at most
+    2 * workers chunks in flight, so memory stays flat whatever the size of the input.
+    Every output record is the input record plus a "score" field.
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+DEFAULT_CHUNK_SIZE = 256
+DEFAULT_TEXT_FIELD = "poem"
+DEFAULT_TAG = "68"
+# LỤC BÁT, THẤT NGÔN and spelling only
+SUPPORTED_TAGS = ("68", "78", "00")
+ASSET_FILES = ("start_vowels.txt", "rhymes.txt", "tone_dict.txt", "words.txt", "vocab_dupple_check.txt")
+
+# Metrics of the current process, built once (by the pool initializer in a worker)
+_metrics = None
+
+
+def default_assets_path() -> str:
+    # Same location as avp.avp.tools.poetic._score
+    root_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(root_path, "avp", "avp", "tools", "assets")
+
+
+def read_jsonl(stream: TextIO) -> Iterator[Dict]:
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            print(f"[CLI]: line {number}: invalid JSON, skipped ({e})", file=sys.stderr)
+            continue
+        if not isinstance(record, dict):
+            record = {DEFAULT_TEXT_FIELD: record}
+        yield record
+
+
+def read_csv(stream: TextIO) -> Iterator[Dict]:
+    yield from csv.DictReader(stream)
+
+
+def chunked(items: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _init_worker(assets_path: str, bundle_path: Optional[str]):
+    global _metrics
+    # Imported here so that the CLI starts without the rule tables
+    from avp.avp.tools.poetic import RhymesTonesMetrics
+    paths = [os.path.join(assets_path, name) for name in ASSET_FILES]
+    _metrics = RhymesTonesMetrics(*paths, lexicon_bundle_path=bundle_path)
+
+
+def poem_score(metrics, poem: str, tag: str) -> float:
+    # calculate_score without rendering (and printing) the annotated stanzas
+    scores = [metrics.calculate_stanza_score(stanza, tag, render=False)[0] for stanza in poem.split("\n\n")]
+    return sum(scores) / len(scores)
+
+
+def tag_of(value, default_tag: str) -> str:
+    # A tag read from JSON may be a number (68): tags are compared as text
+    if value is None or str(value).strip() == "":
+        return default_tag
+    return str(value).strip()
+
+
+def _score_chunk(jobs: Sequence[Tuple[str, str]]) -> List[Optional[float]]:
+    scores = []
+    # The rule checks print the stanzas they can not score, stdout may be the output
+    with contextlib.redirect_stdout(sys.stderr):
+        for poem, tag in jobs:
+            if poem and tag not in SUPPORTED_TAGS:
+                # Not a score of 0: the poem was not scored at all
+                print(f"[CLI]: unsupported tag {tag!r} (expected one of {', '.join(SUPPORTED_TAGS)}), score left null")
+                scores.append(None)
+                continue
+            scores.append(poem_score(_metrics, poem, tag) if poem else None)
+    return scores
+
+
+def score_chunks(
+        chunks: Iterable[List[Dict]],
+        text_field: str,
+        tag_field: Optional[str],
+        default_tag: str,
+        workers: int,
+        assets_path: str,
+        bundle_path: Optional[str]
+) -> Iterator[List[Dict]]:
+    """
+        Score chunks of records in input order, on a pool of workers when workers > 1
+
+        Yields:
+            List[Dict]: the records of a chunk, each with its "score" (None without a poem, with
+                a poem which is not text or with an unsupported tag)
+    """
+    def poem_of(record: Dict) -> str:
+        poem = record.get(text_field)
+        if poem is not None and not isinstance(poem, str):
+            # Scored like a missing poem: one bad record does not stop the stream
+            print(f"[CLI]: {text_field} is not text ({type(poem).__name__}), score left null", file=sys.stderr)
+            return ""
+        return poem or ""
+
+    def jobs_of(chunk: List[Dict]) -> List[Tuple[str, str]]:
+        return [
+            (poem_of(record), tag_of(record.get(tag_field) if tag_field else None, default_tag))
+            for record in chunk
+        ]
+
+    def with_scores(chunk: List[Dict], scores: List[Optional[float]]) -> List[Dict]:
+        for record, score in zip(chunk, scores):
+            record["score"] = score
+        return chunk
+
+    if workers <= 1:
+        _init_worker(assets_path, bundle_path)
+        for chunk in chunks:
+            yield with_scores(chunk, _score_chunk(jobs_of(chunk)))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(assets_path, bundle_path)) as pool:
+        pending = []
+        for chunk in chunks:
+            pending.append((chunk, pool.submit(_score_chunk, jobs_of(chunk))))
+            # Bounded window: stop reading until the oldest chunk is written
+            if len(pending) >= 2 * workers:
+                chunk, future = pending.pop(0)
+                yield with_scores(chunk, future.result())
+        for chunk, future in pending:
+            yield with_scores(chunk, future.result())
+
+
+class ResultWriter:
+    """
+        Write scored records as JSONL or CSV, flushing after every chunk
+
+        The CSV header is the fields of the first record; later records are written with
+        the same columns (missing ones empty, extra ones dropped).
+    """
+
+    def __init__(self, stream: TextIO, output_format: str = "jsonl"):
+        self.stream = stream
+        self.output_format = output_format
+        self._csv_writer = None
+        self.count = 0
+
+    def write_chunk(self, records: List[Dict]):
+        if self.output_format == "csv":
+            if self._csv_writer is None and records:
+                self._csv_writer = csv.DictWriter(self.stream, fieldnames=list(records[0]), extrasaction="ignore")
+                self._csv_writer.writeheader()
+            self._csv_writer.writerows(records)
+        else:
+            for record in records:
+                self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.count += len(records)
+        self.stream.flush()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="avpoetica",
+        description="Score Vietnamese poems (LỤC BÁT / THẤT NGÔN / spelling) from JSONL or CSV, streaming."
+    )
+    parser.add_argument("input", nargs="?", default="-", help="input file, - for stdin (default)")
+    parser.add_argument("-o", "--output", default="-", help="output file, - for stdout (default)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="input format (default: from the extension, jsonl for stdin)")
+    parser.add_argument("--output-format", choices=("jsonl", "csv"), help="output format (default: from the extension, jsonl for stdout)")
+    parser.add_argument("--text-field", default=DEFAULT_TEXT_FIELD, help=f"field holding the poem (default: {DEFAULT_TEXT_FIELD})")
+    parser.add_argument("--tag-field", help="field holding the tag of each poem (68, 78 or 00)")
+    parser.add_argument("--tag", default=DEFAULT_TAG, choices=SUPPORTED_TAGS, help=f"tag of the poems without a tag field (default: {DEFAULT_TAG})")
+    parser.add_argument("--workers", type=int, default=1, help="scoring processes (default: 1, 0 for every core)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help=f"poems per chunk (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument("--assets", default=None, help="directory of the lexicon assets (default: avp/avp/tools/assets)")
+    parser.add_argument("--bundle", default=None, help="compiled lexicon bundle (default: lexicon.bin in the assets when present)")
+    return parser
+
+
+def _format_of(path: str, forced: Optional[str]) -> str:
+    if forced:
+        return forced
+    return "csv" if path != "-" and path.lower().endswith(".csv") else "jsonl"
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    assets_path = args.assets or default_assets_path()
+    bundle_path = args.bundle or os.path.join(assets_path, "lexicon.bin")
+
+    input_format = _format_of(args.input, args.format)
+    output_format = _format_of(args.output, args.output_format)
+    with contextlib.ExitStack() as stack:
+        if args.input == "-":
+            source = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+        else:
+            source = stack.enter_context(open(args.input, "r", encoding="utf-8", newline=""))
+        if args.output == "-":
+            sink = sys.stdout
+        else:
+            sink = stack.enter_context(open(args.output, "w", encoding="utf-8", newline=""))
+
+        records = read_csv(source) if input_format == "csv" else read_jsonl(source)
+        writer = ResultWriter(sink, output_format)
+        start = time.perf_counter()
+        try:
+            for chunk in score_chunks(
+                chunked(records, max(1, args.chunk_size)),
+                args.text_field,
+                args.tag_field,
+                args.tag,
+                workers,
+                assets_path,
+                bundle_path
+            ):
+                writer.write_chunk(chunk)
+        except BrokenPipeError:
+            # Output closed early (e.g. piped into head)
+            return 0
+        elapsed = time.perf_counter() - start
+    print(f"[CLI]: scored {writer.count} poems in {elapsed:.1f}s "
+          f"({writer.count / elapsed if elapsed else 0:.0f} poems/s, {workers} workers)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,17 @@
-from . import agent
-from .agent import root_agent
-from .sub_agents import spa_agent
-# from .tools import *
\ No newline at end of file
+import importlib
+
+# The agents pull in google-adk, so they are only imported on first access;
+# scoring through avp.avp.tools does not pay for the agent stack.
+_LAZY_ATTRIBUTES = {
+    "agent": (".agent", None),
+    "root_agent": (".agent", "root_agent"),
+    "spa_agent": (".sub_agents", "spa_agent"),
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attribute = _LAZY_ATTRIBUTES[name]
+    module = importlib.import_module(module_name, __name__)
+    return module if attribute is None else getattr(module, attribute)
@@ -1,8 +1,12 @@
-from .memory import (
-    _load_precreated_itinerary,
-)
-
 from .poetic import (
     poetic_score,
     _score
-)
\ No newline at end of file
+)
+
+
+def __getattr__(name):
+    # memory.py needs google-adk at import time, so it is only loaded when an agent asks for it
+    if name == "_load_precreated_itinerary":
+        from .memory import _load_precreated_itinerary
+        return _load_precreated_itinerary
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
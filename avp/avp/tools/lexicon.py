@@ -0,0 +1,417 @@
+""" Process-wide registry of the parsed poetic assets (vowels, rhymes, tones, dictionary)."""
+
+import os
+import ast
+import json
+import threading
+import functools
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from .trie import WordTrie, build_word_trie
+
+# Upper bound of distinct syllables memoized per Lexicon
+SYLLABLE_CACHE_SIZE = 65536
+
+# Rime id of anything that does not appear in rhymes.txt
+UNKNOWN_RIME_ID = -1
+
+
+def load_data(filename: str):
+
+    with open(filename, 'r', encoding='utf-8') as file:
+        text = file.read()
+
+    content = ast.literal_eval(text)
+    return content
+
+def vowels(vowels_path: str):
+    start_vowels = load_data(vowels_path)
+    return vowel_tables(start_vowels)
+
+def vowel_tables(start_vowels: dict):
+    even_chars = []
+    list_start_vowels = []
+    tones = {}
+    thanhtrac = []
+    thanhbang = []
+
+    huyen = start_vowels['huyen']
+    sac = start_vowels['sac']
+    nang = start_vowels['nang']
+    hoi = start_vowels['hoi']
+    nga = start_vowels['nga']
+    khong_dau = start_vowels['khong_dau']
+
+    thanhbang.extend(huyen)
+    thanhbang.extend(khong_dau)
+    thanhtrac.extend(sac)
+    thanhtrac.extend(nang)
+    thanhtrac.extend(hoi)
+    thanhtrac.extend(nga)
+    tones["thanhtrac"] = thanhtrac
+    tones["thanhbang"] = thanhbang
+
+    list_start_vowels.extend(huyen)
+    list_start_vowels.extend(sac)
+    list_start_vowels.extend(nang)
+    list_start_vowels.extend(hoi)
+    list_start_vowels.extend(nga)
+    list_start_vowels.extend(khong_dau)
+
+    even_chars.extend(huyen)
+    even_chars.extend(khong_dau)
+    return even_chars, list_start_vowels, tones
+
+def tone_classes(start_vowels: dict) -> Dict[str, str]:
+    """
+        Map every tone-marked vowel to the name of its tone (huyen, sac, nang, hoi, nga, khong_dau)
+    """
+    classes = {}
+    for name in ("khong_dau", "huyen", "sac", "nang", "hoi", "nga"):
+        for char in start_vowels[name]:
+            classes[char] = name
+    return classes
+
+def rhyme(rhyme_path: str):
+    # rhyme_path = sources + "rhymes.txt"
+    rhymes_dict = load_data(rhyme_path)
+    return rhymes_dict
+
+def tone(tone_path: str):
+    # tone_path = sources + "tone_dict.txt"
+    tone_dict = load_data(tone_path)
+    return tone_dict
+
+def special_tone(special_tone_path: str):
+    # tone_path = sources + "vocab_dupple_check.txt"
+    special_tone_dict = load_data(special_tone_path)
+    return special_tone_dict
+
+def rhyme_bitsets(rhymes_dict: dict):
+    """
+        Number every rime of rhymes.txt and encode each rhyme group as a bitset of rime ids
+
+        Returns:
+            rime_ids: rime -> id, for the keys and the values of rhymes.txt
+            rhyme_masks: per id, the bitset of the rimes rhyming with it
+                (None when the rime only appears as a value)
+    """
+    rime_ids = {}
+    for rime, values in rhymes_dict.items():
+        rime_ids.setdefault(rime, len(rime_ids))
+        for value in values:
+            rime_ids.setdefault(value, len(rime_ids))
+
+    rhyme_masks = [None] * len(rime_ids)
+    for rime, values in rhymes_dict.items():
+        mask = 0
+        for value in values:
+            mask |= 1 << rime_ids[value]
+        rhyme_masks[rime_ids[rime]] = mask
+    return rime_ids, tuple(rhyme_masks)
+
+def dictionary(dictionary_path: str) -> WordTrie:
+    # dictionary_path = sources + "words.txt"
+    words = []
+
+    with open(dictionary_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            entry = json.loads(line.strip())
+            words.append(entry["text"].lower())
+
+    # Membership, prefix and edit-distance queries over every word, whatever its first char
+    return build_word_trie(words)
+
+
+class Syllable(NamedTuple):
+    """
+        Analysis of one syllable as written in the poem
+
+        onset: leading consonants (mùa -> m)
+        rime: the part used for rhyme checks (mùa -> ùa)
+        rime_id: id of the rime in rhymes.txt, UNKNOWN_RIME_ID when it is not listed
+        tone_class: huyen, sac, nang, hoi, nga or khong_dau
+        tone: 'even' (bằng) or 'uneven' (trắc); None when the rime is empty
+    """
+    onset: str
+    rime: str
+    rime_id: int
+    tone_class: str
+    tone: Optional[str]
+
+
+class Lexicon:
+    """
+        Immutable container of every asset needed to check the poetic rules.
+
+        A single instance is shared by all PoeticRules / RhymesTonesMetrics objects
+        built from the same asset files, so none of its members may be mutated.
+        The vowel, tone and special tone tables are frozensets, so each membership
+        test of the syllable analysis is constant-time.
+        It also owns a bounded LRU cache of syllable analyses (see analyze).
+    """
+    __slots__ = (
+        "even_chars",
+        "list_start_vowels",
+        "tones",
+        "rhymes_dict",
+        "tone_dict",
+        "dictionary_vi",
+        "special_tone_dict",
+        "tone_classes",
+        "rime_ids",
+        "rhyme_masks",
+        "analyze",
+    )
+
+    def __init__(
+            self,
+            even_chars,
+            list_start_vowels,
+            tones,
+            rhymes_dict,
+            tone_dict,
+            dictionary_vi,
+            special_tone_dict,
+            tone_classes,
+            rime_ids,
+            rhyme_masks,
+            cache_size: int = SYLLABLE_CACHE_SIZE
+    ):
+        values = (
+            even_chars,
+            list_start_vowels,
+            tones,
+            rhymes_dict,
+            tone_dict,
+            dictionary_vi,
+            special_tone_dict,
+            tone_classes,
+            rime_ids,
+            rhyme_masks,
+            # Memoized per lexicon: analyze(word) -> Syllable, with analyze.cache_info()
+            functools.lru_cache(maxsize=cache_size)(self._analyze),
+        )
+        for name, value in zip(self.__slots__, values):
+            object.__setattr__(self, name, value)
+
+    def split_word(self, word: str) -> str:
+        """
+            Split word by 2 part, starting and ending
+
+            param word: word to split
+
+            return: ending part of word
+            Ex: mùa -> ùa
+        """
+        word_length = len(word)
+        start_index = 0
+        prev = ''
+        for i in range(word_length):
+            if prev == 'g' and word[i] == 'i':
+                continue
+            if prev == 'q' and word[i] == 'u':
+                continue
+            if word[i] in self.list_start_vowels:
+                start_index = i
+                break
+            prev = word[i]
+        return word[start_index:]
+
+    def _tone_of_rime(self, rime: str) -> str:
+        # i, e, ê, o, ô, ơ, a,  ă, â, u, ư, y
+        first_char = rime[0]
+        len_char = len(rime)
+        flag = 0
+        if first_char in self.special_tone_dict:
+            # hòa, nước => ước
+            if first_char in self.even_chars:
+                flag += 0
+            elif first_char in self.special_tone_dict and first_char not in self.even_chars:
+                flag += 1
+            ### Check the second
+            for l in range(1, len_char):
+                second_char = rime[l]
+                if second_char in self.even_chars:
+                    flag += 0
+                elif second_char in self.special_tone_dict and second_char not in self.even_chars:
+                    flag += 1
+            flag = flag / len_char
+            if flag > 0: # if have existed a char with uneven ==> uneven
+                return 'uneven'
+            return 'even'
+
+        if first_char in self.even_chars:
+            return 'even'
+        return 'uneven'
+
+    def _analyze(self, word: str) -> Syllable:
+        rime = self.split_word(word)
+        tone_class = "khong_dau"
+        for char in rime:
+            char_class = self.tone_classes.get(char)
+            if char_class is not None and char_class != "khong_dau":
+                tone_class = char_class
+                break
+        return Syllable(
+            onset=word[:len(word) - len(rime)],
+            rime=rime,
+            rime_id=self.rime_ids.get(rime, UNKNOWN_RIME_ID),
+            tone_class=tone_class,
+            tone=self._tone_of_rime(rime) if rime else None,
+        )
+
+    def rhymes(self, rime_id1: int, rime_id2: int) -> Optional[bool]:
+        """
+            Check whether rime 2 is in the rhyme group of rime 1 with a single bit test
+
+            Args:
+                rime_id1: id of the first rime (Syllable.rime_id)
+                rime_id2: id of the second rime
+
+            Returns:
+                True / False, or None when rime 1 has no rhyme group in rhymes.txt
+        """
+        if rime_id1 == UNKNOWN_RIME_ID:
+            return None
+        mask = self.rhyme_masks[rime_id1]
+        if mask is None:
+            return None
+        return rime_id2 != UNKNOWN_RIME_ID and (mask >> rime_id2) & 1 == 1
+
+    def cache_info(self) -> Dict[str, float]:
+        """
+            Hit / miss counters of the syllable analysis cache
+        """
+        info = self.analyze.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "maxsize": info.maxsize,
+            "hit_rate": info.hits / lookups if lookups else 0.0,
+        }
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Lexicon is immutable, '{}' can not be assigned".format(name))
+
+    def __delattr__(self, name):
+        raise AttributeError("Lexicon is immutable, '{}' can not be deleted".format(name))
+
+
+def load_lexicon(
+        vowels_dict_path: str,
+        rhyme_dict_path: str,
+        tone_dict_path: str,
+        dictionary_path: str,
+        special_tone_dict_path: str
+) -> Lexicon:
+    """
+        Parse all asset files into a new Lexicon (no caching)
+
+        Args:
+            vowels_dict_path: path to vowels dictionary
+            rhyme_dict_path: path to rhyme dictionary
+            tone_dict_path: path to tone dictionary
+            dictionary_path: path to dictionary
+            special_tone_dict_path: path to special tone dictionary
+
+        Returns:
+            Lexicon: the parsed assets
+    """
+    start_vowels = load_data(vowels_dict_path)
+    even_chars, list_start_vowels, tones = vowel_tables(start_vowels)
+    rhymes_dict = rhyme(rhyme_dict_path)
+    rime_ids, rhyme_masks = rhyme_bitsets(rhymes_dict)
+    return Lexicon(
+        even_chars=frozenset(even_chars),
+        list_start_vowels=frozenset(list_start_vowels),
+        tones={key: frozenset(value) for key, value in tones.items()},
+        rhymes_dict={key: tuple(value) for key, value in rhymes_dict.items()},
+        tone_dict=tone(tone_dict_path),
+        dictionary_vi=dictionary(dictionary_path),
+        special_tone_dict=frozenset(special_tone(special_tone_dict_path)),
+        tone_classes=tone_classes(start_vowels),
+        rime_ids=rime_ids,
+        rhyme_masks=rhyme_masks,
+    )
+
+
+_LEXICON_REGISTRY: Dict[Tuple[str, ...], Tuple[Tuple[int, ...], Lexicon]] = {}
+_LEXICON_REGISTRY_LOCK = threading.Lock()
+
+
+def _stamp(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return -1
+
+
+def get_lexicon(
+        vowels_dict_path: str,
+        rhyme_dict_path: str,
+        tone_dict_path: str,
+        dictionary_path: str,
+        special_tone_dict_path: str,
+        bundle_path: Optional[str] = None
+) -> Lexicon:
+    """
+        Return the shared Lexicon for these asset files, loading it at most once per process.
+
+        The registry is keyed by the absolute asset paths; an entry is reloaded only when
+        the modification time of one of its files changes. When a compiled bundle exists
+        at bundle_path and is not older than the text assets, it is memory-mapped instead
+        of parsing the text files.
+
+        Args:
+            vowels_dict_path: path to vowels dictionary
+            rhyme_dict_path: path to rhyme dictionary
+            tone_dict_path: path to tone dictionary
+            dictionary_path: path to dictionary
+            special_tone_dict_path: path to special tone dictionary
+            bundle_path: optional path to a bundle built by lexicon_bundle
+
+        Returns:
+            Lexicon: the shared, immutable assets
+    """
+    paths = (
+        vowels_dict_path,
+        rhyme_dict_path,
+        tone_dict_path,
+        dictionary_path,
+        special_tone_dict_path,
+    )
+    key = tuple(os.path.abspath(path) for path in paths)
+    stamps = tuple(_stamp(path) for path in key)
+    use_bundle = False
+    if bundle_path is not None:
+        bundle_path = os.path.abspath(bundle_path)
+        bundle_stamp = _stamp(bundle_path)
+        use_bundle = bundle_stamp >= 0 and bundle_stamp >= max(stamps)
+        if bundle_stamp >= 0 and not use_bundle:
+            print(f"[LEXICON]: {bundle_path} is older than the text assets, parsing the text assets instead")
+        key = key + (bundle_path,)
+        stamps = stamps + (bundle_stamp,)
+
+    with _LEXICON_REGISTRY_LOCK:
+        entry = _LEXICON_REGISTRY.get(key)
+        if entry is not None and entry[0] == stamps:
+            return entry[1]
+
+        if use_bundle:
+            from .lexicon_bundle import load_lexicon_bundle
+            lexicon = load_lexicon_bundle(bundle_path)
+        else:
+            lexicon = load_lexicon(*paths)
+        _LEXICON_REGISTRY[key] = (stamps, lexicon)
+        return lexicon
+
+
+def clear_lexicon_registry() -> None:
+    """
+        Drop every cached Lexicon (mainly for tests and long-running processes)
+    """
+    with _LEXICON_REGISTRY_LOCK:
+        _LEXICON_REGISTRY.clear()
@@ -0,0 +1,387 @@
+""" Precompiled, memory-mapped binary bundle of the poetic assets.
+
+Layout (all integers native-endian, every section 8-byte aligned):
+
+    header   : MAGIC (8s) | version (I) | byte-order mark (I) | section count (I) | pad (I)
+    sections : count x (name (16s) | offset (Q) | length (Q))
+
+    meta        : repr() of the small assets (start vowels, tone template, special tones)
+    rimes.off   : uint32 offsets (n + 1) into rimes.str
+    rimes.str   : UTF-8 rimes, sorted by their encoded bytes
+    rhymes.key  : uint8 per rime, 1 when the rime is a key of rhymes.txt
+    rhymes.off  : uint32 offsets (n + 1) into rhymes.adj
+    rhymes.adj  : uint32 rime ids rhyming with each rime (adjacency table)
+    words.lab   : uint32 code point leading to each node of the dictionary trie
+    words.chi   : uint32 offsets (n + 1), children of node i are child nodes [chi[i], chi[i + 1])
+    words.end   : uint8 per node, 1 when the node ends a dictionary word
+
+The loader only maps the file, so N forked workers share one physical copy of the
+rhyme and word tables through the page cache.
+"""
+
+import os
+import ast
+import mmap
+import json
+import struct
+import argparse
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .trie import WordTrie, build_word_trie
+from .lexicon import (
+    Lexicon,
+    load_data,
+    vowel_tables,
+    tone_classes,
+)
+
+BUNDLE_MAGIC = b"AVPLEX\x00\x00"
+BUNDLE_VERSION = 2
+BUNDLE_BYTE_ORDER_MARK = 0x01020304
+
+_HEADER = struct.Struct("=8sIIII")
+_SECTION = struct.Struct("=16sQQ")
+_ALIGNMENT = 8
+
+
+class StringTable:
+    """
+        Sorted table of UTF-8 strings stored as an offset array plus a byte blob
+
+        Lookups are binary searches over the encoded bytes, which sort in the same
+        order as the code points.
+    """
+    __slots__ = ("_offsets", "_blob", "_size")
+
+    def __init__(self, offsets: memoryview, blob: memoryview):
+        self._offsets = offsets
+        self._blob = blob
+        self._size = len(offsets) - 1
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _encoded(self, index: int) -> bytes:
+        return bytes(self._blob[self._offsets[index]:self._offsets[index + 1]])
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("string table index out of range")
+        return self._encoded(index).decode("utf-8")
+
+    def __iter__(self):
+        for index in range(self._size):
+            yield self._encoded(index).decode("utf-8")
+
+    def _bisect_left(self, key: bytes, lo: int = 0, hi: Optional[int] = None) -> int:
+        hi = self._size if hi is None else hi
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._encoded(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, value: str, lo: int = 0, hi: Optional[int] = None) -> int:
+        """
+            Return the index of value, or -1 when it is not in the table
+        """
+        hi = self._size if hi is None else hi
+        key = value.encode("utf-8")
+        index = self._bisect_left(key, lo, hi)
+        if index < hi and self._encoded(index) == key:
+            return index
+        return -1
+
+    def __contains__(self, value) -> bool:
+        return isinstance(value, str) and self.find(value) >= 0
+
+    def prefix_range(self, prefix: str) -> Tuple[int, int]:
+        """
+            Return the [lo, hi) index range of the strings starting with prefix
+        """
+        key = prefix.encode("utf-8")
+        # 0xFF never occurs in UTF-8, so it sorts after every string sharing the prefix
+        return self._bisect_left(key), self._bisect_left(key + b"\xff")
+
+
+class MappedRhymeGroup:
+    """
+        The rimes rhyming with one rime, read straight from the adjacency table
+    """
+    __slots__ = ("_rimes", "_targets")
+
+    def __init__(self, rimes: StringTable, targets: memoryview):
+        self._rimes = rimes
+        self._targets = targets
+
+    def __contains__(self, rime) -> bool:
+        if not isinstance(rime, str):
+            return False
+        rime_id = self._rimes.find(rime)
+        return rime_id >= 0 and rime_id in self._targets
+
+    def __iter__(self):
+        for rime_id in self._targets:
+            yield self._rimes[rime_id]
+
+    def __len__(self) -> int:
+        return len(self._targets)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class MappedRhymes:
+    """
+        Read-only mapping ``rime -> rimes rhyming with it`` backed by the bundle
+    """
+    __slots__ = ("rimes", "_is_key", "_offsets", "_targets")
+
+    def __init__(self, rimes: StringTable, is_key: memoryview, offsets: memoryview, targets: memoryview):
+        self.rimes = rimes
+        self._is_key = is_key
+        self._offsets = offsets
+        self._targets = targets
+
+    def _key_id(self, rime) -> int:
+        if not isinstance(rime, str):
+            return -1
+        rime_id = self.rimes.find(rime)
+        if rime_id < 0 or not self._is_key[rime_id]:
+            return -1
+        return rime_id
+
+    def __getitem__(self, rime) -> MappedRhymeGroup:
+        rime_id = self._key_id(rime)
+        if rime_id < 0:
+            raise KeyError(rime)
+        return MappedRhymeGroup(
+            self.rimes,
+            self._targets[self._offsets[rime_id]:self._offsets[rime_id + 1]]
+        )
+
+    def __contains__(self, rime) -> bool:
+        return self._key_id(rime) >= 0
+
+    def get(self, rime, default=None):
+        try:
+            return self[rime]
+        except KeyError:
+            return default
+
+    def __iter__(self):
+        for rime_id in range(len(self.rimes)):
+            if self._is_key[rime_id]:
+                yield self.rimes[rime_id]
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        return [(rime, self[rime]) for rime in self]
+
+    def __len__(self) -> int:
+        return sum(1 for flag in self._is_key if flag)
+
+
+def _sorted_unique(values: Iterable[str]) -> List[str]:
+    return sorted(set(values), key=lambda value: value.encode("utf-8"))
+
+
+def _string_sections(name: str, values: List[str]) -> List[Tuple[str, bytes]]:
+    offsets = array("I", [0])
+    blob = bytearray()
+    for value in values:
+        blob += value.encode("utf-8")
+        offsets.append(len(blob))
+    return [(name + ".off", offsets.tobytes()), (name + ".str", bytes(blob))]
+
+
+def _read_words(dictionary_path: str) -> List[str]:
+    words = []
+    with open(dictionary_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            entry = json.loads(line.strip())
+            words.append(entry["text"].lower())
+    return words
+
+
+def build_lexicon_bundle(
+        vowels_dict_path: str,
+        rhyme_dict_path: str,
+        tone_dict_path: str,
+        dictionary_path: str,
+        special_tone_dict_path: str,
+        bundle_path: str
+) -> str:
+    """
+        Compile the five text assets into a single binary bundle
+
+        Args:
+            vowels_dict_path: path to vowels dictionary
+            rhyme_dict_path: path to rhyme dictionary
+            tone_dict_path: path to tone dictionary
+            dictionary_path: path to dictionary
+            special_tone_dict_path: path to special tone dictionary
+            bundle_path: output path of the bundle
+
+        Returns:
+            str: the bundle path
+    """
+    rhymes_dict = load_data(rhyme_dict_path)
+    meta = {
+        "start_vowels": load_data(vowels_dict_path),
+        "tone_dict": load_data(tone_dict_path),
+        "special_tone_dict": load_data(special_tone_dict_path),
+    }
+
+    rimes = _sorted_unique(
+        list(rhymes_dict.keys()) + [value for values in rhymes_dict.values() for value in values]
+    )
+    rime_ids = {rime: rime_id for rime_id, rime in enumerate(rimes)}
+    is_key = array("B", [1 if rime in rhymes_dict else 0 for rime in rimes])
+    adjacency_offsets = array("I", [0])
+    adjacency = array("I")
+    for rime in rimes:
+        adjacency.extend(rime_ids[value] for value in rhymes_dict.get(rime, ()))
+        adjacency_offsets.append(len(adjacency))
+
+    sections = [("meta", repr(meta).encode("utf-8"))]
+    sections += _string_sections("rimes", rimes)
+    sections += [
+        ("rhymes.key", is_key.tobytes()),
+        ("rhymes.off", adjacency_offsets.tobytes()),
+        ("rhymes.adj", adjacency.tobytes()),
+    ]
+    words = build_word_trie(_read_words(dictionary_path))
+    sections += [
+        ("words.lab", words.labels.tobytes()),
+        ("words.chi", words.child_starts.tobytes()),
+        ("words.end", words.terminal.tobytes()),
+    ]
+
+    table_size = _HEADER.size + _SECTION.size * len(sections)
+    position = _align(table_size)
+    entries = []
+    for name, payload in sections:
+        entries.append((name, position, len(payload)))
+        position = _align(position + len(payload))
+
+    tmp_path = bundle_path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, BUNDLE_BYTE_ORDER_MARK, len(sections), 0))
+        for name, offset, length in entries:
+            file.write(_SECTION.pack(name.encode("ascii"), offset, length))
+        for (name, offset, length), (_, payload) in zip(entries, sections):
+            file.write(b"\x00" * (offset - file.tell()))
+            file.write(payload)
+    os.replace(tmp_path, bundle_path)
+    return bundle_path
+
+
+def _align(position: int) -> int:
+    return (position + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _read_sections(buffer: memoryview) -> Dict[str, memoryview]:
+    magic, version, byte_order, count, _ = _HEADER.unpack_from(buffer, 0)
+    if magic != BUNDLE_MAGIC:
+        raise ValueError("Not a lexicon bundle (bad magic number)")
+    if version != BUNDLE_VERSION:
+        raise ValueError(
+            "Unsupported lexicon bundle version {} (expected {}), please rebuild it".format(version, BUNDLE_VERSION)
+        )
+    if byte_order != BUNDLE_BYTE_ORDER_MARK:
+        raise ValueError("Lexicon bundle was built on a machine with another byte order, please rebuild it")
+
+    sections = {}
+    for index in range(count):
+        name, offset, length = _SECTION.unpack_from(buffer, _HEADER.size + index * _SECTION.size)
+        sections[name.rstrip(b"\x00").decode("ascii")] = buffer[offset:offset + length]
+    return sections
+
+
+def load_lexicon_bundle(bundle_path: str) -> Lexicon:
+    """
+        Memory-map a bundle built by build_lexicon_bundle into a Lexicon
+
+        Args:
+            bundle_path: path of the bundle
+
+        Returns:
+            Lexicon: assets whose rhyme and word tables live in the shared mapping
+    """
+    with open(bundle_path, "rb") as file:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    sections = _read_sections(memoryview(mapping))
+
+    meta = ast.literal_eval(bytes(sections["meta"]).decode("utf-8"))
+    even_chars, list_start_vowels, tones = vowel_tables(meta["start_vowels"])
+
+    rimes = StringTable(sections["rimes.off"].cast("I"), sections["rimes.str"])
+    rhyme_tables = (
+        sections["rhymes.key"],
+        sections["rhymes.off"].cast("I"),
+        sections["rhymes.adj"].cast("I"),
+    )
+    rhymes_dict = MappedRhymes(rimes, *rhyme_tables)
+    rime_ids, rhyme_masks = _rhyme_bitsets(rimes, *rhyme_tables)
+    words = WordTrie(sections["words.lab"].cast("I"), sections["words.chi"].cast("I"), sections["words.end"])
+
+    return Lexicon(
+        even_chars=frozenset(even_chars),
+        list_start_vowels=frozenset(list_start_vowels),
+        tones={key: frozenset(value) for key, value in tones.items()},
+        rhymes_dict=rhymes_dict,
+        tone_dict=meta["tone_dict"],
+        dictionary_vi=words,
+        special_tone_dict=frozenset(meta["special_tone_dict"]),
+        tone_classes=tone_classes(meta["start_vowels"]),
+        rime_ids=rime_ids,
+        rhyme_masks=rhyme_masks,
+    )
+
+
+def _rhyme_bitsets(rimes: StringTable, is_key: memoryview, offsets: memoryview, targets: memoryview):
+    # Same ids as the rimes table, so no remapping of the adjacency lists is needed
+    rime_ids = {rimes[rime_id]: rime_id for rime_id in range(len(rimes))}
+    rhyme_masks = []
+    for rime_id in range(len(rimes)):
+        if not is_key[rime_id]:
+            rhyme_masks.append(None)
+            continue
+        mask = 0
+        for target in targets[offsets[rime_id]:offsets[rime_id + 1]]:
+            mask |= 1 << target
+        rhyme_masks.append(mask)
+    return rime_ids, tuple(rhyme_masks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the poetic assets into a binary lexicon bundle")
+    parser.add_argument("--assets", required=True, help="folder holding the five text assets")
+    parser.add_argument("--output", default=None, help="bundle path (default: <assets>/lexicon.bin)")
+    args = parser.parse_args()
+
+    assets = args.assets
+    output = args.output or os.path.join(assets, "lexicon.bin")
+    build_lexicon_bundle(
+        vowels_dict_path=os.path.join(assets, "start_vowels.txt"),
+        rhyme_dict_path=os.path.join(assets, "rhymes.txt"),
+        tone_dict_path=os.path.join(assets, "tone_dict.txt"),
+        dictionary_path=os.path.join(assets, "words.txt"),
+        special_tone_dict_path=os.path.join(assets, "vocab_dupple_check.txt"),
+        bundle_path=output
+    )
+    print(f"[LEXICON BUNDLE]: Saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
+
+    # python -m avp.avp.tools.lexicon_bundle --assets avp/avp/tools/assets/
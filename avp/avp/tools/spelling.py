@@ -0,0 +1,186 @@
+""" Spelling suggestions for the words missing from the dictionary (SymSpell-style deletion index)."""
+
+import functools
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .trie import WordTrie
+
+DEFAULT_TOP_K = 5
+DEFAULT_MAX_DISTANCE = 2
+SUGGESTION_CACHE_SIZE = 4096
+
+# Combining marks of the tones huyền, sắc, ngã, hỏi and nặng (NFD)
+TONE_MARKS = frozenset("\u0300\u0301\u0303\u0309\u0323")
+
+
+def strip_tone_marks(word: str) -> str:
+    """
+        Remove the tone mark of every vowel, keeping the other diacritics: mưởng -> mương
+    """
+    decomposed = unicodedata.normalize("NFD", word)
+    return unicodedata.normalize("NFC", "".join(char for char in decomposed if char not in TONE_MARKS))
+
+
+def delete_levels(word: str, max_distance: int) -> List[Set[str]]:
+    """
+        Strings obtained by deleting chars of word, by number of chars deleted: level n holds
+        the strings needing exactly n deletions (level 0 is {word})
+    """
+    levels = [{word}]
+    seen = {word}
+    for _ in range(max_distance):
+        level = {item[:i] + item[i + 1:] for item in levels[-1] for i in range(len(item))} - seen
+        seen |= level
+        levels.append(level)
+    return levels
+
+
+def deletes(word: str, max_distance: int) -> Set[str]:
+    """
+        word and every string obtained by deleting up to max_distance of its chars
+    """
+    return set().union(*delete_levels(word, max_distance))
+
+
+def edit_distance(first: str, second: str, max_distance: int) -> int:
+    """
+        Levenshtein distance of first and second, max_distance + 1 as soon as it is known to be larger
+    """
+    if abs(len(first) - len(second)) > max_distance:
+        return max_distance + 1
+    # Candidates mostly differ in one or two chars: the common prefix and suffix cost nothing
+    start = 0
+    while start < len(first) and start < len(second) and first[start] == second[start]:
+        start += 1
+    end = 0
+    while end < len(first) - start and end < len(second) - start and first[-1 - end] == second[-1 - end]:
+        end += 1
+    first, second = first[start:len(first) - end], second[start:len(second) - end]
+    if not first or not second:
+        return len(first) + len(second)
+
+    row = list(range(len(second) + 1))
+    for i, first_char in enumerate(first, 1):
+        previous, row[0] = row[0], i
+        for j, second_char in enumerate(second, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (first_char != second_char))
+        if min(row) > max_distance:
+            return max_distance + 1
+    return row[-1]
+
+
+class SpellingSuggester:
+    """
+        Top-k dictionary words close to a misspelled word
+
+        Every word is indexed under all its deletions of up to max_distance chars; the
+        candidates of a query are the words sharing one of its own deletions, so only a
+        handful of edit distances are computed per query. Candidates are ranked by edit
+        distance, then frequency (descending), then alphabetically.
+
+        With ignore_tones, words are indexed and compared without their tone marks, so a
+        wrong tone costs nothing (the distance with the marks breaks the ties).
+        Suggestions are memoized (suggest.cache_info()), a misspelling tends to come back.
+    """
+    __slots__ = ("words", "keys", "frequencies", "max_distance", "ignore_tones", "_index", "suggest")
+
+    def __init__(
+            self,
+            words: Iterable[str],
+            frequencies: Optional[Dict[str, int]] = None,
+            max_distance: int = DEFAULT_MAX_DISTANCE,
+            ignore_tones: bool = False,
+            cache_size: int = SUGGESTION_CACHE_SIZE
+    ):
+        self.words = sorted(set(word for word in words if word))
+        self.keys = [strip_tone_marks(word) if ignore_tones else word for word in self.words]
+        self.frequencies = [frequencies.get(word, 0) if frequencies else 0 for word in self.words]
+        self.max_distance = max_distance
+        self.ignore_tones = ignore_tones
+
+        # delete -> word ids by number of chars deleted from the word to get it
+        index: Dict[str, List[List[int]]] = {}
+        for word_id, key in enumerate(self.keys):
+            for removed, level in enumerate(delete_levels(key, max_distance)):
+                for delete in level:
+                    buckets = index.setdefault(delete, [])
+                    while len(buckets) <= removed:
+                        buckets.append([])
+                    buckets[removed].append(word_id)
+        self._index = index
+        self.suggest = functools.lru_cache(maxsize=cache_size)(self._suggest)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def _suggest(self, word: str, top_k: int = DEFAULT_TOP_K) -> Tuple[Tuple[str, int], ...]:
+        """
+            Dictionary words within max_distance edits of word
+
+            Args:
+                word: the misspelled word (lower-cased before the lookup)
+                top_k: maximum number of suggestions
+
+            Returns:
+                (word, distance) best first, at most top_k of them
+        """
+        word = word.lower()
+        key = strip_tone_marks(word) if self.ignore_tones else word
+        # A word at distance d and key share a string obtained by deleting at most d chars of
+        # each, so max(chars deleted from key, chars deleted from the word) is a lower bound of
+        # the distance. The postings are visited by that bound and the search stops once it
+        # exceeds the distance of the k-th best candidate found so far: the large postings of
+        # the short deletions are only read when no closer candidate is known.
+        levels = delete_levels(key, self.max_distance)
+        bound = self.max_distance
+        seen = set()
+        ranked = []
+        for lower in range(self.max_distance + 1):
+            if lower > bound:
+                break
+            for removed in range(lower + 1):
+                for word_removed in range(lower + 1):
+                    if max(removed, word_removed) != lower:
+                        continue
+                    for delete in levels[removed]:
+                        buckets = self._index.get(delete)
+                        if buckets is None or len(buckets) <= word_removed:
+                            continue
+                        for word_id in buckets[word_removed]:
+                            if word_id in seen:
+                                continue
+                            seen.add(word_id)
+                            distance = edit_distance(key, self.keys[word_id], bound)
+                            if distance > bound:
+                                continue
+                            candidate = self.words[word_id]
+                            tie_break = edit_distance(word, candidate, len(word) + len(candidate)) if self.ignore_tones else 0
+                            ranked.append((distance, tie_break, -self.frequencies[word_id], candidate))
+            if len(ranked) >= top_k:
+                ranked.sort()
+                bound = min(bound, ranked[top_k - 1][0])
+        ranked.sort()
+        return tuple((candidate, distance) for distance, _, _, candidate in ranked[:top_k])
+
+@functools.lru_cache(maxsize=8)
+def get_spelling_suggester(
+        dictionary: WordTrie,
+        max_distance: int = DEFAULT_MAX_DISTANCE,
+        ignore_tones: bool = False
+) -> SpellingSuggester:
+    """
+        Suggester over the single-syllable words of a lexicon dictionary, built on first use
+
+        The frequency of a syllable is the number of dictionary entries it appears in, so
+        common syllables (used in many compound words) come first among equal distances.
+    """
+    entries = list(dictionary)
+    frequencies = Counter(syllable for entry in entries for syllable in entry.split())
+    return SpellingSuggester(
+        (entry for entry in entries if " " not in entry),
+        frequencies=frequencies,
+        max_distance=max_distance,
+        ignore_tones=ignore_tones
+    )
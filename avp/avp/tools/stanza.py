@@ -0,0 +1,176 @@
+""" Tokenized stanza shared by the rhyme, tone, length and spelling checks."""
+
+import re
+from array import array
+from typing import List, Optional, Sequence, Tuple
+
+from .lexicon import Lexicon
+
+# Everything from the first special char on is ignored when checking a word (hương... -> hương)
+_SPECIAL_CHAR = re.compile(r"[^\w\s]")
+
+TONE_UNEVEN = 0
+TONE_EVEN = 1
+TONE_NONE = -1
+TONE_NAMES = {TONE_UNEVEN: "uneven", TONE_EVEN: "even"}
+
+# (line, position, mark) - position is None for a mark written in front of the line
+Mark = Tuple[int, Optional[int], str]
+
+# Lines of THẤT NGÔN following the tone_dict[7] pattern when line 0 starts uneven (the others use 71)
+FIRST_TONE_ROWS = (0, 3, 4, 7)
+MAX_LINES_78 = 8
+
+
+def strip_special_char(word: str) -> str:
+    """
+        Same as RhymesTonesMetrics.split_special_char: hương... -> hương
+    """
+    return _SPECIAL_CHAR.split(word, 1)[0]
+
+
+class Stanza:
+    """
+        A stanza parsed once into flat per-syllable arrays
+
+        Syllable k is the word ``words[k]`` at ``lines[k]`` / ``positions[k]``.
+        ``rime_ids[k]`` is the rime id of the word without its special chars and
+        ``tones[k]`` is TONE_EVEN (bằng) or TONE_UNEVEN (trắc) of the word as written.
+        Blank runs are dropped like preprocess_stanza does, and an empty line keeps
+        a single empty word so that line lengths match ``line.split(" ")``.
+    """
+    __slots__ = (
+        "words",
+        "clean_words",
+        "line_starts",
+        "lines",
+        "positions",
+        "rime_ids",
+        "tones",
+    )
+
+    def __init__(self, text: str, lexicon: Lexicon):
+        analyze = lexicon.analyze
+        self.words: List[str] = []
+        self.clean_words: List[str] = []
+        self.line_starts = array("I", [0])
+        self.lines = array("I")
+        self.positions = array("I")
+        self.rime_ids = array("i")
+        self.tones = array("b")
+
+        for line_index, line in enumerate(text.split("\n")):
+            tokens = [word for word in line.split(" ") if word] or [""]
+            for position, word in enumerate(tokens):
+                clean_word = strip_special_char(word)
+                tone = analyze(word).tone
+                self.words.append(word)
+                self.clean_words.append(clean_word)
+                self.lines.append(line_index)
+                self.positions.append(position)
+                self.rime_ids.append(analyze(clean_word).rime_id)
+                self.tones.append(TONE_NONE if tone is None else TONE_EVEN if tone == "even" else TONE_UNEVEN)
+            self.line_starts.append(len(self.words))
+
+    def __len__(self) -> int:
+        return len(self.line_starts) - 1
+
+    @property
+    def is_stanza(self) -> bool:
+        """
+            False when an inner line is empty, i.e. the text holds a stanza break
+        """
+        return not any(
+            self.line_length(line) == 1 and not self.words[self.line_starts[line]]
+            for line in range(1, len(self) - 1)
+        )
+
+    @property
+    def word_count(self) -> int:
+        return sum(1 for word in self.words if word)
+
+    def line_length(self, line: int) -> int:
+        return self.line_starts[line + 1] - self.line_starts[line]
+
+    def line(self, line: int) -> List[str]:
+        return self.words[self.line_starts[line]:self.line_starts[line + 1]]
+
+    def index(self, line: int, position: int) -> int:
+        """
+            Flat syllable index, raising IndexError like ``line.split(" ")[position]``
+        """
+        length = self.line_length(line)
+        if position < 0:
+            position += length
+        if not 0 <= position < length:
+            raise IndexError("list index out of range")
+        return self.line_starts[line] + position
+
+    def word(self, line: int, position: int) -> str:
+        return self.words[self.index(line, position)]
+
+    def clean_word(self, line: int, position: int) -> str:
+        return self.clean_words[self.index(line, position)]
+
+    def rime_id(self, line: int, position: int) -> int:
+        return self.rime_ids[self.index(line, position)]
+
+    def tone(self, line: int, position: int) -> str:
+        """
+            'even' or 'uneven', raising IndexError for an empty word like get_tone
+        """
+        tone = self.tones[self.index(line, position)]
+        if tone == TONE_NONE:
+            raise IndexError("string index out of range")
+        return TONE_NAMES[tone]
+
+
+def render_stanza(
+        stanza: Stanza,
+        marks: Sequence[Mark],
+        labels: Optional[Sequence[str]] = None
+) -> str:
+    """
+        Write the marks back into the stanza text, only when the caller asks for it
+
+        Args:
+            stanza: the parsed stanza
+            marks: (line, position, mark) in the order they were found; a None position
+                puts the mark in front of the line ("(L)"), otherwise it follows the word
+                ("(E_V)", "(E_T)", "(T)", "(B)")
+            labels: optional label appended to each line ("(R)", "(E_V)")
+
+        Returns:
+            str: the annotated stanza
+    """
+    words = list(stanza.words)
+    prefixes = [""] * len(stanza)
+    for line, position, mark in marks:
+        if position is None:
+            prefixes[line] = prefixes[line] + mark
+        else:
+            index = stanza.line_starts[line] + position
+            words[index] = words[index] + mark
+
+    rendered = []
+    for line in range(len(stanza)):
+        text = prefixes[line] + " ".join(words[stanza.line_starts[line]:stanza.line_starts[line + 1]])
+        if labels is not None:
+            text = text + labels[line]
+        rendered.append(text)
+    return "\n".join(rendered)
+
+
+def is_regular(line_lengths: Sequence[int], tag: str) -> bool:
+    """
+        Whether a stanza has the regular shape of its tag: LỤC BÁT lines of 6 / 8 words
+        alternating over an even number of lines, THẤT NGÔN lines of 7 words, at most 8 lines
+    """
+    n_lines = len(line_lengths)
+    if tag == "68":
+        return n_lines >= 2 and n_lines % 2 == 0 and all(
+            length == (6 if line % 2 == 0 else 8) for line, length in enumerate(line_lengths)
+        )
+    if tag == "78":
+        return 1 <= n_lines <= MAX_LINES_78 and all(length == 7 for length in line_lengths)
+    return False
@@ -0,0 +1,137 @@
+""" Compact read-only trie of the dictionary words (words.txt)."""
+
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+class WordTrie:
+    """
+        Trie stored as three flat arrays, nodes numbered in breadth-first order
+
+        labels[node]: code point of the character leading to node (0 for the root)
+        child_starts[node] .. child_starts[node + 1]: children of node, sorted by label
+        terminal[node]: 1 when the path to node spells a word
+
+        About 9 bytes per node instead of a str object per word, and the arrays can be
+        written as is into the lexicon bundle and memory-mapped back.
+    """
+    __slots__ = ("labels", "child_starts", "terminal", "_size")
+
+    def __init__(self, labels: Sequence[int], child_starts: Sequence[int], terminal: Sequence[int]):
+        self.labels = labels
+        self.child_starts = child_starts
+        self.terminal = terminal
+        self._size = sum(terminal)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _child(self, node: int, char: str) -> int:
+        lo, hi = self.child_starts[node], self.child_starts[node + 1]
+        label = ord(char)
+        index = bisect_left(self.labels, label, lo, hi)
+        if index < hi and self.labels[index] == label:
+            return index
+        return -1
+
+    def _find(self, text: str) -> int:
+        node = 0
+        for char in text:
+            node = self._child(node, char)
+            if node < 0:
+                return -1
+        return node
+
+    def __contains__(self, word) -> bool:
+        if not isinstance(word, str) or not word:
+            return False
+        node = self._find(word)
+        return node >= 0 and self.terminal[node] == 1
+
+    def _walk(self, node: int, prefix: str) -> Iterator[str]:
+        # Depth-first, children in label order, so words come out sorted by code point
+        stack = [(node, prefix)]
+        while stack:
+            node, prefix = stack.pop()
+            if self.terminal[node]:
+                yield prefix
+            for child in range(self.child_starts[node + 1] - 1, self.child_starts[node] - 1, -1):
+                stack.append((child, prefix + chr(self.labels[child])))
+
+    def __iter__(self) -> Iterator[str]:
+        return self._walk(0, "")
+
+    def prefix(self, prefix: str, limit: Optional[int] = None) -> List[str]:
+        """
+            Words starting with prefix, sorted, at most limit of them
+        """
+        node = self._find(prefix)
+        if node < 0:
+            return []
+        words = []
+        for word in self._walk(node, prefix):
+            if limit is not None and len(words) >= limit:
+                break
+            words.append(word)
+        return words
+
+    def within_distance(self, word: str, max_distance: int = 1) -> List[Tuple[str, int]]:
+        """
+            Dictionary words at Levenshtein distance <= max_distance of word
+
+            The edit-distance row is carried down the trie and a branch is cut as soon
+            as every cell of its row is above max_distance.
+
+            Returns:
+                (word, distance) sorted by distance then word
+        """
+        first_row = list(range(len(word) + 1))
+        matches = []
+        stack = [(0, "", first_row)]
+        while stack:
+            node, prefix, row = stack.pop()
+            if self.terminal[node] and row[-1] <= max_distance and prefix:
+                matches.append((prefix, row[-1]))
+            for child in range(self.child_starts[node], self.child_starts[node + 1]):
+                char = chr(self.labels[child])
+                next_row = [row[0] + 1]
+                for column in range(1, len(word) + 1):
+                    next_row.append(min(
+                        next_row[column - 1] + 1,
+                        row[column] + 1,
+                        row[column - 1] + (word[column - 1] != char),
+                    ))
+                if min(next_row) <= max_distance:
+                    stack.append((child, prefix + char, next_row))
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches
+
+
+def build_word_trie(words: Iterable[str]) -> WordTrie:
+    """
+        Build the trie of a list of words (duplicates and empty strings are ignored)
+    """
+    # Level by level: the children of the nodes of one level are the next level, in parent order
+    labels = array("I", [0])
+    child_starts = array("I", [1])
+    terminal = array("B", [0])
+    level = [sorted(set(word for word in words if word))]
+    depth = 0
+    while level:
+        next_level = []
+        for group in level:
+            # group: sorted words spelling the path to the current node, in node order
+            children = {}
+            for word in group:
+                if len(word) == depth:
+                    continue
+                children.setdefault(word[depth], []).append(word)
+            for char, child_words in children.items():
+                labels.append(ord(char))
+                terminal.append(1 if len(child_words[0]) == depth + 1 else 0)
+                next_level.append(child_words)
+            child_starts.append(child_starts[-1] + len(children))
+        level = next_level
+        depth += 1
+    return WordTrie(labels, child_starts, terminal)
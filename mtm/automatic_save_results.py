@@ -1,13 +1,14 @@
 import os 
-import re
 import time 
-import json
-import  pandas as pd
+import asyncio
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
 import numpy as np
 
 from mtm.models import (
     DeepSeekModel, 
-    OpenRouterModel
+    AsyncOpenRouterModel
 )
 from mtm.processes import RhymesTonesMetrics
 from mtm.configs.schemas import (
@@ -22,7 +23,7 @@ from mtm.configs import *
 from mtm.prompts import SYSTEM_PROMPT
 
 from mtm.processes import MaskErrorTokenization
-from mtm.utils import read_file_from_url
+from mtm.utils import resolve_dataset, iter_chunks, read_column, extract_poems, ResponseParseError, Stage, StagedPipeline, ResultSink, RunManifest, input_hash, keep_aside
 
 def create_prompt_user(user_prompt: str) -> str:
     prompt = f"""
@@ -33,31 +34,37 @@ def create_prompt_user(user_prompt: str) -> str:
 
 def read_datasets(
         path: str,
-        column: str
-) -> str:
+        column: Optional[str],
+        offline: bool = DATASET_OFFLINE
+) -> List[Any]:
     """
         A function to read dataset for evaluating the corrected poem input testing 
         
         Args:
-            path (str): path of dataset file
+            path (str): path of dataset file (CSV, JSONL or Parquet) or url of a Google Sheet,
+                fetched once into DATASET_CACHE_DIR
+            column (str, optional): column of the poems, None for whole rows
+            offline (bool): read an url from the dataset cache only
 
         Returns:
-            str: dataset
+            List[Any]: the values of the column (the rows when column is None)
     """
-
-    dataset = read_file_from_url(path)
-    # Check if column exists
-    if column not in dataset:
-        raise ValueError(f"Column {column} not found in dataset")
-    # Return all columns having as possible as input of dataset
     if column is None:
-        return dataset
-    # Return specific column
-    return dataset[f"{column}"]
+        dataset = resolve_dataset(path, cache_dir=DATASET_CACHE_DIR, max_age=DATASET_MAX_AGE, offline=offline)
+        return [row for chunk in iter_chunks(dataset, chunk_size=DATASET_CHUNK_SIZE) for row in chunk]
+    # Raises ValueError when the column is not in the dataset
+    return list(read_column(
+        path,
+        column,
+        cache_dir=DATASET_CACHE_DIR,
+        chunk_size=DATASET_CHUNK_SIZE,
+        max_age=DATASET_MAX_AGE,
+        offline=offline
+    ))
 
 
 def calculate_top_k(
-        poem_inputs: Dict[str, Any],
+        poem_inputs: List[Dict[str, Any]],
         metrics: RhymesTonesMetrics,
         all_responses: List[Dict[str, Any]],
         tag: str,
@@ -67,28 +74,23 @@ def calculate_top_k(
         A function to check and calculate top-k score of  generated poems from OpenRouterModel and DeepSeekModel
 
         Args:
-            poem_inputs (Dict[str, Any]): poems generated from OpenRouterModel and DeepSeekModel
+            poem_inputs (List[Dict[str, Any]]): poems generated from OpenRouterModel and DeepSeekModel
             metrics (RhymesTonesMetrics): rhymes and tones metrics
             tag (str): tag Input - type of poem
             k (int, optional): top-k. Defaults to 3.
 
         Returns:
-            top_k: top-k score
+            top_k: top-k score, with the scored poems under "responses"
 
     """
     outputs = {}
-    poems = []
-    scores = []
-    for i, poem in enumerate(poem_inputs):
-        score = metrics.calculate_score(
-            poem=poem["poem_text"],
-            tag=tag
-        )
-        poems.append(poem["poem_text"])
-        scores.append(score)
-
+    poems = [poem["poem_text"] for poem in poem_inputs]
+    # Every candidate is scored in one vectorized pass
+    scores = metrics.score_batch(poems, tag).scores.tolist()
+    for i, score in enumerate(scores):
         # Add response to all_responses
         poem_inputs[i]["score"] = score
+    outputs["responses"] = poem_inputs
     top_k = sorted(zip(poems, scores), key=lambda x: x[1], reverse=True)[:k]
     outputs["corrected_poem"] = top_k[0][0]
     outputs["corrected_score"] = top_k[0][1]
@@ -99,16 +101,186 @@ def calculate_top_k(
     return outputs
         
 
+# What each stage of the evaluation adds to a stanza, kept in the run manifest so that a
+# resumed run goes on from the last stage a stanza reached
+STAGE_FIELDS = {
+    "mask": ("poem_input", "tag", "user_prompt", "check_score"),
+    "fill": ("responses", "recall_counts", "time"),
+    "score": ("responses", "corrected_poem", "corrected_score", "top_k_corrected_score"),
+    "persist": (),
+}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Evaluate the corrected poems of the dataset and save the results")
+    parser.add_argument(
+        "--dataset",
+        default=GOOGLE_SHEETS_URL,
+        help="CSV, JSONL or Parquet file, or Google Sheets url, of the poems (default: GOOGLE_SHEETS_URL)"
+    )
+    parser.add_argument("--column", default="Qwen_output", help="column of the poems")
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        default=DATASET_OFFLINE,
+        help="read a dataset url from the local dataset cache only"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="go on with the run which stopped (run_manifest.jsonl and the result files) instead of starting a new one"
+    )
+    return parser.parse_args()
+
+
+# Masking and scoring tools of a worker process, built once by the pool initializer
+_worker_met = None
+_worker_metrics = None
+
+
+def init_stanza_worker(
+        met_config: Optional[MaskErrorTokenizationConfig],
+        metrics_config: PoeticRulesMetricsConfig
+):
+    global _worker_met, _worker_metrics
+    if met_config is not None:
+        _worker_met = MaskErrorTokenization(met_config = met_config)
+    _worker_metrics = RhymesTonesMetrics(metrics_config = metrics_config)
+
+
+def mask_stanza(stanza: Dict[str, Any]) -> Dict[str, Any]:
+    """
+        Mask stage (in a worker process): the masked prompt of a stanza and its score before calling the model
+    """
+    poem_input, luc_bat, final_poem = _worker_met.mask_error_tokenization(
+        poem_input = stanza["poem"]
+    )
+    tag = "68" if luc_bat else "78"
+    stanza["poem_input"] = poem_input
+    stanza["tag"] = tag
+    stanza["user_prompt"] = create_prompt_user(user_prompt = final_poem)
+    stanza["check_score"] = _worker_metrics.calculate_score(poem=poem_input, tag=tag)
+    return stanza
+
+
+async def fill_stanza(
+        openrouter_model: AsyncOpenRouterModel,
+        stanza: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+        LLM fill stage: the candidate poems of a stanza (the stanza itself when it needs no correction
+        or when the model gives nothing usable)
+    """
+    start_time = time.time()
+    if stanza["check_score"] >= 100.0:
+        responses, recall_counts = [{"poem_number": 1, "poem_text": stanza["poem_input"]}], 1
+    else:
+        response, recall_counts = await openrouter_model.calling_model(user_prompt=stanza["user_prompt"])
+        responses = None
+        if response is not None:
+            # Fences, + joined strings, raw newlines and cut answers are dealt with in one pass
+            try:
+                responses = extract_poems(response)
+            except ResponseParseError as e:
+                print("Failed to parse JSON from response:", e)
+        if responses is None:
+            responses, recall_counts = [{"poem_number": 1, "poem_text": stanza["poem_input"]}], -1
+    stanza["responses"] = responses
+    stanza["recall_counts"] = recall_counts
+    stanza["time"] = time.time() - start_time
+    return stanza
+
+
+def score_stanza(stanza: Dict[str, Any]) -> Dict[str, Any]:
+    """
+        Score stage (in a worker process): top-1 candidate of a stanza
+    """
+    all_responses = []
+    # corrected_poem : having only top 1 generated poems having highest corrected score
+    # corrected_score : having only top 1 generated poems having highest corrected score
+    results = calculate_top_k(
+        poem_inputs=stanza["responses"],
+        metrics=_worker_metrics,
+        all_responses=all_responses,
+        tag = stanza["tag"],
+        k=1
+    )
+    stanza["responses"] = results["responses"]
+    stanza["corrected_poem"] = results["corrected_poem"]
+    stanza["corrected_score"] = results["corrected_score"]
+    stanza["top_k_corrected_score"] = float(results["top_k_corrected_score"])
+    return stanza
+
+
+def stanza_row(stanza: Dict[str, Any]) -> Dict[str, Any]:
+    """
+        Persist stage: the result row of a stanza (result.csv columns, its key and its candidates)
+    """
+    print(f"poem_input: {stanza['poem']}")
+    print(f"final_poem: {stanza['corrected_poem']}")
+    print(f"top_k: {stanza['responses']}")
+    print(f"time: {stanza['time']}")
+    print(f"corrected_score: {stanza['corrected_score']}")
+    print(f"corrected_score_topk: {stanza['top_k_corrected_score']}")
+    return {
+        "poem_input": stanza["poem"],
+        "final_poem": stanza["corrected_poem"],
+        "user_prompt": stanza["user_prompt"],
+        "time": stanza["time"],
+        "corrected_score": stanza["corrected_score"],
+        "corrected_score_topk": stanza["top_k_corrected_score"],
+        "recall_counts": stanza["recall_counts"],
+        "input_hash": input_hash(stanza["poem"]),
+        "responses": stanza["responses"],
+    }
+
+
 if __name__ == "__main__":
 
+    args = parse_args()
     r_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     print(f"\n\n[ROOT_PATH]: {r_path} \n\n")
 
     data = read_datasets(
-        path=GOOGLE_SHEETS_URL, 
-        column="Qwen_output"
+        path=args.dataset, 
+        column=args.column,
+        offline=args.offline
     )
-    print(f"data: \n{data}")
+    print(f"data: {len(data)} poems")
+
+    # A new run keeps the files of the previous one aside (.bak); with --resume, the stanzas
+    # already in all_responses.jsonl are not evaluated again and the others go on from the
+    # last stage the manifest has for them (no second masking, model call or scoring)
+    jsonl_path = os.path.join(r_path, "all_responses.jsonl")
+    csv_path = os.path.join(r_path, "result.csv")
+    if not args.resume:
+        keep_aside(jsonl_path)
+        keep_aside(csv_path)
+    manifest = RunManifest(
+        path=os.path.join(r_path, "run_manifest.jsonl"),
+        run={"dataset": args.dataset, "column": args.column, "rows": len(data), "model": OPENROUTER_MODEL_NAME, "temperature": TEMPERATURE},
+        resume=args.resume,
+        fsync_every=RESULTS_FSYNC_EVERY
+    )
+    # Rows are appended once, synced every RESULTS_FSYNC_EVERY seconds
+    sink = ResultSink(
+        jsonl_path=jsonl_path,
+        csv_path=csv_path,
+        flush_every=RESULTS_FLUSH_EVERY,
+        fsync_every=RESULTS_FSYNC_EVERY
+    )
+    stanzas = []
+    given_up = []
+    for row, poem in sink.pending(list(enumerate(data)), key=lambda item: item[1]):
+        # A stanza failing on every run would stop every resumed run at the same place
+        if manifest.failures(row, poem) >= RESUME_MAX_FAILURES:
+            given_up.append(row)
+            continue
+        checkpoint = manifest.checkpoint(row, poem) or {}
+        stanzas.append({**checkpoint, "row": row, "poem": poem})
+    print(f"[RESULT SINK]: {len(data) - len(stanzas) - len(given_up)} stanzas already saved, {len(stanzas)} to evaluate")
+    if given_up:
+        print(f"[RUN MANIFEST]: {len(given_up)} stanzas failed {RESUME_MAX_FAILURES} times, left out: rows {given_up}")
     
     # Configuration for MaskErrorTokenization Function 
     mask_err_tok_config = MaskErrorTokenizationConfig(
@@ -117,204 +289,115 @@ if __name__ == "__main__":
             rhyme_dict_path = RHYME_DICT_PATH,
             tone_dict_path = TONE_DICT_PATH,
             dictionary_path = DICTIONARY_PATH,
-            special_tone_dict_path = SPECIAL_TONE_DICT_PATH
+            special_tone_dict_path = SPECIAL_TONE_DICT_PATH,
+            lexicon_bundle_path = LEXICON_BUNDLE_PATH
         ),
         count_syllable_config = CountSyllablePoemsConfig(
-            masked_words = CS_MASKED_WORDS,
-            idx_masked_words = CS_IDX_MASKED_WORDS,
             token_masked_words = CS_TOKEN_MASKED_WORDS
         )
     )
 
-    met = MaskErrorTokenization(
-        met_config = mask_err_tok_config
-    )
     # Configuration for DeepSeek modeling 
-    openrouter_model = OpenRouterModel(
-        model_config=OpenRouterModelConfig(
-            SYSTEM_PROMPT=SYSTEM_PROMPT,
-            OPENROUTER_MODEL_NAME=OPENROUTER_MODEL_NAME,
-            OPENROUTER_API_KEY=OPENROUTER_DEEPSEEK_API_KEY,
-            OPENROUTER_BASE_URL=OPENROUTER_BASE_URL,
-            STREAM=STREAM,
-            TEMPERATURE=TEMPERATURE,
-            MAX_TOKENS=MAX_TOKENS,
-            RANKING_URL=RANKING_URL,
-            RANKING_NAME=RANKING_NAME,
-            INCLUDE_REASONING=INCLUDE_REASONING
-        ))
+    openrouter_config = OpenRouterModelConfig(
+        SYSTEM_PROMPT=SYSTEM_PROMPT,
+        OPENROUTER_MODEL_NAME=OPENROUTER_MODEL_NAME,
+        OPENROUTER_API_KEY=OPENROUTER_DEEPSEEK_API_KEY,
+        OPENROUTER_BASE_URL=OPENROUTER_BASE_URL,
+        STREAM=STREAM,
+        TEMPERATURE=TEMPERATURE,
+        MAX_TOKENS=MAX_TOKENS,
+        RANKING_URL=RANKING_URL,
+        RANKING_NAME=RANKING_NAME,
+        INCLUDE_REASONING=INCLUDE_REASONING,
+        KEEP_REASONING=KEEP_REASONING,
+        POOL_CONNECTIONS=POOL_CONNECTIONS,
+        POOL_MAXSIZE=POOL_MAXSIZE,
+        KEEP_ALIVE=KEEP_ALIVE,
+        CONNECT_TIMEOUT=CONNECT_TIMEOUT,
+        READ_TIMEOUT=READ_TIMEOUT,
+        MAX_ATTEMPTS=MAX_ATTEMPTS,
+        BACKOFF_BASE=BACKOFF_BASE,
+        BACKOFF_MAX=BACKOFF_MAX,
+        RETRY_DEADLINE=RETRY_DEADLINE,
+        MAX_CONCURRENCY=MAX_CONCURRENCY,
+        REQUESTS_PER_MINUTE=REQUESTS_PER_MINUTE,
+        REQUESTS_BURST=REQUESTS_BURST,
+        CACHE_PATH=CACHE_PATH,
+        CACHE_TTL=CACHE_TTL,
+        CACHE_MAX_BYTES=CACHE_MAX_BYTES,
+        CACHE_ONLY=CACHE_ONLY
+    )
 
     metrics_config =  PoeticRulesMetricsConfig(
         vowels_dict_path = VOWELS_DICT_PATH,
         rhyme_dict_path = RHYME_DICT_PATH,
         tone_dict_path = TONE_DICT_PATH,
         dictionary_path = DICTIONARY_PATH,
-        special_tone_dict_path = SPECIAL_TONE_DICT_PATH
+        special_tone_dict_path = SPECIAL_TONE_DICT_PATH,
+        lexicon_bundle_path = LEXICON_BUNDLE_PATH
     )
 
-    metrics = RhymesTonesMetrics(
-        metrics_config = metrics_config
+    # mask (process pool) -> LLM fill (async, token bucket) -> score (process pool) -> persist (one writer).
+    # Worker processes each load the lexicon once (the bundle is memory-mapped and shared);
+    # the pace of the requests is kept by the rate limiter of the model, not by sleeping.
+    mask_workers = MASK_WORKERS or os.cpu_count() or 1
+    score_workers = SCORING_WORKERS or os.cpu_count() or 1
+    mask_pool = ProcessPoolExecutor(
+        max_workers=mask_workers,
+        initializer=init_stanza_worker,
+        initargs=(mask_err_tok_config, metrics_config)
     )
-
-
-    all_responses, poem_inputs, corrected_poems, prompt_inputs, top_k_poems, generated_times, corrected_scores, top_k_corrected_scores =  [[] for _ in range(8)]
-    
-    df = pd.DataFrame(
-        columns=[
-            "poem_input",
-            "final_poem",
-            "user_prompt",
-            "top_k",
-            "time",
-            "corrected_score",
-        ],
-        index=None,
-        dtype=str
+    score_pool = ProcessPoolExecutor(
+        max_workers=score_workers,
+        initializer=init_stanza_worker,
+        initargs=(None, metrics_config)
     )
 
-
-    #  Running all around the dataset for evaluating the model
-    for i in range(len(data)):
-        print(f"\n[MASK ERROR TOKENIZATION]: Begin processing stanza {i + 1}...")
-        poem_input, luc_bat, final_poem = met.mask_error_tokenization(
-            poem_input = data[i]
-        )
-        print(final_poem)
-        print(f"\nCompleted MASK ERROR TOKENIZATION SUCCESSFULLY")
-        tag = "68" if luc_bat else "78"
-
-        user_prompt = create_prompt_user(user_prompt = final_poem)
-        print(user_prompt)
-        # Check score before calling reasoning model
-        check_score = metrics.calculate_score(
-            poem=poem_input,
-            tag=tag
-        )
-        #  Calling Reasoning Model From OpenRouter Framework
-        #  calculate time
-        start_time = time.time()
-        if check_score >= 100.0:
-            json_response, recall_counts = {"responses": [{"poem_number": 1, "poem_text": poem_input}]}, 1
-        else:
-            print(f"[OPENROUTER MODEL]: Begin processing stanza ...")
-            response, recall_counts = openrouter_model.calling_model(user_prompt=user_prompt)
-            if response == None:
-                json_response, recall_counts = {"responses": [{"poem_number": 1, "poem_text": poem_input}]}, -1
-            print(f"json_response: \n{response}")
-            
-            if response.startswith("```"):
-                match = re.search(r'```json\s*(.*?)```', response, re.DOTALL)
-                if match:
-                    response = match.group(1).strip()
-            def clean_json_string(bad_json):
-                # Remove all `+` signs
-                cleaned = re.sub(r'\s*\+\s*', '', bad_json)
-                return cleaned
-            response = clean_json_string(response)
-            response = response.replace('""', '')
-            # This regex will handle newlines inside the values
-            response = re.sub(r'(?<=: ")(.*?)(?=")', lambda m: m.group(0).replace('\n', '\\n'), response, flags=re.DOTALL)
-
-            try:
-                json_response = json.loads(response)
-            except json.JSONDecodeError as e:
-                print("Failed to parse JSON from response:", e)
-            # json_response = json.loads(response)
-        # End time
-        end_time = time.time()
-        print(f"Completed OPENROUTER MODEL SUCCESSFULLY")
-
-        # Calculate range of runing time
-        range_time = end_time - start_time
-
-        print(f"[CACULATE TOP K]: Begin processing stanza ...")
-        # Calculate the final poem which would be saved including 
-        # all_response_poems : having both original and top k generated poems
-        # corrected_poem : having only top 1 generated poems having highest corrected score
-        # corrected_score : having only top 1 generated poems having highest corrected score
-        results = calculate_top_k(
-            poem_inputs=json_response["responses"],
-            metrics=metrics,
-            all_responses=all_responses,
-            tag = tag,
-            k=1
-        )
-        # final_poem = ""
-        corrected_score = results["corrected_score"]
-        corrected_poem = results["corrected_poem"]
-        top_k_corrected_score = results["top_k_corrected_score"]
-
-        
-        # Save data to list storage
-        # all_responses.extend(response["responses"])
-        # poem_inputs.append(data[i])
-        # generated_times.append(range_time)
-        # corrected_poems.append(corrected_poem)
-        # prompt_inputs.append(user_prompt)
-        # top_k_poems.append(json_response["responses"])
-        # corrected_scores.append(corrected_score)
-        # top_k_corrected_scores.append(top_k_corrected_score)
-        print(f"Completed CACULATE TOP K SUCCESSFULLY")
-        print(f"RUNNING STANZA {i + 1} COMPLETED SUCCESSFULLY")
-
-        print(f"poem_input: {data[i]}")
-        print(f"final_poem: {corrected_poem}")
-        print(f"user_prompt: {user_prompt}")
-        print(f"top_k: {json_response['responses']}")
-        print(f"time: {range_time}")
-        print(f"corrected_score: {corrected_score}")
-        print(f"corrected_score_topk: {top_k_corrected_score}")
-
-
-        # print(f"Resetting request rate and calling the model after {i + 1} stanzas... Sleeping for 60 seconds...")
-
-        # Build DataFrame directly from data
-        df_extened = pd.DataFrame({
-            "poem_input": [data[i]],
-            "final_poem": [corrected_poem],
-            "user_prompt": [user_prompt],
-            "top_k": [str(json_response["responses"])],
-            "time": [range_time],
-            "corrected_score": [corrected_score],
-            "corrected_score_topk": [top_k_corrected_score],
-            "recall_counts": [recall_counts],
-        },
-            index=None,
-            dtype=str
-        )
-
-        # Append to CSV
-        df_path = os.path.join(r_path, "result.csv")
-        if not os.path.exists(df_path):
-            df_extened.to_csv(df_path, mode="w", index=False)
-        elif os.path.getsize(df_path) == 0:
-            df_extened.to_csv(df_path, mode="w", header=True, index=False) 
-        else:
-            df_extened.to_csv(df_path, mode="a", header=not os.path.exists(df_path), index=False)
-        print(f"Saved to CSV: {df_path} at stanza {i + 1}")
-
-        # Handle JSON
-        json_data_path = os.path.join(r_path, "all_responses.json")
-        print(f"Saving result to JSON: {json_data_path}  at stanza {i + 1}")
-        if os.path.exists(json_data_path):
-            with open(json_data_path, "r", encoding="utf-8") as file:
-                content = file.read().strip()
-                if content == "":
-                    existing_data = []
-                else:
-                    existing_data = json.loads(content)
-        else:
-            existing_data = []
-
-        existing_data.extend(all_responses)
-
-        with open(json_data_path, "w", encoding="utf-8") as file:
-            json.dump(existing_data, file, indent=4, ensure_ascii=False)
-
-
-        if i % 5 == 0:
-            print(f"Sleeping for 60 seconds... at stanza {i + 1}")
-            time.sleep(60)
+    async def run_pipeline():
+        async with AsyncOpenRouterModel(openrouter_config) as openrouter_model:
+            async def fill(stanza):
+                return await fill_stanza(openrouter_model, stanza)
+
+            def persist(stanza):
+                sink.write(stanza_row(stanza))
+                return stanza
+
+            def checkpoint(stage, stanza):
+                manifest.record(stanza["row"], stanza["poem"], stage, {field: stanza[field] for field in STAGE_FIELDS[stage]})
+
+            def failure(stage, stanza, error):
+                # The run goes on without the stanza; --resume tries it again
+                manifest.record_failure(stanza["row"], stanza["poem"], stage, f"{type(error).__name__}: {error}")
+
+            pipeline = StagedPipeline(
+                stages=[
+                    Stage("mask", mask_stanza, workers=mask_workers, executor=mask_pool,
+                          skip=lambda stanza: "user_prompt" in stanza),
+                    Stage("fill", fill, workers=MAX_CONCURRENCY, skip=lambda stanza: "recall_counts" in stanza),
+                    Stage("score", score_stanza, workers=score_workers, executor=score_pool,
+                          skip=lambda stanza: "corrected_poem" in stanza),
+                    Stage("persist", persist, ordered=True),
+                ],
+                queue_size=PIPELINE_QUEUE_SIZE,
+                report_every=PROGRESS_EVERY,
+                on_result=checkpoint,
+                on_error=failure
+            )
+            stats = await pipeline.run(stanzas)
+            print(f"[PIPELINE]: {stats}")
+            print(f"[OPENROUTER TRANSPORT]: {openrouter_model.transport_stats()}")
+            if openrouter_model.cache is not None:
+                print(f"[RESPONSE CACHE]: {openrouter_model.cache.stats()}")
+
+    try:
+        asyncio.run(run_pipeline())
+    finally:
+        mask_pool.shutdown()
+        score_pool.shutdown()
+        sink.close()
+        manifest.close()
+    if RESULTS_PARQUET:
+        sink.to_parquet(os.path.join(r_path, "all_responses.parquet"))
     # print(f"\nBeginning saving result to csv file at {os.getcwd()}/result.csv\n")
 
     # #  Save csv file 
@@ -358,8 +441,6 @@ if __name__ == "__main__":
     #         special_tone_dict_path = SPECIAL_TONE_DICT_PATH
     #     ),
     #     count_syllable_config = CountSyllablePoemsConfig(
-    #         masked_words = CS_MASKED_WORDS,
-    #         idx_masked_words = CS_IDX_MASKED_WORDS,
     #         token_masked_words = CS_TOKEN_MASKED_WORDS
     #     )
     # )
@@ -1,14 +1,7 @@
 import os 
-import re
 import time 
-import json
-import  pandas as pd
-import numpy as np
+from typing import TYPE_CHECKING, Iterator, Optional
 
-from .mtm.models import (
-    DeepSeekModel, 
-    OpenRouterModel
-)
 from .mtm.processes import RhymesTonesMetrics
 from .mtm.configs.schemas import (
     DeepSeekModelConfig, 
@@ -22,7 +15,11 @@ from .mtm.configs import *
 from .mtm.prompts import SYSTEM_PROMPT
 
 from .mtm.processes import MaskErrorTokenization
-from .mtm.utils import read_file_from_url
+from .mtm.utils import resolve_dataset, iter_chunks, read_column, extract_poems, ResponseParseError
+
+if TYPE_CHECKING:
+    # NumPy stays out of the import path, calculate_top_k only calls score_batch on it
+    from .mtm.processes import ParallelScorer
 
 def create_prompt_user(user_prompt: str) -> str:
     prompt = f"""
@@ -33,65 +30,90 @@ def create_prompt_user(user_prompt: str) -> str:
 
 def read_datasets(
         path: str,
-        column: str
-) -> str:
+        column: Optional[str],
+        offline: bool = DATASET_OFFLINE
+) -> List[Any]:
     """
         A function to read dataset for evaluating the corrected poem input testing 
         
         Args:
-            path (str): path of dataset file
+            path (str): path of dataset file (CSV, JSONL or Parquet) or url of a Google Sheet,
+                fetched once into DATASET_CACHE_DIR
+            column (str, optional): column of the poems, None for whole rows
+            offline (bool): read an url from the dataset cache only
 
         Returns:
-            str: dataset
+            List[Any]: the values of the column (the rows when column is None)
     """
-
-    dataset = read_file_from_url(path)
-    # Check if column exists
-    if column not in dataset:
-        raise ValueError(f"Column {column} not found in dataset")
-    # Return all columns having as possible as input of dataset
     if column is None:
-        return dataset
-    # Return specific column
-    return dataset[f"{column}"]
+        dataset = resolve_dataset(path, cache_dir=DATASET_CACHE_DIR, max_age=DATASET_MAX_AGE, offline=offline)
+        return [row for chunk in iter_chunks(dataset, chunk_size=DATASET_CHUNK_SIZE) for row in chunk]
+    # Raises ValueError when the column is not in the dataset
+    return list(read_column(
+        path,
+        column,
+        cache_dir=DATASET_CACHE_DIR,
+        chunk_size=DATASET_CHUNK_SIZE,
+        max_age=DATASET_MAX_AGE,
+        offline=offline
+    ))
 
 
 def calculate_top_k(
-        poem_inputs: Dict[str, Any],
-        metrics: RhymesTonesMetrics,
+        poem_inputs: Union[List[Dict[str, Any]], Iterator[Dict[str, Any]]],
+        metrics: Union[RhymesTonesMetrics, "ParallelScorer"],
         tag: str,
         k: int = 3,
+        stop_score: float = 100.0,
 ):
     """
         A function to check and calculate top-k score of  generated poems from OpenRouterModel and DeepSeekModel
 
         Args:
-            poem_inputs (Dict[str, Any]): poems generated from OpenRouterModel and DeepSeekModel
-            metrics (RhymesTonesMetrics): rhymes and tones metrics
+            poem_inputs (List[Dict[str, Any]] | Iterator[Dict[str, Any]]): poems generated from OpenRouterModel and DeepSeekModel,
+                or a stream of them (OpenRouterModel.stream_poems) scored as they arrive
+            metrics (RhymesTonesMetrics | ParallelScorer): rhymes and tones metrics, or a process pool of them
             tag (str): tag Input - type of poem
             k (int, optional): top-k. Defaults to 3.
+            stop_score (float, optional): score at which a stream stops being read. Defaults to 100.0.
 
         Returns:
-            top_k: top-k score
+            top_k: top-k score, with the scored poems under "responses"
 
     """
     outputs = {}
-    poems = []
-    scores = []
-    for i, poem in enumerate(poem_inputs):
-        score = metrics.calculate_score(
-            poem=poem["poem_text"],
-            tag=tag
-        )
-        poems.append(poem["poem_text"])
-        scores.append(score)
-
-        # Add response to all_responses
-        poem_inputs[i]["score"] = score
+    if isinstance(poem_inputs, list):
+        poems = [poem["poem_text"] for poem in poem_inputs]
+        # Every candidate is scored in one vectorized pass
+        scores = metrics.score_batch(poems, tag).scores.tolist()
+        for i, score in enumerate(scores):
+            # Add response to all_responses
+            poem_inputs[i]["score"] = score
+    else:
+        # Streamed candidates are scored one by one as they arrive; once one is perfect the
+        # rest of the answer is not waited for (closing the stream drops the connection)
+        received, poems, scores = [], [], []
+        try:
+            for poem in poem_inputs:
+                score = metrics.score_batch([poem["poem_text"]], tag).scores.tolist()[0]
+                poem["score"] = score
+                received.append(poem)
+                poems.append(poem["poem_text"])
+                scores.append(score)
+                if score >= stop_score:
+                    print(f"[CACULATE TOP K]: candidate {len(received)} reaches {score}, stopping the stream")
+                    break
+        finally:
+            if hasattr(poem_inputs, "close"):
+                poem_inputs.close()
+        if not received:
+            raise ValueError("The stream gave no poem to score")
+        poem_inputs = received
+    outputs["responses"] = poem_inputs
     top_k = sorted(zip(poems, scores), key=lambda x: x[1], reverse=True)[:k]
     outputs["corrected_poem"] = top_k[0][0]
     outputs["corrected_score"] = top_k[0][1]
-    outputs["top_k_corrected_score"] = np.mean(scores)
+    outputs["top_k_corrected_score"] = sum(scores) / len(scores)
 
     return outputs
         
@@ -103,6 +125,9 @@ def mtm_main(
         Main function to run the Masked Tokenization Model (MTM) for evaluating the poem input
     """
     print(f" ******************* STARTING MTM MAIN FUNCTION ... *******************\n\n")
+    # Imported here so that scoring-only callers of this module never load openai / requests
+    from .mtm.models import OpenRouterModel
+
     # # Load environment variables
     # r_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     # print(f"\n\n[ROOT_PATH]: {r_path} \n\n")
@@ -114,11 +139,10 @@ def mtm_main(
             rhyme_dict_path = RHYME_DICT_PATH,
             tone_dict_path = TONE_DICT_PATH,
             dictionary_path = DICTIONARY_PATH,
-            special_tone_dict_path = SPECIAL_TONE_DICT_PATH
+            special_tone_dict_path = SPECIAL_TONE_DICT_PATH,
+            lexicon_bundle_path = LEXICON_BUNDLE_PATH
         ),
         count_syllable_config = CountSyllablePoemsConfig(
-            masked_words = CS_MASKED_WORDS,
-            idx_masked_words = CS_IDX_MASKED_WORDS,
             token_masked_words = CS_TOKEN_MASKED_WORDS
         )
     )
@@ -138,7 +162,21 @@ def mtm_main(
             MAX_TOKENS=MAX_TOKENS,
             RANKING_URL=RANKING_URL,
             RANKING_NAME=RANKING_NAME,
-            INCLUDE_REASONING=INCLUDE_REASONING
+            INCLUDE_REASONING=INCLUDE_REASONING,
+            KEEP_REASONING=KEEP_REASONING,
+            POOL_CONNECTIONS=POOL_CONNECTIONS,
+            POOL_MAXSIZE=POOL_MAXSIZE,
+            KEEP_ALIVE=KEEP_ALIVE,
+            CONNECT_TIMEOUT=CONNECT_TIMEOUT,
+            READ_TIMEOUT=READ_TIMEOUT,
+            MAX_ATTEMPTS=MAX_ATTEMPTS,
+            BACKOFF_BASE=BACKOFF_BASE,
+            BACKOFF_MAX=BACKOFF_MAX,
+            RETRY_DEADLINE=RETRY_DEADLINE,
+            CACHE_PATH=CACHE_PATH,
+            CACHE_TTL=CACHE_TTL,
+            CACHE_MAX_BYTES=CACHE_MAX_BYTES,
+            CACHE_ONLY=CACHE_ONLY
         ))
 
     metrics_config =  PoeticRulesMetricsConfig(
@@ -146,7 +184,8 @@ def mtm_main(
         rhyme_dict_path = RHYME_DICT_PATH,
         tone_dict_path = TONE_DICT_PATH,
         dictionary_path = DICTIONARY_PATH,
-        special_tone_dict_path = SPECIAL_TONE_DICT_PATH
+        special_tone_dict_path = SPECIAL_TONE_DICT_PATH,
+        lexicon_bundle_path = LEXICON_BUNDLE_PATH
     )
 
     metrics = RhymesTonesMetrics(
@@ -174,40 +213,39 @@ def mtm_main(
 
     if check_score >= 100.0:
         json_response, recall_counts = {"responses": [{"poem_number": 1, "poem_text": poem_input}]}, 1
+    elif STREAM:
+        # The candidates are scored by calculate_top_k while the answer is being generated
+        print(f"[OPENROUTER MODEL]: Begin streaming stanza ...")
+        json_response, recall_counts = {"responses": openrouter_model.stream_poems(user_prompt=user_prompt)}, None
     else:
         print(f"[OPENROUTER MODEL]: Begin processing stanza ...")
         response, recall_counts = openrouter_model.calling_model(user_prompt=user_prompt)
         if response == None:
             json_response, recall_counts = {"responses": [{"poem_number": 1, "poem_text": poem_input}]}, -1
-        print(f"json_response: \n{response}")
-        
-        if response.startswith("```"):
-            match = re.search(r'```json\s*(.*?)```', response, re.DOTALL)
-            if match:
-                response = match.group(1).strip()
-        def clean_json_string(bad_json):
-            # Remove all `+` signs
-            cleaned = re.sub(r'\s*\+\s*', '', bad_json)
-            return cleaned
-        response = clean_json_string(response)
-        response = response.replace('""', '')
-        # This regex will handle newlines inside the values
-        response = re.sub(r'(?<=: ")(.*?)(?=")', lambda m: m.group(0).replace('\n', '\\n'), response, flags=re.DOTALL)
-
-        try:
-            json_response = json.loads(response)
-        except json.JSONDecodeError as e:
-            print("Failed to parse JSON from response:", e)
+        else:
+            print(f"json_response: \n{response}")
+            # Fences, + joined strings, raw newlines and cut answers are dealt with in one pass
+            try:
+                json_response = {"responses": extract_poems(response)}
+            except ResponseParseError as e:
+                print("Failed to parse JSON from response:", e)
+                json_response, recall_counts = {"responses": [{"poem_number": 1, "poem_text": poem_input}]}, -1
 
     print(f"Completed OPENROUTER MODEL SUCCESSFULLY")
 
     print(f"[CACULATE TOP K]: Begin processing stanza ...")
-    results = calculate_top_k(
-        poem_inputs=json_response["responses"],
-        metrics=metrics,
-        tag = tag,
-        k=1
-    )
+    try:
+        results = calculate_top_k(
+            poem_inputs=json_response["responses"],
+            metrics=metrics,
+            tag = tag,
+            k=1
+        )
+    except ValueError as e:
+        # Only a stream can come empty: every attempt failed before its first poem
+        print("Failed to stream any poem:", e)
+        json_response, recall_counts = {"responses": [{"poem_number": 1, "poem_text": poem_input}]}, -1
+        results = calculate_top_k(poem_inputs=json_response["responses"], metrics=metrics, tag=tag, k=1)
     print(f"******************* Completed MTM SMALL FUNCTION SUCCESSFULLY ***************************\n\n")
 
     return results["corrected_poem"]
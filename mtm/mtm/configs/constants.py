@@ -14,6 +14,29 @@ OPENROUTER_MODEL_NAME = "deepseek/deepseek-r1-0528:free"
 RANKING_URL = None
 RANKING_NAME = None
 INCLUDE_REASONING = True
+KEEP_REASONING = False
+
+# Pooled keep-alive session of OpenRouterModel
+POOL_CONNECTIONS = 1
+POOL_MAXSIZE = 10
+KEEP_ALIVE = True
+CONNECT_TIMEOUT = 10.0
+READ_TIMEOUT = 300.0
+# Retry policy of OpenRouterModel (seconds)
+MAX_ATTEMPTS = 10
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+RETRY_DEADLINE = 900.0
+# Requests in flight at once in fill_many of the async models, and their pace (None: no limit):
+# free OpenRouter models allow 20 requests a minute
+MAX_CONCURRENCY = 4
+REQUESTS_PER_MINUTE = 16
+REQUESTS_BURST = 1
+# Cache of the OpenRouter answers (seconds, bytes; None: no limit). CACHE_ONLY evaluates
+# offline from what is in it, without calling the model.
+CACHE_TTL = 30 * 24 * 3600.0
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+CACHE_ONLY = False
 
 
 
@@ -31,10 +54,35 @@ RHYME_DICT_PATH = full_path + "rhymes.txt"
 TONE_DICT_PATH = full_path + "tone_dict.txt"
 SPECIAL_TONE_DICT_PATH = full_path + "vocab_dupple_check.txt"
 DICTIONARY_PATH = full_path + "words.txt"
+# Compiled by: python -m mtm.mtm.processes.lexicon_bundle --assets assets/
+LEXICON_BUNDLE_PATH = full_path + "lexicon.bin"
+CACHE_PATH = os.path.join(root_path, ".cache", "llm_responses.sqlite")
+DATASET_CACHE_DIR = os.path.join(root_path, ".cache", "datasets")
 
 
 
-CS_MASKED_WORDS = []
-CS_IDX_MASKED_WORDS = set()
 CS_TOKEN_MASKED_WORDS = "MASKED_WORD"
 
+# Process pool of ParallelScorer (None = every core)
+SCORING_WORKERS = None
+SCORING_CHUNK_SIZE = 256
+
+# Evaluation pipeline of automatic_save_results: masking processes (None = every core; the
+# scoring ones are SCORING_WORKERS and the requests in flight MAX_CONCURRENCY), stanzas
+# waiting in front of each stage, and seconds between two progress lines
+MASK_WORKERS = None
+PIPELINE_QUEUE_SIZE = 8
+PROGRESS_EVERY = 30.0
+# Result files: rows kept in memory before being appended, seconds between two syncs to
+# disk, and a Parquet copy of all_responses.jsonl at the end (needs pyarrow)
+RESULTS_FLUSH_EVERY = 16
+RESULTS_FSYNC_EVERY = 5.0
+RESULTS_PARQUET = False
+# Failures of a stanza (model, parsing or scoring errors) after which --resume leaves it out
+RESUME_MAX_FAILURES = 3
+# Datasets of the evaluations: seconds a fetched sheet is used before asking the server
+# whether it changed (None: every run), rows read at once, and offline runs from the cache only
+DATASET_MAX_AGE = 24 * 3600.0
+DATASET_CHUNK_SIZE = 1024
+DATASET_OFFLINE = False
+
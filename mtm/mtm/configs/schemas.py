@@ -23,6 +23,17 @@ class DeepSeekModelConfig(BaseModel):
     MAX_TOKENS: int = Field(
         default = 625
     )
+    # Requests in flight at once in fill_many, and their pace (None: no limit) with the
+    # number of requests which may start at once after a quiet time
+    MAX_CONCURRENCY: int = Field(
+        default = 4
+    )
+    REQUESTS_PER_MINUTE: Optional[float] = Field(
+        default = None
+    )
+    REQUESTS_BURST: int = Field(
+        default = 1
+    )
 
 
 class OpenRouterModelConfig(BaseModel):
@@ -56,6 +67,67 @@ class OpenRouterModelConfig(BaseModel):
     INCLUDE_REASONING: bool = Field(
         default = True
     )
+    # The reasoning trace is dropped while decoding the answer unless kept (it is never used)
+    KEEP_REASONING: bool = Field(
+        default = False
+    )
+    # Pooled keep-alive session of OpenRouterModel
+    POOL_CONNECTIONS: int = Field(
+        default = 1
+    )
+    POOL_MAXSIZE: int = Field(
+        default = 10
+    )
+    KEEP_ALIVE: bool = Field(
+        default = True
+    )
+    # Seconds to open a connection, and between two bytes of the answer (reasoning is slow)
+    CONNECT_TIMEOUT: float = Field(
+        default = 10.0
+    )
+    READ_TIMEOUT: float = Field(
+        default = 300.0
+    )
+    # Retry policy: attempts per prompt, backoff (seconds, doubled every attempt, with
+    # jitter) and the deadline of all the attempts of a prompt
+    MAX_ATTEMPTS: int = Field(
+        default = 10
+    )
+    BACKOFF_BASE: float = Field(
+        default = 1.0
+    )
+    BACKOFF_MAX: float = Field(
+        default = 60.0
+    )
+    RETRY_DEADLINE: float = Field(
+        default = 900.0
+    )
+    # Requests in flight at once in fill_many, and their pace (None: no limit) with the
+    # number of requests which may start at once after a quiet time
+    MAX_CONCURRENCY: int = Field(
+        default = 4
+    )
+    REQUESTS_PER_MINUTE: Optional[float] = Field(
+        default = None
+    )
+    REQUESTS_BURST: int = Field(
+        default = 1
+    )
+    # SQLite cache of the answers keyed by model, system prompt, temperature and user prompt
+    # (None: no cache), their lifetime in seconds, the bound of its size in bytes (None: no
+    # limit), and the cache only mode where a prompt missing from it is not sent
+    CACHE_PATH: Optional[str] = Field(
+        default = None
+    )
+    CACHE_TTL: Optional[float] = Field(
+        default = None
+    )
+    CACHE_MAX_BYTES: Optional[int] = Field(
+        default = None
+    )
+    CACHE_ONLY: bool = Field(
+        default = False
+    )
 
 
 class PoeticRulesConfig(BaseModel):
@@ -74,10 +146,11 @@ class PoeticRulesConfig(BaseModel):
     special_tone_dict_path: str = Field(
         default = "special_tone_dict.txt"
     ) 
+    lexicon_bundle_path: Optional[str] = Field(
+        default = None
+    )
 
 class CountSyllablePoemsConfig(BaseModel):
-    masked_words: List[Dict[str, Any]] = Field(default=[])
-    idx_masked_words: set = Field(default=set())
     token_masked_words: str = Field(default="MASKED_WORD")
 
 class MaskErrorTokenizationConfig(BaseModel):
@@ -101,4 +174,28 @@ class PoeticRulesMetricsConfig(BaseModel):
     ) 
     special_tone_dict_path: str = Field(
         default = "special_tone_dict.txt"
-    ) 
\ No newline at end of file
+    ) 
+    lexicon_bundle_path: Optional[str] = Field(
+        default = None
+    )
+    # Suggestions of the spelling check (tag "00")
+    spelling_suggestions: int = Field(
+        default = 5
+    )
+    spelling_max_distance: int = Field(
+        default = 2
+    )
+    spelling_ignore_tones: bool = Field(
+        default = False
+    )
+
+
+class ParallelScoringConfig(BaseModel):
+    metrics_config: PoeticRulesMetricsConfig = Field(default=PoeticRulesMetricsConfig())
+    # None uses every core of the machine
+    workers: Optional[int] = Field(
+        default = None
+    )
+    chunk_size: int = Field(
+        default = 256
+    )
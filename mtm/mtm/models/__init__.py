@@ -1,6 +1,15 @@
-from .deepseek import (
-    DeepSeekModel,
-)
-from .open_router_deepseek import (
-    OpenRouterModel,
-)
\ No newline at end of file
+import importlib
+
+# The model clients import openai / requests / httpx, so they are only loaded on first use
+_LAZY_ATTRIBUTES = {
+    "DeepSeekModel": ".deepseek",
+    "OpenRouterModel": ".open_router_deepseek",
+    "AsyncDeepSeekModel": ".async_deepseek",
+    "AsyncOpenRouterModel": ".async_open_router",
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
@@ -0,0 +1,87 @@
+from typing import List, Sequence
+
+import httpx
+from openai import AsyncOpenAI
+
+from ..configs.schemas import DeepSeekModelConfig
+from .concurrency import RateLimiter, bounded_gather
+
+
+class AsyncDeepSeekModel:
+    """
+        DeepSeekModel on AsyncOpenAI: many prompts in flight on one connection pool
+
+        Every call sends the system prompt and its own user prompt only (the sync model
+        keeps appending to one conversation, which concurrent calls can not share).
+    """
+
+    def __init__(
+            self,
+            model_config: DeepSeekModelConfig
+    ) -> None:
+        self.SYSTEM_PROMPT = model_config.SYSTEM_PROMPT
+        self.DEEPSEEK_MODEL_NAME = model_config.DEEPSSEEK_MODEL_NAME
+        self.DEEPSEEK_API_KEY = model_config.DEEPSEEK_API_KEY
+        self.BASE_URL = model_config.BASE_URL
+        self.STREAM = model_config.STREAM
+        self.TEMPERATURE = model_config.TEMPERATURE
+        self.MAX_TOKENS = model_config.MAX_TOKENS
+        self.MAX_CONCURRENCY = model_config.MAX_CONCURRENCY
+
+        self.client = AsyncOpenAI(
+            api_key=self.DEEPSEEK_API_KEY,
+            base_url=self.BASE_URL,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.MAX_CONCURRENCY)
+            )
+        )
+        self.limiter = RateLimiter(model_config.REQUESTS_PER_MINUTE, model_config.REQUESTS_BURST)
+
+    async def calling_deepseek(
+            self,
+            user_prompt: str
+    ):
+        """
+            Calling Deepseek API to get the response poems which are similar to the user prompt
+
+            Args:
+                user_prompt (str): user prompt
+
+            Returns:
+                ChatCompletionMessage: the message of the first choice
+        """
+        response = await self.client.chat.completions.create(
+            model=self.DEEPSEEK_MODEL_NAME,
+            messages=[
+                {"role": "system", "content": self.SYSTEM_PROMPT},
+                {"role": "user", "content": user_prompt},
+            ],
+            stream=self.STREAM,
+            temperature=self.TEMPERATURE,
+            max_tokens=self.MAX_TOKENS,
+            response_format={
+                "type": "json_object",
+            }
+        )
+        return response.choices[0].message
+
+    async def fill_many(
+            self,
+            prompts: Sequence[str]
+    ) -> List:
+        """
+            calling_deepseek for every prompt, MAX_CONCURRENCY of them in flight at once
+
+            Returns:
+                List[ChatCompletionMessage]: the message of every prompt, in order
+        """
+        return await bounded_gather(self.calling_deepseek, prompts, self.MAX_CONCURRENCY, self.limiter)
+
+    async def aclose(self):
+        await self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
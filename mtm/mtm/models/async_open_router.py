@@ -0,0 +1,206 @@
+import asyncio
+import json
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import httpx
+
+from ..configs.schemas import OpenRouterModelConfig
+from .completion import parse_completion
+from .concurrency import RateLimiter, bounded_gather
+from .http_pool import TransportStats
+from .response_cache import cache_key, open_cache
+from .retry import RetryPolicy, is_retryable_status, parse_retry_after
+
+
+class AsyncOpenRouterModel:
+    """
+        OpenRouterModel on an httpx.AsyncClient: many prompts in flight on one connection pool
+
+        The client (and its pool) belongs to the event loop it is first used in, so a model
+        is meant to be used inside one asyncio.run, e.g. with `async with`.
+    """
+
+    def __init__(
+            self,
+            model_config: OpenRouterModelConfig
+    ) -> None:
+        self.SYSTEM_PROMPT = model_config.SYSTEM_PROMPT
+        self.OPENROUTER_API_KEY = model_config.OPENROUTER_API_KEY
+        self.OPENROUTER_MODEL_NAME = model_config.OPENROUTER_MODEL_NAME
+        self.OPENROUTER_BASE_URL = model_config.OPENROUTER_BASE_URL
+        self.STREAM = model_config.STREAM
+        self.TEMPERATURE = model_config.TEMPERATURE
+        self.MAX_TOKENS = model_config.MAX_TOKENS
+        self.INCLUDE_REASONING = model_config.INCLUDE_REASONING
+        self.KEEP_REASONING = model_config.KEEP_REASONING
+        self.MAX_CONCURRENCY = model_config.MAX_CONCURRENCY
+
+        self.client = httpx.AsyncClient(
+            headers={
+                "Authorization": f"Bearer {self.OPENROUTER_API_KEY}",
+                "Content-Type": "application/json"
+            },
+            timeout=httpx.Timeout(model_config.READ_TIMEOUT, connect=model_config.CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=model_config.POOL_MAXSIZE,
+                max_keepalive_connections=model_config.POOL_MAXSIZE if model_config.KEEP_ALIVE else 0
+            )
+        )
+        self.limiter = RateLimiter(model_config.REQUESTS_PER_MINUTE, model_config.REQUESTS_BURST)
+        self.stats = TransportStats()
+        self.TIMEOUT = (model_config.CONNECT_TIMEOUT, model_config.READ_TIMEOUT)
+        self.retry_policy = RetryPolicy(
+            max_attempts=model_config.MAX_ATTEMPTS,
+            base_delay=model_config.BACKOFF_BASE,
+            max_delay=model_config.BACKOFF_MAX,
+            deadline=model_config.RETRY_DEADLINE
+        )
+        self.cache = open_cache(model_config)
+
+    async def _post(self, payload: dict, read_timeout: float) -> httpx.Response:
+        new_connections = 0
+
+        async def trace(event_name: str, info: dict):
+            nonlocal new_connections
+            if event_name == "connection.connect_tcp.complete":
+                new_connections += 1
+
+        start = time.perf_counter()
+        try:
+            response = await self.client.post(
+                self.OPENROUTER_BASE_URL,
+                content=json.dumps(payload),
+                timeout=httpx.Timeout(read_timeout, connect=self.TIMEOUT[0]),
+                extensions={"trace": trace}
+            )
+        except httpx.HTTPError as e:
+            self.stats.record(time.perf_counter() - start, new_connections, type(e).__name__)
+            raise
+        elapsed = time.perf_counter() - start
+        self.stats.record(elapsed, new_connections, response.status_code)
+        print(f"[CALLING OPENROUTER]: HTTP {response.status_code} in {elapsed:.2f}s "
+              f"({'new' if new_connections else 'reused'} connection)")
+        return response
+
+    async def calling_model(
+            self,
+            user_prompt: str
+    ) -> Tuple[Optional[str], int]:
+        """
+            Calling OpenRouter API to get the response poems which are similar to the user prompt,
+            once self.limiter lets the request start
+
+            Args:
+                user_prompt (str): user prompt
+
+            Returns:
+                (content, attempts): the JSON content of the answer, None once the retry policy gives up
+                (attempts is 0 when the answer comes from self.cache)
+        """
+        cached = self._from_cache(user_prompt)
+        if cached is not None:
+            return cached
+        await self.limiter.wait()
+        return await self._fill(user_prompt)
+
+    def _from_cache(self, user_prompt: str) -> Optional[Tuple[Optional[str], int]]:
+        # (content, 0) when the cache answers for the prompt, None when the model has to
+        if self.cache is None:
+            return None
+        content = self.cache.get(cache_key(self.OPENROUTER_MODEL_NAME, self.SYSTEM_PROMPT, self.TEMPERATURE, user_prompt))
+        if content is not None:
+            return content, 0
+        if self.cache.cache_only:
+            print('{"error_msg": "Answer not in the cache (cache only mode)."}')
+            return None, 0
+        return None
+
+    async def _fill(self, user_prompt: str) -> Tuple[Optional[str], int]:
+        messages = [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt},
+        ]
+        payload = {
+            "model": self.OPENROUTER_MODEL_NAME,
+            "messages": messages,
+            # The whole answer is waited for (OpenRouterModel.stream_poems reads one as it comes)
+            "stream": False,
+            "temperature": self.TEMPERATURE,
+            "max_tokens": self.MAX_TOKENS,
+            "response_format": "json_object",
+            "include_reasoning": self.INCLUDE_REASONING,
+        }
+
+        # Same policy as OpenRouterModel.calling_model
+        started = time.monotonic()
+        content = None
+        attempt = 0
+        while True:
+            attempt += 1
+            print(f"[CALLING OPENROUTER]: Calling OpenRouter API {attempt} times")
+            retry_after = None
+            try:
+                response = await self._post(payload, min(self.TIMEOUT[1], max(self.retry_policy.remaining(started), 1.0)))
+            except httpx.TransportError as e:
+                print(f'{{"error_msg": "{type(e).__name__}: {e}. Please try again."}}')
+            else:
+                completion, error_msg = parse_completion(response.status_code, response.content, self.KEEP_REASONING)
+                if completion is not None:
+                    content = completion.content
+                    break
+                print(error_msg)
+                if not is_retryable_status(response.status_code):
+                    break
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+            wait = self.retry_policy.next_wait(attempt, started, retry_after)
+            if wait is None:
+                break
+            print(f"[CALLING OPENROUTER]: Retrying in {wait:.1f}s")
+            self.stats.record_wait(wait)
+            await asyncio.sleep(wait)
+
+        self.stats.record_prompt(attempt, content is not None)
+        if content is None:
+            print('{"error_msg": "Requesting Timeout Error. Please try again."}')
+        elif self.cache is not None:
+            self.cache.put(cache_key(self.OPENROUTER_MODEL_NAME, self.SYSTEM_PROMPT, self.TEMPERATURE, user_prompt), content)
+        return content, attempt
+
+    async def fill_many(
+            self,
+            prompts: Sequence[str]
+    ) -> List[Tuple[Optional[str], int]]:
+        """
+            calling_model for every prompt, MAX_CONCURRENCY of them in flight at once
+
+            The prompts answered by self.cache are left out before the others are sent, so
+            they take no slot of the concurrency or rate limit.
+
+            Returns:
+                List[Tuple[Optional[str], int]]: (content, attempts) of every prompt, in order
+        """
+        results = [self._from_cache(prompt) for prompt in prompts]
+        missing = [i for i, result in enumerate(results) if result is None]
+        filled = await bounded_gather(self._fill, [prompts[i] for i in missing], self.MAX_CONCURRENCY, self.limiter)
+        for i, result in zip(missing, filled):
+            results[i] = result
+        return results
+
+    def transport_stats(self) -> dict:
+        """
+            Calls (attempts), connections opened and reused, latency and retries, as OpenRouterModel.transport_stats
+        """
+        return self.stats.as_dict()
+
+    async def aclose(self):
+        await self.client.aclose()
+        if self.cache is not None:
+            self.cache.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
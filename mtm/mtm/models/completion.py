@@ -0,0 +1,131 @@
+""" Validated chat completion answers, shared by the sync and async model clients."""
+
+import json
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+# Fields of the message holding the reasoning trace of reasoning models (often far longer
+# than the poems themselves)
+REASONING_FIELDS = ("reasoning", "reasoning_details")
+
+
+class ChatCompletion:
+    """
+        First choice of a usable chat completion answer
+
+        content: the answer, a JSON object (bare or in a ```json fence) as the system prompt asks
+        reasoning: the reasoning trace, None unless kept
+        finish_reason: why the generation stopped ("stop", "length", ...)
+        usage: token counts reported by the provider
+    """
+    __slots__ = ("id", "model", "content", "reasoning", "finish_reason", "usage")
+
+    def __init__(
+            self,
+            id: Optional[str],
+            model: Optional[str],
+            content: str,
+            reasoning: Optional[str] = None,
+            finish_reason: Optional[str] = None,
+            usage: Optional[Dict[str, Any]] = None
+    ):
+        self.id = id
+        self.model = model
+        self.content = content
+        self.reasoning = reasoning
+        self.finish_reason = finish_reason
+        self.usage = usage or {}
+
+    def __repr__(self) -> str:
+        return f"ChatCompletion(id={self.id!r}, finish_reason={self.finish_reason!r}, content={self.content[:40]!r}...)"
+
+
+def _without_reasoning(pairs) -> dict:
+    # object_pairs_hook: the trace is dropped as soon as its object is decoded
+    return {key: value for key, value in pairs if key not in REASONING_FIELDS}
+
+
+def parse_completion(
+        status_code: int,
+        body: Union[bytes, str],
+        keep_reasoning: bool = False
+) -> Tuple[Optional[ChatCompletion], Optional[str]]:
+    """
+        Decode a chat completion answer once and check it is usable
+
+        Args:
+            status_code: HTTP status of the answer
+            body: body of the answer (bytes are decoded by json itself, without a text copy)
+            keep_reasoning: keep the reasoning trace of the message, dropped while decoding otherwise
+
+        Returns:
+            (ChatCompletion, None) when usable, (None, error_msg) otherwise
+    """
+    if status_code == 404:
+        return None, '{"error_msg": "Wrong 404. Something went wrong. Please try again."}'
+    if status_code != 200:
+        return None, f'{{"error_msg": "Something went wrong (HTTP {status_code}). Please try again."}}'
+    if not body.strip():
+        return None, '{"error_msg": "Not get any response. Please try again."}'
+    try:
+        answer = json.loads(body, object_pairs_hook=None if keep_reasoning else _without_reasoning)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None, '{"error_msg": "Answer is not JSON. Something went wrong. Please try again."}'
+
+    if not isinstance(answer, dict) or "choices" not in answer:
+        return None, '{"error_msg": "Not having choices. Something went wrong. Please try again."}'
+    if not answer["choices"]:
+        return None, '{"error_msg": "Not having any element in choices. Something went wrong. Please try again."}'
+    choice = answer["choices"][0]
+    if not isinstance(choice, dict) or "message" not in choice:
+        return None, '{"error_msg": "Not having message in choices. Something went wrong. Please try again."}'
+    message = choice["message"]
+    if not isinstance(message, dict) or not isinstance(message.get("content"), str):
+        return None, '{"error_msg": "Not having content in message. Something went wrong. Please try again."}'
+
+    content = message["content"].strip()
+    if not (
+        (content.startswith("{") and content.endswith("}")) or
+        (content.startswith("```json") and content.endswith("```"))
+    ):
+        return None, '{"error_msg": "Not having json format. Something went wrong. Please try again."}'
+    return ChatCompletion(
+        id=answer.get("id"),
+        model=answer.get("model"),
+        content=message["content"],
+        reasoning=message.get("reasoning"),
+        finish_reason=choice.get("finish_reason"),
+        usage=answer.get("usage")
+    ), None
+
+
+def iter_stream_content(lines: Iterable[Union[bytes, str]]) -> Iterator[str]:
+    """
+        Pieces of content of a streamed chat completion (server-sent events)
+
+        Every event is a `data: {chunk}` line; the content of the first choice of each chunk
+        is yielded as it comes. Comment lines (": OPENROUTER PROCESSING") are skipped, the
+        reasoning deltas are dropped while decoding, and the stream ends at `data: [DONE]`.
+
+        Raises:
+            ValueError: the provider sent an error event in the middle of the stream
+    """
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        try:
+            chunk = json.loads(data, object_pairs_hook=_without_reasoning)
+        except json.JSONDecodeError:
+            continue
+        if not isinstance(chunk, dict):
+            continue
+        if "error" in chunk:
+            raise ValueError(f"Error event in the stream: {chunk['error']}")
+        choices = chunk.get("choices") or [{}]
+        content = (choices[0].get("delta") or {}).get("content")
+        if content:
+            yield content
@@ -0,0 +1,64 @@
+""" Bounded concurrency for the async model clients: N requests in flight, under a rate limit."""
+
+import asyncio
+from typing import Awaitable, Callable, Iterable, List, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class RateLimiter:
+    """
+        Token bucket on the starts of the requests: requests_per_minute tokens a minute,
+        at most burst of them saved up
+
+        Free OpenRouter models allow a few requests per minute; a steady pace keeps every
+        request under the limit instead of sending a burst and sleeping it off. With burst=1
+        the starts are spaced 60 / requests_per_minute seconds apart. None or 0 means no limit.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, burst: int = 1):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        # How far ahead of the steady pace a start may be (burst - 1 saved tokens)
+        self._tolerance = (max(1, burst) - 1) * self.interval
+        # Time at which the bucket is empty again at the steady pace
+        self._next_start = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = asyncio.get_running_loop().time()
+        # Book the token before sleeping, so that concurrent callers queue up behind it
+        start = max(now, self._next_start - self._tolerance)
+        self._next_start = max(self._next_start, start) + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+async def bounded_gather(
+        call: Callable[[T], Awaitable[R]],
+        items: Iterable[T],
+        max_in_flight: int,
+        limiter: Optional[RateLimiter] = None
+) -> List[R]:
+    """
+        await call(item) for every item, with at most max_in_flight of them running at once
+
+        Args:
+            call: coroutine function sending one request
+            items: arguments of the calls
+            max_in_flight: maximum number of calls awaiting an answer at the same time
+            limiter: pace of the call starts, none by default
+
+        Returns:
+            List: the results, in the order of items
+    """
+    semaphore = asyncio.Semaphore(max(1, max_in_flight))
+
+    async def run(item: T) -> R:
+        async with semaphore:
+            if limiter is not None:
+                await limiter.wait()
+            return await call(item)
+
+    return list(await asyncio.gather(*(run(item) for item in items)))
@@ -0,0 +1,132 @@
+""" Pooled keep-alive HTTP session shared by every call of a model client."""
+
+import threading
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class CountingHTTPAdapter(HTTPAdapter):
+    """
+        HTTPAdapter counting the TCP (and TLS) connections its pools open
+
+        Every request sent on a connection already in the pool is a reused connection,
+        so requests - connections_opened is the number of handshakes saved.
+    """
+    connections_opened = 0
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        adapter = self
+        lock = threading.Lock()
+
+        def counting(pool_class):
+            # A pooled connection object reconnects by itself once the server closed it,
+            # so the count is taken on connect() rather than when the object is created
+            class CountingConnection(pool_class.ConnectionCls):
+                def connect(self):
+                    with lock:
+                        adapter.connections_opened += 1
+                    return super().connect()
+
+            class CountingConnectionPool(pool_class):
+                ConnectionCls = CountingConnection
+            return CountingConnectionPool
+
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: counting(pool_class)
+            for scheme, pool_class in self.poolmanager.pool_classes_by_scheme.items()
+        }
+
+
+def build_session(
+        pool_connections: int,
+        pool_maxsize: int,
+        keep_alive: bool = True,
+        headers: Optional[Dict[str, str]] = None
+) -> requests.Session:
+    """
+        Session with one CountingHTTPAdapter mounted for http:// and https://
+
+        Args:
+            pool_connections: number of hosts whose pool is kept
+            pool_maxsize: connections kept open per host (concurrent callers beyond it wait for one)
+            keep_alive: keep the connections open between calls ("Connection: close" otherwise)
+            headers: headers sent with every request
+
+        Returns:
+            requests.Session: the session, its adapter is session.get_adapter(url)
+    """
+    session = requests.Session()
+    # Retries are the business of the caller, which knows which answers are worth another try
+    adapter = CountingHTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=0,
+        pool_block=True
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(headers or {})
+    session.headers["Connection"] = "keep-alive" if keep_alive else "close"
+    return session
+
+
+class TransportStats:
+    """
+        Latency, connection reuse and retries of the HTTP calls of a model client
+
+        Every HTTP call is one attempt; a prompt takes one attempt or more, and is
+        failed once the retry policy gives up on it.
+    """
+    __slots__ = (
+        "calls", "connections_opened", "seconds", "last_seconds", "max_seconds",
+        "prompts", "retries", "failed_prompts", "retry_wait_seconds", "status_counts"
+    )
+
+    def __init__(self):
+        self.calls = 0
+        self.connections_opened = 0
+        self.seconds = 0.0
+        self.last_seconds = 0.0
+        self.max_seconds = 0.0
+        self.prompts = 0
+        self.retries = 0
+        self.failed_prompts = 0
+        self.retry_wait_seconds = 0.0
+        # HTTP status (or exception name) of every attempt
+        self.status_counts = {}
+
+    def record(self, seconds: float, new_connections: int, status=None):
+        self.calls += 1
+        self.connections_opened += new_connections
+        self.seconds += seconds
+        self.last_seconds = seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        if status is not None:
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    def record_wait(self, seconds: float):
+        self.retry_wait_seconds += seconds
+
+    def record_prompt(self, attempts: int, succeeded: bool):
+        self.prompts += 1
+        self.retries += attempts - 1
+        self.failed_prompts += not succeeded
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "connections_opened": self.connections_opened,
+            "reused_connections": max(0, self.calls - self.connections_opened),
+            "seconds": self.seconds,
+            "mean_seconds": self.seconds / self.calls if self.calls else 0.0,
+            "max_seconds": self.max_seconds,
+            "last_seconds": self.last_seconds,
+            "prompts": self.prompts,
+            "retries": self.retries,
+            "failed_prompts": self.failed_prompts,
+            "retry_wait_seconds": self.retry_wait_seconds,
+            "status_counts": dict(self.status_counts),
+        }
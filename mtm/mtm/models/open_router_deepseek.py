@@ -1,8 +1,15 @@
 import json 
+import time
+from typing import Any, Dict, Iterator
+
 import requests
 
-from openai import OpenAI
 from ..configs.schemas import OpenRouterModelConfig
+from ..utils.parse_json import PoemStreamParser, ResponseParseError, extract_poems
+from .completion import iter_stream_content, parse_completion
+from .http_pool import TransportStats, build_session
+from .response_cache import cache_key, open_cache
+from .retry import RetryPolicy, is_retryable_status, parse_retry_after
 
 class OpenRouterModel:
     def __init__(
@@ -21,13 +28,98 @@ class OpenRouterModel:
         self.RANKING_URL = model_config.RANKING_URL
         self.RANKING_NAME = model_config.RANKING_NAME
         self.INCLUDE_REASONING = model_config.INCLUDE_REASONING
+        self.KEEP_REASONING = model_config.KEEP_REASONING
+        self.TIMEOUT = (model_config.CONNECT_TIMEOUT, model_config.READ_TIMEOUT)
 
+        # One pooled keep-alive session for every call: the TCP and TLS handshakes
+        # are paid once per connection instead of once per request
+        self.session = build_session(
+            pool_connections=model_config.POOL_CONNECTIONS,
+            pool_maxsize=model_config.POOL_MAXSIZE,
+            keep_alive=model_config.KEEP_ALIVE,
+            headers={
+                "Authorization": f"Bearer {self.OPENROUTER_API_KEY}",
+                "Content-Type": "application/json"
+                # "HTTP-Referer": self.RANKING_URL, # Optional. Site URL for rankings on openrouter.ai.
+                # "X-Title": self.RANKING_NAME, # Optional. Site title for rankings on openrouter.ai.
+            }
+        )
+        self.stats = TransportStats()
+        # Attempts of the last stream_poems call
+        self.attempts = 0
+        self.retry_policy = RetryPolicy(
+            max_attempts=model_config.MAX_ATTEMPTS,
+            base_delay=model_config.BACKOFF_BASE,
+            max_delay=model_config.BACKOFF_MAX,
+            deadline=model_config.RETRY_DEADLINE
+        )
+        # Answers already received for the same prompt (None: every prompt is sent)
+        self.cache = open_cache(model_config)
 
+    def _cache_key(self, user_prompt: str) -> str:
+        return cache_key(self.OPENROUTER_MODEL_NAME, self.SYSTEM_PROMPT, self.TEMPERATURE, user_prompt)
 
-        self.client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=self.OPENROUTER_API_KEY,
-        )
+    def _payload(self, user_prompt: str, stream: bool) -> dict:
+        self.messages = [
+            {
+                "role": "system", 
+                "content": self.SYSTEM_PROMPT
+            },
+            {
+                "role": "user", 
+                "content": user_prompt
+            }
+        ]
+        return {
+            "model": self.OPENROUTER_MODEL_NAME,
+            "messages": self.messages,
+            "stream": stream,
+            "temperature": self.TEMPERATURE,
+            "max_tokens": self.MAX_TOKENS,
+            "response_format": "json_object",
+            "include_reasoning": self.INCLUDE_REASONING, 
+        }
+
+    def _post(self, payload: dict, read_timeout: float, stream: bool = False):
+        adapter = self.session.get_adapter(self.OPENROUTER_BASE_URL)
+        opened = adapter.connections_opened
+        start = time.perf_counter()
+        try:
+            # With stream, the call returns once the headers are in and the body is read as it comes
+            response = self.session.post(
+                url=self.OPENROUTER_BASE_URL,
+                data=json.dumps(payload),
+                timeout=(self.TIMEOUT[0], read_timeout),
+                stream=stream
+            )
+        except requests.RequestException as e:
+            self.stats.record(time.perf_counter() - start, adapter.connections_opened - opened, type(e).__name__)
+            raise
+        elapsed = time.perf_counter() - start
+        new_connections = adapter.connections_opened - opened
+        self.stats.record(elapsed, new_connections, response.status_code)
+        print(f"[CALLING OPENROUTER]: HTTP {response.status_code} in {elapsed:.2f}s "
+              f"({'new' if new_connections else 'reused'} connection)")
+        return response
+
+    def transport_stats(self) -> dict:
+        """
+            Calls (attempts), connections opened and reused, latency in seconds, prompts,
+            retries, failed prompts, seconds spent waiting to retry and the status of the
+            attempts, over every call so far
+        """
+        return self.stats.as_dict()
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
 
     def calling_model(
@@ -37,102 +129,160 @@ class OpenRouterModel:
         """
         Calling Deepseek API to get the response poems which are similar to the user prompt
 
+        Unusable answers, throttling, server errors and network errors are asked again
+        following self.retry_policy (backoff with jitter, Retry-After, attempt cap and
+        deadline); other errors (bad key, unknown model, ...) are not.
+
         Args:
             user_prompt (str): user prompt
             
         Returns:
-            Dict[str, Any]: The response from Deepseek - Return top 10 poems from Deepseek
+            Tuple[Optional[str], int]: The JSON content of the answer (None when every attempt failed) and the number of attempts
+                (0 when the answer comes from self.cache)
         """
-        recall = False
-        i = 0
-        while recall == False:
-            print(f"[CALLING OPENROUTER]: Calling OpenRouter API {i + 1} times")
-            i += 1
-            self.messages = [
-                {
-                    "role": "system", 
-                    "content": self.SYSTEM_PROMPT
-                }
-            ]
-            self.messages.append(
-                {
-                    "role": "user", 
-                    "content": user_prompt
-                }
-            )
-
-            self.response = requests.post(
-                url=self.OPENROUTER_BASE_URL,
-                headers={
-                    "Authorization": f"Bearer {self.OPENROUTER_API_KEY}",
-                    "Content-Type": "application/json"
-                    # "HTTP-Referer": self.RANKING_URL, # Optional. Site URL for rankings on openrouter.ai.
-                    # "X-Title": self.RANKING_NAME, # Optional. Site title for rankings on openrouter.ai.
-                },
-                data=json.dumps({
-                    "model": self.OPENROUTER_MODEL_NAME,
-                    "messages": self.messages,
-                    "stream": self.STREAM,
-                    "temperature": self.TEMPERATURE,
-                    "max_tokens": self.MAX_TOKENS,
-                    "response_format": "json_object",
-                    "include_reasoning": self.INCLUDE_REASONING, 
-                })
-            )
+        key = None
+        if self.cache is not None:
+            key = self._cache_key(user_prompt)
+            content = self.cache.get(key)
+            if content is not None:
+                print("[CALLING OPENROUTER]: Answer found in the cache")
+                return content, 0
+            if self.cache.cache_only:
+                print('{"error_msg": "Answer not in the cache (cache only mode)."}')
+                return None, 0
+        # The whole answer is waited for here, stream_poems reads it as it is generated
+        payload = self._payload(user_prompt, stream=False)
 
-            if self.response.status_code == 404:
-                print('{"error_msg": "Wrong 404. Something went wrong. Please try again."}')
-                self.response = None    
-                continue
-
-            if self.response.status_code != 200:
-                print(f"Response status code: {self.response.status_code}")
-                print('{"error_msg": "Something went wrong. Please try again."}')      
-                self.response = None    
-                continue
-            print(f"Response status code: {self.response}")
-            response_text = self.response.text.strip()
-            if not response_text:
-                print('{"error_msg": "Not get any response. Please try again."}')   
+        started = time.monotonic()
+        content = None
+        attempt = 0
+        while True:
+            attempt += 1
+            print(f"[CALLING OPENROUTER]: Calling OpenRouter API {attempt} times")
+            retry_after = None
+            try:
+                # The answer must come before the deadline of the whole call
+                self.response = self._post(payload, min(self.TIMEOUT[1], max(self.retry_policy.remaining(started), 1.0)))
+            except (requests.ConnectionError, requests.Timeout) as e:
+                print(f'{{"error_msg": "{type(e).__name__}: {e}. Please try again."}}')
                 self.response = None
-                continue
-            
-            if "choices" not in self.response.json():
-                print('{"error_msg": "Not having choices. Something went wrong. Please try again."}')     
-                self.response = None    
-                continue
-            if len(self.response.json()['choices']) == 0:
-                print('{"error_msg": "Not having any element in choices. Something went wrong. Please try again."}')    
-                self.response = None    
-                continue
-            if "message" not in self.response.json()['choices'][0]:
-                print('{"error_msg": "Not having message in choices. Something went wrong. Please try again."}')    
-                self.response = None    
-                continue
-            
-            if "content" not in self.response.json()['choices'][0]['message']:
-                print('{"error_msg": "Not having content in message. Something went wrong. Please try again."}')    
-                self.response = None    
-                continue
-            
-            if not (
-                (self.response.json()['choices'][0]['message']['content'].strip().startswith("{") and self.response.json()['choices'][0]['message']['content'].strip().endswith("}")) or
-                (self.response.json()['choices'][0]['message']['content'].strip().startswith("```json") and self.response.json()['choices'][0]['message']['content'].strip().endswith("```"))
-            ):
-                print('{"error_msg": "Not having json format. Something went wrong. Please try again."}')    
-                self.response = None    
-                continue
-
-            if i >= 10:
-                print('{"error_msg": "Requesting Timeout Error. Please try again."}')    
-                self.response = None    
-                return None, i
-
-            if self.response.status_code == 200:
-                recall = True
+            else:
+                print(f"Response status code: {self.response}")
+                # The body is decoded once, into the validated answer which replaces the raw
+                # response (and its body, reasoning trace included) in memory
+                completion, error_msg = parse_completion(self.response.status_code, self.response.content, self.KEEP_REASONING)
+                if completion is not None:
+                    self.response = completion
+                    content = completion.content
+                    break
+                print(error_msg)
+                if not is_retryable_status(self.response.status_code):
+                    break
+                retry_after = parse_retry_after(self.response.headers.get("Retry-After"))
+                self.response = None
+
+            wait = self.retry_policy.next_wait(attempt, started, retry_after)
+            if wait is None:
                 break
+            print(f"[CALLING OPENROUTER]: Retrying in {wait:.1f}s")
+            self.stats.record_wait(wait)
+            time.sleep(wait)
+
+        self.stats.record_prompt(attempt, content is not None)
+        if content is None:
+            print('{"error_msg": "Requesting Timeout Error. Please try again."}')
+            self.response = None
+            return None, attempt
+        if key is not None:
+            self.cache.put(key, content)
+        return content, attempt
+
+    def stream_poems(
+            self,
+            user_prompt: str
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the answer (server-sent events) and yield every poem as soon as its JSON object closes
+
+        The caller can stop iterating once it has a good enough candidate: the connection is
+        then closed and the rest of the answer is neither waited for nor generated. An answer
+        failing before its first poem is asked again under self.retry_policy, as in calling_model.
+        Only an answer read to its end is stored in self.cache.
+
+        Args:
+            user_prompt (str): user prompt
+
+        Yields:
+            Dict[str, Any]: the {"poem_number": ..., "poem_text": ...} entries of the answer
+        """
+        key = None
+        if self.cache is not None:
+            key = self._cache_key(user_prompt)
+            content = self.cache.get(key)
+            if content is not None:
+                print("[CALLING OPENROUTER]: Answer found in the cache")
+                self.attempts = 0
+                try:
+                    yield from extract_poems(content)
+                    return
+                except ResponseParseError:
+                    pass
+            elif self.cache.cache_only:
+                print('{"error_msg": "Answer not in the cache (cache only mode)."}')
+                self.attempts = 0
+                return
+
+        payload = self._payload(user_prompt, stream=True)
+        started = time.monotonic()
+        parser = None
+        attempt = 0
+        try:
+            while True:
+                attempt += 1
+                # A broken stream leaves its parser in the middle of a string or an object:
+                # every attempt reads its answer from scratch
+                parser = PoemStreamParser()
+                print(f"[CALLING OPENROUTER]: Streaming OpenRouter API {attempt} times")
+                retry_after = None
+                try:
+                    self.response = self._post(payload, min(self.TIMEOUT[1], max(self.retry_policy.remaining(started), 1.0)), stream=True)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    print(f'{{"error_msg": "{type(e).__name__}: {e}. Please try again."}}')
+                    self.response = None
+                else:
+                    with self.response:
+                        if self.response.status_code == 200:
+                            pieces = []
+                            try:
+                                for content in iter_stream_content(self.response.iter_lines()):
+                                    pieces.append(content)
+                                    for poem in parser.feed(content):
+                                        yield poem
+                            except (requests.RequestException, ValueError) as e:
+                                print(f'{{"error_msg": "Stream broken: {e}"}}')
+                            else:
+                                if key is not None and parser.count:
+                                    self.cache.put(key, "".join(pieces))
+                            if parser.count:
+                                break
+                            print('{"error_msg": "Not having any poem in the stream. Please try again."}')
+                        else:
+                            print(f'{{"error_msg": "Something went wrong (HTTP {self.response.status_code}). Please try again."}}')
+                            if not is_retryable_status(self.response.status_code):
+                                break
+                            retry_after = parse_retry_after(self.response.headers.get("Retry-After"))
+                    self.response = None
 
-        return self.response.json()['choices'][0]['message']['content'], i
+                wait = self.retry_policy.next_wait(attempt, started, retry_after)
+                if wait is None:
+                    break
+                print(f"[CALLING OPENROUTER]: Retrying in {wait:.1f}s")
+                self.stats.record_wait(wait)
+                time.sleep(wait)
+        finally:
+            # Also when the caller stopped early (GeneratorExit)
+            self.attempts = attempt
+            self.stats.record_prompt(attempt, parser is not None and parser.count > 0)
 
         # self.messages.append(
         #     {
@@ -159,5 +309,6 @@ class OpenRouterModel:
 
 if __name__ == "__main__":
     user_prompt = "I am a poet and my task is to write a poem based on the user prompt."
-    deepseek_model = OpenRouterModel(model_config=OpenRouterModelConfig())
-    deepseek_model.calling_model(user_prompt=user_prompt)
\ No newline at end of file
+    with OpenRouterModel(model_config=OpenRouterModelConfig()) as deepseek_model:
+        deepseek_model.calling_model(user_prompt=user_prompt)
+        print(deepseek_model.transport_stats())
\ No newline at end of file
@@ -0,0 +1,183 @@
+""" Persistent content-addressed cache of the LLM answers, shared by the model clients.
+
+    An answer is stored under the hash of what produced it (model name, system prompt,
+    temperature, user prompt), so the same masked poem is only sent once across reruns,
+    duplicated rows and identical masked structures. It lives in one SQLite file.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+"""
+
+
+def cache_key(model_name: str, system_prompt: str, temperature: float, user_prompt: str) -> str:
+    """
+        Hash of what an answer depends on (sha256 hex digest)
+    """
+    fields = json.dumps([model_name, system_prompt, float(temperature), user_prompt], ensure_ascii=False)
+    return hashlib.sha256(fields.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+        SQLite store of the answers, with expiry and size bound
+
+        Args:
+            path (str): SQLite file (its directory is created), ":memory:" for a throwaway cache
+            ttl (float, optional): seconds an answer stays valid. None: forever.
+            max_bytes (int, optional): bound of the stored answers, the least recently used
+                are evicted beyond it. None: no bound.
+            cache_only (bool): never call the model, a miss is an unanswered prompt
+                (deterministic offline evaluation)
+    """
+    __slots__ = ("path", "ttl", "max_bytes", "cache_only", "hits", "misses", "stores", "evictions",
+                 "_connection", "_lock")
+
+    def __init__(
+            self,
+            path: str,
+            ttl: Optional[float] = None,
+            max_bytes: Optional[int] = None,
+            cache_only: bool = False
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.cache_only = cache_only
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # One connection shared by the threads of the caller, the lock serializes its use
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            if path != ":memory:":
+                # Readers (other runs on the same file) do not block the writer
+                self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(_SCHEMA)
+
+    def get(self, key: str) -> Optional[str]:
+        """
+            Stored answer of key, None when missing or expired (an expired one is removed)
+        """
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute("SELECT content, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.evictions += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._connection.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, content: str):
+        """
+            Store the answer of key, then evict down to max_bytes
+        """
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, content, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, content, len(content.encode("utf-8")), now, now)
+            )
+            self.stores += 1
+            if self.max_bytes is not None:
+                self._evict()
+
+    def _evict(self):
+        total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Least recently used first, until the rest fits
+        doomed = []
+        for key, size in self._connection.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self._connection.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def purge_expired(self) -> int:
+        """
+            Remove the expired answers
+
+            Returns:
+                int: number of answers removed
+        """
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            removed = self._connection.execute(
+                "DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,)
+            ).rowcount
+            self.evictions += removed
+        return removed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+            Hits, misses, stores and evictions so far, and what is stored
+        """
+        with self._lock:
+            entries, size = self._connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def open_cache(model_config) -> Optional[ResponseCache]:
+    """
+        ResponseCache of a model config (CACHE_PATH, CACHE_TTL, CACHE_MAX_BYTES, CACHE_ONLY),
+        None when CACHE_PATH is not set
+    """
+    if not model_config.CACHE_PATH:
+        return None
+    return ResponseCache(
+        path=model_config.CACHE_PATH,
+        ttl=model_config.CACHE_TTL,
+        max_bytes=model_config.CACHE_MAX_BYTES,
+        cache_only=model_config.CACHE_ONLY
+    )
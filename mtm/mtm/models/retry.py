@@ -0,0 +1,82 @@
+""" Retry policy of the model clients: capped exponential backoff with jitter, Retry-After and a deadline."""
+
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+# Answers worth asking again: throttling, timeouts and server errors. A 200 whose content
+# is unusable is asked again too (the next sample may be fine); any other status
+# (400 bad request, 401 / 403 key, 402 credits, 404 unknown model) will not fix itself.
+RETRYABLE_STATUS = frozenset({200, 408, 409, 425, 429, 500, 502, 503, 504})
+
+
+def is_retryable_status(status_code: int) -> bool:
+    return status_code in RETRYABLE_STATUS
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+        Seconds to wait from a Retry-After header (delay in seconds or HTTP date), None without one
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+class RetryPolicy:
+    """
+        When to ask again, and how long to wait before
+
+        Attempt n waits a random time in [0, min(max_delay, base_delay * 2 ** (n - 1))] (full
+        jitter: concurrent callers throttled together do not come back together), or the
+        Retry-After of the answer when it asks for longer. No attempt starts after
+        max_attempts attempts, nor once the next one could not start before the deadline
+        (seconds since the first attempt).
+    """
+    __slots__ = ("max_attempts", "base_delay", "max_delay", "deadline")
+
+    def __init__(self, max_attempts: int = 10, base_delay: float = 1.0, max_delay: float = 60.0, deadline: float = 900.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+            Seconds to wait after the failed attempt number attempt (1 for the first one)
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def next_wait(self, attempt: int, started: float, retry_after: Optional[float] = None) -> Optional[float]:
+        """
+            Seconds to wait before the next attempt, None when the budget is spent
+
+            Args:
+                attempt: number of attempts made so far
+                started: time.monotonic() of the first attempt
+                retry_after: Retry-After of the last answer, if any
+        """
+        if attempt >= self.max_attempts:
+            return None
+        delay = self.backoff(attempt, retry_after)
+        if time.monotonic() + delay >= started + self.deadline:
+            return None
+        return delay
+
+    def remaining(self, started: float) -> float:
+        """
+            Seconds left before the deadline
+        """
+        return started + self.deadline - time.monotonic()
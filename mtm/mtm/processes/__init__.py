@@ -1,2 +1,25 @@
-from .masktoken import MaskErrorTokenization
-from .poetic_score import RhymesTonesMetrics
\ No newline at end of file
+import importlib
+
+# Loaded on first access so that scoring does not import the masking / config stack
+_LAZY_ATTRIBUTES = {
+    "MaskErrorTokenization": ".masktoken",
+    "RhymesTonesMetrics": ".poetic_score",
+    "ParallelScorer": ".parallel_score",
+    "SpellingSuggester": ".spelling",
+    "PoemScoreSession": ".score_session",
+    "Lexicon": ".lexicon",
+    "get_lexicon": ".lexicon",
+    "clear_lexicon_registry": ".lexicon",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
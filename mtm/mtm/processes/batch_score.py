@@ -0,0 +1,315 @@
+""" Vectorized scoring of many poems, loaded by RhymesTonesMetrics.score_batch.
+
+    Every distinct word of the batch is analyzed once. Stanzas with the regular shape of
+    their tag (LỤC BÁT: 6 / 8 words alternating, an even number of lines; THẤT NGÔN: 7
+    words per line, at most 8 lines) are encoded as word codes, stacked by tag and number
+    of lines, gathered into matrices of rime ids and tone classes, and the rhyme and tone
+    rules run as column operations over the whole group. Any other stanza (wrong lengths, "00" spelling, unknown tags)
+    goes through the scalar rule checks, so the scores are the ones of calculate_score.
+"""
+
+from functools import lru_cache
+from math import ceil, floor
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .lexicon import Lexicon
+from .stanza import FIRST_TONE_ROWS, TONE_EVEN, TONE_NONE, TONE_UNEVEN, is_regular, strip_special_char
+
+# Encoded expected tone that never matches a syllable (tone_dict value other than even / uneven)
+_TONE_OTHER = -2
+
+
+class BatchScores(NamedTuple):
+    """
+        Per-poem results of score_batch, aligned with the input poems
+
+        scores: same value as calculate_score
+        length_errors, rhyme_errors, tone_errors, spelling_errors: errors summed over the
+            stanzas, a stanza that can not be scored (score 0) counts no error
+    """
+    scores: np.ndarray
+    length_errors: np.ndarray
+    rhyme_errors: np.ndarray
+    tone_errors: np.ndarray
+    spelling_errors: np.ndarray
+
+
+@lru_cache(maxsize=8)
+def rhyme_table(lexicon: Lexicon) -> Tuple[np.ndarray, np.ndarray]:
+    """
+        Dense form of Lexicon.rhymes for array lookups
+
+        Returns:
+            known: known[a] is False when rhymes(a, _) is None (rime not a key of rhymes.txt)
+            table: table[a, b] is True when rhymes(a, b) is True
+            Both have one extra trailing slot, so UNKNOWN_RIME_ID (-1) indexes it
+    """
+    size = len(lexicon.rhyme_masks)
+    known = np.zeros(size + 1, dtype=bool)
+    table = np.zeros((size + 1, size + 1), dtype=bool)
+    n_bytes = (size + 7) // 8
+    for rime_id, mask in enumerate(lexicon.rhyme_masks):
+        if mask is None:
+            continue
+        known[rime_id] = True
+        bits = np.frombuffer(mask.to_bytes(n_bytes, "little"), dtype=np.uint8)
+        table[rime_id, :size] = np.unpackbits(bits, bitorder="little")[:size]
+    return known, table
+
+
+def tone_template(tone_dict: dict, key: int, length: int):
+    """
+        Positions and encoded tones of a tone_dict pattern, None when the scalar check
+        would raise on it (missing pattern or position outside the line)
+    """
+    pattern = tone_dict.get(key)
+    if pattern is None or any(not 0 <= position < length for position in pattern):
+        return None
+    positions = np.fromiter(pattern.keys(), dtype=np.intp, count=len(pattern))
+    expected = np.array(
+        [TONE_EVEN if tone == "even" else TONE_UNEVEN if tone == "uneven" else _TONE_OTHER for tone in pattern.values()],
+        dtype=np.int8
+    )
+    return positions, expected
+
+
+def line_starts_68(n_lines: int) -> List[int]:
+    return [(line // 2) * 14 + (line % 2) * 6 for line in range(n_lines)]
+
+
+class _Vocabulary:
+    """
+        Every distinct word of the batch analyzed once, so that encoding a stanza is one
+        dict lookup per word and the arrays are gathered with NumPy
+    """
+    __slots__ = ("lexicon", "index", "rime_ids", "tones", "blanks", "head_ids", "head_blanks")
+
+    def __init__(self, lexicon: Lexicon):
+        self.lexicon = lexicon
+        self.index: Dict[str, int] = {}
+        # Same values as Stanza.rime_ids / Stanza.tones, and whether the word without special chars is ""
+        self.rime_ids: List[int] = []
+        self.tones: List[int] = []
+        self.blanks: List[bool] = []
+        # Rime id of the rime of the word, as check_ryhme_stanze_type_78 reads the first ending word
+        self.head_ids: List[int] = []
+        self.head_blanks: List[bool] = []
+
+    def encode(self, words: List[str]) -> List[int]:
+        index = self.index
+        codes = []
+        for word in words:
+            code = index.get(word)
+            if code is None:
+                code = index[word] = self._add(word)
+            codes.append(code)
+        return codes
+
+    def _add(self, word: str) -> int:
+        analyze = self.lexicon.analyze
+        clean_word = strip_special_char(word)
+        tone = analyze(word).tone
+        head = strip_special_char(analyze(word).rime)
+        self.rime_ids.append(analyze(clean_word).rime_id)
+        self.tones.append(TONE_NONE if tone is None else TONE_EVEN if tone == "even" else TONE_UNEVEN)
+        self.blanks.append(not clean_word)
+        self.head_ids.append(analyze(head).rime_id)
+        self.head_blanks.append(not head)
+        return len(self.rime_ids) - 1
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "rime_ids": np.array(self.rime_ids, dtype=np.int32),
+            "tones": np.array(self.tones, dtype=np.int8),
+            "blanks": np.array(self.blanks, dtype=bool),
+            "head_ids": np.array(self.head_ids, dtype=np.int32),
+            "head_blanks": np.array(self.head_blanks, dtype=bool),
+        }
+
+
+def _not_rhyming(known: np.ndarray, table: np.ndarray, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    # rhymes(first, second) is False (None when first is unknown counts no error)
+    return known[first] & ~table[first, second]
+
+
+def _pair_errors(known, table, prev, cur, end, end_blank) -> np.ndarray:
+    """
+        RHYME errors of check_rhyme_pair for one column of pairs; end is the ending word
+        of the previous pair, end_blank marks the pairs where it is "" (first pair rule)
+    """
+    first_pair = _not_rhyming(known, table, prev, cur).astype(np.int64)
+    chained = (
+        _not_rhyming(known, table, prev, end).astype(np.int64)
+        + _not_rhyming(known, table, end, cur).astype(np.int64)
+    )
+    return np.where(end_blank, first_pair, chained)
+
+
+def _tone_errors(tones: np.ndarray, start: int, template) -> Tuple[np.ndarray, np.ndarray]:
+    positions, expected = template
+    found = tones[:, start + positions]
+    return (found != expected).sum(axis=1), (found == TONE_NONE).any(axis=1)
+
+
+def _score_group_68(codes: np.ndarray, n_lines: int, vocabulary: dict, rhymes, templates: dict):
+    known, table = rhymes
+    rime_ids = vocabulary["rime_ids"][codes]
+    tones = vocabulary["tones"][codes]
+    blanks = vocabulary["blanks"][codes]
+    starts = line_starts_68(n_lines)
+    size = len(codes)
+
+    rhyme_errors = np.zeros(size, dtype=np.int64)
+    for line in range(0, n_lines, 2):
+        prev = rime_ids[:, starts[line] + 5]
+        cur = rime_ids[:, starts[line + 1] + 5]
+        if line == 0:
+            rhyme_errors += _not_rhyming(known, table, prev, cur)
+        else:
+            end_index = starts[line - 1] + 7
+            rhyme_errors += _pair_errors(known, table, prev, cur, rime_ids[:, end_index], blanks[:, end_index])
+
+    tone_errors = np.zeros(size, dtype=np.int64)
+    failed = tones[:, 1] == TONE_NONE
+    for line in range(n_lines):
+        wrong, missing = _tone_errors(tones, starts[line], templates[6 if line % 2 == 0 else 8])
+        tone_errors += wrong
+        failed |= missing
+
+    rhyme_slots = ceil(n_lines / 2) + 2 * floor(n_lines / 2) - 1
+    tone_slots = 3 * ceil(n_lines / 2) + 4 * floor(n_lines / 2)
+    return rhyme_errors, tone_errors, failed, rhyme_slots, tone_slots
+
+
+def _score_group_78(codes: np.ndarray, n_lines: int, vocabulary: dict, rhymes, templates: dict):
+    known, table = rhymes
+    rime_ids = vocabulary["rime_ids"][codes]
+    tones = vocabulary["tones"][codes]
+    blanks = vocabulary["blanks"][codes]
+    size = len(codes)
+
+    rhyme_errors = np.zeros(size, dtype=np.int64)
+    rhyme_lines = [0] + [2 * i + 1 for i in range(n_lines // 2)]
+    for i in range(len(rhyme_lines) - 1):
+        prev_index = rhyme_lines[i] * 7 + 6
+        prev = rime_ids[:, prev_index]
+        cur = rime_ids[:, rhyme_lines[i + 1] * 7 + 6]
+        if i == 0:
+            end = vocabulary["head_ids"][codes[:, 6]]
+            end_blank = vocabulary["head_blanks"][codes[:, 6]]
+        else:
+            end, end_blank = prev, blanks[:, prev_index]
+        rhyme_errors += _pair_errors(known, table, prev, cur, end, end_blank)
+
+    tone_errors = np.zeros(size, dtype=np.int64)
+    failed = tones[:, 1] == TONE_NONE
+    first_uneven = tones[:, 1] == TONE_UNEVEN
+    for line in range(n_lines):
+        wrong_7, missing_7 = _tone_errors(tones, line * 7, templates[7])
+        wrong_71, missing_71 = _tone_errors(tones, line * 7, templates[71])
+        use_7 = first_uneven == (line in FIRST_TONE_ROWS)
+        tone_errors += np.where(use_7, wrong_7, wrong_71)
+        failed |= np.where(use_7, missing_7, missing_71)
+
+    rhyme_slots = ceil(n_lines / 2) + floor(n_lines / 2) - 3
+    tone_slots = 3 * ceil(n_lines / 2) + 3 * floor(n_lines / 2)
+    return rhyme_errors, tone_errors, failed, rhyme_slots, tone_slots
+
+
+def _score_stanza(metrics, text: str, tag: str):
+    """
+        Scalar path: (score, length, rhyme, tone, spelling errors) like calculate_stanza_score
+    """
+    stanza = metrics.analyze_stanza(text)
+    length_errors = rhyme_errors = tone_errors = spelling_errors = 0
+    try:
+        if tag != "00":
+            _, length_errors, rhyme_errors, tone_errors, _ = metrics.check_rule(stanza, tag, render=False)
+        else:
+            spelling_errors, _ = metrics.check_spelling_vietnamese(stanza, [], None)
+        score = metrics.calculate_score_by_error(
+            len(stanza), tag, length_errors, rhyme_errors, tone_errors, spelling_errors, stanza.word_count
+        )
+    except Exception as e:
+        print(e)
+        return 0, 0, 0, 0, 0
+    return score, length_errors, rhyme_errors, tone_errors, spelling_errors
+
+
+def score_batch(metrics, poems: Sequence[str], tags: Union[str, Sequence[str]]) -> BatchScores:
+    """
+        Score many poems at once, see RhymesTonesMetrics.score_batch
+    """
+    if isinstance(tags, str):
+        tags = [tags] * len(poems)
+    if len(tags) != len(poems):
+        raise ValueError(f"Got {len(tags)} tags for {len(poems)} poems")
+
+    templates = {
+        "68": {6: tone_template(metrics.tone_dict, 6, 6), 8: tone_template(metrics.tone_dict, 8, 8)},
+        "78": {7: tone_template(metrics.tone_dict, 7, 7), 71: tone_template(metrics.tone_dict, 71, 7)},
+    }
+    vectorized = {tag: all(template is not None for template in templates[tag].values()) for tag in templates}
+
+    vocabulary = _Vocabulary(metrics.lexicon)
+    stanza_poems: List[int] = []
+    stanza_results: List[Optional[Tuple[float, int, int, int, int]]] = []
+    # (tag, number of lines) -> slots and word codes of the regular stanzas
+    groups: Dict[Tuple[str, int], Tuple[List[int], List[List[int]]]] = {}
+    for poem_index, (poem, tag) in enumerate(zip(poems, tags)):
+        for text in poem.split("\n\n"):
+            stanza_poems.append(poem_index)
+            # Same words as Stanza: blank runs dropped, an empty line keeps one empty word
+            lines = [[word for word in line.split(" ") if word] or [""] for line in text.split("\n")]
+            if vectorized.get(tag) and is_regular([len(line) for line in lines], tag):
+                slots, codes = groups.setdefault((tag, len(lines)), ([], []))
+                slots.append(len(stanza_results))
+                codes.append(vocabulary.encode([word for line in lines for word in line]))
+                stanza_results.append(None)
+            else:
+                stanza_results.append(_score_stanza(metrics, text, tag))
+
+    n_stanzas = len(stanza_results)
+    scores = np.zeros(n_stanzas, dtype=np.float64)
+    counts = np.zeros((4, n_stanzas), dtype=np.int64)
+    for slot, result in enumerate(stanza_results):
+        if result is not None:
+            scores[slot] = result[0]
+            counts[:, slot] = result[1:]
+
+    if groups:
+        arrays = vocabulary.arrays()
+        rhymes = rhyme_table(metrics.lexicon)
+    for (tag, n_lines), (slots, codes) in groups.items():
+        score_group = _score_group_68 if tag == "68" else _score_group_78
+        rhyme_errors, tone_errors, failed, rhyme_slots, tone_slots = score_group(
+            np.array(codes, dtype=np.intp), n_lines, arrays, rhymes, templates[tag]
+        )
+        slots = np.array(slots, dtype=np.intp)
+        if rhyme_slots == 0:
+            # 70 * errors / 0 raises in calculate_score_by_error
+            failed = np.ones_like(failed)
+            rhyme_slots = 1
+        group_scores = 100 - (70 * rhyme_errors) / rhyme_slots - (30 * tone_errors) / tone_slots
+        scores[slots] = np.where(failed, 0.0, group_scores)
+        counts[1, slots] = np.where(failed, 0, rhyme_errors)
+        counts[2, slots] = np.where(failed, 0, tone_errors)
+
+    # Stanza scores are added in order, like the running sum of calculate_score
+    stanza_poems = np.array(stanza_poems, dtype=np.intp)
+    sums = np.zeros(len(poems), dtype=np.float64)
+    np.add.at(sums, stanza_poems, scores)
+    n_per_poem = np.bincount(stanza_poems, minlength=len(poems))
+    poem_counts = np.zeros((4, len(poems)), dtype=np.int64)
+    for kind in range(4):
+        np.add.at(poem_counts[kind], stanza_poems, counts[kind])
+
+    return BatchScores(
+        scores=sums / n_per_poem,
+        length_errors=poem_counts[0],
+        rhyme_errors=poem_counts[1],
+        tone_errors=poem_counts[2],
+        spelling_errors=poem_counts[3],
+    )
@@ -1,40 +1,28 @@
+from typing import List
+
 from ..configs import CountSyllablePoemsConfig
+from .errors import PoemError, MISSING_WORD, EXTRA_WORD
 
 class CountSyllablePoems:
     def __init__(self, config: CountSyllablePoemsConfig):
         super(CountSyllablePoems, self).__init__()
-        # Lacking word, Reductant word 
-        # self.masked_words = [
-        #     #  {
-        #     #     "line": 1,
-        #     #     "position": 9,
-        #     #     "word": None (don't masked) (because of reductant word,only delete it)
-        #     #  },
-        #     #  {
-        #     #     "line": 2,
-        #     #     "position": 8,
-        #     #     "word": "missing"
-        #     #  },
-        # ]
-        self.masked_words = config.masked_words
-        self.idx_masked_words = config.idx_masked_words
+        # Lacking word, Reductant word
+        #   PoemError(MISSING_WORD, line = 1, position = 7, expected = 8, actual = 7)
+        #   PoemError(EXTRA_WORD, line = 0, position = 6, expected = 6, actual = 7)
+        self.errors: List[PoemError] = []
         self.token_masked_words = config.token_masked_words
 
-    def add_masked_word(
-            self, 
-            word: str, 
-            line: int, 
-            position: int
+    def add_error(
+            self,
+            kind: str,
+            line: int,
+            position: int,
+            expected: int,
+            actual: int
     ):
-        self.masked_words.append({
-            "line": line,
-            "position": position,
-            "word": word
-        })
-
-        self.idx_masked_words.add(f"{line}_{position}")
+        self.errors.append(PoemError(kind, line, position, expected, actual))
 
-        print(f"Masked word: {word} at line {line}, position {position}")
+        print(f"Masked word: {kind} at line {line + 1}, position {position + 1}")
 
     def check_poem_68(
             self,
@@ -49,31 +37,15 @@ class CountSyllablePoems:
             if line % 2 == 0: 
                 # reductant word
                 if count_sentence > first_count:
-                    self.add_masked_word(
-                        word = "reductant" , 
-                        line= line + 1,
-                        position = first_count + 1
-                    )
+                    self.add_error(EXTRA_WORD, line, first_count, first_count, count_sentence)
                 # missing word
                 elif count_sentence < first_count:
-                    self.add_masked_word(
-                        word = "missing", 
-                        line= line + 1,
-                        position = first_count
-                    )
+                    self.add_error(MISSING_WORD, line, first_count - 1, first_count, count_sentence)
             else:
                 if count_sentence > second_count:
-                    self.add_masked_word(
-                        word = "reductant", 
-                        line= line + 1,
-                        position = second_count + 1
-                    )
+                    self.add_error(EXTRA_WORD, line, second_count, second_count, count_sentence)
                 elif count_sentence < second_count:
-                    self.add_masked_word(
-                        word = "missing", 
-                        line= line + 1,
-                        position = second_count
-                    )
+                    self.add_error(MISSING_WORD, line, second_count - 1, second_count, count_sentence)
                 
         print(f"Completed successfully for checking LỤC BÁT poem")
     
@@ -86,18 +58,10 @@ class CountSyllablePoems:
             count_sentence = len(sentence.strip().split(" ")) 
             # reductant word
             if count_sentence > first_count:
-                self.add_masked_word(
-                    word = "reductant" , 
-                    line= line + 1,
-                    position = first_count + 1
-                )
+                self.add_error(EXTRA_WORD, line, first_count, first_count, count_sentence)
             # missing word
             elif count_sentence < first_count:
-                self.add_masked_word(
-                    word = "missing",
-                    line= line + 1,
-                    position = first_count 
-                )
+                self.add_error(MISSING_WORD, line, first_count - 1, first_count, count_sentence)
 
         print(f"Completed successfully for checking THẤT NGÔN BÁT CÚ poem")
 
@@ -114,8 +78,7 @@ class CountSyllablePoems:
                 stanza: stanza to check
 
             Returns:
-                idx_masked_words: index of masked words
-                masked_words: list of masked words
+                errors: MISSING_WORD / EXTRA_WORD records (0-based line and position)
 
         """
         sentences = stanza.split("\n")
@@ -124,14 +87,12 @@ class CountSyllablePoems:
         else:
             self.check_poem_78(sentences)
 
-        return self.idx_masked_words, self.masked_words
+        return self.errors
     
 
 if __name__ == "__main__":
     count_syllable_poems = CountSyllablePoems(
         config = CountSyllablePoemsConfig(
-            masked_words = [],
-            idx_masked_words = set(),
             token_masked_words = "MASKED_WORD"
         )
     )
@@ -148,13 +109,12 @@ if __name__ == "__main__":
         poem = "Hoàng hôn tắt nắng phủ sương \nbóng tối giăng đầy vạn nẻo sơi \nngọn cỏ thu sương lay khẽ khẽ \nđầu non điểm xuyết ánh lơ thơ \ncôn trùng rỉ rả nghe mà chán \ncon nhện buông tơ rối cả trơ \nlặng lẽ tìm con buồn héo hắt \nkhói sương lẩn khuất ánh lóe vàng."
         poem_1 = "Hoàng hôn tắt nắng phủ sương mờ mờ \nbóng tối giăng đầy vạn nẻo sơi \nngọn cỏ thu sương lay khẽ khẽ \nđầu non điểm xuyết ánh lơ thơ \ncôn trùng rỉ rả nghe mà chán \ncon nhện buông tơ rối cả trơ \nlặng lẽ tìm con buồn héo hắt \nkhói sương lẩn khuất ánh lóe vàng."
 
-    idx_masked_words, masked_words = count_syllable_poems.count_syllables(
+    errors = count_syllable_poems.count_syllables(
         stanza = poem_1,
         luc_bat = luc_bat
     )
 
-    print(f"idx_masked_words: {idx_masked_words}")
-    print(f"masked_words: {masked_words}")
+    print(f"errors: {errors}")
 
 
 
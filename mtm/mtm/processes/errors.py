@@ -0,0 +1,65 @@
+""" Structured records of the rule violations found in a poem."""
+
+from typing import Any, Dict, Optional, Tuple
+
+# Kinds of errors and the annotation written after the word (or in front of the line)
+RHYME = "rhyme"
+TONE = "tone"
+LENGTH = "length"
+SPELLING = "spelling"
+MISSING_WORD = "missing"
+EXTRA_WORD = "reductant"
+
+ANNOTATIONS = {
+    RHYME: "(E_V)",
+    TONE: "(E_T)",
+    LENGTH: "(L)",
+    SPELLING: "(E_S)",
+}
+
+
+class PoemError:
+    """
+        One rule violation, located by 0-based line and word position in its stanza
+
+        kind: RHYME, TONE, LENGTH, SPELLING, MISSING_WORD or EXTRA_WORD
+        line: index of the line in the stanza
+        position: index of the word in the line, None for an error on the whole line (LENGTH)
+        expected: what the rule asks for (rhyming word, 'even' / 'uneven', number of words)
+        actual: what was found (the word as written, its tone, number of words)
+    """
+    __slots__ = ("kind", "line", "position", "expected", "actual")
+
+    def __init__(
+            self,
+            kind: str,
+            line: int,
+            position: Optional[int],
+            expected: Any = None,
+            actual: Any = None
+    ):
+        self.kind = kind
+        self.line = line
+        self.position = position
+        self.expected = expected
+        self.actual = actual
+
+    @property
+    def mark(self) -> Tuple[int, Optional[int], str]:
+        """
+            (line, position, annotation) as consumed by render_stanza
+        """
+        return self.line, self.position, ANNOTATIONS[self.kind]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PoemError):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        return "PoemError(kind={!r}, line={}, position={}, expected={!r}, actual={!r})".format(
+            self.kind, self.line, self.position, self.expected, self.actual
+        )
@@ -9,6 +9,7 @@ from ..configs import (
 )
 from .poetic_rule import PoeticRules
 from .count_syllables import CountSyllablePoems
+from .errors import PoemError, MISSING_WORD, EXTRA_WORD
 
 class MaskErrorTokenization:
     def __init__(
@@ -35,7 +36,7 @@ class MaskErrorTokenization:
                 luc_bat: whether or not the poem input is LỤC BÁT type poem or not
             
             Returns:
-
+                errors: PoemError records of the rhyme and tone rules
 
         """
         tags = "68" if luc_bat else "78"
@@ -45,14 +46,15 @@ class MaskErrorTokenization:
             rhyme_dict_path=self.poetic_config.rhyme_dict_path, 
             tone_dict_path=self.poetic_config.tone_dict_path, 
             dictionary_path=self.poetic_config.dictionary_path, 
-            special_tone_dict_path=self.poetic_config.special_tone_dict_path
+            special_tone_dict_path=self.poetic_config.special_tone_dict_path,
+            lexicon_bundle_path=self.poetic_config.lexicon_bundle_path
         )
-        idx_masked_words, masked_words = check_poetic_rule.check_poem(
+        errors = check_poetic_rule.check_poem(
             poem=poem_input, 
             tag=tags
         )
 
-        return idx_masked_words, masked_words
+        return errors
 
     def _run_count_syllables(
             self,
@@ -67,21 +69,18 @@ class MaskErrorTokenization:
                 luc_bat: whether or not the stanza is LỤC BÁT type stanza or not
 
             Returns:
+                errors: PoemError records of the missing and reductant words
 
         """
         count_syllable_poems = CountSyllablePoems(
-            config = CountSyllablePoemsConfig(
-                    masked_words = self.count_syllable_config.masked_words,
-                    idx_masked_words = self.count_syllable_config.idx_masked_words,
-                    token_masked_words = self.count_syllable_config.token_masked_words
-                )
+            config = self.count_syllable_config
         )
-        idx_masked_words, masked_words = count_syllable_poems.count_syllables(
+        errors = count_syllable_poems.count_syllables(
             stanza = poem_input,
             luc_bat = luc_bat
         )
 
-        return idx_masked_words, masked_words
+        return errors
 
     def _check_luc_bat(
             self,
@@ -157,8 +156,7 @@ class MaskErrorTokenization:
     def _run_masked_words(
             self,
             poem_input: str,
-            idx_masked_words: List[int],
-            masked_words: List[Dict[str, Any]],
+            errors: List[PoemError],
             luc_bat: bool
     ):
         """ 
@@ -166,8 +164,8 @@ class MaskErrorTokenization:
 
             Args:
                 poem_input(str): poem input  to check
-                idx_masked_words(Set(int)): index of masked words
-                masked_words(List[Dict[str, Any]]): list of masked words
+                errors(List[PoemError]): one error per masked slot, sorted by line and position
+                luc_bat: whether or not the stanza is LỤC BÁT type stanza or not
 
             Returns:
                 masked_poem(str): poem with error tokenization masked
@@ -176,20 +174,18 @@ class MaskErrorTokenization:
         final_poem = ""
         
         sentences = poem_input.split("\n")
-        for idx, masked_word in zip(idx_masked_words, masked_words):
-            #  Split idx to get rows and cols (1_6) ==> rows = 1, cols = 6
-            rows, cols = idx.split("_")[0], idx.split("_")[1]
-            rows, cols = int(rows) - 1, int(cols) - 1
+        for error in errors:
+            rows, cols = error.line, error.position
 
             if luc_bat:
                 # Replace masked word phrase
                 words = sentences[rows].split(" ")
                 # Handle the wrong case if the stanza lack  or redundant word
-                if masked_word["word"] == "missing":
+                if error.kind == MISSING_WORD:
                     # Replace missing word phrase
                     words.append(f"[{self.token_masked_words}]")
 
-                elif masked_word["word"] == "reductant":
+                elif error.kind == EXTRA_WORD:
                     # Replace wrong word phrase
                     words[cols - 1:] = [f""]*2
                     words[cols] = f"[{self.token_masked_words}]"
@@ -209,11 +205,11 @@ class MaskErrorTokenization:
                 words = sentences[rows].split(" ")
                 # print(f"words: {words}")
                                 # Handle the wrong case if the stanza lack  or redundant word
-                if masked_word["word"] == "missing":
+                if error.kind == MISSING_WORD:
                     # print("missing")
                     # Replace missing word phrase
                     words.append(f"[{self.token_masked_words}]")
-                elif masked_word["word"] == "reductant":
+                elif error.kind == EXTRA_WORD:
                     # Replace wrong word phrase
                     words[cols - 1:] = [f""]*2
                     words[cols] = f"[{self.token_masked_words}]"
@@ -326,44 +322,31 @@ class MaskErrorTokenization:
         print(f"LUC BÁT TYPE: {luc_bat}")
 
         # count syllables
-        cs_idx_masked_words, cs_masked_words = self._run_count_syllables(
+        cs_errors = self._run_count_syllables(
             poem_input = poem_input,
             luc_bat = luc_bat
         )
 
         # check poetic rule
-        pr_idx_masked_words, pr_masked_words = self._run_poetic_rule(
+        pr_errors = self._run_poetic_rule(
             poem_input = poem_input,
             luc_bat = luc_bat
         )
 
-        # combine all errors of count syllables and poetic rule problems
-        combined_idx_masked_words = set()
-        combined_idx_masked_words.update(cs_idx_masked_words)
-        combined_idx_masked_words.update(pr_idx_masked_words)
-        combined_masked_words = pr_masked_words + cs_masked_words
-
-        print(f" cs_idx_masked_words: {cs_idx_masked_words} \n cs_masked_words: {cs_masked_words} \n pr_idx_masked_words: {pr_idx_masked_words} \n pr_masked_words: {pr_masked_words} \n")
-        print(f" combined_idx_masked_words: {combined_idx_masked_words} \n combined_masked_words: {combined_masked_words} \n")
-        # print(sorted(list(combined_idx_masked_words)))
+        print(f" cs_errors: {cs_errors} \n pr_errors: {pr_errors} \n")
 
-        # Sort combined_idx_masked_words
-        combined_idx_masked_words_sorted = sorted(
-            combined_idx_masked_words,
-            key=lambda x: tuple(map(int, x.split('_')))
-        )
-
-        # Sort combined_masked_words by line and position
-        combined_masked_words_sorted = sorted(
-            combined_masked_words,
-            key=lambda x: (x['line'], x['position'])
-        )
-        print(f"combined_idx_masked_words_sorted: {combined_idx_masked_words_sorted} \n combined_masked_words_sorted: {combined_masked_words_sorted} \n")
+        # One error per masked slot, a missing / reductant word wins over a rule error at the same place
+        combined_errors = {}
+        for error in pr_errors + cs_errors:
+            slot = (error.line, error.position)
+            if slot not in combined_errors or error.kind in (MISSING_WORD, EXTRA_WORD):
+                combined_errors[slot] = error
+        combined_errors_sorted = [combined_errors[slot] for slot in sorted(combined_errors)]
+        print(f"combined_errors_sorted: {combined_errors_sorted} \n")
 
         poem_input, masked_poem = self._run_masked_words(
             poem_input = poem_input,
-            idx_masked_words = combined_idx_masked_words_sorted,
-            masked_words = combined_masked_words_sorted,
+            errors = combined_errors_sorted,
             luc_bat = luc_bat
         )
 
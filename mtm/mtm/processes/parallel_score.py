@@ -0,0 +1,132 @@
+""" Process-pool scoring of many poems on every core of the machine."""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Sequence, Tuple, Union, TYPE_CHECKING
+
+import numpy as np
+
+from .batch_score import BatchScores
+from .poetic_score import RhymesTonesMetrics
+
+if TYPE_CHECKING:
+    from ..configs import ParallelScoringConfig, PoeticRulesMetricsConfig
+
+# Metrics of a worker process, built once by the pool initializer
+_worker_metrics: Optional[RhymesTonesMetrics] = None
+
+
+def _init_worker(metrics_config: "PoeticRulesMetricsConfig"):
+    # get_lexicon loads the assets once per process; a lexicon bundle is memory-mapped,
+    # so every worker shares the same pages of it
+    global _worker_metrics
+    _worker_metrics = RhymesTonesMetrics(metrics_config=metrics_config)
+
+
+def _score_chunk(chunk: Tuple[Sequence[str], Sequence[str]]) -> BatchScores:
+    poems, tags = chunk
+    return _worker_metrics.score_batch(poems, tags)
+
+
+class ParallelScorer:
+    """
+        Score poems with a pool of worker processes, each holding its own lexicon
+
+        Poems go out in chunks of chunk_size and come back in input order. The scores are
+        the ones of RhymesTonesMetrics.calculate_score, so a ParallelScorer can be passed
+        wherever a RhymesTonesMetrics is used for score_batch (calculate_top_k).
+    """
+
+    def __init__(self, config: "ParallelScoringConfig"):
+        self.metrics_config = config.metrics_config
+        self.workers = config.workers or os.cpu_count() or 1
+        self.chunk_size = max(1, config.chunk_size)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._metrics: Optional[RhymesTonesMetrics] = None
+
+        # Throughput of every score_batch call so far
+        self.poems_scored = 0
+        self.seconds = 0.0
+
+    def _local_metrics(self) -> RhymesTonesMetrics:
+        if self._metrics is None:
+            self._metrics = RhymesTonesMetrics(metrics_config=self.metrics_config)
+        return self._metrics
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.metrics_config,)
+            )
+        return self._executor
+
+    def score_batch(
+            self,
+            poems: Sequence[str],
+            tags: Union[str, Sequence[str]]
+    ) -> BatchScores:
+        """
+            Score poems on the pool, results in input order
+
+            Args:
+                poems: poems to score
+                tags: one tag for every poem, or one tag per poem
+
+            Returns:
+                BatchScores: per-poem scores and error counts
+        """
+        start = time.perf_counter()
+        if isinstance(tags, str):
+            tags = [tags] * len(poems)
+        if len(tags) != len(poems):
+            raise ValueError(f"Got {len(tags)} tags for {len(poems)} poems")
+
+        chunks = [
+            (poems[i:i + self.chunk_size], tags[i:i + self.chunk_size])
+            for i in range(0, len(poems), self.chunk_size)
+        ]
+        if self.workers == 1 or len(chunks) <= 1:
+            # Not worth the round trip to the pool (e.g. the few candidates of calculate_top_k)
+            results = self._local_metrics().score_batch(list(poems), list(tags))
+        else:
+            parts = list(self._pool().map(_score_chunk, chunks))
+            results = BatchScores(*(np.concatenate(arrays) for arrays in zip(*parts)))
+
+        elapsed = time.perf_counter() - start
+        self.poems_scored += len(poems)
+        self.seconds += elapsed
+        if len(chunks) > 1:
+            print(f"[PARALLEL SCORING]: {len(poems)} poems in {elapsed:.2f}s "
+                  f"({len(poems) / elapsed:.0f} poems/s, {self.workers} workers)")
+        return results
+
+    def calculate_score(self, poem: str, tag: str) -> float:
+        """
+            Score a single poem in the calling process, same as RhymesTonesMetrics.calculate_score
+        """
+        return self.score_batch([poem], tag).scores[0].item()
+
+    def throughput(self) -> dict:
+        """
+            Poems scored, seconds spent and poems per second over every call so far
+        """
+        return {
+            "poems": self.poems_scored,
+            "seconds": self.seconds,
+            "poems_per_second": self.poems_scored / self.seconds if self.seconds else 0.0,
+            "workers": self.workers,
+        }
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,10 +1,6 @@
 import re
-import ast
-import json
 from math import ceil, floor
-from collections import defaultdict
-from itertools import chain
-from typing import Optional
+from typing import List, Optional
 
 
 try:
@@ -12,81 +8,21 @@ try:
 except ImportError:
     import importlib_resources as resources
 
-sources ="assets/"
-
-def load_data(filename: str):
-
-    with open(filename, 'r', encoding='utf-8') as file:
-        text = file.read()
-
-    content = ast.literal_eval(text)
-    return content
-def vowels(vowels_path: str):
-    even_chars = []
-    list_start_vowels = []
-    tones = {}
-    thanhtrac = []
-    thanhbang = []
-    start_vowels = load_data(vowels_path)
-
-
-    huyen = start_vowels['huyen']
-    sac = start_vowels['sac']
-    nang = start_vowels['nang']
-    hoi = start_vowels['hoi']
-    nga = start_vowels['nga']
-    khong_dau = start_vowels['khong_dau']
-
-    thanhbang.extend(huyen)
-    thanhbang.extend(khong_dau)
-    thanhtrac.extend(sac)
-    thanhtrac.extend(nang)
-    thanhtrac.extend(hoi)
-    thanhtrac.extend(nga)
-    tones["thanhtrac"] = thanhtrac
-    tones["thanhbang"] = thanhbang
-
-    list_start_vowels.extend(huyen)
-    list_start_vowels.extend(sac)
-    list_start_vowels.extend(nang)
-    list_start_vowels.extend(hoi)
-    list_start_vowels.extend(nga)
-    list_start_vowels.extend(khong_dau)
-
-    even_chars.extend(huyen)
-    even_chars.extend(khong_dau)
-    return even_chars, list_start_vowels, tones
-
-def rhyme(rhyme_path: str):
-    # rhyme_path = sources + "rhymes.txt"
-    rhymes_dict = load_data(rhyme_path)
-    return rhymes_dict
-
-def tone(tone_path: str):
-    # tone_path = sources + "tone_dict.txt"
-    tone_dict = load_data(tone_path)
-    return tone_dict
-
-def special_tone(special_tone_path: str):
-    # tone_path = sources + "vocab_dupple_check.txt"
-    special_tone_dict = load_data(special_tone_path)
-    return special_tone_dict
-
-def dictionary(dictionary_path: str):
-    # dictionary_path = sources + "words.txt"
-    word_dict = defaultdict(set)
-
-    with open(dictionary_path, 'r', encoding='utf-8') as file:
-        for line in file:
-            entry = json.loads(line.strip())
-            text = entry["text"].lower()
-
-            first_char = text[0].lower()
-            word_dict[first_char].add(text)
-
-    result_dict = dict(word_dict)
-    return result_dict
+from .stanza import Stanza, render_stanza, strip_special_char
+from .errors import PoemError, ANNOTATIONS, RHYME, SPELLING, TONE
+from .spelling import DEFAULT_MAX_DISTANCE, DEFAULT_TOP_K, get_spelling_suggester
+from .lexicon import (
+    UNKNOWN_RIME_ID,
+    load_data,
+    vowels,
+    rhyme,
+    tone,
+    special_tone,
+    dictionary,
+    get_lexicon,
+)
 
+sources ="assets/"
 
 class PoeticRules:
   def __init__(
@@ -95,7 +31,11 @@ class PoeticRules:
       rhyme_dict_path,
       tone_dict_path,
       dictionary_path,
-      special_tone_dict_path
+      special_tone_dict_path,
+      lexicon_bundle_path=None,
+      spelling_suggestions=DEFAULT_TOP_K,
+      spelling_max_distance=DEFAULT_MAX_DISTANCE,
+      spelling_ignore_tones=False
     ):
     """
       Constructor for RhymesTonesMetrics class
@@ -106,24 +46,36 @@ class PoeticRules:
         tone_dict_path: path to tone dictionary
         dictionary_path: path to dictionary
         special_tone_dict_path: path to special tone dictionary
+        lexicon_bundle_path: optional compiled bundle, memory-mapped when present
+        spelling_suggestions: number of suggestions kept for each wrong word
+        spelling_max_distance: largest edit distance of a suggestion
+        spelling_ignore_tones: compare the suggestions without their tone marks
 
     """
 
-    self.even_chars, self.list_start_vowels, self.tones = vowels(vowels_dict_path)
-    self.rhymes_dict = rhyme(rhyme_dict_path)
-    self.tone_dict = tone(tone_dict_path)
-    self.dictionary_vi = dictionary(dictionary_path)
-    self.special_tone_dict = special_tone(special_tone_dict_path)
-
-
-    self.masked_words = [
-        #  {
-        #     "line": 1,
-        #     "position": 8,
-        #     "word": "mùa"
-        #  },
-      ]
-    self.idx_masked_words = set()
+    # Shared across every instance built from the same assets (loaded once per process)
+    self.lexicon = get_lexicon(
+        vowels_dict_path=vowels_dict_path,
+        rhyme_dict_path=rhyme_dict_path,
+        tone_dict_path=tone_dict_path,
+        dictionary_path=dictionary_path,
+        special_tone_dict_path=special_tone_dict_path,
+        bundle_path=lexicon_bundle_path
+    )
+    self.even_chars = self.lexicon.even_chars
+    self.list_start_vowels = self.lexicon.list_start_vowels
+    self.tones = self.lexicon.tones
+    self.rhymes_dict = self.lexicon.rhymes_dict
+    self.tone_dict = self.lexicon.tone_dict
+    self.dictionary_vi = self.lexicon.dictionary_vi
+    self.special_tone_dict = self.lexicon.special_tone_dict
+    self.spelling_suggestions = spelling_suggestions
+    self.spelling_max_distance = spelling_max_distance
+    self.spelling_ignore_tones = spelling_ignore_tones
+
+
+    # Every rule violation found so far, in the order they were found
+    self.errors: List[PoemError] = []
     self.token_masked_words = "MASKED_WORD"
 
   def is_stanza(self, sentences: str):
@@ -158,19 +110,7 @@ class PoeticRules:
           return: ending part of word
           Ex: mùa -> ùa
       """
-      word_length = len(word)
-      start_index = 0
-      prev = ''
-      for i in range(word_length):
-          if prev == 'g' and word[i] == 'i':
-              continue
-          if prev == 'q' and word[i] == 'u':
-              continue
-          if word[i] in self.list_start_vowels:
-              start_index = i
-              break
-          prev = word[i]
-      return word[start_index:]
+      return self.lexicon.analyze(word).rime
 
 
   def compare(self, word1: str, word2: str):
@@ -179,53 +119,46 @@ class PoeticRules:
 
         param word1, word2: words to check
 
-        return: is the same rhyme or not
+        return: is the same rhyme or not, None when the rime of word1 is not in rhymes.txt
       """
-      rhyme1 = self.split_word(word1)
-      rhyme2 = self.split_word(word2)
-
-      if rhyme2 in self.rhymes_dict[rhyme1]:
-          return True
-      return False
+      return self.lexicon.rhymes(
+          self.lexicon.analyze(word1).rime_id,
+          self.lexicon.analyze(word2).rime_id
+      )
 
 
-  def add_masked_word(
-        self, 
-        word: str,
-        line: int,
-        position: int
-  ):
-      self.masked_words.append({
-          "line": line,
-          "position": position,
-          "word": word
-      })
+  def add_error(self, error: PoemError):
+      """
+        Record a rule violation to be masked
 
-      self.idx_masked_words.add(f"{line}_{position}") # ex: 1_8 for line 1, position 8
-      
+        param error: the PoemError record
+      """
+      self.errors.append(error)
 
-      print(f"Masked word: {word} at line {line}, position {position}")
+      position = "-" if error.position is None else error.position + 1
+      print(f"Masked word ({error.kind}): {error.actual} at line {error.line + 1}, position {position}")
 
 
 
   def check_rhyme_pair(
       self,
-      prev_sentence: str,
-      cur_sentence: str,
-      idx: int,
-      idx_next: int,
+      stanza: Stanza,
+      prev_line: int,
+      cur_line: int,
       tag: str,
       prev_end_words_rhyme="",
   ):
       """
-          Check 2 words rhyme if the same
+          Check the rhyme of the ending words of 2 lines
 
-          param word1, word2: words to check
+          Params:
+            stanza: parsed stanza
+            prev_line, cur_line: index of the 2 lines
+            tag: tag Input - type of poem
+            prev_end_words_rhyme: ending word of the previous pair ("" for none)
 
-          return: is the same rhyme or not
+          return: ending word of cur_line
         """
-      error_word = ""
-
       tag_end_word = 0 # index of ending word to check ryhme
 
       if tag == "68":
@@ -234,193 +167,126 @@ class PoeticRules:
       elif tag == "78":
         tag_end_word = 6
 
-      prev_words = prev_sentence.split(" ")
-      cur_words = cur_sentence.split(" ")
-
-      prev_words_in_sentences = self.split_special_char(prev_words[tag_end_word])
-      cur_words_in_sentences = self.split_special_char(cur_words[tag_end_word])
-      prev_end_words_rhyme = self.split_special_char(prev_end_words_rhyme)
+      prev_rime_id = stanza.rime_id(prev_line, tag_end_word)
+      cur_rime_id = stanza.rime_id(cur_line, tag_end_word)
 
       if prev_end_words_rhyme == "":
-          try:
-              if not self.compare(prev_words_in_sentences, cur_words_in_sentences):
-                  error_word = cur_words[tag_end_word]
-                  self.add_masked_word(
-                      word=error_word,
-                      line=idx_next + 1,
-                      position=tag_end_word + 1
-                  )
-
-          except Exception as e:
-              print(f"{e} + {cur_sentence}")
-              pass
+          matched = self.lexicon.rhymes(prev_rime_id, cur_rime_id)
+          if matched is False:
+              self.add_error(PoemError(
+                  RHYME, cur_line, tag_end_word,
+                  stanza.clean_word(prev_line, tag_end_word), stanza.word(cur_line, tag_end_word)
+              ))
 
       if prev_end_words_rhyme != "":
-          try:
-            if not self.compare(prev_words_in_sentences, prev_end_words_rhyme):
-                error_word = prev_words[tag_end_word]
-                self.add_masked_word(
-                    word=error_word,
-                    line=idx + 1,
-                    position=tag_end_word + 1
-                )
-
-          except Exception as e:
-              print(f"{e} + {cur_sentence}")
-              pass
-
-          try:
-            if not self.compare(prev_end_words_rhyme, cur_words_in_sentences):
-                error_word = cur_words[tag_end_word]
-                self.add_masked_word(
-                    word=error_word,
-                    line=idx_next + 1,
-                    position=tag_end_word + 1
-                )
-
-          except Exception as e:
-              print(f"{e} + {cur_sentence}")
-              pass
-
-      prev_sentence = " ".join(prev_words)
-      cur_sentence = " ".join(cur_words)
-
-      return prev_sentence, cur_sentence, cur_words[-1]
+          end_rime_id = self.lexicon.analyze(prev_end_words_rhyme).rime_id
+
+          matched = self.lexicon.rhymes(prev_rime_id, end_rime_id)
+          if matched is False:
+              self.add_error(PoemError(
+                  RHYME, prev_line, tag_end_word, prev_end_words_rhyme, stanza.word(prev_line, tag_end_word)
+              ))
+
+          matched = self.lexicon.rhymes(end_rime_id, cur_rime_id)
+          if matched is False:
+              self.add_error(PoemError(
+                  RHYME, cur_line, tag_end_word, prev_end_words_rhyme, stanza.word(cur_line, tag_end_word)
+              ))
+
+      return stanza.clean_word(cur_line, -1)
   
 
+  def rhyme_group_id(self, rime: str) -> int:
+      """
+        Rime id of a rime that has a rhyme group in rhymes.txt
+
+        param rime: rime to look up
+
+        return: its id, KeyError when rhymes.txt has no group for it
+      """
+      rime_id = self.lexicon.rime_ids.get(rime, UNKNOWN_RIME_ID)
+      if self.lexicon.rhymes(rime_id, rime_id) is None:
+          raise KeyError(rime)
+      return rime_id
+
   def check_ryhme_stanze_type_78(
       self,
-      sentences: str,
-      most_common_rhyme: Optional[str] = None
+      stanza: Stanza,
+      most_common_rhyme: Optional[list] = None
   ):
       """
         Check rhyme by stanza with THAT NGON BAT CU type
 
         Params:
-          sentence: List of sentences in stanza
-          first_words: List of first words in sentences
-          prev_end_words_rhyme: ending word of previous sentence
-          total_rhyme_errors: total rhyme errors
-          total_length_errors: total length errors
-          check_ryhme_label: check rhyme label
-          check_ryhme_labels: list of check rhyme labels
-          tag: tag Input - type of poem
-
-        Returns:
-          res: stanza after check filter and error highlighted
-          total_rhyme_errors: total rhyme errors
-          total_length_errors: total length errors
-          check_ryhme_labels: list of check rhyme labels
+          stanza: parsed stanza
+          most_common_rhyme: rimes shared by most of the rhyming lines, the first one is used
       """
-      length_sentences = len(sentences)
+      length_sentences = len(stanza)
       # Let's check The first sentence 
       pos_end_word = 6
-      print(f"self.rhymes_dict[most_common_rhyme[0]]: {self.rhymes_dict[most_common_rhyme[0]]}")
-      first_word = sentences[0].split(" ")[pos_end_word]
-      rhyme_first_word = self.split_word(first_word)
-      if rhyme_first_word not in self.rhymes_dict[most_common_rhyme[0]]:
-          self.add_masked_word(
-              word=first_word,
-              line=1,
-              position=pos_end_word + 1
-      )  
+      common_rime_id = self.rhyme_group_id(most_common_rhyme[0])
+      print(f"most_common_rhyme: {most_common_rhyme[0]}")
+      first_word = stanza.word(0, pos_end_word)
+      if not self.lexicon.rhymes(common_rime_id, self.lexicon.analyze(first_word).rime_id):
+          self.add_error(PoemError(RHYME, 0, pos_end_word, most_common_rhyme[0], first_word))
 
       for i in range(1, length_sentences, 2):
-         end_word = sentences[i].split(" ")[pos_end_word]
-         rhyme_end_word = self.split_word(end_word)
+         end_word = stanza.word(i, pos_end_word)
          print(f"end_word: {end_word}")
-         print(f"rhyme_end_word: {rhyme_end_word}")
-         if rhyme_end_word not in self.rhymes_dict[most_common_rhyme[0]]:
-            self.add_masked_word(
-                word=end_word,
-                line=i + 1,
-                position=pos_end_word + 1
-            )
-
-      return "\n".join(sentences)
+         if not self.lexicon.rhymes(common_rime_id, self.lexicon.analyze(end_word).rime_id):
+            self.add_error(PoemError(RHYME, i, pos_end_word, most_common_rhyme[0], end_word))
 
   def check_rhyme_stanza_type_68(
       self,
-      sentences: str,
-      first_words: str,
-      prev_end_words_rhyme: str,
-      start_index: int,
+      stanza: Stanza,
       tag: str
   ):
       """
         Check rhyme by stanza with LUC BAT type
 
         Params:
-          sentence: List of sentences in stanza
-          first_words: List of first words in sentences
-          prev_end_words_rhyme: ending word of previous sentence
-          total_rhyme_errors: total rhyme errors
-          total_length_errors: total length errors
-          check_ryhme_label: check rhyme label
-          check_ryhme_labels: list of check rhyme labels
-          start_index: start index of sentences
+          stanza: parsed stanza
           tag: tag Input - type of poem
-
-        Returns:
-          res: stanza after check filter and error highlighted
-          total_rhyme_errors: total rhyme errors
-          total_length_errors: total length errors
-          check_ryhme_labels: list of check rhyme labels
-
       """
-      if len(first_words) == 8:
-          prev_end_words_rhyme = self.split_word(first_words[7])
+      prev_end_words_rhyme = ""
+      start_index = 0
+      if stanza.line_length(0) == 8:
+          prev_end_words_rhyme = strip_special_char(self.split_word(stanza.word(0, 7)))
           start_index = 1
 
-      for i in range(start_index, len(sentences), 2):
-        if i+1 == len(sentences):
-            sentences.append("Missing ending sentence")
-        sentences[i], sentences[i+1], prev_end_words_rhyme =\
-            self.check_rhyme_pair(sentences[i], sentences[i + 1], i, i + 1, tag, prev_end_words_rhyme)
-
-      return "\n".join(sentences)
+      for i in range(start_index, len(stanza), 2):
+        if i+1 == len(stanza):
+            raise IndexError("Missing ending sentence")
+        prev_end_words_rhyme = self.check_rhyme_pair(stanza, i, i + 1, tag, prev_end_words_rhyme)
 
   def check_rhyme_stanza(
       self,
-      stanza: str,
+      stanza: Stanza,
       tag: str
   ):
       """
-          Check rhyme by stanza
+          Check rhyme by stanza, recording the RHYME errors
 
           Params:
-            stanza: input stanza to check
+            stanza: parsed stanza
             tag: tag Input - type of poem
-
-          Returns:
-            res: stanza after check filter and error highlighted
-            total_rhyme_errors: total rhyme errors
-            total_length_errors: total length errors
-
         """
-      sentences = stanza.split("\n")
-      first_words = sentences[0].split(" ")
-      start_index = 0
-      prev_end_words_rhyme = ""
-
       if tag == "78":
         # Check the rhyme of the last word of the stanza
-        pos_last_word = len(first_words) - 1
-        rhyme_list = []
+        pos_last_word = stanza.line_length(0) - 1
+        rhyme_list = [self.split_word(stanza.word(0, pos_last_word))]
         rhyme_dict = {}
-        rhyme_list.append(self.split_word(first_words[pos_last_word]))
-        for i in range(1, len(sentences), 2):
-           last_word = self.split_word(sentences[i].split(" ")[pos_last_word])
-           last_word = self.split_special_char(last_word)
+        for i in range(1, len(stanza), 2):
+           last_word = strip_special_char(self.split_word(stanza.word(i, pos_last_word)))
            rhyme_list.append(last_word)
-        #    print(f"self.rhymes_dict[last_word]: {self.rhymes_dict[last_word]}")
-           rhyme_dict[last_word] = self.rhymes_dict[last_word]
-        frequency_rhyme = defaultdict(int)
+           rhyme_dict[last_word] = self.rhyme_group_id(last_word)
+        frequency_rhyme = {}
 
         for rhyme in rhyme_list:
+            rime_id = self.lexicon.rime_ids.get(rhyme, UNKNOWN_RIME_ID)
             matched = False 
-            for key, value in rhyme_dict.items():
-                if rhyme in value:
+            for key, key_rime_id in rhyme_dict.items():
+                if self.lexicon.rhymes(key_rime_id, rime_id):
                     matched = True
                     frequency_rhyme[key] = frequency_rhyme.get(key, 0) + 1
                     break
@@ -430,23 +296,11 @@ class PoeticRules:
         max_freq = max(frequency_rhyme.values())
         most_common_rhyme = [k for k, v in frequency_rhyme.items() if v == max_freq]
           
-        res = self.check_ryhme_stanze_type_78(
-            sentences,
-            most_common_rhyme
-        )
+        self.check_ryhme_stanze_type_78(stanza, most_common_rhyme)
       elif tag == "68":
-        res = self.check_rhyme_stanza_type_68(
-            sentences,
-            first_words,
-            prev_end_words_rhyme,
-            start_index,
-            tag
-        )
+        self.check_rhyme_stanza_type_68(stanza, tag)
       else:
-        pass
-
-
-      return res
+        raise ValueError(f"Unsupported tag for the rhyme rule: {tag}")
 
 
   def get_tone(self, word: str):
@@ -457,68 +311,40 @@ class PoeticRules:
 
             return: even or uneven
           """
-          # i, e, ê, o, ô, ơ, a,  ă, â, u, ư, y
-      first_char = self.split_word(word)
-      suffix_char = first_char
-      len_char = len(first_char)
-      first_char = first_char[0]
-      flag = 0
-      if first_char in self.special_tone_dict:
-        # hòa, nước => ước
-        if first_char in self.even_chars:
-          flag += 0
-        elif first_char in self.special_tone_dict and first_char not in self.even_chars:
-          flag += 1
-        ### Check the second
-        for l in range(1, len_char):
-          second_char = suffix_char[l]
-          if second_char in self.even_chars:
-            flag += 0
-          elif second_char in self.special_tone_dict and second_char not in self.even_chars:
-            flag += 1
-        flag = flag / len_char
-        if flag > 0: # if have existed a char with uneven ==> uneven
-          return 'uneven'
-        else:
-          return 'even'
-
-      for i in self.even_chars:
-          if first_char == i:
-              return 'even'
-      try:
-          second_char = first_char[1]
-          for i in self.even_chars:
-              if second_char == i:
-                  return 'even'
-      except:
-          pass
-      return 'uneven'
+      tone = self.lexicon.analyze(word).tone
+      if tone is None:
+          raise IndexError("string index out of range")
+      return tone
 
   def check_tone_sentence(
       self,
-      sentence: str,
+      stanza: Stanza,
       row_sentence: int,
       first_tone_default: list,
-      tag: str
+      tag: str,
+      marks: list
   ):
       """
-          Check sentence is on the right form of even or uneven rule
+          Check sentence is on the right form of even or uneven rule, recording the TONE errors
 
-          param sentence: sentence to check tone
+          Params:
+            stanza: parsed stanza
+            row_sentence: index of the line to check
+            first_tone_default: rows following the first / second tone pattern
+            tag: tag Input - type of poem
+            marks: list receiving the (T), (B) annotations of the right tones
 
-          return: sentences after added notation to highlight error
-                  total_wrong_tone: total wrong tone in sentence
+          A line with a wrong number of words can not be checked and raises ValueError,
+          which ends the check of the stanza (the count syllable check masks that line)
         """
-      words = sentence.split(" ")
-      length = len(words)
+      length = stanza.line_length(row_sentence)
       cur_tone_dict = None
-      sentence_correct = words
 
       ## Check the format Tone of each sentence
       if tag == "78":
         ## 78
         if length != 7:
-            return "(L)"+sentence, 0, " ".join(sentence_correct)
+            raise ValueError(f"line {row_sentence + 1} has {length} words, expected 7")
 
         if row_sentence in first_tone_default[0]:
           cur_tone_dict = self.tone_dict[length]
@@ -529,57 +355,43 @@ class PoeticRules:
       elif tag == "68":
         ## 68
         if length != 6 and length != 8:
-            return "(L)"+sentence, 0, " ".join(sentence_correct)
+            raise ValueError(f"line {row_sentence + 1} has {length} words, expected 6 or 8")
         cur_tone_dict = self.tone_dict[length]
 
       for i in cur_tone_dict:
-          if self.get_tone(words[i]) != cur_tone_dict[i]:
-              self.add_masked_word(
-                 word = words[i], 
-                 line = row_sentence + 1, 
-                 position = i + 1
-              )
-              words[i] = words[i] + "(E_T)"
+          tone = stanza.tone(row_sentence, i)
+          if tone != cur_tone_dict[i]:
+              self.add_error(PoemError(TONE, row_sentence, i, cur_tone_dict[i], tone))
+          elif tone == 'uneven':
+              marks.append((row_sentence, i, "(T)"))
           else:
-            if self.get_tone(words[i]) == 'uneven':
-              sentence_correct[i] = sentence_correct[i] + "(T)"
-            elif self.get_tone(words[i]) == 'even':
-              sentence_correct[i] = sentence_correct[i] + "(B)"
-
-      return " ".join(words), " ".join(sentence_correct)
+              marks.append((row_sentence, i, "(B)"))
 
 
   def check_tone_stanza(
       self,
-      stanza: str,
-      tag: str
+      stanza: Stanza,
+      tag: str,
+      marks: list
   ):
       """
           Check stanza is on the right form of even or uneven rule
 
           Params:
-            sentence: stanza to check tone
+            stanza: parsed stanza
             tag: tag Input - type of poem
-
-          Returns:
-            stanza after added notation to highlight error
-            total_wrong_tone: total wrong tone in sentence
+            marks: list receiving the (T), (B) annotations of the right tones
         """
-      sentences = stanza.split("\n")
-      sentences_correct = []
       ### the first Define for the tone of the first sentence is _ T _ B _ T _ _
       first_tone_default = [[0, 3, 4, 7], [1, 2, 5, 6]] ## ==> 7 ffile, 71 file
-      first_sentence_words_1 = sentences[0].split(" ")[1]
       # Check even , uneven for a sentence
-      if self.get_tone(first_sentence_words_1) == 'uneven':
+      if stanza.tone(0, 1) == 'uneven':
         first_tone_default_sentence = first_tone_default
-      elif self.get_tone(first_sentence_words_1) == 'even':
+      else:
         first_tone_default_sentence = [first_tone_default[1], first_tone_default[0]]
 
-      for i in range(len(sentences)):
-          sentences[i], sentence_correct = self.check_tone_sentence(sentences[i], i, first_tone_default_sentence, tag)
-          sentences_correct.append(sentence_correct)
-      return "\n".join(sentences), "\n".join(sentences_correct)
+      for i in range(len(stanza)):
+          self.check_tone_sentence(stanza, i, first_tone_default_sentence, tag, marks)
 
 
   def preprocess_stanza(self, stanza: str):
@@ -601,191 +413,166 @@ class PoeticRules:
           sentences_out.append(" ".join(words_out))
       return "\n".join(sentences_out)
 
+  def analyze_stanza(self, stanza: str) -> Stanza:
+      """
+        Parse the stanza once (blanks removed like preprocess_stanza) into per-syllable arrays
+
+        param stanza: stanza to parse
+
+        return: Stanza read by every check
+      """
+      return Stanza(stanza, self.lexicon)
+
 
   def check_rule(
       self,
-      stanza: str,
-      tag: str
+      stanza,
+      tag: str,
+      render: bool = True
   ):
       """
         A function to check both rhyme and tone rule
 
         Params:
-            sentence: stanza to check
+            stanza: stanza to check (text or an already parsed Stanza)
             tag: tag Input - type of poem
+            render: write the tone annotations and errors into the text; when False it is None
 
         Returns:
-            stanza processed
+            stanza processed, twice (annotated stanza and the correct format)
       """
-
-      if not self.is_stanza(stanza):
-          print(stanza + ": is not a stanza")
+      if isinstance(stanza, str):
+          stanza = self.analyze_stanza(stanza)
+      if not stanza.is_stanza:
+          print(render_stanza(stanza, []) + ": is not a stanza")
           return
-      stanza = self.preprocess_stanza(stanza)
-      stanza = self.check_rhyme_stanza(stanza, tag) # Create and record error unstructured sentences
-      stanza, sentences_correct_format = self.check_tone_stanza(stanza, tag)
-      sentences_correct_format = stanza
-      return stanza, sentences_correct_format
+      first_error = len(self.errors)
+      marks = []
+      self.check_rhyme_stanza(stanza, tag)
+      self.check_tone_stanza(stanza, tag, marks)
+      if not render:
+          return None, None
+      # Only the tone errors are written into the text
+      tone_marks = [error.mark for error in self.errors[first_error:] if error.kind == TONE]
+      sentences_correct_format = render_stanza(stanza, tone_marks + marks)
+      return sentences_correct_format, sentences_correct_format
 
   def check_spelling_vietnamese(
       self,
-      stanza: str,
-      sentences_correct_format: str,
-      recommend_correct_format: dict
+      stanza: Stanza,
+      recommend_correct_format: Optional[dict]
   ):
       """
 
-         A function to check Spelling Rule VietNamese Language
+         A function to check Spelling Rule VietNamese Language, recording the SPELLING errors
 
          Params:
-            sentence: stanza to check
-            total_spelling_errors: total spelling errors
+            stanza: parsed stanza to check
+            recommend_correct_format: top suggestions for each wrong word, None to skip them
 
 
          Returns:
-            stanza processed
-            total_spelling_errors: total spelling errors
-            sentences_correct_format: sentences after added notation to highlight error
+            recommend_correct_format: closest dictionary words of each wrong word (SpellingSuggester)
       """
 
-      sentences = stanza.split("\n")
-      for line, sentence in enumerate(sentences):
-          words = sentence.split(" ")
-          words_out = []
-          for pos, word in enumerate(words):
-            first_char = word[0].lower()
-            vietnamese_chars = self.dictionary_vi[first_char]
-            if self.split_special_char(word.lower()) in vietnamese_chars:
+      for line in range(len(stanza)):
+          for pos, word in enumerate(stanza.line(line)):
+            clean_word = strip_special_char(word.lower())
+            if not word or clean_word in self.dictionary_vi:
               continue
-            else:
-              self.add_masked_word(
-                 word = word, 
-                 line = line + 1, 
-                 position = pos + 1
-              )
-              word = word + "(E_S)"
-              recommend_correct_format[word] = vietnamese_chars
-            words_out.append(word)
-          sentences_correct_format.append(" ".join(words_out))
-      # print(sentences_correct_format)
-      return "\n".join(sentences_correct_format), recommend_correct_format
+            self.add_error(PoemError(SPELLING, line, pos, None, word))
+            if recommend_correct_format is not None:
+              recommend_correct_format[word + ANNOTATIONS[SPELLING]] = self.suggest_spelling(clean_word)
+      return recommend_correct_format
+
+  def suggest_spelling(self, word: str) -> List[str]:
+      """
+        Closest dictionary words of a misspelled word, best first
+
+        The SpellingSuggester of the dictionary is built on the first call and shared
+        by every checker using the same lexicon.
+
+        Params:
+            word: the wrong word, without its special chars
+
+        Returns:
+            List[str]: at most spelling_suggestions words
+      """
+      suggester = get_spelling_suggester(self.dictionary_vi, self.spelling_max_distance, self.spelling_ignore_tones)
+      return [candidate for candidate, _ in suggester.suggest(word, self.spelling_suggestions)]
+
+  def render_spelling(self, stanza: Stanza, errors: list):
+      """
+        Text of the spelling check: the misspelled words of each line marked with (E_S)
+
+        Params:
+            stanza: parsed stanza
+            errors: SPELLING records of this stanza
+
+        Returns:
+            str: one line of wrong words per line of the stanza
+      """
+      sentences_correct_format = [[] for _ in range(len(stanza))]
+      for error in errors:
+          sentences_correct_format[error.line].append(error.actual + ANNOTATIONS[SPELLING])
+      return "\n".join(" ".join(words) for words in sentences_correct_format)
 
 
   def calculate_stanza_score(
         self,
         stanza: str,
         tag: str,
+        render: bool = True
         ):
       """
-        A function to calculate score for the Stanza
+        A function to check the rules of the Stanza, recording its errors
 
         param sentence: stanza
+        param render: build the annotated text; when False sentences_correct_format is None
 
-        return: score  after checked by rule and calculated by formula that rhyme accounts for 70% score rate
-          and 30% left for tone
+        return: sentences_correct_format, recommend_correct_format
       """
 
-      stanza = self.preprocess_stanza(stanza)
-      total_spelling_errors = 0
+      stanza = self.analyze_stanza(stanza)
+      first_error = len(self.errors)
 
       sentences_correct_format = []
       recommend_correct_format = {}
       try:
         if tag != "00":
-          stanza, sentences_correct_format = self.check_rule(stanza, tag)
+          _, sentences_correct_format = self.check_rule(stanza, tag, render)
         elif tag == "00":
-          sentences_correct_format, recommend_correct_format = self.check_spelling_vietnamese(stanza, total_spelling_errors, sentences_correct_format, recommend_correct_format)
+          recommend_correct_format = self.check_spelling_vietnamese(stanza, recommend_correct_format)
+          sentences_correct_format = self.render_spelling(stanza, self.errors[first_error:]) if render else None
 
       except Exception as e:
           print(e)
-          score = 0
           sentences_correct_format = ""
       return sentences_correct_format, recommend_correct_format
 
 
   def check_poem(self,
                       poem: str,
-                      tag: str):
+                      tag: str,
+                      render: bool = True):
       """
-        A function to calculate score for a poem that may have some stanzas
+        A function to check the rules of a poem that may have some stanzas
 
         Params:
           sentence: poem Input
           tags: tags Input - type of poem
+          render: print the annotated text of each stanza
 
         Returns:
-          score_accuracy_poemn: score  after checked by rule and calculated by formula that rhyme accounts for 70% score rate
-        and 30% left for tone
+          errors: PoemError records of every checked stanza (lines counted inside each stanza)
 
       """
 
       sentences_correct_format = ""
       recommend_correct_format = {}
       for i in poem.split("\n\n"):
-          sentences_correct_format, recommend_correct_format = self.calculate_stanza_score(i, tag)
-          print(sentences_correct_format)
-          print(recommend_correct_format)
-      return self.idx_masked_words, self.masked_words 
-  
-
-
-
-if __name__ == "__main__":
-    import os 
-    # get the root path
-    root_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    root_path = os.path.dirname(os.path.dirname(root_path))
-    # print(f"\n\n[ROOT_PATH]: {root_path} \n\n")
-    full_path = os.path.join(root_path, sources)
-    # print(f"\n\n[SOURCES]: {sources} \n\n")
-
-    vowels_path = full_path + "start_vowels.txt"
-    rhyme_path = full_path + "rhymes.txt"
-    tone_path = full_path + "tone_dict.txt"
-    special_tone_path = full_path + "vocab_dupple_check.txt"
-    dictionary_path = full_path + "words.txt"
-
-    check_poetic_rule = PoeticRules(
-       vowels_dict_path = vowels_path, 
-       rhyme_dict_path=rhyme_path, 
-       tone_dict_path=tone_path, 
-       dictionary_path=dictionary_path, 
-       special_tone_dict_path=special_tone_path
-    )
-    luc_bat = True
-    poem = ""
-    if luc_bat:
-        poem = "cởi trời xanh cởi đất nâu \ngió mấy hờn dỗi bạc na nhớ nhùng \nbạc đầu tóc trắng da nhé \ncõi lửa thế giới ai nhung lưng sầu \nnhớ quê hương thơ nhuộm sầu \ntóc thể vương vương đôi sánh vai tròn \nđêm buồn ngắm ánh trăng tròn \nngẩn ngơ ôm bóng mỏi tròn năm canh."
-    else:
-        poem = "Hoàng hôn tắt nắng phủ sương mờ \nbóng tối giăng đầy vạn nẻo sơi \nngọn cỏ thu sương lay khẽ khẽ \nđầu non điểm xuyết ánh lơ thơ \ncôn trùng rỉ rả nghe mà chán \ncon nhện buông tơ rối cả trơ \nlặng lẽ tìm con buồn héo hắt \nkhói sương lẩn khuất ánh lóe vàng."
-    tags = "68" if luc_bat else "78"
-    idx_masked_words, masked_words = check_poetic_rule.check_poem(poem, tag=tags)
-
-    print(f"\n\n[IDX_MASKED_WORDS]: {idx_masked_words} \n")
-    print(f"\n\n[MASKED_WORDS]: {masked_words} \n")  
-
-    # python mtm/mtm/processes/poetic_rule.py  
-
-# =========================  LỤC BÁT
-# cởi trời xanh cởi đất nâu 
-# \ngió MẤY hờn dỗi bạc nâu nhớ nhùng  | (2_2) - TONE, 
-# \nbạc đầu tóc trắng da nhung 
-# \ncõi LỬA thế giới ai nhung lưng sầu | (4_2) - TONE, 
-# \nnhớ quê hương THƠ nhuộm sầu | (5_4) - TONE
-# \ntóc THỂ vương VƯƠNG đôi SÁNH vai tròn | (6_2) - TONE, (6_4) - TONE, (6_6) - TONE, RHYME 
-# \nđêm buồn ngắm ánh trăng tròn 
-# \nngẩn ngơ ôm bóng mỏi tròn năm canh.
-
-
-# =========================  THẤT NGÔN BÁT CÚ
-# Hoàng hôn tắt nắng phủ sương mờ 
-# bóng tối giăng đầy vạn nẻo sơi | (2_7) - RHYME
-# ngọn cỏ thu sương lay khẽ khẽ 
-# đầu non điểm xuyết ánh lơ thơ 
-# côn trùng rỉ rả nghe mà chán 
-# con nhện buông tơ rối cả trơ 
-# lặng lẽ tìm con buồn héo hắt 
-# khói sương lẩn khuất ánh LÓE VÀNG | (8_6) - TONE, (8_7) - RHYME
-
-
-
+          sentences_correct_format, recommend_correct_format = self.calculate_stanza_score(i, tag, render)
+          if render:
+              print(sentences_correct_format)
+              print(recommend_correct_format)
+      return self.errors
@@ -18,11 +18,7 @@ import os
 
 
 import re
-import ast
-import json
 from math import ceil, floor
-from collections import defaultdict
-from itertools import chain
 
 
 try:
@@ -31,86 +27,28 @@ except ImportError:
     import importlib_resources as resources
 
 
-from ..configs import PoeticRulesMetricsConfig
+from typing import List, Optional, Union, TYPE_CHECKING
 
-def load_data(filename: str):
-
-    with open(filename, 'r', encoding='utf-8') as file:
-        text = file.read()
-
-    content = ast.literal_eval(text)
-    return content
-def vowels(vowels_path: str):
-    even_chars = []
-    list_start_vowels = []
-    tones = {}
-    thanhtrac = []
-    thanhbang = []
-    start_vowels = load_data(vowels_path)
-
-
-    huyen = start_vowels['huyen']
-    sac = start_vowels['sac']
-    nang = start_vowels['nang']
-    hoi = start_vowels['hoi']
-    nga = start_vowels['nga']
-    khong_dau = start_vowels['khong_dau']
-
-    thanhbang.extend(huyen)
-    thanhbang.extend(khong_dau)
-    thanhtrac.extend(sac)
-    thanhtrac.extend(nang)
-    thanhtrac.extend(hoi)
-    thanhtrac.extend(nga)
-    tones["thanhtrac"] = thanhtrac
-    tones["thanhbang"] = thanhbang
-
-    list_start_vowels.extend(huyen)
-    list_start_vowels.extend(sac)
-    list_start_vowels.extend(nang)
-    list_start_vowels.extend(hoi)
-    list_start_vowels.extend(nga)
-    list_start_vowels.extend(khong_dau)
-
-    even_chars.extend(huyen)
-    even_chars.extend(khong_dau)
-    return even_chars, list_start_vowels, tones
-
-def rhyme(rhyme_path: str):
-    # rhyme_path = sources + "rhymes.txt"
-    rhymes_dict = load_data(rhyme_path)
-    return rhymes_dict
-
-def tone(tone_path: str):
-    # tone_path = sources + "tone_dict.txt"
-    tone_dict = load_data(tone_path)
-    return tone_dict
-
-def special_tone(special_tone_path: str):
-    # tone_path = sources + "vocab_dupple_check.txt"
-    special_tone_dict = load_data(special_tone_path)
-    return special_tone_dict
-
-def dictionary(dictionary_path: str):
-    # dictionary_path = sources + "words.txt"
-    word_dict = defaultdict(set)
-
-    with open(dictionary_path, 'r', encoding='utf-8') as file:
-        for line in file:
-            entry = json.loads(line.strip())
-            text = entry["text"].lower()
-
-            first_char = text[0].lower()
-            word_dict[first_char].add(text)
-
-    result_dict = dict(word_dict)
-    return result_dict
+if TYPE_CHECKING:
+    from ..configs import PoeticRulesMetricsConfig
+from .stanza import Stanza, render_stanza, strip_special_char
+from .errors import PoemError, ANNOTATIONS, LENGTH, RHYME, SPELLING, TONE
+from .spelling import get_spelling_suggester
+from .lexicon import (
+    load_data,
+    vowels,
+    rhyme,
+    tone,
+    special_tone,
+    dictionary,
+    get_lexicon,
+)
 
 
 class RhymesTonesMetrics:
   def __init__(
       self,
-      metrics_config: PoeticRulesMetricsConfig
+      metrics_config: "PoeticRulesMetricsConfig"
     ):
     """
       Constructor for RhymesTonesMetrics class
@@ -121,14 +59,32 @@ class RhymesTonesMetrics:
         tone_dict_path: path to tone dictionary
         dictionary_path: path to dictionary
         special_tone_dict_path: path to special tone dictionary
+        lexicon_bundle_path: optional compiled bundle, memory-mapped when present
+        spelling_suggestions: number of suggestions kept for each wrong word
+        spelling_max_distance: largest edit distance of a suggestion
+        spelling_ignore_tones: compare the suggestions without their tone marks
 
     """
 
-    self.even_chars, self.list_start_vowels, self.tones = vowels(metrics_config.vowels_dict_path)
-    self.rhymes_dict = rhyme(metrics_config.rhyme_dict_path)
-    self.tone_dict = tone(metrics_config.tone_dict_path)
-    self.dictionary_vi = dictionary(metrics_config.dictionary_path)
-    self.special_tone_dict = special_tone(metrics_config.special_tone_dict_path)
+    # Shared across every instance built from the same assets (loaded once per process)
+    self.lexicon = get_lexicon(
+        vowels_dict_path=metrics_config.vowels_dict_path,
+        rhyme_dict_path=metrics_config.rhyme_dict_path,
+        tone_dict_path=metrics_config.tone_dict_path,
+        dictionary_path=metrics_config.dictionary_path,
+        special_tone_dict_path=metrics_config.special_tone_dict_path,
+        bundle_path=metrics_config.lexicon_bundle_path
+    )
+    self.even_chars = self.lexicon.even_chars
+    self.list_start_vowels = self.lexicon.list_start_vowels
+    self.tones = self.lexicon.tones
+    self.rhymes_dict = self.lexicon.rhymes_dict
+    self.tone_dict = self.lexicon.tone_dict
+    self.dictionary_vi = self.lexicon.dictionary_vi
+    self.special_tone_dict = self.lexicon.special_tone_dict
+    self.spelling_suggestions = metrics_config.spelling_suggestions
+    self.spelling_max_distance = metrics_config.spelling_max_distance
+    self.spelling_ignore_tones = metrics_config.spelling_ignore_tones
 
   def is_stanza(self, sentences: str):
       """
@@ -162,19 +118,7 @@ class RhymesTonesMetrics:
           return: ending part of word
           Ex: mùa -> ùa
       """
-      word_length = len(word)
-      start_index = 0
-      prev = ''
-      for i in range(word_length):
-          if prev == 'g' and word[i] == 'i':
-              continue
-          if prev == 'q' and word[i] == 'u':
-              continue
-          if word[i] in self.list_start_vowels:
-              start_index = i
-              break
-          prev = word[i]
-      return word[start_index:]
+      return self.lexicon.analyze(word).rime
 
 
   def compare(self, word1: str, word2: str):
@@ -183,284 +127,200 @@ class RhymesTonesMetrics:
 
         param word1, word2: words to check
 
-        return: is the same rhyme or not
+        return: is the same rhyme or not, None when the rime of word1 is not in rhymes.txt
       """
-      rhyme1 = self.split_word(word1)
-      rhyme2 = self.split_word(word2)
-
-      if rhyme2 in self.rhymes_dict[rhyme1]:
-          return True
-      return False
+      return self.lexicon.rhymes(
+          self.lexicon.analyze(word1).rime_id,
+          self.lexicon.analyze(word2).rime_id
+      )
 
 
 
   def check_rhyme_pair(
       self,
-      prev_sentence: str,
-      cur_sentence: str,
+      stanza: Stanza,
+      prev_line: int,
+      cur_line: int,
       check_ryhme_label,
       tag: str,
-      prev_end_words_rhyme="",
+      prev_end_words_rhyme,
+      errors: list
   ):
       """
-          Check 2 words rhyme if the same
+          Check the rhyme of the ending words of 2 lines
 
-          param word1, word2: words to check
+          Params:
+            stanza: parsed stanza
+            prev_line, cur_line: index of the 2 lines
+            check_ryhme_label: rhyme label of the previous pair
+            tag: tag Input - type of poem
+            prev_end_words_rhyme: ending word of the previous pair ("" for none)
+            errors: list receiving the PoemError records
 
-          return: is the same rhyme or not
+          Returns:
+            ending word of cur_line, check_ryhme_label
         """
-      rhyme_errors = 0
-      length_errors = 0
-
-      prev_length = len(prev_sentence.split(" "))
-      cur_length = len(cur_sentence.split(" "))
-
       tag_end_word = 0 # index of ending word to check ryhme
 
       if tag == "68":
         tag_end_word = 5
 
-        if prev_length != 6:
-            prev_sentence = "(L)" + prev_sentence
-            length_errors = length_errors + 1
+        if stanza.line_length(prev_line) != 6:
+            errors.append(PoemError(LENGTH, prev_line, None, 6, stanza.line_length(prev_line)))
 
-        if cur_length != 8:
-            cur_sentence = "(L)" + cur_sentence
-            length_errors = length_errors + 1
+        if stanza.line_length(cur_line) != 8:
+            errors.append(PoemError(LENGTH, cur_line, None, 8, stanza.line_length(cur_line)))
 
       elif tag == "78":
         tag_end_word = 6
 
-        if prev_length != 7:
-            prev_sentence = "(L)" + prev_sentence
-            length_errors = length_errors + 1
+        if stanza.line_length(prev_line) != 7:
+            errors.append(PoemError(LENGTH, prev_line, None, 7, stanza.line_length(prev_line)))
 
-        if cur_length != 7:
-            cur_sentence = "(L)" + cur_sentence
-            length_errors = length_errors + 1
+        if stanza.line_length(cur_line) != 7:
+            errors.append(PoemError(LENGTH, cur_line, None, 7, stanza.line_length(cur_line)))
 
-      prev_words = prev_sentence.split(" ")
-      cur_words = cur_sentence.split(" ")
-
-      prev_words_in_sentences = self.split_special_char(prev_words[tag_end_word])
-      cur_words_in_sentences = self.split_special_char(cur_words[tag_end_word])
-      prev_end_words_rhyme = self.split_special_char(prev_end_words_rhyme)
+      prev_rime_id = stanza.rime_id(prev_line, tag_end_word)
+      cur_rime_id = stanza.rime_id(cur_line, tag_end_word)
 
       if prev_end_words_rhyme == "":
-          try:
-              if not self.compare(prev_words_in_sentences, cur_words_in_sentences):
-
-                  cur_words[tag_end_word] = cur_words[tag_end_word] + "(E_V)"
-                  check_ryhme_label = "(E_V)"
-                  rhyme_errors = rhyme_errors + 1
-              else:
-                  check_ryhme_label = "(R)"
-
-          except Exception as e:
-              print(f"{e} + {cur_sentence}")
-              pass
+          matched = self.lexicon.rhymes(prev_rime_id, cur_rime_id)
+          if matched is False:
+              errors.append(PoemError(
+                  RHYME, cur_line, tag_end_word,
+                  stanza.clean_word(prev_line, tag_end_word), stanza.word(cur_line, tag_end_word)
+              ))
+              check_ryhme_label = "(E_V)"
+          elif matched:
+              check_ryhme_label = "(R)"
 
       if prev_end_words_rhyme != "":
-          try:
-            if not self.compare(prev_words_in_sentences, prev_end_words_rhyme):
-
-                prev_words[tag_end_word] = prev_words[tag_end_word] + "(E_V)"
-                check_ryhme_label = "(E_V)"
-                rhyme_errors = rhyme_errors + 1
-            else:
-                check_ryhme_label = "(R)"
-
-          except Exception as e:
-              print(f"{e} + {cur_sentence}")
-              pass
-
-          try:
-            if not self.compare(prev_end_words_rhyme, cur_words_in_sentences):
-
-                cur_words[tag_end_word] = cur_words[tag_end_word] + "(E_V)"
-                check_ryhme_label = "(E_V)"
-                rhyme_errors = rhyme_errors + 1
-            else:
-                check_ryhme_label = "(R)"
-
-
-          except Exception as e:
-              print(f"{e} + {cur_sentence}")
-              pass
-
-      prev_sentence = " ".join(prev_words)
-      cur_sentence = " ".join(cur_words)
-
-
-      return prev_sentence, cur_sentence, cur_words[-1], rhyme_errors, length_errors, check_ryhme_label
+          end_rime_id = self.lexicon.analyze(prev_end_words_rhyme).rime_id
+
+          matched = self.lexicon.rhymes(prev_rime_id, end_rime_id)
+          if matched is False:
+              errors.append(PoemError(
+                  RHYME, prev_line, tag_end_word, prev_end_words_rhyme, stanza.word(prev_line, tag_end_word)
+              ))
+              check_ryhme_label = "(E_V)"
+          elif matched:
+              check_ryhme_label = "(R)"
+
+          matched = self.lexicon.rhymes(end_rime_id, cur_rime_id)
+          if matched is False:
+              errors.append(PoemError(
+                  RHYME, cur_line, tag_end_word, prev_end_words_rhyme, stanza.word(cur_line, tag_end_word)
+              ))
+              check_ryhme_label = "(E_V)"
+          elif matched:
+              check_ryhme_label = "(R)"
+
+      return stanza.clean_word(cur_line, -1), check_ryhme_label
 
   def check_ryhme_stanze_type_78(
       self,
-      sentences: str,
-      first_words: str,
-      prev_end_words_rhyme: str,
-      total_rhyme_errors: int,
-      total_length_errors: int,
-      check_ryhme_label,
+      stanza: Stanza,
       check_ryhme_labels,
+      errors: list,
       tag: str
   ):
       """
         Check rhyme by stanza with THAT NGON BAT CU type
 
         Params:
-          sentence: List of sentences in stanza
-          first_words: List of first words in sentences
-          prev_end_words_rhyme: ending word of previous sentence
-          total_rhyme_errors: total rhyme errors
-          total_length_errors: total length errors
-          check_ryhme_label: check rhyme label
+          stanza: parsed stanza
           check_ryhme_labels: list of check rhyme labels
+          errors: list receiving the PoemError records
           tag: tag Input - type of poem
 
         Returns:
-          res: stanza after check filter and error highlighted
-          total_rhyme_errors: total rhyme errors
-          total_length_errors: total length errors
           check_ryhme_labels: list of check rhyme labels
       """
+      check_ryhme_label = ""
+      prev_end_words_rhyme = ""
 
-      ryhme_sentence_lines = [0]
-      out_ryhme_sentence_lines = []
-
-      for i in range(int(len(sentences)/2)):
-        ryhme_sentence_lines = ryhme_sentence_lines + [int(2*i+1)]
-        out_ryhme_sentence_lines = out_ryhme_sentence_lines + [int(2*i)]
-      out_ryhme_sentence_lines = out_ryhme_sentence_lines[1:]
-
-      # print(out_ryhme_sentence_lines, ryhme_sentence_lines)
-
+      # Lines 0, 1, 3, 5, ... rhyme together
+      ryhme_sentence_lines = [0] + [2*i + 1 for i in range(len(stanza)//2)]
 
-      if len(first_words) == 7:
-          prev_end_words_rhyme = self.split_word(first_words[6])
+      if stanza.line_length(0) == 7:
+          prev_end_words_rhyme = strip_special_char(self.split_word(stanza.word(0, 6)))
 
       for i in range(0, len(ryhme_sentence_lines) - 1):
           idx = ryhme_sentence_lines[i]
           idx_next = ryhme_sentence_lines[i+1]
 
-          sentences[idx], sentences[idx_next], prev_end_words_rhyme, rhyme_errors, length_errors, check_ryhme_label =\
-              self.check_rhyme_pair(sentences[idx], sentences[idx_next], check_ryhme_label, tag, prev_end_words_rhyme)
-
-          total_rhyme_errors = total_rhyme_errors + rhyme_errors
-          total_length_errors = total_length_errors + length_errors
+          prev_end_words_rhyme, check_ryhme_label =\
+              self.check_rhyme_pair(stanza, idx, idx_next, check_ryhme_label, tag, prev_end_words_rhyme, errors)
 
           check_ryhme_labels[idx_next] = check_ryhme_label
 
-      return "\n".join(sentences), total_rhyme_errors, total_length_errors, check_ryhme_labels
+      return check_ryhme_labels
 
   def check_rhyme_stanza_type_68(
       self,
-      sentences: str,
-      first_words: str,
-      prev_end_words_rhyme: str,
-      total_rhyme_errors: int,
-      total_length_errors: int,
-      check_ryhme_label,
+      stanza: Stanza,
       check_ryhme_labels,
-      start_index: int,
+      errors: list,
       tag: str
   ):
       """
         Check rhyme by stanza with LUC BAT type
 
         Params:
-          sentence: List of sentences in stanza
-          first_words: List of first words in sentences
-          prev_end_words_rhyme: ending word of previous sentence
-          total_rhyme_errors: total rhyme errors
-          total_length_errors: total length errors
-          check_ryhme_label: check rhyme label
+          stanza: parsed stanza
           check_ryhme_labels: list of check rhyme labels
-          start_index: start index of sentences
+          errors: list receiving the PoemError records
           tag: tag Input - type of poem
 
         Returns:
-          res: stanza after check filter and error highlighted
-          total_rhyme_errors: total rhyme errors
-          total_length_errors: total length errors
           check_ryhme_labels: list of check rhyme labels
 
       """
+      check_ryhme_label = ""
+      prev_end_words_rhyme = ""
+      start_index = 0
 
-      if len(first_words) == 8:
-          prev_end_words_rhyme = self.split_word(first_words[7])
+      if stanza.line_length(0) == 8:
+          prev_end_words_rhyme = strip_special_char(self.split_word(stanza.word(0, 7)))
           start_index = 1
 
-      for i in range(start_index, len(sentences), 2):
-          if i+1 == len(sentences):
-              sentences.append("Missing ending sentence")
-          sentences[i], sentences[i+1], prev_end_words_rhyme, rhyme_errors, length_errors, check_ryhme_label =\
-              self.check_rhyme_pair(sentences[i], sentences[i + 1], check_ryhme_label, tag, prev_end_words_rhyme)
-          total_rhyme_errors = total_rhyme_errors + rhyme_errors
-          total_length_errors = total_length_errors + length_errors
+      for i in range(start_index, len(stanza), 2):
+          if i+1 == len(stanza):
+              raise IndexError("Missing ending sentence")
+          prev_end_words_rhyme, check_ryhme_label =\
+              self.check_rhyme_pair(stanza, i, i + 1, check_ryhme_label, tag, prev_end_words_rhyme, errors)
 
           check_ryhme_labels[i+1] = check_ryhme_label
 
-      return "\n".join(sentences), total_rhyme_errors, total_length_errors, check_ryhme_labels
+      return check_ryhme_labels
 
   def check_rhyme_stanza(
       self,
-      stanza: str,
-      tag: str
+      stanza: Stanza,
+      tag: str,
+      errors: list
   ):
       """
           Check rhyme by stanza
 
           Params:
-            stanza: input stanza to check
+            stanza: parsed stanza
             tag: tag Input - type of poem
+            errors: list receiving the RHYME and LENGTH PoemError records
 
           Returns:
-            res: stanza after check filter and error highlighted
-            total_rhyme_errors: total rhyme errors
-            total_length_errors: total length errors
+            check_ryhme_labels: rhyme label of each line
 
         """
-      sentences = stanza.split("\n")
-      first_words = sentences[0].split(" ")
-      start_index = 0
-      prev_end_words_rhyme = ""
-      total_rhyme_errors = 0
-      total_length_errors = 0
-      check_ryhme_labels = [""]*len(sentences)
+      check_ryhme_labels = [""]*len(stanza)
       # Init original value
       check_ryhme_labels[0] = "(R)"
-      check_ryhme_label = ""
 
       if tag == "78":
-
-        res, total_rhyme_errors, total_length_errors, check_ryhme_labels = self.check_ryhme_stanze_type_78(
-            sentences,
-            first_words,
-            prev_end_words_rhyme,
-            total_rhyme_errors,
-            total_length_errors,
-            check_ryhme_label,
-            check_ryhme_labels,
-            tag
-        )
+        return self.check_ryhme_stanze_type_78(stanza, check_ryhme_labels, errors, tag)
       elif tag == "68":
-        res, total_rhyme_errors, total_length_errors, check_ryhme_labels = self.check_rhyme_stanza_type_68(
-            sentences,
-            first_words,
-            prev_end_words_rhyme,
-            total_rhyme_errors,
-            total_length_errors,
-            check_ryhme_label,
-            check_ryhme_labels,
-            start_index,
-            tag
-        )
-      else:
-        pass
-
-
-      return res, total_rhyme_errors, total_length_errors, check_ryhme_labels
+        return self.check_rhyme_stanza_type_68(stanza, check_ryhme_labels, errors, tag)
+      raise ValueError(f"Unsupported tag for the rhyme rule: {tag}")
 
 
   def get_tone(self, word: str):
@@ -471,68 +331,44 @@ class RhymesTonesMetrics:
 
             return: even or uneven
           """
-          # i, e, ê, o, ô, ơ, a,  ă, â, u, ư, y
-      first_char = self.split_word(word)
-      suffix_char = first_char
-      len_char = len(first_char)
-      first_char = first_char[0]
-      flag = 0
-      if first_char in self.special_tone_dict:
-        # hòa, nước => ước
-        if first_char in self.even_chars:
-          flag += 0
-        elif first_char in self.special_tone_dict and first_char not in self.even_chars:
-          flag += 1
-        ### Check the second
-        for l in range(1, len_char):
-          second_char = suffix_char[l]
-          if second_char in self.even_chars:
-            flag += 0
-          elif second_char in self.special_tone_dict and second_char not in self.even_chars:
-            flag += 1
-        flag = flag / len_char
-        if flag > 0: # if have existed a char with uneven ==> uneven
-          return 'uneven'
-        else:
-          return 'even'
-
-      for i in self.even_chars:
-          if first_char == i:
-              return 'even'
-      try:
-          second_char = first_char[1]
-          for i in self.even_chars:
-              if second_char == i:
-                  return 'even'
-      except:
-          pass
-      return 'uneven'
+      tone = self.lexicon.analyze(word).tone
+      if tone is None:
+          raise IndexError("string index out of range")
+      return tone
 
   def check_tone_sentence(
       self,
-      sentence: str,
+      stanza: Stanza,
       row_sentence: int,
       first_tone_default: list,
-      tag: str
+      tag: str,
+      errors: list,
+      marks: list,
+      line_marks: list
   ):
       """
           Check sentence is on the right form of even or uneven rule
 
-          param sentence: sentence to check tone
+          Params:
+            stanza: parsed stanza
+            row_sentence: index of the line to check
+            first_tone_default: rows following the first / second tone pattern
+            tag: tag Input - type of poem
+            errors: list receiving the TONE PoemError records
+            marks: list receiving the (T), (B) annotations of the right tones
+            line_marks: list receiving the (L) annotation of a line with a wrong length
 
-          return: sentences after added notation to highlight error
-                  total_wrong_tone: total wrong tone in sentence
+          return: total_wrong_tone: total wrong tone in sentence
         """
-      words = sentence.split(" ")
-      length = len(words)
+      length = stanza.line_length(row_sentence)
       cur_tone_dict = None
-      sentence_correct = words
 
       ## Check the format Tone of each sentence
       if tag == "78":
         ## 78
         if length != 7:
-            return "(L)"+sentence, 0, " ".join(sentence_correct)
+            line_marks.append((row_sentence, None, "(L)"))
+            return 0
 
         if row_sentence in first_tone_default[0]:
           cur_tone_dict = self.tone_dict[length]
@@ -543,57 +379,56 @@ class RhymesTonesMetrics:
       elif tag == "68":
         ## 68
         if length != 6 and length != 8:
-            return "(L)"+sentence, 0, " ".join(sentence_correct)
+            line_marks.append((row_sentence, None, "(L)"))
+            return 0
         cur_tone_dict = self.tone_dict[length]
       total_wrong_tone = 0
       for i in cur_tone_dict:
-          if self.get_tone(words[i]) != cur_tone_dict[i]:
+          tone = stanza.tone(row_sentence, i)
+          if tone != cur_tone_dict[i]:
               total_wrong_tone = total_wrong_tone + 1
-              words[i] = words[i] + "(E_T)"
+              errors.append(PoemError(TONE, row_sentence, i, cur_tone_dict[i], tone))
+          elif tone == 'uneven':
+              marks.append((row_sentence, i, "(T)"))
           else:
-            if self.get_tone(words[i]) == 'uneven':
-              sentence_correct[i] = sentence_correct[i] + "(T)"
-            elif self.get_tone(words[i]) == 'even':
-              sentence_correct[i] = sentence_correct[i] + "(B)"
+              marks.append((row_sentence, i, "(B)"))
 
-      return " ".join(words), total_wrong_tone, " ".join(sentence_correct)
+      return total_wrong_tone
 
 
   def check_tone_stanza(
       self,
-      stanza: str,
-      tag: str
+      stanza: Stanza,
+      tag: str,
+      errors: list,
+      marks: list,
+      line_marks: list
   ):
       """
           Check stanza is on the right form of even or uneven rule
 
           Params:
-            sentence: stanza to check tone
+            stanza: parsed stanza
             tag: tag Input - type of poem
+            errors: list receiving the TONE PoemError records
+            marks: list receiving the (T), (B) annotations of the right tones
+            line_marks: list receiving the (L) annotations of lines with a wrong length
 
           Returns:
-            stanza after added notation to highlight error
-            total_wrong_tone: total wrong tone in sentence
+            total_wrong_tone: total wrong tone in stanza
         """
-      sentences = stanza.split("\n")
-      sentences_correct = []
       total_wrong = 0
       ### the first Define for the tone of the first sentence is _ T _ B _ T _ _
       first_tone_default = [[0, 3, 4, 7], [1, 2, 5, 6]] ## ==> 7 ffile, 71 file
-      first_sentence_words_1 = sentences[0].split(" ")[1]
       # Check even , uneven for a sentence
-      if self.get_tone(first_sentence_words_1) == 'uneven':
+      if stanza.tone(0, 1) == 'uneven':
         first_tone_default_sentence = first_tone_default
-      elif self.get_tone(first_sentence_words_1) == 'even':
+      else:
         first_tone_default_sentence = [first_tone_default[1], first_tone_default[0]]
 
-      for i in range(len(sentences)):
-          current_wrong = 0
-
-          sentences[i], current_wrong, sentence_correct = self.check_tone_sentence(sentences[i], i, first_tone_default_sentence, tag)
-          total_wrong = total_wrong + current_wrong
-          sentences_correct.append(sentence_correct)
-      return "\n".join(sentences), total_wrong, "\n".join(sentences_correct)
+      for i in range(len(stanza)):
+          total_wrong = total_wrong + self.check_tone_sentence(stanza, i, first_tone_default_sentence, tag, errors, marks, line_marks)
+      return total_wrong
 
 
   def preprocess_stanza(self, stanza: str):
@@ -615,76 +450,166 @@ class RhymesTonesMetrics:
           sentences_out.append(" ".join(words_out))
       return "\n".join(sentences_out)
 
+  def analyze_stanza(self, stanza: str) -> Stanza:
+      """
+        Parse the stanza once (blanks removed like preprocess_stanza) into per-syllable arrays
 
-  def check_rule(
+        param stanza: stanza to parse
+
+        return: Stanza read by every check
+      """
+      return Stanza(stanza, self.lexicon)
+
+
+  def check_stanza_rules(
+      self,
+      stanza: Stanza,
+      tag: str
+  ):
+      """
+        Run the rhyme and tone rules once, without rendering anything
+
+        Params:
+            stanza: parsed stanza
+            tag: tag Input - type of poem
+
+        Returns:
+            errors: PoemError records, rhyme and length errors first then tone errors
+            check_ryhme_labels: rhyme label of each line
+            marks: (T), (B) annotations of the right tones
+            line_marks: (L) annotations of the lines skipped by the tone rule
+      """
+      errors = []
+      marks = []
+      line_marks = []
+      check_ryhme_labels = self.check_rhyme_stanza(stanza, tag, errors)
+      self.check_tone_stanza(stanza, tag, errors, marks, line_marks)
+      return errors, check_ryhme_labels, marks, line_marks
+
+  def find_errors(
       self,
       stanza: str,
       tag: str
+  ) -> List[PoemError]:
+      """
+        Rule violations of a stanza as structured records
+
+        Params:
+            stanza: stanza to check
+            tag: tag Input - type of poem ("00" checks the spelling)
+
+        Returns:
+            List[PoemError]: the errors, nothing is written into the text
+            Raises the same exceptions as check_rule on a stanza that can not be checked
+      """
+      stanza = self.analyze_stanza(stanza)
+      if tag == "00":
+          errors = []
+          self.check_spelling_vietnamese(stanza, errors, {})
+          return errors
+      if not stanza.is_stanza:
+          raise ValueError(render_stanza(stanza, []) + ": is not a stanza")
+      return self.check_stanza_rules(stanza, tag)[0]
+
+  def check_rule(
+      self,
+      stanza,
+      tag: str,
+      render: bool = True
   ):
       """
         A function to check both rhyme and tone rule
 
         Params:
-            sentence: stanza to check
+            stanza: stanza to check (text or an already parsed Stanza)
             tag: tag Input - type of poem
+            render: write the annotations back into the text; when False both texts are None
 
         Returns:
-            stanza processed
+            stanza with errors highlighted, total_length_errors, total_rhyme_errors,
+            total_wrong_tone, stanza with the correct format and rhyme labels
       """
-      if not self.is_stanza(stanza):
-          print(stanza + ": is not a stanza")
+      if isinstance(stanza, str):
+          stanza = self.analyze_stanza(stanza)
+      if not stanza.is_stanza:
+          print(render_stanza(stanza, []) + ": is not a stanza")
           return
-      stanza = self.preprocess_stanza(stanza)
-      stanza, total_rhyme_errors, total_length_errors, check_ryhme_labels = self.check_rhyme_stanza(stanza, tag) # Create and record error unstructured sentences
-      stanza, total_wrong_tone, sentences_correct_format = self.check_tone_stanza(stanza, tag)
+      errors, check_ryhme_labels, marks, line_marks = self.check_stanza_rules(stanza, tag)
+      total_length_errors = sum(1 for error in errors if error.kind == LENGTH)
+      total_rhyme_errors = sum(1 for error in errors if error.kind == RHYME)
+      total_wrong_tone = sum(1 for error in errors if error.kind == TONE)
 
-      each_sentence = sentences_correct_format.split("\n")
-      mixed_format = [""]*len(each_sentence)
-      for i in range(len(each_sentence)):
-          mixed_format[i] = each_sentence[i] + check_ryhme_labels[i]
+      if not render:
+          return None, total_length_errors, total_rhyme_errors, total_wrong_tone, None
 
-      mixed_format = "\n".join(mixed_format)
-      return stanza, total_length_errors, total_rhyme_errors, total_wrong_tone, mixed_format
+      error_marks = [error.mark for error in errors]
+      annotated = render_stanza(stanza, error_marks + marks + line_marks)
+      mixed_format = render_stanza(stanza, error_marks + marks, check_ryhme_labels)
+      return annotated, total_length_errors, total_rhyme_errors, total_wrong_tone, mixed_format
 
   def check_spelling_vietnamese(
       self,
-      stanza: str,
-      total_spelling_errors: int,
-      sentences_correct_format: str,
-      recommend_correct_format: dict
+      stanza: Stanza,
+      errors: list,
+      recommend_correct_format: Optional[dict]
   ):
       """
 
          A function to check Spelling Rule VietNamese Language
 
          Params:
-            sentence: stanza to check
-            total_spelling_errors: total spelling errors
+            stanza: parsed stanza to check
+            errors: list receiving the SPELLING PoemError records
+            recommend_correct_format: top suggestions for each wrong word, None to skip them
 
 
          Returns:
-            stanza processed
             total_spelling_errors: total spelling errors
-            sentences_correct_format: sentences after added notation to highlight error
+            recommend_correct_format: closest dictionary words of each wrong word (SpellingSuggester)
       """
-
-      sentences = stanza.split("\n")
-      for sentence in sentences:
-          words = sentence.split(" ")
-          words_out = []
-          for word in words:
-            first_char = word[0].lower()
-            vietnamese_chars = self.dictionary_vi[first_char]
-            if self.split_special_char(word.lower()) in vietnamese_chars:
+      total_spelling_errors = 0
+      for line in range(len(stanza)):
+          for position, word in enumerate(stanza.line(line)):
+            clean_word = strip_special_char(word.lower())
+            if not word or clean_word in self.dictionary_vi:
               continue
-            else:
-              total_spelling_errors = total_spelling_errors + 1
-              word = word + "(E_S)"
-              recommend_correct_format[word] = vietnamese_chars
-            words_out.append(word)
-          sentences_correct_format.append(" ".join(words_out))
-      # print(sentences_correct_format)
-      return total_spelling_errors, "\n".join(sentences_correct_format), recommend_correct_format
+            total_spelling_errors = total_spelling_errors + 1
+            errors.append(PoemError(SPELLING, line, position, None, word))
+            if recommend_correct_format is not None:
+              recommend_correct_format[word + ANNOTATIONS[SPELLING]] = self.suggest_spelling(clean_word)
+      return total_spelling_errors, recommend_correct_format
+
+  def suggest_spelling(self, word: str) -> List[str]:
+      """
+        Closest dictionary words of a misspelled word, best first
+
+        The SpellingSuggester of the dictionary is built on the first call and shared
+        by every checker using the same lexicon.
+
+        Params:
+            word: the wrong word, without its special chars
+
+        Returns:
+            List[str]: at most spelling_suggestions words
+      """
+      suggester = get_spelling_suggester(self.dictionary_vi, self.spelling_max_distance, self.spelling_ignore_tones)
+      return [candidate for candidate, _ in suggester.suggest(word, self.spelling_suggestions)]
+
+  def render_spelling(self, stanza: Stanza, errors: list):
+      """
+        Text of the spelling check: the misspelled words of each line marked with (E_S)
+
+        Params:
+            stanza: parsed stanza
+            errors: SPELLING records from check_spelling_vietnamese
+
+        Returns:
+            str: one line of wrong words per line of the stanza
+      """
+      sentences_correct_format = [[] for _ in range(len(stanza))]
+      for error in errors:
+          sentences_correct_format[error.line].append(error.actual + ANNOTATIONS[SPELLING])
+      return "\n".join(" ".join(words) for words in sentences_correct_format)
 
 
   def calculate_score_by_error(self,
@@ -736,34 +661,37 @@ class RhymesTonesMetrics:
 
   def calculate_stanza_score(self,
                              stanza: str,
-                             tag: str):
+                             tag: str,
+                             render: bool = True):
       """
         A function to calculate score for the Stanza
 
         param sentence: stanza
+        param render: build the annotated text and the spelling suggestions; when False
+          sentences_correct_format and recommend_correct_format are None
 
         return: score  after checked by rule and calculated by formula that rhyme accounts for 70% score rate
           and 30% left for tone
       """
 
-      stanza = self.preprocess_stanza(stanza)
-      length = len(stanza.split("\n"))
+      stanza = self.analyze_stanza(stanza)
+      length = len(stanza)
       total_length_errors = 0
       total_rhyme_errors = 0
       total_wrong_tone = 0
       total_spelling_errors = 0
 
-      word_by_stanza = [ x.split(" ") for x in stanza.split("\n")]
-      # Concatenate into a single list
-      flat_list = [item for item in chain.from_iterable(word_by_stanza) if item]
-      total_length_words_of_stanza = len(flat_list)
+      total_length_words_of_stanza = stanza.word_count
       sentences_correct_format = []
-      recommend_correct_format = {}
+      # Only the rendered result shows the suggestions, they are not worth computing otherwise
+      recommend_correct_format = {} if render else None
       try:
         if tag != "00":
-          stanza, total_length_errors, total_rhyme_errors, total_wrong_tone, sentences_correct_format = self.check_rule(stanza, tag)
+          _, total_length_errors, total_rhyme_errors, total_wrong_tone, sentences_correct_format = self.check_rule(stanza, tag, render)
         elif tag == "00":
-          total_spelling_errors, sentences_correct_format, recommend_correct_format = self.check_spelling_vietnamese(stanza, total_spelling_errors, sentences_correct_format, recommend_correct_format)
+          errors = []
+          total_spelling_errors, recommend_correct_format = self.check_spelling_vietnamese(stanza, errors, recommend_correct_format)
+          sentences_correct_format = self.render_spelling(stanza, errors) if render else None
 
         score = self.calculate_score_by_error(length, tag, total_length_errors, total_rhyme_errors, total_wrong_tone, total_spelling_errors, total_length_words_of_stanza)
 
@@ -796,12 +724,41 @@ class RhymesTonesMetrics:
       recommend_correct_format = {}
       for i in poem.split("\n\n"):
           count += 1
-          score, sentences_correct_format, recommend_correct_format = self.calculate_stanza_score(i, tag)
+          score, sentences_correct_format, recommend_correct_format = self.calculate_stanza_score(i, tag, render=False)
         #   print(sentences_correct_format)
         #   print(recommend_correct_format)
           sum_ = sum_ + score
       return sum_/count
 
 
+  def score_batch(self,
+                  poems: List[str],
+                  tags: Union[str, List[str]]):
+      """
+        Score many poems at once with NumPy, same scores as calculate_score
 
+        Params:
+          poems: poems Input
+          tags: one tag for every poem, or one tag per poem
+
+        Returns:
+          BatchScores: per-poem scores and length / rhyme / tone / spelling error counts
 
+      """
+      # NumPy stays out of the import path of the scalar scorer
+      from .batch_score import score_batch
+      return score_batch(self, poems, tags)
+
+  def score_session(self, poem: str, tag: str):
+      """
+        Keep the score of a poem up to date while its words are replaced one at a time
+
+        Params:
+          poem: poem Input
+          tag: tag Input - type of poem
+
+        Returns:
+          PoemScoreSession: session.replace(line, pos, word) returns the new score
+      """
+      from .score_session import PoemScoreSession
+      return PoemScoreSession(self, poem, tag)
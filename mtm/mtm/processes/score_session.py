@@ -0,0 +1,356 @@
+""" Incremental rescoring of a poem edited one word at a time.
+
+    A PoemScoreSession keeps, for every stanza with the regular shape of its tag, the tone
+    errors of each line and the rhyme errors of each pair of rhyming lines. Replacing a word
+    rechecks the tone slots of its line (every line of a THẤT NGÔN stanza when the tone of
+    word 2 of line 1 flips, since it selects the patterns) and the rhyme pairs reading that
+    word, then rebuilds the stanza score from the running totals. Other stanzas (wrong
+    lengths, unknown tags) are rescored with calculate_stanza_score, so the score is always
+    the one of calculate_score on the edited poem.
+"""
+
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from .stanza import (
+    FIRST_TONE_ROWS,
+    TONE_EVEN,
+    TONE_NONE,
+    TONE_UNEVEN,
+    is_regular,
+    strip_special_char,
+)
+
+if TYPE_CHECKING:
+    from .poetic_score import RhymesTonesMetrics
+
+# Encoded expected tone that never matches a syllable (tone_dict value other than even / uneven)
+_TONE_OTHER = -2
+
+
+class _Features:
+    """
+        What the rules read of one word: rime id and blank flag of the word without its
+        special chars, tone, and rime id / blank flag of its rime (first THẤT NGÔN ending)
+    """
+    __slots__ = ("rime_id", "blank", "tone", "head_id", "head_blank")
+
+    def __init__(self, lexicon, word: str):
+        analyze = lexicon.analyze
+        clean_word = strip_special_char(word)
+        tone = analyze(word).tone
+        head = strip_special_char(analyze(word).rime)
+        self.rime_id = analyze(clean_word).rime_id
+        self.blank = not clean_word
+        self.tone = TONE_NONE if tone is None else TONE_EVEN if tone == "even" else TONE_UNEVEN
+        self.head_id = analyze(head).rime_id
+        self.head_blank = not head
+
+
+class _RhymePair:
+    """
+        One call of check_rhyme_pair: ending words of prev_line and cur_line at position,
+        chained through the ending word at (end_line, end_position) when there is one
+    """
+    __slots__ = ("prev_line", "cur_line", "position", "end_line", "end_position", "use_head")
+
+    def __init__(self, prev_line, cur_line, position, end_line=None, end_position=None, use_head=False):
+        self.prev_line = prev_line
+        self.cur_line = cur_line
+        self.position = position
+        self.end_line = end_line
+        self.end_position = end_position
+        self.use_head = use_head
+
+    def slots(self) -> List[Tuple[int, int]]:
+        slots = [(self.prev_line, self.position), (self.cur_line, self.position)]
+        if self.end_line is not None:
+            slots.append((self.end_line, self.end_position))
+        return slots
+
+
+class _StanzaState:
+    """
+        Words of one stanza and the check results the incremental path updates
+
+        incremental is False for the stanzas rescored from their text on every edit.
+    """
+    __slots__ = (
+        "lines",
+        "incremental",
+        "features",
+        "tone_errors",
+        "tone_missing",
+        "pair_errors",
+        "pairs",
+        "pairs_of_slot",
+        "total_tone_errors",
+        "total_pair_errors",
+        "missing_lines",
+        "spelling",
+        "total_spelling_errors",
+        "word_count",
+        "score",
+    )
+
+    def __init__(self, text: str):
+        # Same tokens as Stanza: blank runs dropped, an empty line keeps one empty word
+        self.lines: List[List[str]] = [[word for word in line.split(" ") if word] or [""] for line in text.split("\n")]
+        self.incremental = False
+        self.score = 0
+
+    @property
+    def text(self) -> str:
+        return "\n".join(" ".join(words) for words in self.lines)
+
+
+class PoemScoreSession:
+    """
+        A poem and its score, kept up to date word replacement after word replacement
+
+        Lines are numbered over the whole poem, stanza breaks ("\\n\\n") excluded, and
+        positions are the indexes of the words in their line, both from 0.
+
+        Example:
+            session = metrics.score_session(poem, "68")
+            session.replace(1, 7, "nhung")  # -> score of the edited poem
+    """
+
+    def __init__(self, metrics: "RhymesTonesMetrics", poem: str, tag: str):
+        self.metrics = metrics
+        self.lexicon = metrics.lexicon
+        self.tag = tag
+        self._features: Dict[str, _Features] = {}
+        self._templates = self._tone_templates()
+        self._stanzas = [_StanzaState(text) for text in poem.split("\n\n")]
+        # Global line -> (stanza, line in the stanza)
+        self._locations = [
+            (index, line) for index, stanza in enumerate(self._stanzas) for line in range(len(stanza.lines))
+        ]
+        for stanza in self._stanzas:
+            self._check_stanza(stanza)
+
+    @property
+    def score(self) -> float:
+        """
+            Score of the current poem, same value as calculate_score
+        """
+        return sum(stanza.score for stanza in self._stanzas) / len(self._stanzas)
+
+    @property
+    def stanza_scores(self) -> List[float]:
+        return [stanza.score for stanza in self._stanzas]
+
+    @property
+    def text(self) -> str:
+        return "\n\n".join(stanza.text for stanza in self._stanzas)
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def line(self, line: int) -> List[str]:
+        index, local_line = self._locations[line]
+        return list(self._stanzas[index].lines[local_line])
+
+    def word(self, line: int, position: int) -> str:
+        index, local_line = self._locations[line]
+        return self._stanzas[index].lines[local_line][position]
+
+    def tone_errors(self, line: int) -> Optional[int]:
+        """
+            Wrong tones of a line, None for a line of a stanza rescored from its text
+        """
+        index, local_line = self._locations[line]
+        stanza = self._stanzas[index]
+        if not stanza.incremental or self.tag == "00":
+            return None
+        return stanza.tone_errors[local_line]
+
+    def replace(self, line: int, position: int, word: str) -> float:
+        """
+            Replace one word and rescore
+
+            Args:
+                line: line of the poem, stanza breaks excluded
+                position: position of the word in the line
+                word: the new syllable, without blanks
+
+            Returns:
+                float: score of the edited poem
+        """
+        if not word or " " in word or "\n" in word:
+            raise ValueError(f"replace takes a single word, got {word!r}")
+        index, local_line = self._locations[line]
+        stanza = self._stanzas[index]
+        words = stanza.lines[local_line]
+        if not 0 <= position < len(words) or not words[position]:
+            raise IndexError(f"No word at line {line}, position {position}")
+        if words[position] == word:
+            return self.score
+        words[position] = word
+
+        if not stanza.incremental:
+            self._check_stanza(stanza)
+        elif self.tag == "00":
+            self._update_spelling(stanza, local_line, position)
+        else:
+            self._update_rules(stanza, local_line, position)
+        return self.score
+
+    # Checks
+
+    def _word_features(self, word: str) -> _Features:
+        features = self._features.get(word)
+        if features is None:
+            features = self._features[word] = _Features(self.lexicon, word)
+        return features
+
+    def _tone_templates(self) -> Dict[int, Optional[List[Tuple[int, int]]]]:
+        templates = {}
+        for key in (6, 7, 8, 71):
+            pattern = self.metrics.tone_dict.get(key)
+            if pattern is None:
+                templates[key] = None
+                continue
+            templates[key] = [
+                (position, TONE_EVEN if tone == "even" else TONE_UNEVEN if tone == "uneven" else _TONE_OTHER)
+                for position, tone in pattern.items()
+            ]
+        return templates
+
+    def _template(self, stanza: _StanzaState, line: int):
+        if self.tag == "68":
+            return self._templates[6 if line % 2 == 0 else 8]
+        first_uneven = stanza.features[0][1].tone == TONE_UNEVEN
+        return self._templates[7 if first_uneven == (line in FIRST_TONE_ROWS) else 71]
+
+    def _can_increment(self, stanza: _StanzaState) -> bool:
+        if self.tag == "00":
+            return True
+        if not is_regular([len(words) for words in stanza.lines], self.tag):
+            return False
+        # A pattern missing or reaching past the line raises in check_tone_sentence
+        keys = (6, 8) if self.tag == "68" else (7, 71)
+        length = 6 if self.tag == "68" else 7
+        for key in keys:
+            template = self._templates[key]
+            if template is None or any(not 0 <= position < (8 if key == 8 else length) for position, _ in template):
+                return False
+        return True
+
+    def _check_stanza(self, stanza: _StanzaState):
+        stanza.incremental = self._can_increment(stanza)
+        if not stanza.incremental:
+            stanza.score = self.metrics.calculate_stanza_score(stanza.text, self.tag, render=False)[0]
+            return
+
+        if self.tag == "00":
+            # A replacement never empties a word, so the number of words stays the same
+            stanza.word_count = sum(1 for words in stanza.lines for word in words if word)
+            stanza.spelling = [[self._misspelled(word) for word in words] for words in stanza.lines]
+            stanza.total_spelling_errors = sum(map(sum, stanza.spelling))
+            self._score_spelling(stanza)
+            return
+
+        stanza.features = [[self._word_features(word) for word in words] for words in stanza.lines]
+        stanza.tone_errors = [0] * len(stanza.lines)
+        stanza.tone_missing = [False] * len(stanza.lines)
+        stanza.total_tone_errors = 0
+        stanza.missing_lines = 0
+        for line in range(len(stanza.lines)):
+            self._check_tone_line(stanza, line)
+
+        stanza.pairs = self._rhyme_pairs(len(stanza.lines))
+        stanza.pair_errors = [self._pair_errors(stanza, pair) for pair in stanza.pairs]
+        stanza.total_pair_errors = sum(stanza.pair_errors)
+        stanza.pairs_of_slot = {}
+        for index, pair in enumerate(stanza.pairs):
+            for slot in pair.slots():
+                stanza.pairs_of_slot.setdefault(slot, []).append(index)
+        self._score_rules(stanza)
+
+    def _rhyme_pairs(self, n_lines: int) -> List[_RhymePair]:
+        # Same pairs and chaining as check_rhyme_stanza_type_68 / check_ryhme_stanze_type_78
+        if self.tag == "68":
+            return [
+                _RhymePair(line, line + 1, 5, *((line - 1, 7) if line else ()))
+                for line in range(0, n_lines, 2)
+            ]
+        rhyme_lines = [0] + [2 * i + 1 for i in range(n_lines // 2)]
+        return [
+            _RhymePair(prev, cur, 6, 0, 6, True) if i == 0 else _RhymePair(prev, cur, 6, prev, 6)
+            for i, (prev, cur) in enumerate(zip(rhyme_lines, rhyme_lines[1:]))
+        ]
+
+    def _pair_errors(self, stanza: _StanzaState, pair: _RhymePair) -> int:
+        rhymes = self.lexicon.rhymes
+        prev_id = stanza.features[pair.prev_line][pair.position].rime_id
+        cur_id = stanza.features[pair.cur_line][pair.position].rime_id
+        if pair.end_line is None:
+            return int(rhymes(prev_id, cur_id) is False)
+
+        end = stanza.features[pair.end_line][pair.end_position]
+        if end.head_blank if pair.use_head else end.blank:
+            return int(rhymes(prev_id, cur_id) is False)
+        end_id = end.head_id if pair.use_head else end.rime_id
+        return int(rhymes(prev_id, end_id) is False) + int(rhymes(end_id, cur_id) is False)
+
+    def _check_tone_line(self, stanza: _StanzaState, line: int):
+        features = stanza.features[line]
+        wrong = 0
+        missing = False
+        for position, expected in self._template(stanza, line):
+            tone = features[position].tone
+            missing = missing or tone == TONE_NONE
+            wrong += tone != expected
+
+        stanza.total_tone_errors += wrong - stanza.tone_errors[line]
+        stanza.missing_lines += missing - stanza.tone_missing[line]
+        stanza.tone_errors[line] = wrong
+        stanza.tone_missing[line] = missing
+
+    def _score_rules(self, stanza: _StanzaState):
+        # get_tone raises on an empty rime, and check_tone_stanza reads word 2 of line 1 first
+        if stanza.missing_lines or stanza.features[0][1].tone == TONE_NONE:
+            stanza.score = 0
+            return
+        try:
+            stanza.score = self.metrics.calculate_score_by_error(
+                len(stanza.lines), self.tag, 0, stanza.total_pair_errors, stanza.total_tone_errors, 0, None
+            )
+        except ZeroDivisionError:
+            # THẤT NGÔN stanza of 3 lines: no rhyme slot
+            stanza.score = 0
+
+    def _update_rules(self, stanza: _StanzaState, line: int, position: int):
+        before = stanza.features[line][position]
+        after = stanza.features[line][position] = self._word_features(stanza.lines[line][position])
+
+        if self.tag == "78" and (line, position) == (0, 1) and before.tone != after.tone:
+            # The tone of this word selects the pattern of every line
+            for other in range(len(stanza.lines)):
+                self._check_tone_line(stanza, other)
+        elif any(slot == position for slot, _ in self._template(stanza, line)):
+            self._check_tone_line(stanza, line)
+
+        for index in stanza.pairs_of_slot.get((line, position), ()):
+            errors = self._pair_errors(stanza, stanza.pairs[index])
+            stanza.total_pair_errors += errors - stanza.pair_errors[index]
+            stanza.pair_errors[index] = errors
+        self._score_rules(stanza)
+
+    def _misspelled(self, word: str) -> bool:
+        return bool(word) and strip_special_char(word.lower()) not in self.metrics.dictionary_vi
+
+    def _score_spelling(self, stanza: _StanzaState):
+        try:
+            stanza.score = self.metrics.calculate_score_by_error(
+                len(stanza.lines), self.tag, 0, 0, 0, stanza.total_spelling_errors, stanza.word_count
+            )
+        except ZeroDivisionError:
+            stanza.score = 0
+
+    def _update_spelling(self, stanza: _StanzaState, line: int, position: int):
+        misspelled = self._misspelled(stanza.lines[line][position])
+        stanza.total_spelling_errors += misspelled - stanza.spelling[line][position]
+        stanza.spelling[line][position] = misspelled
+        self._score_spelling(stanza)
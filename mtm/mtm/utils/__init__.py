@@ -1 +1,6 @@
-from .read_file import *
\ No newline at end of file
+from .read_file import *
+from .dataset import *
+from .parse_json import *
+from .pipeline import *
+from .save_file import *
+from .run_manifest import *
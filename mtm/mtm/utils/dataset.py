@@ -0,0 +1,282 @@
+""" Dataset layer of the evaluations: remote datasets are fetched once into a local cache,
+    then every dataset is read as a stream of row chunks.
+
+    for poem in read_column(GOOGLE_SHEETS_URL, "Qwen_output", cache_dir=DATASET_CACHE_DIR):
+        ...
+
+    A source is a local CSV, JSONL or Parquet file, or an url (a Google Sheets url is read
+    through its CSV export). A fetched file is kept with its ETag, Last-Modified and sha256:
+    within max_age seconds it is used as it is, after that the server is asked whether it
+    changed (a conditional request, answered 304 when it did not), and a copy whose sha256
+    no longer matches is fetched again. Offline, or when the server cannot be reached, the
+    cached copy is used.
+"""
+
+import csv
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from .read_file import google_sheets_csv_url
+
+__all__ = ["dataset_format", "fetch_dataset", "resolve_dataset", "iter_chunks", "read_column"]
+
+_FORMATS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+}
+# Bytes read at once while downloading or hashing a file
+_BLOCK_SIZE = 1 << 20
+
+
+def dataset_format(path: str) -> str:
+    """
+        Format of a dataset file from its extension: "csv", "jsonl" or "parquet"
+    """
+    extension = os.path.splitext(path.split("?")[0])[1].lower()
+    if extension not in _FORMATS:
+        raise ValueError(f"Unsupported dataset format {extension!r} of {path} (csv, jsonl or parquet)")
+    return _FORMATS[extension]
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_json(path: str, value: Dict[str, Any]):
+    temporary = path + ".tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump(value, file, ensure_ascii=False, indent=2)
+    os.replace(temporary, path)
+
+
+def fetch_dataset(
+        url: str,
+        cache_dir: str,
+        max_age: Optional[float] = None,
+        offline: bool = False,
+        timeout: float = 30.0
+) -> str:
+    """
+        Local copy of a remote dataset, downloaded only when the cache has no valid copy of it
+
+        Args:
+            url (str): url of the file (a CSV export for a Google Sheet)
+            cache_dir (str): directory of the cached files and their metadata
+            max_age (float, optional): seconds a cached copy is used without asking the server;
+                None: it is revalidated (ETag / Last-Modified) every call
+            offline (bool): never call the server, a dataset which is not cached is an error
+            timeout (float): seconds to connect and to wait for each read
+
+        Raises:
+            FileNotFoundError: offline and the dataset is not cached
+            OSError: the download failed and the dataset is not cached
+
+        Returns:
+            str: path of the cached file
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:24]
+    try:
+        extension = "." + dataset_format(url)
+    except ValueError:
+        # e.g. .../export?format=csv
+        extension = ".csv"
+    path = os.path.join(cache_dir, key + extension)
+    meta_path = path + ".json"
+
+    meta: Optional[Dict[str, Any]] = None
+    if os.path.exists(path) and os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as file:
+            meta = json.load(file)
+        if _file_sha256(path) != meta.get("sha256"):
+            print(f"[DATASET CACHE]: {path} does not match its sha256, fetching it again")
+            meta = None
+
+    if meta is not None and (offline or (max_age is not None and time.time() - meta["checked"] < max_age)):
+        print(f"[DATASET CACHE]: using {path} (fetched {time.ctime(meta['fetched'])})")
+        return path
+    if offline:
+        raise FileNotFoundError(f"{url} is not in the dataset cache {cache_dir} (offline)")
+
+    import urllib.error
+    import urllib.request
+
+    headers = {}
+    if meta is not None:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+    temporary = path + ".part"
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=timeout) as response:
+            digest = hashlib.sha256()
+            size = 0
+            with open(temporary, "wb") as file:
+                for block in iter(lambda: response.read(_BLOCK_SIZE), b""):
+                    digest.update(block)
+                    file.write(block)
+                    size += len(block)
+                file.flush()
+                os.fsync(file.fileno())
+            response_headers = response.headers
+    except urllib.error.HTTPError as error:
+        if error.code == 304 and meta is not None:
+            meta["checked"] = time.time()
+            _write_json(meta_path, meta)
+            print(f"[DATASET CACHE]: {url} not modified, using {path}")
+            return path
+        if meta is None:
+            raise
+        print(f"[DATASET CACHE]: {url} answered {error.code}, using the cached {path}")
+        return path
+    except OSError as error:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        if meta is None:
+            raise
+        print(f"[DATASET CACHE]: {url} unreachable ({error}), using the cached {path}")
+        return path
+
+    sha256 = digest.hexdigest()
+    os.replace(temporary, path)
+    now = time.time()
+    changed = meta is None or meta.get("sha256") != sha256
+    _write_json(meta_path, {
+        "url": url,
+        "etag": response_headers.get("ETag"),
+        "last_modified": response_headers.get("Last-Modified"),
+        "sha256": sha256,
+        "size": size,
+        "fetched": now if changed else meta["fetched"],
+        "checked": now,
+    })
+    print(f"[DATASET CACHE]: {url} {'fetched' if changed else 'unchanged'} ({size} bytes) into {path}")
+    return path
+
+
+def resolve_dataset(
+        source: str,
+        cache_dir: Optional[str] = None,
+        max_age: Optional[float] = None,
+        offline: bool = False
+) -> str:
+    """
+        Local path of a dataset source: a local file as it is, an url through the cache
+        (a Google Sheets url through its CSV export)
+
+        Args:
+            source (str): path or url of the dataset
+            cache_dir (str, optional): directory of the dataset cache, needed for an url
+            max_age, offline: see fetch_dataset
+    """
+    if not (source.startswith("http://") or source.startswith("https://")):
+        if not os.path.exists(source):
+            raise FileNotFoundError(f"Dataset {source} not found")
+        return source
+    if cache_dir is None:
+        raise ValueError(f"A cache directory is needed to read {source}")
+    if "docs.google.com/spreadsheets/" in source and "/export" not in source:
+        source = google_sheets_csv_url(source)
+    return fetch_dataset(source, cache_dir=cache_dir, max_age=max_age, offline=offline)
+
+
+def _check_columns(columns: Optional[Sequence[str]], names: Sequence[str]):
+    for column in columns or ():
+        if column not in names:
+            raise ValueError(f"Column {column} not found in dataset")
+
+
+def iter_chunks(
+        path: str,
+        columns: Optional[Sequence[str]] = None,
+        chunk_size: int = 1024
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+        Stream the rows of a local dataset file, chunk_size rows at a time
+
+        Args:
+            path (str): CSV (with a header), JSONL (one object per line) or Parquet file
+                (needs pyarrow)
+            columns (Sequence[str], optional): the only columns read (all of them when None)
+            chunk_size (int): rows per chunk
+
+        Raises:
+            ValueError: a column is not in the dataset
+
+        Yields:
+            List[Dict[str, Any]]: the next rows, {column: value}
+    """
+    chunk_size = max(1, chunk_size)
+    fmt = dataset_format(path)
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        _check_columns(columns, parquet.schema_arrow.names)
+        for batch in parquet.iter_batches(batch_size=chunk_size, columns=list(columns) if columns else None):
+            yield batch.to_pylist()
+        return
+
+    chunk: List[Dict[str, Any]] = []
+    if fmt == "csv":
+        # utf-8-sig: a byte order mark is not part of the first column name
+        with open(path, "r", encoding="utf-8-sig", newline="") as file:
+            reader = csv.DictReader(file)
+            _check_columns(columns, reader.fieldnames or ())
+            for row in reader:
+                chunk.append({column: row[column] for column in columns} if columns else row)
+                if len(chunk) == chunk_size:
+                    yield chunk
+                    chunk = []
+    else:
+        with open(path, "r", encoding="utf-8") as file:
+            for number, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                if columns:
+                    try:
+                        row = {column: row[column] for column in columns}
+                    except KeyError as error:
+                        raise ValueError(f"Column {error.args[0]} not found in dataset (line {number})") from None
+                chunk.append(row)
+                if len(chunk) == chunk_size:
+                    yield chunk
+                    chunk = []
+    if chunk:
+        yield chunk
+
+
+def read_column(
+        source: str,
+        column: str,
+        cache_dir: Optional[str] = None,
+        chunk_size: int = 1024,
+        max_age: Optional[float] = None,
+        offline: bool = False
+) -> Iterator[Any]:
+    """
+        Stream the values of one column of a dataset (path or url, see resolve_dataset)
+
+        Args:
+            source (str): path or url of the dataset
+            column (str): name of the column
+            cache_dir, max_age, offline: see fetch_dataset
+            chunk_size (int): rows read at once
+    """
+    path = resolve_dataset(source, cache_dir=cache_dir, max_age=max_age, offline=offline)
+    for chunk in iter_chunks(path, columns=[column], chunk_size=chunk_size):
+        for row in chunk:
+            yield row[column]
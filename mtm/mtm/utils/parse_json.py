@@ -0,0 +1,319 @@
+""" Tolerant single-pass extraction of the poems of an LLM answer.
+
+    The answer is asked to be {"responses": [{"poem_number": 1, "poem_text": "..."}, ...]},
+    but what comes back may be wrapped in a ```json fence or some prose, join string pieces
+    with + (JavaScript style), hold raw newlines inside the strings, leave trailing or
+    missing commas, or stop in the middle of a poem when max_tokens is reached.
+
+    The scanner reads the text once, from its first { or [, and builds the value it
+    recognizes; string runs are consumed with regular expressions, so the work is linear
+    in the length of the answer.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+__all__ = ["ResponseParseError", "parse_lenient_json", "extract_poems", "PoemStreamParser"]
+
+# Run of string characters without an escape or a closing quote
+_STRING_RUN = re.compile(r'[^"\\]+')
+_WHITESPACE = re.compile(r"\s*")
+_NUMBER = re.compile(r"-?(?:\d+)(?:\.\d+)?(?:[eE][+-]?\d+)?")
+_UNICODE_ESCAPE = re.compile(r"\\u([0-9a-fA-F]{4})(?:\\u([0-9a-fA-F]{4}))?")
+_BARE_WORD = re.compile(r"[A-Za-z_][A-Za-z_0-9]*")
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_LITERALS = {"true": True, "false": False, "null": None, "True": True, "False": False, "None": None}
+
+
+class ResponseParseError(ValueError):
+    """
+        The answer holds no JSON value, or no poem
+    """
+
+
+class _EndOfInput(Exception):
+    pass
+
+
+class _Scanner:
+    __slots__ = ("text", "pos", "truncated")
+
+    def __init__(self, text: str, start: int):
+        self.text = text
+        self.pos = start
+        # Set when the text ended before the value did; what was complete is kept
+        self.truncated = False
+
+    def skip_whitespace(self) -> str:
+        self.pos = _WHITESPACE.match(self.text, self.pos).end()
+        if self.pos >= len(self.text):
+            raise _EndOfInput
+        return self.text[self.pos]
+
+    def value(self) -> Any:
+        char = self.skip_whitespace()
+        if char == "{":
+            return self.object()
+        if char == "[":
+            return self.array()
+        if char == '"':
+            return self.string()
+        match = _NUMBER.match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+            number = match.group()
+            return float(number) if "." in number or "e" in number or "E" in number else int(number)
+        match = _BARE_WORD.match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+            return _LITERALS.get(match.group(), match.group())
+        raise ResponseParseError(f"Unexpected {char!r} at {self.pos}")
+
+    def string(self) -> str:
+        pieces = []
+        while True:
+            pieces.append(self._string_piece())
+            # "line 1\n" + "line 2\n" + ...: the pieces make one string
+            try:
+                char = self.skip_whitespace()
+            except _EndOfInput:
+                break
+            if char != "+":
+                break
+            self.pos += 1
+            if self.skip_whitespace() != '"':
+                break
+        return "".join(pieces)
+
+    def _string_piece(self) -> str:
+        text = self.text
+        self.pos += 1
+        parts = []
+        while True:
+            match = _STRING_RUN.match(text, self.pos)
+            if match:
+                # Raw newlines and tabs are kept as they are
+                parts.append(match.group())
+                self.pos = match.end()
+            if self.pos >= len(text):
+                raise _EndOfInput
+            if text[self.pos] == '"':
+                self.pos += 1
+                return "".join(parts)
+            # Backslash
+            if self.pos + 1 >= len(text):
+                raise _EndOfInput
+            escape = text[self.pos + 1]
+            match = _UNICODE_ESCAPE.match(text, self.pos) if escape == "u" else None
+            if match:
+                high, low = match.group(1), match.group(2)
+                if low and 0xD800 <= int(high, 16) < 0xDC00 <= int(low, 16) < 0xE000:
+                    # Surrogate pair of a char beyond the BMP
+                    parts.append(chr(0x10000 + ((int(high, 16) - 0xD800) << 10) + int(low, 16) - 0xDC00))
+                    self.pos = match.end()
+                else:
+                    parts.append(chr(int(high, 16)))
+                    self.pos += 6
+            else:
+                # An unknown escape stands for the char itself
+                parts.append(_ESCAPES.get(escape, escape))
+                self.pos += 2
+
+    def object(self) -> Dict[str, Any]:
+        result = {}
+        self.pos += 1
+        while True:
+            try:
+                char = self.skip_whitespace()
+            except _EndOfInput:
+                self.truncated = True
+                return result
+            if char == "}":
+                self.pos += 1
+                return result
+            if char == ",":
+                # Trailing or doubled comma
+                self.pos += 1
+                continue
+            if char == '"':
+                key = self._string_piece()
+            else:
+                match = _BARE_WORD.match(self.text, self.pos)
+                if not match:
+                    raise ResponseParseError(f"Unexpected {char!r} at {self.pos}")
+                key = match.group()
+                self.pos = match.end()
+            if self.skip_whitespace() == ":":
+                self.pos += 1
+            # A member cut by the end of the text is dropped (and its object with it)
+            result[key] = self.value()
+
+    def array(self) -> List[Any]:
+        result = []
+        self.pos += 1
+        while True:
+            try:
+                char = self.skip_whitespace()
+            except _EndOfInput:
+                self.truncated = True
+                return result
+            if char == "]":
+                self.pos += 1
+                return result
+            if char == ",":
+                self.pos += 1
+                continue
+            try:
+                item = self.value()
+            except _EndOfInput:
+                # The item was cut: the complete ones before it are kept
+                self.truncated = True
+                return result
+            result.append(item)
+
+
+def _parse(text: str, start: int) -> Tuple[Any, bool]:
+    scanner = _Scanner(text, start)
+    try:
+        return scanner.value(), scanner.truncated
+    except _EndOfInput:
+        raise ResponseParseError("The answer ends before its first JSON value does") from None
+
+
+def _starts(text: str) -> List[int]:
+    return sorted(index for index in (text.find("{"), text.find("[")) if index >= 0)
+
+
+def parse_lenient_json(text: str) -> Any:
+    """
+        First JSON object or array of text, tolerating fences, prose around it, + joined
+        strings, raw newlines in strings, trailing or missing commas and a cut end
+
+        Raises:
+            ResponseParseError: text holds no { or [, or something else than JSON follows it
+    """
+    starts = _starts(text)
+    if not starts:
+        raise ResponseParseError("No JSON object in the answer")
+    return _parse(text, starts[0])[0]
+
+
+def extract_poems(text: str) -> List[Dict[str, Any]]:
+    """
+        Poems of an answer shaped as {"responses": [{"poem_number": ..., "poem_text": ...}, ...]}
+
+        A bare list of poems is accepted too, and a poem_text given as a list of lines is
+        joined with newlines. Entries without a poem_text are skipped, and so is a last
+        poem cut by the end of the answer.
+
+        Returns:
+            List[Dict[str, Any]]: the entries of "responses", in order, each with a str poem_text
+
+        Raises:
+            ResponseParseError: the answer holds no poem
+    """
+    error = ResponseParseError("No JSON object in the answer")
+    # Prose before the JSON may hold a [ or a { of its own: the first of each is tried
+    for start in _starts(text):
+        try:
+            value, truncated = _parse(text, start)
+            poems = _poems_of(value)
+        except ResponseParseError as e:
+            error = e
+            continue
+        if truncated:
+            print(f"[PARSE JSON]: the answer is cut, {len(poems)} complete poems kept")
+        return poems
+    raise error
+
+
+def _poem_entry(entry: Any) -> Optional[Dict[str, Any]]:
+    # The entry with its poem_text as a str, None when it has none
+    if not isinstance(entry, dict):
+        return None
+    poem_text = entry.get("poem_text")
+    if isinstance(poem_text, list):
+        poem_text = "\n".join(str(line) for line in poem_text)
+    if not isinstance(poem_text, str) or not poem_text.strip():
+        return None
+    entry["poem_text"] = poem_text
+    return entry
+
+
+def _poems_of(value: Any) -> List[Dict[str, Any]]:
+    responses = value.get("responses") if isinstance(value, dict) else value
+    if not isinstance(responses, list):
+        raise ResponseParseError("No responses list in the answer")
+
+    poems = [entry for entry in map(_poem_entry, responses) if entry is not None]
+    if not poems:
+        raise ResponseParseError("No poem_text in the responses")
+    return poems
+
+
+class PoemStreamParser:
+    """
+        Poems of an answer received piece by piece (a streamed completion)
+
+        feed() returns the poems whose object closed in the new text, so a candidate can be
+        scored while the next ones are still being generated. Only the structure (strings,
+        brackets) of the new chars is tracked and only the text of the object being received
+        is kept; a closed object is parsed once, so the whole answer costs one pass whatever
+        the size of the pieces.
+    """
+    __slots__ = ("count", "_buffer", "_scanned", "_in_string", "_escape", "_stack", "_object_start")
+
+    def __init__(self):
+        self._buffer = ""
+        # Poems returned so far
+        self.count = 0
+        self._scanned = 0
+        self._in_string = False
+        self._escape = False
+        # Open brackets; the start of an object whose parent is a [ (a candidate poem)
+        self._stack: List[str] = []
+        self._object_start = -1
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """
+            Add the next piece of the answer
+
+            Returns:
+                List[Dict[str, Any]]: the poems completed by this piece, each with a str poem_text
+        """
+        buffer = self._buffer + text
+        poems = []
+        for index in range(self._scanned, len(buffer)):
+            char = buffer[index]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = bool(self._stack)
+            elif char in "{[":
+                if char == "{" and self._stack and self._stack[-1] == "[":
+                    self._object_start = index
+                self._stack.append(char)
+            elif char in "}]" and self._stack:
+                self._stack.pop()
+                if char == "}" and self._object_start >= 0 and self._stack and self._stack[-1] == "[":
+                    try:
+                        entry = _poem_entry(parse_lenient_json(buffer[self._object_start:index + 1]))
+                    except ResponseParseError:
+                        entry = None
+                    if entry is not None:
+                        poems.append(entry)
+                    self._object_start = -1
+        # Only the object being received is needed from now on
+        if self._object_start >= 0:
+            self._buffer = buffer[self._object_start:]
+            self._object_start = 0
+        else:
+            self._buffer = ""
+        self._scanned = len(self._buffer)
+        self.count += len(poems)
+        return poems
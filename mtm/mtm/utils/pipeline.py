@@ -0,0 +1,297 @@
+""" Staged concurrent pipeline: items flow through stages linked by bounded queues.
+
+    pipeline = StagedPipeline([
+        Stage("mask", mask_stanza, workers=4, executor=process_pool),
+        Stage("fill", fill_stanza, workers=4),          # async def: runs on the event loop
+        Stage("score", score_stanza, workers=2),        # def: runs in a thread
+        Stage("persist", save_row, ordered=True),       # one writer, rows in input order
+    ])
+    stats = asyncio.run(pipeline.run(stanzas))
+
+    Every stage has its own workers, and a full queue blocks the stage feeding it, so a slow
+    stage holds the faster ones back instead of piling their results up in memory. An item a
+    stage function raises on becomes a StageFailure, which the next stages pass on untouched:
+    one bad item does not stop the run.
+"""
+
+import asyncio
+import inspect
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+__all__ = ["Stage", "StageFailure", "StagedPipeline"]
+
+# Sent down a queue once per worker of the next stage when the items are exhausted
+_DONE = object()
+
+
+class Stage:
+    """
+        One step of a StagedPipeline
+
+        Args:
+            name (str): name of the stage in the progress and the stats
+            function (Callable): value -> next value. A coroutine function is awaited on the
+                event loop; a plain function runs in executor (None: the default thread pool),
+                it must be picklable when executor is a process pool.
+            workers (int): items processed at once by the stage
+            executor (Executor, optional): where a plain function runs
+            ordered (bool): hand the items to the stage in input order, one at a time (a writer)
+            skip (Callable, optional): value -> True when the stage has nothing to do for it
+                (done by a previous run); the value then goes on as it is
+    """
+    __slots__ = ("name", "function", "workers", "executor", "ordered", "skip", "items", "skipped", "failed",
+                 "busy_seconds")
+
+    def __init__(
+            self,
+            name: str,
+            function: Callable[[Any], Any],
+            workers: int = 1,
+            executor: Optional[Executor] = None,
+            ordered: bool = False,
+            skip: Optional[Callable[[Any], bool]] = None
+    ):
+        self.name = name
+        self.function = function
+        # Items can only be kept in order by one worker
+        self.workers = 1 if ordered else max(1, workers)
+        self.executor = executor
+        self.ordered = ordered
+        self.skip = skip
+        self.items = 0
+        self.skipped = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+
+    async def apply(self, value: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(self.function):
+                result = await self.function(value)
+            else:
+                result = await asyncio.get_running_loop().run_in_executor(self.executor, self.function, value)
+        finally:
+            self.busy_seconds += time.perf_counter() - start
+        self.items += 1
+        return result
+
+
+class StageFailure:
+    """
+        An item a stage function raised on: the value the stage got, the stage and the error.
+        The next stages pass it on without calling their function.
+    """
+    __slots__ = ("stage", "value", "error")
+
+    def __init__(self, stage: str, value: Any, error: BaseException):
+        self.stage = stage
+        self.value = value
+        self.error = error
+
+    def __repr__(self) -> str:
+        return f"StageFailure({self.stage!r}, {type(self.error).__name__}: {self.error})"
+
+
+class _Reorder:
+    # Releases (index, value) pairs in index order, whatever order they come in; the feeder
+    # waits in room() so that at most window items are ever held back
+    __slots__ = ("next_index", "waiting", "_moved")
+
+    def __init__(self):
+        self.next_index = 0
+        self.waiting: Dict[int, Any] = {}
+        self._moved = asyncio.Event()
+
+    def push(self, index: int, value: Any) -> List[tuple]:
+        self.waiting[index] = value
+        ready = []
+        while self.next_index in self.waiting:
+            ready.append((self.next_index, self.waiting.pop(self.next_index)))
+            self.next_index += 1
+        if ready:
+            self._moved.set()
+        return ready
+
+    async def room(self, index: int, window: int):
+        # Items next_index .. index - 1 are in flight: index goes in once fewer than window are
+        while index - self.next_index >= window:
+            self._moved.clear()
+            await self._moved.wait()
+
+
+class StagedPipeline:
+    """
+        Run items through stages concurrently, each stage fed by a bounded queue
+
+        Args:
+            stages (List[Stage]): the steps, in order; what the last one returns is dropped
+            queue_size (int): items waiting in front of a stage before the stage feeding it waits
+            report_every (float): seconds between two progress lines (done, rate, ETA); 0: none
+            on_result (Callable, optional): (stage name, result) -> None, called on the event loop
+                each time a stage is done with an item (e.g. to checkpoint it)
+            on_error (Callable, optional): (stage name, value, error) -> None, called on the event
+                loop each time a stage function raises on an item
+            fail_fast (bool): stop the run at the first error of a stage function instead
+            reorder_window (int, optional): items fed ahead of the next one an ordered stage
+                waits for (None: as many as the queues and the workers hold), which bounds
+                what an ordered stage holds back behind a slow item
+    """
+
+    def __init__(
+            self,
+            stages: List[Stage],
+            queue_size: int = 8,
+            report_every: float = 10.0,
+            on_result: Optional[Callable[[str, Any], None]] = None,
+            on_error: Optional[Callable[[str, Any, BaseException], None]] = None,
+            fail_fast: bool = False,
+            reorder_window: Optional[int] = None
+    ):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.report_every = report_every
+        self.on_result = on_result
+        self.on_error = on_error
+        self.fail_fast = fail_fast
+        self.reorder_window = max(1, reorder_window or (
+            self.queue_size * len(stages) + sum(stage.workers for stage in stages)
+        ))
+        self.done = 0
+        self.failed = 0
+        self.total: Optional[int] = None
+        self._started = 0.0
+        self._last_report = 0.0
+        self._reported = -1
+
+    async def run(self, items: Iterable[Any]) -> Dict[str, Any]:
+        """
+            Push every item through the stages
+
+            Raises:
+                with fail_fast, the first exception of a stage function, once the other workers
+                are cancelled
+
+            Returns:
+                Dict[str, Any]: stats() of the run
+        """
+        items = list(items)
+        self.total = len(items)
+        self.done = 0
+        self.failed = 0
+        self._reported = -1
+        self._started = self._last_report = time.perf_counter()
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        reorders = [_Reorder() if stage.ordered else None for stage in self.stages]
+
+        async def feed():
+            for index, item in enumerate(items):
+                for reorder in reorders:
+                    if reorder is not None:
+                        await reorder.room(index, self.reorder_window)
+                await queues[0].put((index, item))
+            for _ in range(self.stages[0].workers):
+                await queues[0].put(_DONE)
+
+        tasks = [asyncio.ensure_future(feed())]
+        for position, stage in enumerate(self.stages):
+            # The workers of a stage share a count, the last one to stop tells the next stage
+            running = [stage.workers]
+            for _ in range(stage.workers):
+                tasks.append(asyncio.ensure_future(self._work(position, queues, running, reorders[position])))
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        self._report(final=True)
+        return self.stats()
+
+    async def _work(self, position: int, queues: List[asyncio.Queue], running: List[int], reorder: Optional[_Reorder]):
+        stage = self.stages[position]
+        last = position + 1 == len(self.stages)
+        while True:
+            entry = await queues[position].get()
+            if entry is _DONE:
+                break
+            for index, value in ([entry] if reorder is None else reorder.push(*entry)):
+                if isinstance(value, StageFailure):
+                    result = value
+                elif stage.skip is not None and stage.skip(value):
+                    stage.skipped += 1
+                    result = value
+                else:
+                    try:
+                        result = await stage.apply(value)
+                    except Exception as error:
+                        if self.fail_fast:
+                            raise
+                        stage.failed += 1
+                        self.failed += 1
+                        result = StageFailure(stage.name, value, error)
+                        print(f"[PIPELINE]: item {index} failed in {stage.name}: {type(error).__name__}: {error}")
+                        if self.on_error is not None:
+                            self.on_error(stage.name, value, error)
+                    else:
+                        if self.on_result is not None:
+                            self.on_result(stage.name, result)
+                if last:
+                    self.done += 1
+                    self._report()
+                else:
+                    # Waits while the next stage is behind
+                    await queues[position + 1].put((index, result))
+        running[0] -= 1
+        if running[0] == 0 and not last:
+            for _ in range(self.stages[position + 1].workers):
+                await queues[position + 1].put(_DONE)
+
+    def _report(self, final: bool = False):
+        now = time.perf_counter()
+        if final:
+            if self._reported == self.done:
+                return
+        elif not self.report_every or now - self._last_report < self.report_every:
+            return
+        self._last_report = now
+        self._reported = self.done
+        print(f"[PIPELINE]: {self.progress()}")
+
+    def progress(self) -> str:
+        """
+            Items done, rate and estimated time left, as one line
+        """
+        elapsed = time.perf_counter() - self._started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        left = (self.total or 0) - self.done
+        eta = f"{left / rate:.0f}s" if rate > 0 else "?"
+        failed = f" ({self.failed} failed)" if self.failed else ""
+        return f"{self.done}/{self.total} done{failed} in {elapsed:.0f}s, {rate:.2f} items/s, ETA {eta}"
+
+    def stats(self) -> Dict[str, Any]:
+        """
+            Items (done, skipped and failed), busy seconds and mean seconds per item of every stage,
+            and the run time
+        """
+        elapsed = time.perf_counter() - self._started
+        return {
+            "items": self.done,
+            "failed": self.failed,
+            "seconds": elapsed,
+            "stages": {
+                stage.name: {
+                    "workers": stage.workers,
+                    "items": stage.items,
+                    "skipped": stage.skipped,
+                    "failed": stage.failed,
+                    "busy_seconds": stage.busy_seconds,
+                    "seconds_per_item": stage.busy_seconds / stage.items if stage.items else 0.0,
+                }
+                for stage in self.stages
+            },
+        }
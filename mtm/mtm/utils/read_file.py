@@ -1,5 +1,5 @@
 import os 
-import pandas as pd 
+from typing import Optional
 
 # from mtm.mtm.configs import *
 
@@ -10,6 +10,8 @@ def read_file(
         is_url: bool = False
 ) -> str:
     if is_url:
+        import pandas as pd
+
         print(f"[DATA FROM GOOGLE SHEETS]: Reading successful")
         data = pd.read_csv(file_path)
         return data
@@ -17,14 +19,13 @@ def read_file(
         print(f"[DATA FROM FILE]: Reading successful")
         return f.read()
 
-def read_file_from_url(url: str) -> str:
-    is_url = False
+def google_sheets_csv_url(url: str) -> str:
+    """
+        CSV export url of a Google Sheets url (https://docs.google.com/spreadsheets/d/<sheet_id>/...gid=<grid>)
+    """
     sheet_id = None
     grid = None
-    base_url = url
     if url.startswith("http://") or url.startswith("https://"):
-        is_url = True
-    
         # Get sheet id from url
         if url.startswith("https://docs.google.com/spreadsheets/d/"):
             sheet_id = url.split("d/")[1].split("/")[0]
@@ -39,12 +40,27 @@ def read_file_from_url(url: str) -> str:
     print(f"sheet_id: {sheet_id}")
     print(f"grid: {grid}")
 
-    if is_url:
-        base_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid={grid}"
+    return f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid={grid}"
+
+
+def read_file_from_url(url: str, cache_dir: Optional[str] = None) -> str:
+    """
+        Read a Google Sheets url as a DataFrame
+
+        Args:
+            url (str): url of the sheet
+            cache_dir (str, optional): directory of the dataset cache (see dataset.fetch_dataset);
+                None downloads the sheet every call
+    """
+    base_url = google_sheets_csv_url(url)
+    if cache_dir is not None:
+        from .dataset import fetch_dataset
+
+        base_url = fetch_dataset(base_url, cache_dir=cache_dir)
 
     return read_file(
         file_path=base_url,
-        is_url=is_url
+        is_url=True
     )
 
 
@@ -0,0 +1,166 @@
+""" Checkpoints of a long evaluation run, to resume it where it stopped.
+
+    The manifest is an append-only JSONL file: a first line describing the run, then one
+    line each time an input row passes a stage, with what the stage produced (the masked
+    prompt, the candidates of the model, the scores). Replaying it gives, for every row,
+    the last stage it reached and everything needed to go on from there, so a restarted
+    run does not mask, call the model or score a row again. A stage which raised on a row
+    is a line too, with its error: a row failing on every run can be left out of the next.
+"""
+
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from .save_file import input_hash, keep_aside, recover_jsonl
+
+__all__ = ["RunManifest"]
+
+
+class RunManifest:
+    """
+        Append-only record of the stages reached by the rows of a run
+
+        Args:
+            path (str): JSONL file of the manifest
+            run (Dict[str, Any], optional): description of the run (dataset, model, ...), written
+                as the first line of a new manifest
+            resume (bool): go on with the manifest at path; otherwise it is kept aside (.bak)
+                and a new run starts
+            fsync_every (float): seconds between two syncs to disk
+
+        Every line of a row carries its index and the hash of its input, so a row of another
+        dataset (the sheet changed between two runs) is never taken for a checkpoint.
+        Failures are kept apart from the states: {"row": ..., "input_hash": ..., "stage": ...,
+        "error": ..., "count": <failures of the row so far>} in self.failed.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            run: Optional[Dict[str, Any]] = None,
+            resume: bool = False,
+            fsync_every: float = 5.0
+    ):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.run: Dict[str, Any] = dict(run or {})
+        # Latest state of every row: {"row": ..., "input_hash": ..., "stage": ..., <what the stages produced>}
+        self.rows: Dict[int, Dict[str, Any]] = {}
+        # Last failure of every row which failed, with the number of failures
+        self.failed: Dict[int, Dict[str, Any]] = {}
+        self._last_sync = time.monotonic()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if resume:
+            self._replay(recover_jsonl(path))
+        else:
+            keep_aside(path)
+        self._file = open(path, "a", encoding="utf-8", newline="\n")
+        if self._file.tell() == 0:
+            self.run.setdefault("created", time.time())
+            self._append({"run": self.run})
+        else:
+            print(f"[RUN MANIFEST]: resuming {path}, {self.summary()}")
+
+    def _replay(self, lines: List[Dict[str, Any]]):
+        for line in lines:
+            if "run" in line:
+                self.run = {**line["run"], **self.run}
+                continue
+            if "error" in line:
+                self._failed(line["row"], line["input_hash"], line["stage"], line["error"])
+                continue
+            state = self.rows.get(line["row"])
+            if state is None or state["input_hash"] != line["input_hash"]:
+                state = self.rows[line["row"]] = {"row": line["row"], "input_hash": line["input_hash"]}
+            state.update(line.get("state") or {})
+            state["stage"] = line["stage"]
+
+    def _append(self, line: Dict[str, Any]):
+        self._file.write(json.dumps(line, ensure_ascii=False))
+        self._file.write("\n")
+        self._file.flush()
+        if time.monotonic() - self._last_sync >= self.fsync_every:
+            os.fsync(self._file.fileno())
+            self._last_sync = time.monotonic()
+
+    def record(self, row: int, poem: str, stage: str, state: Optional[Dict[str, Any]] = None):
+        """
+            Write that a row passed a stage, with what the stage produced
+
+            Args:
+                row (int): index of the row in the dataset
+                poem (str): input of the row
+                stage (str): name of the stage
+                state (Dict[str, Any], optional): fields produced by the stage (JSON serializable)
+        """
+        hashed = input_hash(poem)
+        self._append({"row": row, "input_hash": hashed, "stage": stage, "state": state or {}})
+        current = self.rows.get(row)
+        if current is None or current["input_hash"] != hashed:
+            current = self.rows[row] = {"row": row, "input_hash": hashed}
+        current.update(state or {})
+        current["stage"] = stage
+
+    def _failed(self, row: int, hashed: str, stage: str, error: str):
+        previous = self.failed.get(row)
+        count = previous["count"] + 1 if previous is not None and previous["input_hash"] == hashed else 1
+        self.failed[row] = {"row": row, "input_hash": hashed, "stage": stage, "error": error, "count": count}
+
+    def record_failure(self, row: int, poem: str, stage: str, error: str):
+        """
+            Write that a stage raised on a row
+
+            Args:
+                row (int): index of the row in the dataset
+                poem (str): input of the row
+                stage (str): name of the stage
+                error (str): what went wrong
+        """
+        hashed = input_hash(poem)
+        self._append({"row": row, "input_hash": hashed, "stage": stage, "error": error})
+        self._failed(row, hashed, stage, error)
+
+    def failures(self, row: int, poem: str) -> int:
+        """
+            Number of times a stage raised on a row (0 when the row is new or was another input)
+        """
+        failure = self.failed.get(row)
+        if failure is None or failure["input_hash"] != input_hash(poem):
+            return 0
+        return failure["count"]
+
+    def checkpoint(self, row: int, poem: str) -> Optional[Dict[str, Any]]:
+        """
+            What the run kept of a row, None when the row is new (or was another input)
+        """
+        state = self.rows.get(row)
+        if state is None or state["input_hash"] != input_hash(poem):
+            return None
+        return state
+
+    def summary(self, stages: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """
+            Number of rows per last stage reached, and of rows which failed ("failed")
+        """
+        counts: Dict[str, int] = {stage: 0 for stage in (stages or ())}
+        for state in self.rows.values():
+            counts[state["stage"]] = counts.get(state["stage"], 0) + 1
+        if self.failed:
+            counts["failed"] = len(self.failed)
+        return counts
+
+    def close(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
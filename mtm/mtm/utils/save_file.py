@@ -0,0 +1,256 @@
+""" Append-only result files of an evaluation run.
+
+    Every stanza is one line of a JSONL file (its row and its candidates) and one row of a
+    CSV file, appended once: a run costs O(n) I/O instead of rewriting the whole result
+    every stanza. The JSONL file is the record a run resumes from; the CSV file is rebuilt
+    from it when the two disagree (a crash between the two writes).
+"""
+
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+__all__ = ["RESULT_FIELDS", "input_hash", "recover_jsonl", "keep_aside", "ResultSink"]
+
+# Columns of result.csv, as the evaluation has always written them, then the key of the row
+RESULT_FIELDS = (
+    "poem_input",
+    "final_poem",
+    "user_prompt",
+    "top_k",
+    "time",
+    "corrected_score",
+    "corrected_score_topk",
+    "recall_counts",
+    "input_hash",
+)
+
+
+def input_hash(poem: str) -> str:
+    """
+        Key of an input row: sha256 hex digest of its poem
+    """
+    return hashlib.sha256(poem.encode("utf-8")).hexdigest()
+
+
+def recover_jsonl(path: str) -> List[Dict[str, Any]]:
+    """
+        Objects of an append-only JSONL file; a last line cut by a crash is dropped from the file
+
+        Returns:
+            List[Dict[str, Any]]: one object per complete line, [] when the file does not exist
+    """
+    rows = []
+    if not os.path.exists(path):
+        return rows
+    good = 0
+    with open(path, "rb") as file:
+        for line in file:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                row = json.loads(line)
+            except ValueError:
+                break
+            rows.append(row)
+            good += len(line)
+    if good != os.path.getsize(path):
+        print(f"[RESULT SINK]: dropping a cut line at the end of {path}")
+        with open(path, "r+b") as file:
+            file.truncate(good)
+    return rows
+
+
+def keep_aside(path: str) -> Optional[str]:
+    """
+        Move a non empty file to the first free <path>.bak, <path>.1.bak, ... so that it is never overwritten
+
+        Returns:
+            Optional[str]: where the file went, None when there was nothing to keep
+    """
+    if not os.path.exists(path) or not os.path.getsize(path):
+        return None
+    backup, number = path + ".bak", 0
+    while os.path.exists(backup):
+        number += 1
+        backup = f"{path}.{number}.bak"
+    os.replace(path, backup)
+    print(f"[RESULT SINK]: previous {path} kept as {backup}")
+    return backup
+
+
+class ResultSink:
+    """
+        Buffered append-only JSONL + CSV writer, synced to disk every fsync_every seconds
+
+        Args:
+            jsonl_path (str): one JSON object per stanza, {"input_hash": ..., <fields>..., "responses": [...]}
+            csv_path (str, optional): the same rows without the responses, None for none
+            fields (Sequence[str]): CSV columns
+            flush_every (int): rows kept in memory before they are written
+            fsync_every (float): seconds between two syncs to disk (0: every write)
+
+        Opening an existing file resumes it: a line cut by a crash is dropped, and the
+        hashes of the rows already written are in self.done.
+    """
+
+    def __init__(
+            self,
+            jsonl_path: str,
+            csv_path: Optional[str] = None,
+            fields: Sequence[str] = RESULT_FIELDS,
+            flush_every: int = 16,
+            fsync_every: float = 5.0
+    ):
+        self.jsonl_path = jsonl_path
+        self.csv_path = csv_path
+        self.fields = tuple(fields)
+        self.flush_every = max(1, flush_every)
+        self.fsync_every = fsync_every
+        # How many times each input hash is written (an input may come twice in a dataset)
+        self.done: Counter = Counter()
+        self.rows_written = 0
+        self._pending: List[Dict[str, Any]] = []
+        self._last_sync = time.monotonic()
+
+        directory = os.path.dirname(jsonl_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        rows = self._recover()
+        self._jsonl = open(jsonl_path, "a", encoding="utf-8", newline="\n")
+        self._csv = None
+        if csv_path is not None:
+            if not self._csv_matches(rows):
+                self._rebuild_csv(rows)
+            self._csv = open(csv_path, "a", encoding="utf-8", newline="")
+            self._csv_writer = csv.DictWriter(self._csv, fieldnames=self.fields, extrasaction="ignore")
+            if self._csv.tell() == 0:
+                self._csv_writer.writeheader()
+
+    def _recover(self) -> List[Dict[str, Any]]:
+        rows = recover_jsonl(self.jsonl_path)
+        for row in rows:
+            self.done[row.get("input_hash")] += 1
+        if rows:
+            print(f"[RESULT SINK]: resuming {self.jsonl_path}, {len(rows)} rows already written")
+        return rows
+
+    def _csv_matches(self, rows: List[Dict[str, Any]]) -> bool:
+        if not os.path.exists(self.csv_path):
+            return not rows
+        try:
+            with open(self.csv_path, "r", encoding="utf-8", newline="") as file:
+                hashes = [row.get("input_hash") for row in csv.DictReader(file)]
+        except (csv.Error, UnicodeDecodeError):
+            return False
+        return hashes == [row.get("input_hash") for row in rows]
+
+    def _rebuild_csv(self, rows: List[Dict[str, Any]]):
+        print(f"[RESULT SINK]: rebuilding {self.csv_path} from {self.jsonl_path}")
+        # e.g. the result of a run before the JSONL file: kept aside, never overwritten
+        keep_aside(self.csv_path)
+        temporary = self.csv_path + ".tmp"
+        with open(temporary, "w", encoding="utf-8", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=self.fields, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(self._csv_row(row) for row in rows)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self.csv_path)
+
+    @staticmethod
+    def _csv_row(row: Dict[str, Any]) -> Dict[str, Any]:
+        # Everything is written as text, top_k being the repr of the candidates (as before)
+        text = {key: value if isinstance(value, str) else str(value) for key, value in row.items()}
+        if "top_k" not in row and "responses" in row:
+            text["top_k"] = str(row["responses"])
+        return text
+
+    def pending(self, items: Iterable[Any], key: Callable[[Any], str] = lambda item: item) -> List[Any]:
+        """
+            The items not written yet, in order (an input written n times skips its first n occurrences)
+
+            Args:
+                items: inputs of the run
+                key: poem of an item, hashed with input_hash
+        """
+        seen = Counter()
+        left = []
+        for item in items:
+            hashed = input_hash(key(item))
+            seen[hashed] += 1
+            if seen[hashed] > self.done[hashed]:
+                left.append(item)
+        return left
+
+    def write(self, row: Dict[str, Any]):
+        """
+            Append one row (a dict with an "input_hash" and "responses"; the CSV gets self.fields of it)
+        """
+        self._pending.append(row)
+        self.done[row.get("input_hash")] += 1
+        if len(self._pending) >= self.flush_every or time.monotonic() - self._last_sync >= self.fsync_every:
+            self.flush()
+
+    def flush(self, sync: Optional[bool] = None):
+        """
+            Write the rows kept in memory; they are synced to disk when fsync_every seconds have passed
+            since the last sync (or when sync is True)
+        """
+        if self._pending:
+            lines = io.StringIO()
+            for row in self._pending:
+                lines.write(json.dumps(row, ensure_ascii=False))
+                lines.write("\n")
+            # The JSONL line goes first: a row missing from the CSV is rebuilt from it
+            self._jsonl.write(lines.getvalue())
+            self._jsonl.flush()
+            if self._csv is not None:
+                self._csv_writer.writerows(self._csv_row(row) for row in self._pending)
+                self._csv.flush()
+            self.rows_written += len(self._pending)
+            self._pending = []
+        if sync is None:
+            sync = time.monotonic() - self._last_sync >= self.fsync_every
+        if sync:
+            os.fsync(self._jsonl.fileno())
+            if self._csv is not None:
+                os.fsync(self._csv.fileno())
+            self._last_sync = time.monotonic()
+
+    def to_parquet(self, parquet_path: str) -> str:
+        """
+            Compact the JSONL file into one Parquet file (needs pandas and pyarrow or fastparquet),
+            also once the sink is closed
+
+            Returns:
+                str: parquet_path
+        """
+        import pandas as pd
+
+        if not self._jsonl.closed:
+            self.flush(sync=True)
+        frame = pd.read_json(self.jsonl_path, lines=True, dtype=False)
+        if "responses" in frame:
+            # Nested lists of dicts are kept as their JSON text
+            frame["responses"] = [json.dumps(value, ensure_ascii=False) for value in frame["responses"]]
+        frame.to_parquet(parquet_path, index=False)
+        print(f"[RESULT SINK]: {len(frame)} rows compacted to {parquet_path}")
+        return parquet_path
+
+    def close(self):
+        self.flush(sync=True)
+        self._jsonl.close()
+        if self._csv is not None:
+            self._csv.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
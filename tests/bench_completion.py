@@ -0,0 +1,75 @@
+""" Benchmark: checking an OpenRouter answer with one .json() per check vs parse_completion.
+
+    python tests/bench_completion.py [reasoning_kib]
+
+    The answer carries a reasoning trace of reasoning_kib KiB, as with INCLUDE_REASONING=True.
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+# Add the project root to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from mtm.mtm.models.completion import parse_completion
+from fake_openrouter import POEM, completion_body, poems_content
+
+
+def checks_per_json_call(text: str) -> str:
+    # What calling_model did before: every check decoded the whole body again
+    if "choices" not in json.loads(text):
+        return None
+    if len(json.loads(text)['choices']) == 0:
+        return None
+    if "message" not in json.loads(text)['choices'][0]:
+        return None
+    if "content" not in json.loads(text)['choices'][0]['message']:
+        return None
+    if not (
+        (json.loads(text)['choices'][0]['message']['content'].strip().startswith("{") and json.loads(text)['choices'][0]['message']['content'].strip().endswith("}")) or
+        (json.loads(text)['choices'][0]['message']['content'].strip().startswith("```json") and json.loads(text)['choices'][0]['message']['content'].strip().endswith("```"))
+    ):
+        return None
+    return json.loads(text)['choices'][0]['message']['content']
+
+
+def timed(function, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def retained(function) -> int:
+    # Bytes still allocated by what function returns
+    tracemalloc.start()
+    result = function()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    reasoning_kib = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    body = completion_body(poems_content([POEM] * 5), reasoning="suy nghĩ về vần và luật bằng trắc. " * (reasoning_kib * 32))
+    raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+    text = raw.decode("utf-8")
+    repeat = 50
+
+    old_s = timed(lambda: checks_per_json_call(text), repeat)
+    new_s = timed(lambda: parse_completion(200, raw), repeat)
+    kept_s = timed(lambda: parse_completion(200, raw, keep_reasoning=True), repeat)
+    print(f"[BENCH] body {len(raw) / 1024:.0f} KiB")
+    print(f"[BENCH] .json() per check       : {old_s * 1000:.2f} ms")
+    print(f"[BENCH] parse_completion        : {new_s * 1000:.2f} ms ({old_s / new_s:.1f}x)")
+    print(f"[BENCH] parse_completion (keep) : {kept_s * 1000:.2f} ms")
+    print(f"[BENCH] retained: decoded answer {retained(lambda: json.loads(text)) / 1024:.0f} KiB, "
+          f"ChatCompletion {retained(lambda: parse_completion(200, raw)[0]) / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
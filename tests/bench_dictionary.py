@@ -0,0 +1,59 @@
+""" Memory and lookup time of the dictionary: first-char dict of sets vs WordTrie.
+
+    python tests/bench_dictionary.py [words.txt]
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+# Add the project root to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from mtm.mtm.processes.trie import build_word_trie
+
+DICTIONARY_PATH = os.path.join(current_dir, "assets", "words.txt")
+
+
+def read_words(path: str) -> list:
+    with open(path, "r", encoding="utf-8") as file:
+        return [json.loads(line)["text"].lower() for line in file if line.strip()]
+
+
+def set_layout(words: list) -> dict:
+    # Layout of dictionary() before the trie
+    word_dict = defaultdict(set)
+    for word in words:
+        word_dict[word[0]].add(word)
+    return {key: frozenset(value) for key, value in word_dict.items()}
+
+
+def measure(build, words: list):
+    tracemalloc.start()
+    structure = build(words)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return structure, size
+
+
+def lookup_time(contains, words: list, repeat: int = 5) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for word in words:
+            contains(word)
+    return (time.perf_counter() - start) / (repeat * len(words)) * 1e6
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else DICTIONARY_PATH
+    words = read_words(path)
+    # Copies, so that the strings of the layouts are counted and not shared with the input list
+    sets, sets_size = measure(lambda items: set_layout([word.encode().decode() for word in items]), words)
+    trie, trie_size = measure(build_word_trie, words)
+
+    print(f"{len(words)} words, {len(trie.labels)} trie nodes")
+    print(f"dict of sets: {sets_size / 1024:8.1f} KiB, {lookup_time(lambda word: word in sets[word[0]], words):.2f} us/lookup")
+    print(f"WordTrie:     {trie_size / 1024:8.1f} KiB, {lookup_time(lambda word: word in trie, words):.2f} us/lookup")
@@ -0,0 +1,76 @@
+""" Benchmark: OpenRouterModel calls on the pooled keep-alive session vs a new connection per call,
+    and AsyncOpenRouterModel.fill_many against a server taking some time to answer.
+
+    python tests/bench_open_router.py [n_calls] [answer_seconds] [max_concurrency]
+
+    Against a local server the saving is only the TCP handshake; against openrouter.ai each
+    new connection also costs a TLS handshake (a few round trips).
+"""
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+# Add the project root to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from mtm.mtm.configs.schemas import OpenRouterModelConfig
+from mtm.mtm.models.async_open_router import AsyncOpenRouterModel
+from mtm.mtm.models.open_router_deepseek import OpenRouterModel
+from fake_openrouter import FakeOpenRouter
+
+
+def run(n_calls: int, keep_alive: bool, delay: float = 0.0) -> dict:
+    with FakeOpenRouter(delay=delay) as server:
+        config = OpenRouterModelConfig(OPENROUTER_BASE_URL=server.url, KEEP_ALIVE=keep_alive)
+        with OpenRouterModel(config) as model, contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for _ in range(n_calls):
+                model.calling_model("bài thơ")
+            elapsed = time.perf_counter() - start
+            stats = model.transport_stats()
+    stats["calls_per_second"] = n_calls / elapsed
+    return stats
+
+
+def run_async(n_calls: int, delay: float, max_concurrency: int) -> dict:
+    async def fill(model: AsyncOpenRouterModel):
+        async with model:
+            await model.fill_many(["bài thơ"] * n_calls)
+
+    with FakeOpenRouter(delay=delay) as server:
+        config = OpenRouterModelConfig(OPENROUTER_BASE_URL=server.url, MAX_CONCURRENCY=max_concurrency)
+        model = AsyncOpenRouterModel(config)
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            asyncio.run(fill(model))
+            elapsed = time.perf_counter() - start
+    stats = model.transport_stats()
+    stats["calls_per_second"] = n_calls / elapsed
+    return stats
+
+
+def report(name: str, stats: dict):
+    print(f"[BENCH] {name:20}: {stats['calls_per_second']:.0f} calls/s, "
+          f"mean {stats['mean_seconds'] * 1000:.2f} ms, "
+          f"{stats['connections_opened']} connections for {stats['calls']} calls")
+
+
+def main():
+    n_calls = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+    max_concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    report("connection per call", run(n_calls, keep_alive=False))
+    report("keep-alive pool", run(n_calls, keep_alive=True))
+
+    # A slow server: one request at a time vs max_concurrency in flight
+    print(f"[BENCH] answers taking {delay * 1000:.0f} ms:")
+    report("sync, one by one", run(n_calls, keep_alive=True, delay=delay))
+    report(f"fill_many, {max_concurrency} in flight", run_async(n_calls, delay, max_concurrency))
+
+
+if __name__ == "__main__":
+    main()
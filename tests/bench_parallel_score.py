@@ -0,0 +1,46 @@
+""" Benchmark: score_batch in one process vs ParallelScorer over every core.
+
+    python tests/bench_parallel_score.py [n_poems] [workers]
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+# Add the project root to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from mtm.mtm.configs.schemas import ParallelScoringConfig, PoeticRulesMetricsConfig
+from mtm.mtm.processes.parallel_score import ParallelScorer
+from mtm.mtm.processes.poetic_score import RhymesTonesMetrics
+from bench_score_batch import random_poems
+from test_lexicon import LEXICON_PATHS
+
+
+def main():
+    n_poems = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    metrics_config = PoeticRulesMetricsConfig(**LEXICON_PATHS)
+    poems, tags = random_poems(n_poems)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        single = RhymesTonesMetrics(metrics_config).score_batch(poems, tags)
+        single_s = time.perf_counter() - start
+
+    with ParallelScorer(ParallelScoringConfig(metrics_config=metrics_config, workers=workers)) as scorer:
+        # Warm the pool up, so that the timing does not include starting the workers
+        scorer.score_batch(poems[:scorer.chunk_size * scorer.workers], tags[:scorer.chunk_size * scorer.workers])
+        start = time.perf_counter()
+        parallel = scorer.score_batch(poems, tags)
+        parallel_s = time.perf_counter() - start
+
+    assert parallel.scores.tolist() == single.scores.tolist()
+    print(f"[BENCH] 1 process   : {n_poems / single_s:.0f} poems/s")
+    print(f"[BENCH] {scorer.workers} workers : {n_poems / parallel_s:.0f} poems/s ({single_s / parallel_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+""" Benchmark: calculate_score in a loop vs score_batch over the same candidates.
+
+    python tests/bench_score_batch.py [n_poems]
+"""
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+# Add the project root to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from mtm.mtm.configs.schemas import PoeticRulesMetricsConfig
+from mtm.mtm.processes.poetic_score import RhymesTonesMetrics
+from test_lexicon import ASSETS_PATH, LEXICON_PATHS
+
+
+def random_poems(n_poems: int):
+    with open(os.path.join(ASSETS_PATH, "words.txt"), encoding="utf-8") as file:
+        # Single syllables, so that every candidate has the regular shape of its tag
+        words = sorted({word for line in file for word in json.loads(line)["text"].split()})
+    rng = random.Random(0)
+    poems, tags = [], []
+    for _ in range(n_poems):
+        tag = rng.choice(["68", "78"])
+        lengths = [6, 8] * 2 if tag == "68" else [7] * 8
+        poems.append("\n".join(" ".join(rng.choice(words) for _ in range(length)) for length in lengths))
+        tags.append(tag)
+    return poems, tags
+
+
+def main():
+    n_poems = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    metrics = RhymesTonesMetrics(PoeticRulesMetricsConfig(**LEXICON_PATHS))
+    poems, tags = random_poems(n_poems)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        scalar = [metrics.calculate_score(poem, tag) for poem, tag in zip(poems, tags)]
+        scalar_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch = metrics.score_batch(poems, tags)
+        batch_s = time.perf_counter() - start
+
+    assert batch.scores.tolist() == scalar
+    print(f"[BENCH] calculate_score: {scalar_s / n_poems * 1e6:.1f} us/poem")
+    print(f"[BENCH] score_batch    : {batch_s / n_poems * 1e6:.1f} us/poem ({scalar_s / batch_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+""" Microbenchmark: rescoring after a one-word edit, PoemScoreSession.replace vs calculate_score.
+
+    python tests/bench_score_session.py [n_edits]
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+# Add the project root to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from mtm.mtm.configs.schemas import PoeticRulesMetricsConfig
+from mtm.mtm.processes.poetic_score import RhymesTonesMetrics
+from test_lexicon import LEXICON_PATHS
+
+
+def main():
+    n_edits = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    metrics = RhymesTonesMetrics(PoeticRulesMetricsConfig(**LEXICON_PATHS))
+    words = sorted(word for word in metrics.dictionary_vi if " " not in word)
+    rng = random.Random(0)
+    lengths = [6, 8] * 4
+    poem = "\n".join(" ".join(rng.choice(words) for _ in range(length)) for length in lengths)
+    edits = []
+    for _ in range(n_edits):
+        line = rng.randrange(len(lengths))
+        edits.append((line, rng.randrange(lengths[line]), rng.choice(words)))
+
+    session = metrics.score_session(poem, "68")
+    start = time.perf_counter()
+    for line, position, word in edits:
+        session.replace(line, position, word)
+    incremental = (time.perf_counter() - start) / n_edits * 1e6
+
+    texts = []
+    session = metrics.score_session(poem, "68")
+    for line, position, word in edits:
+        session.replace(line, position, word)
+        texts.append(session.text)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for text in texts:
+            metrics.calculate_score(text, "68")
+        full = (time.perf_counter() - start) / n_edits * 1e6
+
+    print(f"[BENCH] calculate_score: {full:7.1f} us/edit")
+    print(f"[BENCH] replace        : {incremental:7.1f} us/edit ({full / incremental:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
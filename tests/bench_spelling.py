@@ -0,0 +1,50 @@
+""" Microbenchmark: spelling suggestions per wrong word, deletion index vs full trie scan.
+
+    python tests/bench_spelling.py [repeat]
+"""
+import os
+import sys
+import time
+# Add the project root to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from mtm.mtm.processes.lexicon import load_lexicon
+from mtm.mtm.processes.spelling import get_spelling_suggester
+
+ASSETS_PATH = os.path.join(current_dir, "assets")
+LEXICON_PATHS = [
+    os.path.join(ASSETS_PATH, "start_vowels.txt"),
+    os.path.join(ASSETS_PATH, "rhymes.txt"),
+    os.path.join(ASSETS_PATH, "tone_dict.txt"),
+    os.path.join(ASSETS_PATH, "words.txt"),
+    os.path.join(ASSETS_PATH, "vocab_dupple_check.txt"),
+]
+WRONG_WORDS = "hoàg ngừoi mưởng bìh xyz giọn chạu khuỗn dơn cẫu hể gễm".split()
+
+
+def per_word(suggest, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for word in WRONG_WORDS:
+            suggest(word)
+    return (time.perf_counter() - start) / (repeat * len(WRONG_WORDS)) * 1e6
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    dictionary = load_lexicon(*LEXICON_PATHS).dictionary_vi
+
+    start = time.perf_counter()
+    suggester = get_spelling_suggester(dictionary)
+    print(f"[BENCH] index of {len(suggester)} words built in {(time.perf_counter() - start) * 1e3:.1f} ms")
+
+    scan = per_word(lambda word: dictionary.within_distance(word, 2), repeat)
+    # Without the memo, every call searches the index
+    cold = per_word(lambda word: suggester._suggest(word), repeat)
+    per_word(suggester.suggest, 1)
+    warm = per_word(suggester.suggest, repeat)
+    print(f"[BENCH] trie scan     : {scan:8.1f} us/word")
+    print(f"[BENCH] deletion index: {cold:8.1f} us/word ({scan / cold:.1f}x)")
+    print(f"[BENCH] memoized      : {warm:8.1f} us/word ({scan / warm:.0f}x)")
@@ -0,0 +1,70 @@
+""" Microbenchmark: per-word syllable analysis with list-backed vs frozenset-backed tables.
+
+    python tests/bench_syllable.py [repeat]
+"""
+import os
+import sys
+import time
+# Add the project root to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from mtm.mtm.processes.lexicon import Lexicon, load_lexicon
+
+ASSETS_PATH = os.path.join(current_dir, "assets")
+LEXICON_PATHS = [
+    os.path.join(ASSETS_PATH, "start_vowels.txt"),
+    os.path.join(ASSETS_PATH, "rhymes.txt"),
+    os.path.join(ASSETS_PATH, "tone_dict.txt"),
+    os.path.join(ASSETS_PATH, "words.txt"),
+    os.path.join(ASSETS_PATH, "vocab_dupple_check.txt"),
+]
+WORDS = (
+    "cởi trời xanh cởi đất nâu gió mây hờn dỗi bạc nâu nhớ nhung "
+    "bạc đầu tóc trắng da nhung cõi tình thế giới ai nhung lưng sầu "
+    "quê hương nước biếc thuyền trôi gianh giữa khuya trăng"
+).split()
+
+
+def list_backed(lexicon: Lexicon) -> Lexicon:
+    # Same assets with the plain lists returned by vowels() before the lookup tables
+    return Lexicon(
+        even_chars=list(lexicon.even_chars),
+        list_start_vowels=list(lexicon.list_start_vowels),
+        tones={key: list(value) for key, value in lexicon.tones.items()},
+        rhymes_dict=lexicon.rhymes_dict,
+        tone_dict=lexicon.tone_dict,
+        dictionary_vi=lexicon.dictionary_vi,
+        special_tone_dict=list(lexicon.special_tone_dict),
+        tone_classes=lexicon.tone_classes,
+        rime_ids=lexicon.rime_ids,
+        rhyme_masks=lexicon.rhyme_masks,
+    )
+
+
+def per_word_us(analyze, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for word in WORDS:
+            analyze(word)
+    return (time.perf_counter() - start) / (repeat * len(WORDS)) * 1e6
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    lexicon = load_lexicon(*LEXICON_PATHS)
+    baseline = list_backed(lexicon)
+
+    # _analyze bypasses the LRU cache so every call walks the tables
+    lists_us = per_word_us(baseline._analyze, repeat)
+    sets_us = per_word_us(lexicon._analyze, repeat)
+    cached_us = per_word_us(lexicon.analyze, repeat)
+
+    print(f"[BENCH] lists     : {lists_us:.2f} us/word")
+    print(f"[BENCH] frozensets: {sets_us:.2f} us/word ({lists_us / sets_us:.1f}x)")
+    print(f"[BENCH] cached    : {cached_us:.2f} us/word ({lists_us / cached_us:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
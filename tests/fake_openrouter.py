@@ -0,0 +1,182 @@
+""" Local stand-in for the OpenRouter chat completions endpoint, for the tests and benchmarks.
+
+    with FakeOpenRouter(delay=0.01) as server:
+        model = OpenRouterModel(OpenRouterModelConfig(OPENROUTER_BASE_URL=server.url))
+
+    Every POST is answered with a chat completion whose content is the {"responses": [...]}
+    payload the system prompt asks for, its first poem being the user prompt (so answers can
+    be matched to prompts). Answers can be scripted with server.queue(status, body).
+
+    A request with "stream": true gets the content of its 200 answer as server-sent events,
+    chunk_size chars per event and stream_delay seconds between events. A scripted stream
+    can be cut after some events, the connection then closes in the middle of the answer.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+POEM = "trăng khuya ẩn hiện mải mê\ncâu thơ quên mất lối về trên sông"
+
+
+def completion_body(content: str, reasoning: Optional[str] = None) -> Dict:
+    message = {"role": "assistant", "content": content}
+    if reasoning is not None:
+        message["reasoning"] = reasoning
+    return {
+        "id": "gen-fake",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "fake/model",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": message}],
+    }
+
+
+def poems_content(poems: List[str]) -> str:
+    return json.dumps({
+        "responses": [{"poem_number": i + 1, "poem_text": poem} for i, poem in enumerate(poems)]
+    }, ensure_ascii=False)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in two writes, Nagle would hold the body back for a delayed ACK
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        with self.server.lock:
+            self.server.requests.append(payload)
+            scripted = self.server.scripted.popleft() if self.server.scripted else None
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+        try:
+            if self.server.delay:
+                time.sleep(self.server.delay)
+        finally:
+            with self.server.lock:
+                self.server.in_flight -= 1
+
+        if scripted is None:
+            user_prompt = payload["messages"][-1]["content"] if payload.get("messages") else POEM
+            scripted = (200, completion_body(poems_content([user_prompt, POEM, POEM])), {}, None)
+        status, body, headers, cut_after = scripted
+        if payload.get("stream") and status == 200 and isinstance(body, dict) and body.get("choices"):
+            self._send_events(body["choices"][0]["message"]["content"], cut_after)
+            return
+        data = body if isinstance(body, bytes) else json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(data)
+
+
+    def _send_events(self, content: str, cut_after: Optional[int] = None):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        size = self.server.chunk_size
+        events = [": OPENROUTER PROCESSING\n\n"]
+        events += [
+            "data: " + json.dumps({"id": "gen-fake", "choices": [{"index": 0, "delta": {"content": content[i:i + size]}}]},
+                                  ensure_ascii=False) + "\n\n"
+            for i in range(0, len(content), size)
+        ]
+        events.append("data: [DONE]\n\n")
+        if cut_after is not None:
+            # The comment line, then cut_after content events, and no end of the chunked body
+            events = events[:cut_after + 1]
+            self.close_connection = True
+        try:
+            for sent, event in enumerate(events):
+                if sent and self.server.stream_delay:
+                    time.sleep(self.server.stream_delay)
+                data = event.encode("utf-8")
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+            if cut_after is None:
+                self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading: the rest of the answer is not generated
+            with self.server.lock:
+                self.server.streams_dropped += 1
+            self.close_connection = True
+
+
+class FakeOpenRouter:
+    """
+        Threaded HTTP/1.1 keep-alive server on a free local port
+
+        Attributes:
+            url: chat completions URL to give to the model
+            connections: TCP connections accepted so far
+            requests: JSON payloads received so far
+            max_in_flight: most requests being answered at the same time
+            streams_dropped: streamed answers the client stopped reading before their end
+    """
+
+    def __init__(self, delay: float = 0.0, stream_delay: float = 0.0, chunk_size: int = 16):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.lock = threading.Lock()
+        self._server.connections = 0
+        self._server.requests = []
+        self._server.scripted = deque()
+        self._server.delay = delay
+        self._server.in_flight = 0
+        self._server.max_in_flight = 0
+        self._server.stream_delay = stream_delay
+        self._server.chunk_size = chunk_size
+        self._server.streams_dropped = 0
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        host, port = self._server.server_address
+        self.url = f"http://{host}:{port}/api/v1/chat/completions"
+
+    @property
+    def connections(self) -> int:
+        return self._server.connections
+
+    @property
+    def max_in_flight(self) -> int:
+        return self._server.max_in_flight
+
+    @property
+    def streams_dropped(self) -> int:
+        return self._server.streams_dropped
+
+    @property
+    def requests(self) -> List[Dict]:
+        return self._server.requests
+
+    def queue(self, status: int, body=None, headers: Optional[Dict[str, str]] = None, cut_after: Optional[int] = None):
+        """
+            Answer the next unanswered request with status and body (a dict is sent as JSON);
+            a streamed answer stops after cut_after events when it is set
+        """
+        self._server.scripted.append((status, body if body is not None else {}, headers or {}, cut_after))
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._server.shutdown()
+        self._server.server_close()
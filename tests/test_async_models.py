@@ -0,0 +1,84 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import pytest
+# Add the project root to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+pytest.importorskip("httpx")
+
+from mtm.mtm.configs.schemas import DeepSeekModelConfig, OpenRouterModelConfig
+from mtm.mtm.models.async_open_router import AsyncOpenRouterModel
+from fake_openrouter import FakeOpenRouter, completion_body, poems_content
+
+
+def fill_many(config: OpenRouterModelConfig, prompts):
+    async def run():
+        async with AsyncOpenRouterModel(config) as model:
+            return await model.fill_many(prompts), model.transport_stats()
+    return asyncio.run(run())
+
+
+def test_fill_many_keeps_n_requests_in_flight():
+    prompts = [f"bài thơ {i}" for i in range(12)]
+    with FakeOpenRouter(delay=0.1) as server:
+        config = OpenRouterModelConfig(OPENROUTER_BASE_URL=server.url, MAX_CONCURRENCY=4)
+        start = time.perf_counter()
+        results, stats = fill_many(config, prompts)
+        elapsed = time.perf_counter() - start
+
+    # Answers come back in prompt order
+    assert [json.loads(content)["responses"][0]["poem_text"] for content, _ in results] == prompts
+    assert [attempts for _, attempts in results] == [1] * 12
+    assert server.max_in_flight == 4
+    assert elapsed < 12 * 0.1 / 2
+    # One connection per request in flight, reused by the next ones
+    assert server.connections == stats["connections_opened"] == 4
+    assert stats["reused_connections"] == 8
+
+
+def test_fill_many_paces_requests_under_the_rate_limit():
+    with FakeOpenRouter() as server:
+        config = OpenRouterModelConfig(OPENROUTER_BASE_URL=server.url, MAX_CONCURRENCY=4, REQUESTS_PER_MINUTE=600)
+        start = time.perf_counter()
+        fill_many(config, ["bài thơ"] * 4)
+        elapsed = time.perf_counter() - start
+
+    # 600 requests per minute: one start every 0.1s
+    assert elapsed >= 0.3
+
+
+def test_unusable_answers_are_asked_again():
+    with FakeOpenRouter() as server:
+        server.queue(500)
+        server.queue(200, completion_body("no json here"))
+        server.queue(200, completion_body(poems_content(["câu thơ"])))
+        config = OpenRouterModelConfig(OPENROUTER_BASE_URL=server.url, MAX_CONCURRENCY=1, BACKOFF_BASE=0.01)
+        [(content, attempts)], stats = fill_many(config, ["bài thơ"])
+
+    assert json.loads(content)["responses"][0]["poem_text"] == "câu thơ"
+    assert attempts == 3
+    assert stats["retries"] == 2
+    assert stats["status_counts"] == {500: 1, 200: 2}
+
+
+def test_async_deepseek_fill_many():
+    pytest.importorskip("openai")
+    from mtm.mtm.models.async_deepseek import AsyncDeepSeekModel
+
+    with FakeOpenRouter(delay=0.05) as server:
+        config = DeepSeekModelConfig(BASE_URL=server.url.rsplit("/chat/completions", 1)[0], MAX_CONCURRENCY=3)
+
+        async def run():
+            async with AsyncDeepSeekModel(config) as model:
+                return await model.fill_many(["một", "hai", "ba", "bốn", "năm", "sáu"])
+
+        messages = asyncio.run(run())
+
+    assert [json.loads(message.content)["responses"][0]["poem_text"] for message in messages] == \
+        ["một", "hai", "ba", "bốn", "năm", "sáu"]
+    assert server.max_in_flight == 3
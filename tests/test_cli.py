@@ -0,0 +1,97 @@
+import csv
+import json
+import os
+import sys
+# Add the project root to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from avp.app.cli import main
+from mtm.mtm.configs.schemas import PoeticRulesMetricsConfig
+from mtm.mtm.processes.poetic_score import RhymesTonesMetrics
+
+from test_lexicon import ASSETS_PATH, LEXICON_PATHS
+from test_score_batch import THAT_NGON
+from test_stanza import BROKEN_LUC_BAT, LUC_BAT
+
+RECORDS = [
+    {"id": 1, "poem": LUC_BAT, "tag": "68"},
+    {"id": 2, "poem": BROKEN_LUC_BAT, "tag": "68"},
+    {"id": 3, "poem": THAT_NGON, "tag": "78"},
+    {"id": 4, "poem": BROKEN_LUC_BAT, "tag": "00"},
+    {"id": 5, "poem": LUC_BAT + "\n\n" + BROKEN_LUC_BAT},
+]
+
+
+def expected_scores():
+    metrics = RhymesTonesMetrics(PoeticRulesMetricsConfig(**LEXICON_PATHS))
+    return [metrics.calculate_score(record["poem"], record.get("tag", "68")) for record in RECORDS]
+
+
+def write_jsonl(path):
+    with open(path, "w", encoding="utf-8") as file:
+        for record in RECORDS:
+            file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        file.write("not json\n")
+
+
+def test_cli_scores_jsonl_in_order(tmp_path, capsys):
+    source, target = tmp_path / "poems.jsonl", tmp_path / "scores.jsonl"
+    write_jsonl(source)
+
+    for workers in ("1", "2"):
+        assert main([str(source), "-o", str(target), "--tag-field", "tag", "--assets", ASSETS_PATH,
+                     "--workers", workers, "--chunk-size", "2"]) == 0
+        with open(target, encoding="utf-8") as file:
+            results = [json.loads(line) for line in file]
+        assert [result["id"] for result in results] == [1, 2, 3, 4, 5]
+        assert [result["score"] for result in results] == expected_scores()
+        assert results[0]["poem"] == LUC_BAT
+
+    err = capsys.readouterr().err
+    assert "invalid JSON" in err and "scored 5 poems" in err
+
+
+def test_cli_reads_and_writes_csv(tmp_path):
+    source, target = tmp_path / "poems.csv", tmp_path / "scores.csv"
+    with open(source, "w", encoding="utf-8", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=["id", "text"])
+        writer.writeheader()
+        for record in RECORDS[:3]:
+            writer.writerow({"id": record["id"], "text": record["poem"]})
+
+    assert main([str(source), "-o", str(target), "--text-field", "text", "--tag", "68", "--assets", ASSETS_PATH]) == 0
+    with open(target, encoding="utf-8", newline="") as file:
+        rows = list(csv.DictReader(file))
+
+    metrics = RhymesTonesMetrics(PoeticRulesMetricsConfig(**LEXICON_PATHS))
+    assert [row["id"] for row in rows] == ["1", "2", "3"]
+    assert [float(row["score"]) for row in rows] == [metrics.calculate_score(r["poem"], "68") for r in RECORDS[:3]]
+
+
+def test_cli_reads_numeric_tags_and_leaves_unsupported_ones_unscored(tmp_path, capsys):
+    source, target = tmp_path / "poems.jsonl", tmp_path / "scores.jsonl"
+    with open(source, "w", encoding="utf-8") as file:
+        for record in ({"id": 1, "poem": LUC_BAT, "tag": 68}, {"id": 2, "poem": LUC_BAT, "tag": "69"}):
+            file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    assert main([str(source), "-o", str(target), "--tag-field", "tag", "--assets", ASSETS_PATH]) == 0
+    with open(target, encoding="utf-8") as file:
+        results = [json.loads(line) for line in file]
+    assert [result["score"] for result in results] == [100.0, None]
+    assert "unsupported tag '69'" in capsys.readouterr().err
+
+
+def test_cli_leaves_a_poem_which_is_not_text_unscored_and_goes_on(tmp_path, capsys):
+    source, target = tmp_path / "poems.jsonl", tmp_path / "scores.jsonl"
+    with open(source, "w", encoding="utf-8") as file:
+        for record in ({"id": 1, "poem": 12}, {"id": 2, "poem": ["một"]}, {"id": 3, "poem": LUC_BAT}):
+            file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    assert main([str(source), "-o", str(target), "--assets", ASSETS_PATH]) == 0
+    with open(target, encoding="utf-8") as file:
+        results = [json.loads(line) for line in file]
+    assert [result["score"] for result in results] == [None, None, 100.0]
+    err = capsys.readouterr().err
+    assert "poem is not text (int)" in err and "poem is not text (list)" in err
@@ -0,0 +1,146 @@
+import os
+import sys
+import csv
+import json
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+# Add the project root to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from mtm.mtm.utils.dataset import fetch_dataset, iter_chunks, read_column, resolve_dataset
+from test_stanza import BROKEN_LUC_BAT, LUC_BAT
+
+ROWS = [
+    {"id": str(i), "Qwen_output": poem, "note": "ghi chú"}
+    for i, poem in enumerate([LUC_BAT, BROKEN_LUC_BAT] * 3)
+]
+
+
+class SheetServer:
+    """ Serves one CSV body with an ETag, answering 304 to a matching If-None-Match """
+
+    def __init__(self, body: bytes, etag: str = '"v1"'):
+        self.body = body
+        self.etag = etag
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                server.requests.append(dict(self.headers))
+                if server.etag and self.headers.get("If-None-Match") == server.etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/csv")
+                self.send_header("Content-Length", str(len(server.body)))
+                if server.etag:
+                    self.send_header("ETag", server.etag)
+                self.end_headers()
+                self.wfile.write(server.body)
+
+        self._http = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._http.server_address[1]}/export?format=csv&gid=0"
+        self._thread = threading.Thread(target=self._http.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._http.shutdown()
+        self._http.server_close()
+
+
+def csv_bytes(rows) -> bytes:
+    lines = [",".join(rows[0])] + [",".join(f'"{value}"' for value in row.values()) for row in rows]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def write_csv(path: str, rows):
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def test_local_csv_and_jsonl_are_streamed_in_chunks_of_the_projected_columns(tmp_path):
+    table, lines = str(tmp_path / "poems.csv"), str(tmp_path / "poems.jsonl")
+    write_csv(table, ROWS)
+    with open(lines, "w", encoding="utf-8") as file:
+        for row in ROWS:
+            file.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    for path in (table, lines):
+        chunks = list(iter_chunks(path, columns=["Qwen_output"], chunk_size=4))
+        assert [len(chunk) for chunk in chunks] == [4, 2]
+        assert [row for chunk in chunks for row in chunk] == [{"Qwen_output": row["Qwen_output"]} for row in ROWS]
+        assert list(read_column(path, "Qwen_output")) == [row["Qwen_output"] for row in ROWS]
+        with pytest.raises(ValueError, match="Column Mistral_output not found"):
+            list(read_column(path, "Mistral_output"))
+    assert next(iter_chunks(table))[0] == ROWS[0]
+
+    with pytest.raises(ValueError, match="Unsupported dataset format"):
+        list(iter_chunks(str(tmp_path / "poems.xlsx")))
+
+
+def test_parquet_columns_are_read_alone(tmp_path):
+    pytest.importorskip("pyarrow")
+    pd = pytest.importorskip("pandas")
+
+    path = str(tmp_path / "poems.parquet")
+    pd.DataFrame(ROWS).to_parquet(path, index=False)
+    chunks = list(iter_chunks(path, columns=["Qwen_output"], chunk_size=5))
+    assert [len(chunk) for chunk in chunks] == [5, 1]
+    assert list(chunks[0][0]) == ["Qwen_output"]
+    assert list(read_column(path, "Qwen_output")) == [row["Qwen_output"] for row in ROWS]
+
+
+def test_a_url_is_fetched_once_then_revalidated_with_its_etag(tmp_path):
+    cache_dir = str(tmp_path / "datasets")
+    with SheetServer(csv_bytes(ROWS)) as server:
+        path = fetch_dataset(server.url, cache_dir=cache_dir)
+        assert list(read_column(path, "Qwen_output")) == [row["Qwen_output"] for row in ROWS]
+
+        # Within max_age the server is not asked at all
+        assert fetch_dataset(server.url, cache_dir=cache_dir, max_age=3600) == path
+        assert len(server.requests) == 1
+
+        # After it, a conditional request answered 304 keeps the copy
+        assert fetch_dataset(server.url, cache_dir=cache_dir) == path
+        assert server.requests[-1]["If-None-Match"] == '"v1"' and len(server.requests) == 2
+
+        # The sheet changed: the new version replaces the copy
+        server.body, server.etag = csv_bytes(ROWS[:2]), '"v2"'
+        assert len(list(read_column(server.url, "Qwen_output", cache_dir=cache_dir))) == 2
+
+        # A copy which no longer matches its sha256 is fetched again
+        with open(path, "ab") as file:
+            file.write(b'"6","broken","x"\n')
+        server.etag = None
+        fetch_dataset(server.url, cache_dir=cache_dir, max_age=3600)
+        assert len(server.requests) == 4
+        assert len(list(read_column(path, "Qwen_output"))) == 2
+
+
+def test_offline_runs_read_the_cache_only(tmp_path):
+    cache_dir = str(tmp_path / "datasets")
+    with SheetServer(csv_bytes(ROWS)) as server:
+        url = server.url
+        fetch_dataset(url, cache_dir=cache_dir)
+
+    # The server is gone: offline or not, the cached copy is read
+    assert len(list(read_column(url, "Qwen_output", cache_dir=cache_dir, offline=True))) == len(ROWS)
+    assert len(list(read_column(url, "Qwen_output", cache_dir=cache_dir, max_age=None))) == len(ROWS)
+
+    with pytest.raises(FileNotFoundError):
+        fetch_dataset(url + "1", cache_dir=cache_dir, offline=True)
+    with pytest.raises(FileNotFoundError):
+        resolve_dataset(str(tmp_path / "missing.csv"))
@@ -0,0 +1,61 @@
+import os
+import sys
+import subprocess
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+
+# Modules of the LLM / agent stack that a scoring call must never import
+HEAVY_MODULES = ["pandas", "numpy", "openai", "requests", "httpx", "google.adk"]
+
+# Cumulative import time allowed for each scoring entry point (seconds)
+IMPORT_TIME_BUDGET_SECONDS = 1.0
+
+
+def measure_import(statement: str):
+    """
+        Run the import in a fresh interpreter with ``-X importtime``
+
+        Returns:
+            total_seconds: cumulative import time of the top level modules
+            heavy: heavy modules found in sys.modules afterwards
+    """
+    code = (
+        "import sys\n"
+        f"{statement}\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=project_root,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Top level entries have no indentation in front of the module name
+        if not name[1:].startswith(" "):
+            total_us += int(cumulative)
+    heavy = [module for module in result.stdout.strip().split(",") if module]
+    return total_us / 1e6, heavy
+
+
+@pytest.mark.parametrize("statement", [
+    "from mtm.mtm.processes import RhymesTonesMetrics",
+    "from mtm.mtm.processes.poetic_rule import PoeticRules",
+    "import mtm.main",
+    "from avp.avp.tools.poetic import RhymesTonesMetrics",
+    # Only the names of avp/main.py load the agent stack
+    "import avp; assert not hasattr(avp, 'foo'); from avp import app",
+])
+def test_scoring_import_stays_slim(statement):
+    total_seconds, heavy = measure_import(statement)
+    print(f"[IMPORT TIME] {statement}: {total_seconds * 1000:.1f} ms")
+
+    assert heavy == []
+    assert total_seconds < IMPORT_TIME_BUDGET_SECONDS
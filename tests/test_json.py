@@ -1,35 +1,45 @@
+import os
+import sys
+import json
+# Add the project root to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
 
-if __name__ == "__main__":
-    import os
-    import json
+from mtm.mtm.utils.parse_json import extract_poems
 
-    r_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Scored responses as saved in all_responses.json
+SAVED_RESPONSES = [
+    {
+        "poem_number": 4,
+        "poem_text": "cởi trời xanh cởi đất nâu\ngió mây cũng đã bắc cầu sang nhau\nđể cho tình có được màu\nkhông còn nhung nhớ nỗi sầu trong thư\nvà em như thực như hư\nthư anh vừa gửi hay thư ông trời\ncàn khôn như cũng thảnh thơi\nkhi ta không giận không lời dối gian",
+        "score": 93.63636363636364
+    },
+    {
+        "poem_number": 5,
+        "poem_text": "cởi trời xanh cởi đất nâu\ngió mây cũng đã bắc cầu sang nhau\nđể cho tình có được màu\nkhông còn nhung nhớ đắng cay sầu từ\nvà em như thực như hư\nthư anh vừa gửi hay thư ông trời\ncàn khôn như cũng thảnh thơi\nkhi ta không giận không lời dối gian",
+        "score": 93.63636363636364
+    }
+]
 
-    json_data_path = os.path.join(r_path, "all_responses.json")
-    if os.path.exists(json_data_path):
-        with open(json_data_path, "r", encoding="utf-8") as file:
-            content = file.read().strip()
-            if content == "":
-                existing_data = []
-            else:
-                existing_data = json.loads(content)
-    else:
-        existing_data = []
-    all_responses = [
-        {
-            "poem_number": 4,
-            "poem_text": "cởi trời xanh cởi đất nâu\ngió mây cũng đã bắc cầu sang nhau\nđể cho tình có được màu\nkhông còn nhung nhớ nỗi sầu trong thư\nvà em như thực như hư\nthư anh vừa gửi hay thư ông trời\ncàn khôn như cũng thảnh thơi\nkhi ta không giận không lời dối gian",
-            "score": 93.63636363636364
-        },
-        {
-            "poem_number": 5,
-            "poem_text": "cởi trời xanh cởi đất nâu\ngió mây cũng đã bắc cầu sang nhau\nđể cho tình có được màu\nkhông còn nhung nhớ đắng cay sầu từ\nvà em như thực như hư\nthư anh vừa gửi hay thư ông trời\ncàn khôn như cũng thảnh thơi\nkhi ta không giận không lời dối gian",
-            "score": 93.63636363636364
-        }
-    ]
-    existing_data.extend(all_responses)
 
-    with open(json_data_path, "w", encoding="utf-8") as file:
-        json.dump(existing_data, file, indent=4, ensure_ascii=False)
-    
-    print(f"existing_data: {existing_data}")
\ No newline at end of file
+def test_saved_responses_parse_back():
+    for text in (
+        json.dumps(SAVED_RESPONSES, indent=4, ensure_ascii=False),
+        json.dumps({"responses": SAVED_RESPONSES}, ensure_ascii=False),
+        json.dumps({"responses": SAVED_RESPONSES}),
+    ):
+        assert extract_poems(text) == SAVED_RESPONSES
+
+
+def test_saved_responses_file_round_trip(tmp_path):
+    # all_responses.json is rewritten with every new batch appended to what it holds
+    json_data_path = tmp_path / "all_responses.json"
+    json_data_path.write_text("", encoding="utf-8")
+    for _ in range(2):
+        content = json_data_path.read_text(encoding="utf-8").strip()
+        existing_data = extract_poems(content) if content else []
+        existing_data.extend(SAVED_RESPONSES)
+        json_data_path.write_text(json.dumps(existing_data, indent=4, ensure_ascii=False), encoding="utf-8")
+
+    assert extract_poems(json_data_path.read_text(encoding="utf-8")) == SAVED_RESPONSES * 2
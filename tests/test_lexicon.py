@@ -0,0 +1,169 @@
+import os
+import sys
+import pytest
+# Add the project root to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from mtm.mtm.configs.schemas import PoeticRulesMetricsConfig
+from mtm.mtm.processes.lexicon import get_lexicon, clear_lexicon_registry, load_lexicon
+from mtm.mtm.processes.poetic_score import RhymesTonesMetrics
+from mtm.mtm.processes.poetic_rule import PoeticRules
+
+# Small synthetic lexicon with the same layout as the real assets
+ASSETS_PATH = os.path.join(current_dir, "assets")
+LEXICON_PATHS = {
+    "vowels_dict_path": os.path.join(ASSETS_PATH, "start_vowels.txt"),
+    "rhyme_dict_path": os.path.join(ASSETS_PATH, "rhymes.txt"),
+    "tone_dict_path": os.path.join(ASSETS_PATH, "tone_dict.txt"),
+    "dictionary_path": os.path.join(ASSETS_PATH, "words.txt"),
+    "special_tone_dict_path": os.path.join(ASSETS_PATH, "vocab_dupple_check.txt"),
+}
+
+
+def test_lexicon_is_loaded_once():
+    clear_lexicon_registry()
+    metrics = RhymesTonesMetrics(PoeticRulesMetricsConfig(**LEXICON_PATHS))
+    rules = PoeticRules(**LEXICON_PATHS)
+
+    assert metrics.lexicon is rules.lexicon
+    assert get_lexicon(**LEXICON_PATHS) is metrics.lexicon
+
+
+def test_lexicon_is_immutable():
+    lexicon = get_lexicon(**LEXICON_PATHS)
+
+    with pytest.raises(AttributeError):
+        lexicon.rhymes_dict = {}
+
+
+def test_lexicon_reloads_on_mtime_change(tmp_path):
+    paths = {}
+    for key, path in LEXICON_PATHS.items():
+        target = tmp_path / os.path.basename(path)
+        target.write_bytes(open(path, "rb").read())
+        paths[key] = str(target)
+
+    first = get_lexicon(**paths)
+    assert get_lexicon(**paths) is first
+
+    stat = os.stat(paths["tone_dict_path"])
+    os.utime(paths["tone_dict_path"], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert get_lexicon(**paths) is not first
+
+
+def test_bundle_matches_text_assets(tmp_path):
+    from mtm.mtm.processes.lexicon_bundle import build_lexicon_bundle, load_lexicon_bundle
+
+    bundle_path = build_lexicon_bundle(bundle_path=str(tmp_path / "lexicon.bin"), **LEXICON_PATHS)
+    text_lexicon = get_lexicon(**LEXICON_PATHS)
+    mapped_lexicon = load_lexicon_bundle(bundle_path)
+
+    for rime, values in text_lexicon.rhymes_dict.items():
+        assert sorted(mapped_lexicon.rhymes_dict[rime]) == sorted(values)
+    with pytest.raises(KeyError):
+        mapped_lexicon.rhymes_dict["not-a-rime"]
+
+    assert list(mapped_lexicon.dictionary_vi) == list(text_lexicon.dictionary_vi)
+    assert mapped_lexicon.dictionary_vi.within_distance("lá", 1) == text_lexicon.dictionary_vi.within_distance("lá", 1)
+
+    assert mapped_lexicon.tone_dict == text_lexicon.tone_dict
+    assert mapped_lexicon.even_chars == text_lexicon.even_chars
+
+
+def test_metrics_score_from_bundle(tmp_path):
+    from mtm.mtm.processes.lexicon_bundle import build_lexicon_bundle
+
+    bundle_path = build_lexicon_bundle(bundle_path=str(tmp_path / "lexicon.bin"), **LEXICON_PATHS)
+    text_metrics = RhymesTonesMetrics(PoeticRulesMetricsConfig(**LEXICON_PATHS))
+    mapped_metrics = RhymesTonesMetrics(
+        PoeticRulesMetricsConfig(lexicon_bundle_path=bundle_path, **LEXICON_PATHS)
+    )
+    poem = "cởi trời xanh cởi đất nâu\ngió mây hờn dỗi bạc nâu nhớ nhung\nbạc đầu tóc trắng da nhung\ncõi tình thế giới ai nhung lưng sầu"
+
+    for tag in ("68", "78", "00"):
+        assert mapped_metrics.calculate_score(poem, tag) == text_metrics.calculate_score(poem, tag)
+
+
+def test_syllable_analysis_is_memoized():
+    lexicon = load_lexicon(*LEXICON_PATHS.values())
+
+    syllable = lexicon.analyze("lá")
+    assert (syllable.onset, syllable.rime, syllable.tone_class, syllable.tone) == ("l", "á", "sac", "uneven")
+    assert lexicon.analyze("lá") is syllable
+    assert lexicon.analyze("mùa").tone == "even"
+
+    info = lexicon.cache_info()
+    assert (info["hits"], info["misses"], info["size"]) == (1, 2, 2)
+
+
+def test_rule_checkers_share_syllable_cache():
+    metrics = RhymesTonesMetrics(PoeticRulesMetricsConfig(**LEXICON_PATHS))
+    rules = PoeticRules(**LEXICON_PATHS)
+    metrics.get_tone("gió")
+    hits = metrics.lexicon.cache_info()["hits"]
+
+    assert rules.get_tone("gió") == metrics.get_tone("gió")
+    assert rules.lexicon.cache_info()["hits"] == hits + 2
+
+
+def test_rhyme_check_uses_rime_ids(tmp_path):
+    from mtm.mtm.processes.lexicon import UNKNOWN_RIME_ID
+    from mtm.mtm.processes.lexicon_bundle import build_lexicon_bundle, load_lexicon_bundle
+
+    bundle_path = build_lexicon_bundle(bundle_path=str(tmp_path / "lexicon.bin"), **LEXICON_PATHS)
+    for lexicon in (load_lexicon(*LEXICON_PATHS.values()), load_lexicon_bundle(bundle_path)):
+        for rime, values in lexicon.rhymes_dict.items():
+            rime_id = lexicon.analyze(rime).rime_id
+            for other in lexicon.rime_ids:
+                assert lexicon.rhymes(rime_id, lexicon.rime_ids[other]) == (other in values)
+
+        assert lexicon.analyze("123").rime_id == UNKNOWN_RIME_ID
+        assert lexicon.rhymes(UNKNOWN_RIME_ID, lexicon.analyze("mùa").rime_id) is None
+
+
+def test_unknown_rime_is_not_an_error(capsys):
+    metrics = RhymesTonesMetrics(PoeticRulesMetricsConfig(**LEXICON_PATHS))
+
+    assert metrics.compare("x2", "mùa") is None
+    assert metrics.compare("mùa", "x2") is False
+    assert capsys.readouterr().out == ""
+
+
+def test_dictionary_trie_queries():
+    from mtm.mtm.processes.trie import build_word_trie
+
+    trie = build_word_trie(["lá", "là", "lả", "lúa", "mùa", "mùa thu", "lá"])
+    assert len(trie) == 6
+    assert list(trie) == sorted(["lá", "là", "lả", "lúa", "mùa", "mùa thu"])
+    assert "mùa" in trie and "mùa thu" in trie
+    assert "mù" not in trie and "" not in trie and None not in trie
+    assert "123" not in trie and "..." not in trie
+
+    assert trie.prefix("mùa") == ["mùa", "mùa thu"]
+    assert trie.prefix("l", limit=2) == sorted(["lá", "là", "lả", "lúa"])[:2]
+    assert trie.prefix("x") == []
+
+    assert trie.within_distance("lá", 0) == [("lá", 0)]
+    assert trie.within_distance("la", 1) == [("là", 1), ("lá", 1), ("lúa", 1), ("lả", 1)]
+    assert trie.within_distance("lúa", 1) == [("lúa", 0)]
+    assert trie.within_distance("lúa", 2) == [("lúa", 0), ("là", 2), ("lá", 2), ("lả", 2), ("mùa", 2)]
+    assert trie.within_distance("123", 1) == []
+
+
+def test_spelling_check_counts_digits_and_punctuation():
+    metrics = RhymesTonesMetrics(PoeticRulesMetricsConfig(**LEXICON_PATHS))
+    lexicon = metrics.lexicon
+    assert "123" not in lexicon.dictionary_vi
+    assert all(word in lexicon.dictionary_vi for word in ("bay", "ai"))
+
+    # Used to raise KeyError on the first char '1' and score 0
+    from mtm.mtm.processes.stanza import Stanza
+    stanza = Stanza("bay 123 ai ...", lexicon)
+    errors = []
+    total, recommend = metrics.check_spelling_vietnamese(stanza, errors, {})
+    assert total == 2
+    assert [(error.line, error.position, error.actual) for error in errors] == [(0, 1, "123"), (0, 3, "...")]
+    assert all(isinstance(candidates, list) for candidates in recommend.values())
@@ -0,0 +1,224 @@
+import os
+import sys
+import json
+import time
+# Add the project root to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from mtm.mtm.configs.schemas import OpenRouterModelConfig
+from mtm.mtm.models.completion import ChatCompletion, parse_completion
+from mtm.mtm.models.open_router_deepseek import OpenRouterModel
+from mtm.mtm.models.retry import RetryPolicy, parse_retry_after
+from fake_openrouter import FakeOpenRouter, POEM, completion_body, poems_content
+
+
+def test_calls_share_one_keep_alive_connection():
+    with FakeOpenRouter() as server:
+        config = OpenRouterModelConfig(OPENROUTER_BASE_URL=server.url, OPENROUTER_API_KEY="sk-test")
+        with OpenRouterModel(config) as model:
+            for _ in range(5):
+                content, attempts = model.calling_model("bài thơ")
+                assert json.loads(content)["responses"][0]["poem_number"] == 1
+                assert attempts == 1
+            stats = model.transport_stats()
+
+    assert server.connections == 1
+    assert stats["calls"] == 5
+    assert stats["connections_opened"] == 1
+    assert stats["reused_connections"] == 4
+    assert 0 < stats["max_seconds"] <= stats["seconds"]
+    assert server.requests[0]["messages"][1] == {"role": "user", "content": "bài thơ"}
+
+
+def test_keep_alive_can_be_turned_off():
+    with FakeOpenRouter() as server:
+        config = OpenRouterModelConfig(OPENROUTER_BASE_URL=server.url, KEEP_ALIVE=False)
+        with OpenRouterModel(config) as model:
+            for _ in range(3):
+                model.calling_model("bài thơ")
+            stats = model.transport_stats()
+
+    assert server.connections == 3
+    assert stats["connections_opened"] == 3
+    assert stats["reused_connections"] == 0
+
+
+def test_throttled_call_waits_for_retry_after():
+    with FakeOpenRouter() as server:
+        server.queue(429, {"error": {"code": 429}}, {"Retry-After": "0.3"})
+        config = OpenRouterModelConfig(OPENROUTER_BASE_URL=server.url, BACKOFF_BASE=0.01)
+        with OpenRouterModel(config) as model:
+            start = time.perf_counter()
+            content, attempts = model.calling_model("bài thơ")
+            elapsed = time.perf_counter() - start
+            stats = model.transport_stats()
+
+    assert content is not None and attempts == 2
+    assert elapsed >= 0.3
+    assert stats["retries"] == 1
+    assert stats["retry_wait_seconds"] >= 0.3
+    assert stats["status_counts"] == {429: 1, 200: 1}
+
+
+def test_errors_that_can_not_fix_themselves_are_not_retried():
+    with FakeOpenRouter() as server:
+        server.queue(401, {"error": {"message": "No auth credentials found"}})
+        with OpenRouterModel(OpenRouterModelConfig(OPENROUTER_BASE_URL=server.url)) as model:
+            assert model.calling_model("bài thơ") == (None, 1)
+            assert model.transport_stats()["failed_prompts"] == 1
+    assert len(server.requests) == 1
+
+
+def test_retries_stop_at_the_attempt_cap_and_the_deadline():
+    with FakeOpenRouter() as server:
+        for _ in range(3):
+            server.queue(503)
+        config = OpenRouterModelConfig(OPENROUTER_BASE_URL=server.url, MAX_ATTEMPTS=3, BACKOFF_BASE=0.01)
+        with OpenRouterModel(config) as model:
+            assert model.calling_model("bài thơ") == (None, 3)
+        assert len(server.requests) == 3
+
+        # Retry-After beyond the deadline: no point in waiting for it
+        server.queue(429, {}, {"Retry-After": "5"})
+        config = OpenRouterModelConfig(OPENROUTER_BASE_URL=server.url, RETRY_DEADLINE=1.0)
+        with OpenRouterModel(config) as model:
+            start = time.perf_counter()
+            assert model.calling_model("bài thơ") == (None, 1)
+            assert time.perf_counter() - start < 1.0
+
+
+def test_network_errors_are_retried():
+    with FakeOpenRouter() as server:
+        url = server.url
+    # The server is closed: every connection is refused
+    config = OpenRouterModelConfig(OPENROUTER_BASE_URL=url, MAX_ATTEMPTS=3, BACKOFF_BASE=0.01)
+    with OpenRouterModel(config) as model:
+        assert model.calling_model("bài thơ") == (None, 3)
+        stats = model.transport_stats()
+    assert stats["status_counts"] == {"ConnectionError": 3}
+    assert stats["retries"] == 2
+
+
+def test_retry_policy():
+    policy = RetryPolicy(max_attempts=4, base_delay=0.5, max_delay=3.0, deadline=60.0)
+    for attempt in range(1, 8):
+        assert 0 <= policy.backoff(attempt) <= min(3.0, 0.5 * 2 ** (attempt - 1))
+    assert policy.backoff(1, retry_after=10.0) == 10.0
+    started = time.monotonic()
+    assert policy.next_wait(3, started) is not None
+    assert policy.next_wait(4, started) is None
+    assert policy.next_wait(1, started, retry_after=120.0) is None
+
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert 0 <= parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+def test_reasoning_is_dropped_unless_kept():
+    body = completion_body(poems_content(["câu thơ"]), reasoning="suy nghĩ " * 1000)
+    body["choices"][0]["message"]["reasoning_details"] = [{"type": "reasoning.text", "text": "..."}]
+    with FakeOpenRouter() as server:
+        server.queue(200, body)
+        server.queue(200, body)
+        with OpenRouterModel(OpenRouterModelConfig(OPENROUTER_BASE_URL=server.url)) as model:
+            content, _ = model.calling_model("bài thơ")
+            # The raw response is replaced by the validated answer
+            assert isinstance(model.response, ChatCompletion)
+            assert model.response.reasoning is None
+            assert model.response.finish_reason == "stop"
+            assert json.loads(content)["responses"][0]["poem_text"] == "câu thơ"
+        config = OpenRouterModelConfig(OPENROUTER_BASE_URL=server.url, KEEP_REASONING=True)
+        with OpenRouterModel(config) as model:
+            model.calling_model("bài thơ")
+            assert model.response.reasoning == "suy nghĩ " * 1000
+
+
+def test_parse_completion_checks_the_answer():
+    good = json.dumps(completion_body('```json\n{"responses": []}\n```')).encode("utf-8")
+    completion, error_msg = parse_completion(200, good)
+    assert error_msg is None and completion.content.startswith("```json")
+
+    for status, body in [
+        (200, b""),
+        (200, b"<html>"),
+        (200, b'{"id": "gen"}'),
+        (200, b'{"choices": []}'),
+        (200, b'{"choices": [{"index": 0}]}'),
+        (200, b'{"choices": [{"message": {"content": null}}]}'),
+        (200, json.dumps(completion_body("Here are the poems")).encode("utf-8")),
+        (503, good),
+    ]:
+        completion, error_msg = parse_completion(status, body)
+        assert completion is None and "error_msg" in error_msg
+
+
+def test_stream_gives_poems_as_they_are_generated():
+    with FakeOpenRouter(stream_delay=0.01, chunk_size=8) as server:
+        with OpenRouterModel(OpenRouterModelConfig(OPENROUTER_BASE_URL=server.url)) as model:
+            stream = model.stream_poems("bài thơ")
+            first = next(stream)
+            # The first poem comes while the rest of the answer is still being sent
+            assert first == {"poem_number": 1, "poem_text": "bài thơ"}
+            assert [poem["poem_text"] for poem in stream] == [POEM, POEM]
+            assert model.attempts == 1
+            # The sync calls still wait for the whole body
+            content, _ = model.calling_model("bài thơ")
+            assert json.loads(content)["responses"][0]["poem_text"] == "bài thơ"
+    assert server.requests[0]["stream"] is True and server.requests[1]["stream"] is False
+    assert server.streams_dropped == 0
+
+
+def test_stream_is_asked_again_until_it_gives_a_poem():
+    with FakeOpenRouter() as server:
+        server.queue(503)
+        server.queue(200, completion_body("no json here"))
+        config = OpenRouterModelConfig(OPENROUTER_BASE_URL=server.url, BACKOFF_BASE=0.01)
+        with OpenRouterModel(config) as model:
+            assert [poem["poem_number"] for poem in model.stream_poems("bài thơ")] == [1, 2, 3]
+            assert model.attempts == 3
+            assert model.transport_stats()["status_counts"] == {503: 1, 200: 2}
+
+
+def test_a_stream_cut_in_the_middle_of_a_poem_is_read_again_from_scratch():
+    with FakeOpenRouter(chunk_size=8) as server:
+        # Cut inside the string of the first poem: {"responses": [{"poem_number": 1, "poem_text": "
+        server.queue(200, completion_body(poems_content(["bài thơ", POEM, POEM])), cut_after=6)
+        config = OpenRouterModelConfig(OPENROUTER_BASE_URL=server.url, BACKOFF_BASE=0.01)
+        with OpenRouterModel(config) as model:
+            assert [poem["poem_text"] for poem in model.stream_poems("bài thơ")] == ["bài thơ", POEM, POEM]
+            assert model.attempts == 2
+    assert len(server.requests) == 2
+
+
+def test_top_k_stops_reading_the_stream_at_a_perfect_poem():
+    from mtm.main import calculate_top_k
+    from mtm.mtm.configs.schemas import PoeticRulesMetricsConfig
+    from mtm.mtm.processes.poetic_score import RhymesTonesMetrics
+    from test_lexicon import LEXICON_PATHS
+    from test_stanza import BROKEN_LUC_BAT, LUC_BAT
+
+    metrics = RhymesTonesMetrics(PoeticRulesMetricsConfig(**LEXICON_PATHS))
+    candidates = [BROKEN_LUC_BAT, LUC_BAT] + [BROKEN_LUC_BAT] * 20
+    with FakeOpenRouter(stream_delay=0.02, chunk_size=32) as server:
+        server.queue(200, completion_body(poems_content(candidates)))
+        with OpenRouterModel(OpenRouterModelConfig(OPENROUTER_BASE_URL=server.url)) as model:
+            start = time.perf_counter()
+            results = calculate_top_k(poem_inputs=model.stream_poems("bài thơ"), metrics=metrics, tag="68", k=1)
+            elapsed = time.perf_counter() - start
+            assert model.transport_stats()["failed_prompts"] == 0
+
+        # The server notices the dropped connection at its next write
+        deadline = time.monotonic() + 2
+        while not server.streams_dropped and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert server.streams_dropped == 1
+
+    assert results["corrected_poem"] == LUC_BAT and results["corrected_score"] == 100.0
+    assert [poem["poem_number"] for poem in results["responses"]] == [1, 2]
+    assert results["responses"][0]["score"] < 100.0
+    # The whole answer takes len(body) / 32 * 0.02s to be sent
+    full = len(poems_content(candidates)) / 32 * 0.02
+    assert elapsed < full / 3
@@ -0,0 +1,25 @@
+import os
+import sys
+# Add the project root to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from mtm.mtm.configs.schemas import ParallelScoringConfig, PoeticRulesMetricsConfig
+from mtm.mtm.processes.parallel_score import ParallelScorer
+from mtm.mtm.processes.poetic_score import RhymesTonesMetrics
+from test_lexicon import LEXICON_PATHS
+from test_stanza import BROKEN_LUC_BAT, LUC_BAT, STANZA
+
+
+def test_parallel_scores_come_back_in_input_order():
+    metrics_config = PoeticRulesMetricsConfig(**LEXICON_PATHS)
+    metrics = RhymesTonesMetrics(metrics_config)
+    poems = [LUC_BAT, BROKEN_LUC_BAT, STANZA, LUC_BAT + "\n\n" + BROKEN_LUC_BAT] * 5
+    expected = [metrics.calculate_score(poem, "68") for poem in poems]
+
+    with ParallelScorer(ParallelScoringConfig(metrics_config=metrics_config, workers=2, chunk_size=3)) as scorer:
+        assert scorer.score_batch(poems, "68").scores.tolist() == expected
+        # A single chunk is scored in the calling process
+        assert scorer.calculate_score(BROKEN_LUC_BAT, "68") == expected[1]
+        assert scorer.throughput()["poems"] == len(poems) + 1
@@ -1,6 +1,19 @@
-if __name__ == "__main__":
-        
-    response = """```json
+import os
+import sys
+import json
+import pytest
+# Add the project root to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from mtm.mtm.models.completion import iter_stream_content
+from mtm.mtm.utils.parse_json import PoemStreamParser, ResponseParseError, extract_poems, parse_lenient_json
+
+# Answers seen from the models, kept as they came (raw newlines inside the strings)
+
+# Fenced, each line of a poem a string piece joined with +
+FENCED_PLUS_RESPONSE = """```json
         {
             "responses": [
                 {
@@ -62,7 +75,9 @@ if __name__ == "__main__":
         }
         ```
     """
-    response = """
+
+# Bare JSON, raw newlines in the poems
+RAW_NEWLINE_RESPONSE = """
     {
         "responses": [
             {
@@ -89,23 +104,113 @@ if __name__ == "__main__":
     }
     """
 
-    import re
-    import json
-
-    if response.startswith("```"):
-        match = re.search(r'```json\s*(.*?)```', response, re.DOTALL)
-        if match:
-            response = match.group(1).strip()
-    def clean_json_string(bad_json):
-        # Remove all `+` signs
-        cleaned = re.sub(r'\s*\+\s*', '', bad_json)
-        return cleaned
-    response = clean_json_string(response)
-    response = response.replace('""', '')
-    # This regex will handle newlines inside the values
-    response = re.sub(r'(?<=: ")(.*?)(?=")', lambda m: m.group(0).replace('\n', '\\n'), response, flags=re.DOTALL)
-
-    # Replace
-    print(response) 
-
-    json_response = json.loads(response)
+
+def test_fenced_answer_with_plus_joined_strings():
+    poems = extract_poems(FENCED_PLUS_RESPONSE)
+    assert [poem["poem_number"] for poem in poems] == [1, 2, 3, 4, 5]
+    lines = poems[0]["poem_text"].split("\n")
+    assert lines[0] == "cởi trời xanh cởi đất nâu"
+    assert lines[7] == "khi ta không giận không lời dối gian"
+    assert len(lines) == 8
+    assert poems[2]["poem_text"].split("\n")[3] == "không còn nhung nhớ mong cầu trời dư"
+
+
+def test_answer_with_raw_newlines():
+    poems = extract_poems(RAW_NEWLINE_RESPONSE)
+    assert len(poems) == 5
+    assert poems[4]["poem_text"].split("\n")[3] == " hồng hồng đôi má non thơm say mây"
+    # The same poems as json.loads accepting control chars in strings
+    expected = json.loads(RAW_NEWLINE_RESPONSE, strict=False)["responses"]
+    assert poems == expected
+
+
+def test_valid_json_gives_what_json_loads_gives():
+    answer = {
+        "responses": [
+            {"poem_number": 1, "poem_text": "dòng \"một\"\nmùa thu \\ lá \u0111\u1ecf \ud83c\udf42", "score": -1.5e2},
+            {"poem_number": 2, "poem_text": "a\tb", "tags": [True, False, None]},
+        ]
+    }
+    for text in (json.dumps(answer), json.dumps(answer, ensure_ascii=False, indent=4)):
+        assert parse_lenient_json(text) == json.loads(text)
+
+
+def test_prose_trailing_commas_and_missing_commas():
+    text = """Here are the corrected poems [as asked]:
+    {
+        "responses": [
+            {"poem_number": 1, "poem_text": "câu một",},
+            {"poem_number": 2, "poem_text": ["câu hai", "câu ba"]}
+            {"poem_number": 3, "poem_text": ""},
+            {"poem_number": 4, "poem_text": 'x'}
+        ],
+    }
+    Hope this helps!"""
+    with pytest.raises(ResponseParseError):
+        # Single-quoted strings are not JSON
+        extract_poems(text)
+    poems = extract_poems(text.replace(", 'x'", ', "câu bốn"').replace("'x'", '"câu bốn"'))
+    assert [(poem["poem_number"], poem["poem_text"]) for poem in poems] == [
+        (1, "câu một"), (2, "câu hai\ncâu ba"), (4, "câu bốn")
+    ]
+
+
+def test_answer_cut_by_max_tokens_keeps_the_complete_poems():
+    cut = RAW_NEWLINE_RESPONSE[:RAW_NEWLINE_RESPONSE.index("đong thơm say mây")]
+    poems = extract_poems(cut)
+    assert [poem["poem_number"] for poem in poems] == [1]
+
+    with pytest.raises(ResponseParseError):
+        extract_poems(RAW_NEWLINE_RESPONSE[:200])
+
+
+def test_answers_without_poems_are_rejected():
+    for text in ("", "Sorry, I can not help with that.", '{"error": "rate limited"}', '{"responses": []}',
+                 '{"responses": [{"poem_number": 1}]}'):
+        with pytest.raises(ResponseParseError):
+            extract_poems(text)
+
+
+def test_parsing_is_linear():
+    import time
+
+    def seconds(copies):
+        # Answers glued together without commas: one list of copies * 5 poems
+        text = "[" + RAW_NEWLINE_RESPONSE * copies + "]"
+        start = time.perf_counter()
+        assert len(parse_lenient_json(text)) == copies
+        return time.perf_counter() - start
+
+    assert seconds(400) < 20 * max(seconds(40), 1e-3)
+
+
+@pytest.mark.parametrize("size", [1, 7, 50, 10000])
+def test_stream_parser_gives_each_poem_as_its_object_closes(size):
+    for response in (FENCED_PLUS_RESPONSE, RAW_NEWLINE_RESPONSE):
+        parser = PoemStreamParser()
+        received = []
+        for start in range(0, len(response), size):
+            piece = response[start:start + size]
+            poems = parser.feed(piece)
+            # A poem is given by the piece holding the } of its object, not later
+            if poems and size == 1:
+                assert piece == "}"
+            received.extend(poems)
+        assert received == extract_poems(response)
+        assert parser.count == len(received)
+
+
+def test_stream_content_of_server_sent_events():
+    lines = [
+        b": OPENROUTER PROCESSING",
+        b"",
+        b'data: {"choices": [{"delta": {"role": "assistant", "content": ""}}]}',
+        'data: {"choices": [{"delta": {"content": "{\\"responses\\"", "reasoning": "..."}}]}'.encode("utf-8"),
+        b'data: {"choices": [{"delta": {"content": ": []}"}}]}',
+        b"data: [DONE]",
+        b'data: {"choices": [{"delta": {"content": "after the end"}}]}',
+    ]
+    assert list(iter_stream_content(lines)) == ['{"responses"', ": []}"]
+
+    with pytest.raises(ValueError):
+        list(iter_stream_content(['data: {"error": {"message": "Provider returned error"}}']))
@@ -0,0 +1,137 @@
+import os
+import sys
+import time
+import asyncio
+import random
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+# Add the project root to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from mtm.mtm.models.concurrency import RateLimiter
+from mtm.mtm.utils.pipeline import Stage, StagedPipeline
+
+
+def test_stages_run_concurrently_and_the_writer_gets_input_order():
+    written = []
+
+    def mask(item):
+        time.sleep(0.01)
+        return item * 10
+
+    async def fill(item):
+        # Answers come back in any order
+        await asyncio.sleep(random.uniform(0.0, 0.05))
+        return item + 1
+
+    pipeline = StagedPipeline([
+        Stage("mask", mask, workers=4, executor=ThreadPoolExecutor(4)),
+        Stage("fill", fill, workers=8),
+        Stage("persist", written.append, ordered=True),
+    ], queue_size=4, report_every=0)
+    start = time.perf_counter()
+    stats = asyncio.run(pipeline.run(range(40)))
+    elapsed = time.perf_counter() - start
+
+    assert written == [i * 10 + 1 for i in range(40)]
+    assert stats["items"] == 40
+    assert {name: stage["items"] for name, stage in stats["stages"].items()} == {"mask": 40, "fill": 40, "persist": 40}
+    # Sequentially: 40 * (0.01 + 0.025 on average)
+    assert elapsed < 40 * 0.035 / 3
+    assert pipeline.progress().startswith("40/40 done")
+
+
+def test_a_slow_stage_holds_the_faster_ones_back():
+    masked = []
+    in_flight = []
+
+    def mask(item):
+        masked.append(item)
+        return item
+
+    async def persist(item):
+        # Items masked but not persisted yet: bounded by the queues and the workers
+        in_flight.append(len(masked) - item)
+        await asyncio.sleep(0.005)
+
+    asyncio.run(StagedPipeline([
+        Stage("mask", mask, workers=2),
+        Stage("persist", persist),
+    ], queue_size=3, report_every=0).run(range(30)))
+
+    assert max(in_flight) <= 3 + 2 + 1 + 1
+
+
+def test_a_failing_item_goes_through_as_a_failure_and_the_run_goes_on():
+    written, errors = [], []
+
+    async def fill(item):
+        if item == 5:
+            raise ValueError("bad answer")
+        return item
+
+    pipeline = StagedPipeline(
+        [Stage("fill", fill, workers=3), Stage("score", lambda item: item * 2), Stage("persist", written.append, ordered=True)],
+        report_every=0,
+        on_error=lambda stage, value, error: errors.append((stage, value, str(error)))
+    )
+    stats = asyncio.run(pipeline.run(range(20)))
+
+    # The failure is passed on, never handed to the functions of the next stages
+    assert written == [i * 2 for i in range(20) if i != 5]
+    assert errors == [("fill", 5, "bad answer")]
+    assert stats["items"] == 20 and stats["failed"] == 1
+    assert stats["stages"]["fill"]["failed"] == 1 and stats["stages"]["score"]["items"] == 19
+
+    # fail_fast: the first error stops the run
+    with pytest.raises(ValueError, match="bad answer"):
+        asyncio.run(StagedPipeline([Stage("fill", fill, workers=3), Stage("persist", print)], report_every=0,
+                                   fail_fast=True).run(range(20)))
+
+
+def test_a_slow_item_bounds_what_the_ordered_stage_holds_back():
+    done_before_first = []
+
+    async def fill(item):
+        # The first item comes back long after the others, which wait for it in the writer
+        if item == 0:
+            await asyncio.sleep(0.2)
+            done_before_first.append(len(finished))
+        else:
+            await asyncio.sleep(0.001)
+        finished.append(item)
+        return item
+
+    finished = []
+    written = []
+    stats = asyncio.run(StagedPipeline(
+        [Stage("fill", fill, workers=8), Stage("persist", written.append, ordered=True)],
+        queue_size=2,
+        report_every=0,
+        reorder_window=10
+    ).run(range(100)))
+
+    assert stats["items"] == 100 and written == list(range(100))
+    # Only the items of the window are fed (and held back) while the first one is late
+    assert done_before_first == [9]
+
+
+def test_token_bucket_allows_a_burst_then_keeps_the_pace():
+    async def starts(limiter, count):
+        loop = asyncio.get_running_loop()
+        origin = loop.time()
+        times = []
+        for _ in range(count):
+            await limiter.wait()
+            times.append(loop.time() - origin)
+        return times
+
+    # 600 a minute: one every 0.1s, 3 saved up
+    times = asyncio.run(starts(RateLimiter(600, burst=3), 6))
+    assert times[2] < 0.05
+    assert times[5] >= 0.29
+    # burst=1 spaces every start
+    times = asyncio.run(starts(RateLimiter(600), 3))
+    assert times[1] >= 0.09 and times[2] >= 0.19
@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+import asyncio
+import pytest
+# Add the project root to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from mtm.mtm.configs.schemas import OpenRouterModelConfig
+from mtm.mtm.models.open_router_deepseek import OpenRouterModel
+from mtm.mtm.models.response_cache import ResponseCache, cache_key
+from fake_openrouter import FakeOpenRouter, POEM
+
+
+def test_key_depends_on_what_the_answer_depends_on():
+    key = cache_key("deepseek/deepseek-r1", "system", 0.8, "bài thơ")
+    assert key == cache_key("deepseek/deepseek-r1", "system", 0.8, "bài thơ")
+    assert len({
+        key,
+        cache_key("qwen/qwq-32b", "system", 0.8, "bài thơ"),
+        cache_key("deepseek/deepseek-r1", "other system", 0.8, "bài thơ"),
+        cache_key("deepseek/deepseek-r1", "system", 1.5, "bài thơ"),
+        cache_key("deepseek/deepseek-r1", "system", 0.8, "bài thơ khác"),
+    }) == 5
+
+
+def test_answers_expire_and_the_least_recently_used_are_evicted(tmp_path):
+    path = str(tmp_path / "cache" / "responses.sqlite")
+    with ResponseCache(path, ttl=0.2) as cache:
+        cache.put("a", "câu thơ")
+        assert cache.get("a") == "câu thơ"
+        time.sleep(0.3)
+        assert cache.get("a") is None and len(cache) == 0
+
+    with ResponseCache(path, max_bytes=25) as cache:
+        for key in "abc":
+            cache.put(key, "x" * 10)
+            time.sleep(0.01)
+        # a and b fit, c does not: a, the least recently used, goes
+        assert cache.get("a") is None and len(cache) == 2
+        cache.get("b")
+        cache.put("d", "x" * 10)
+        assert cache.get("c") is None and cache.get("b") == "x" * 10
+        stats = cache.stats()
+    assert stats["evictions"] == 2 and stats["entries"] == 2 and stats["bytes"] == 20
+
+    # Persisted across runs
+    with ResponseCache(path) as cache:
+        assert cache.get("d") == "x" * 10
+
+
+def test_model_sends_a_prompt_once_across_runs(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    with FakeOpenRouter() as server:
+        config = OpenRouterModelConfig(OPENROUTER_BASE_URL=server.url, CACHE_PATH=path)
+        with OpenRouterModel(config) as model:
+            first = model.calling_model("bài thơ")
+            assert first[1] == 1
+            assert model.calling_model("bài thơ") == (first[0], 0)
+        with OpenRouterModel(config) as model:
+            assert model.calling_model("bài thơ") == (first[0], 0)
+            # The streamed answer is stored once read to its end, and given back as poems
+            assert [poem["poem_text"] for poem in model.stream_poems("bài thơ khác")] == ["bài thơ khác", POEM, POEM]
+            assert [poem["poem_text"] for poem in model.stream_poems("bài thơ khác")] == ["bài thơ khác", POEM, POEM]
+            assert model.attempts == 0
+            assert model.cache.stats()["hits"] == 2
+        assert len(server.requests) == 2
+
+        # A new temperature is a new answer
+        config = OpenRouterModelConfig(OPENROUTER_BASE_URL=server.url, CACHE_PATH=path, TEMPERATURE=0.1)
+        with OpenRouterModel(config) as model:
+            assert model.calling_model("bài thơ")[1] == 1
+        assert len(server.requests) == 3
+
+
+def test_cache_only_mode_never_calls_the_model(tmp_path):
+    pytest.importorskip("httpx")
+    from mtm.mtm.models.async_open_router import AsyncOpenRouterModel
+
+    path = str(tmp_path / "responses.sqlite")
+    with FakeOpenRouter() as server:
+        with OpenRouterModel(OpenRouterModelConfig(OPENROUTER_BASE_URL=server.url, CACHE_PATH=path)) as model:
+            content, _ = model.calling_model("một")
+
+        config = OpenRouterModelConfig(OPENROUTER_BASE_URL=server.url, CACHE_PATH=path, CACHE_ONLY=True)
+        with OpenRouterModel(config) as model:
+            assert model.calling_model("hai") == (None, 0)
+            assert list(model.stream_poems("hai")) == []
+
+        async def run():
+            async with AsyncOpenRouterModel(config) as model:
+                return await model.fill_many(["một", "hai"])
+
+        assert asyncio.run(run()) == [(content, 0), (None, 0)]
+    assert len(server.requests) == 1
@@ -0,0 +1,146 @@
+import os
+import sys
+import json
+import asyncio
+# Add the project root to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from mtm.mtm.utils.pipeline import Stage, StagedPipeline
+from mtm.mtm.utils.run_manifest import RunManifest
+from test_stanza import BROKEN_LUC_BAT, LUC_BAT
+
+
+def test_a_resumed_manifest_gives_back_the_last_stage_of_every_row(tmp_path):
+    path = str(tmp_path / "run_manifest.jsonl")
+    with RunManifest(path, run={"model": "deepseek/deepseek-r1"}) as manifest:
+        manifest.record(0, LUC_BAT, "mask", {"user_prompt": "prompt 0"})
+        manifest.record(0, LUC_BAT, "fill", {"responses": [{"poem_text": LUC_BAT}]})
+        manifest.record(1, BROKEN_LUC_BAT, "mask", {"user_prompt": "prompt 1"})
+
+    with RunManifest(path, resume=True) as manifest:
+        assert manifest.run["model"] == "deepseek/deepseek-r1"
+        assert manifest.checkpoint(0, LUC_BAT) == {
+            "row": 0,
+            "input_hash": manifest.rows[0]["input_hash"],
+            "stage": "fill",
+            "user_prompt": "prompt 0",
+            "responses": [{"poem_text": LUC_BAT}],
+        }
+        assert manifest.checkpoint(1, BROKEN_LUC_BAT)["stage"] == "mask"
+        # The row changed in the dataset: its checkpoint is not taken
+        assert manifest.checkpoint(1, LUC_BAT) is None
+        assert manifest.checkpoint(2, LUC_BAT) is None
+        assert manifest.summary(["mask", "fill", "score"]) == {"mask": 1, "fill": 1, "score": 0}
+
+
+def test_a_new_run_keeps_the_old_manifest_aside_and_a_cut_line_is_dropped(tmp_path):
+    path = str(tmp_path / "run_manifest.jsonl")
+    with RunManifest(path) as manifest:
+        manifest.record(0, LUC_BAT, "mask", {"user_prompt": "prompt 0"})
+    with open(path, "a", encoding="utf-8") as file:
+        file.write('{"row": 1, "input_ha')
+
+    with RunManifest(path, resume=True) as manifest:
+        assert list(manifest.rows) == [0]
+    with open(path, encoding="utf-8") as file:
+        assert all(json.loads(line) for line in file)
+
+    with RunManifest(path) as manifest:
+        assert manifest.rows == {}
+    assert os.path.exists(path + ".bak")
+    with open(path, encoding="utf-8") as file:
+        assert list(json.loads(file.readline())) == ["run"]
+
+
+def test_a_resumed_pipeline_skips_the_stages_a_row_already_passed(tmp_path):
+    path = str(tmp_path / "run_manifest.jsonl")
+    calls = []
+
+    def make_stages(fail_at=None):
+        def mask(stanza):
+            calls.append(("mask", stanza["row"]))
+            return {**stanza, "masked": stanza["poem"].upper()}
+
+        async def fill(stanza):
+            if stanza["row"] == fail_at:
+                raise RuntimeError("the run dies")
+            calls.append(("fill", stanza["row"]))
+            return {**stanza, "filled": stanza["masked"] + "!"}
+
+        return [
+            Stage("mask", mask, skip=lambda stanza: "masked" in stanza),
+            Stage("fill", fill, skip=lambda stanza: "filled" in stanza),
+            Stage("persist", lambda stanza: stanza, ordered=True),
+        ]
+
+    def run(manifest, stages, poems, fail_fast=False):
+        fields = {"mask": ("masked",), "fill": ("filled",), "persist": ()}
+        stanzas = [{**(manifest.checkpoint(row, poem) or {}), "row": row, "poem": poem} for row, poem in enumerate(poems)]
+        pipeline = StagedPipeline(
+            stages,
+            report_every=0,
+            on_result=lambda stage, stanza: manifest.record(
+                stanza["row"], stanza["poem"], stage, {field: stanza[field] for field in fields[stage]}
+            ),
+            fail_fast=fail_fast
+        )
+        return asyncio.run(pipeline.run(stanzas))
+
+    poems = ["một", "hai", "ba"]
+    with RunManifest(path) as manifest:
+        try:
+            # The process dies (fail_fast stands for a crash)
+            run(manifest, make_stages(fail_at=2), poems, fail_fast=True)
+        except RuntimeError:
+            pass
+    assert ("mask", 2) in calls and ("fill", 2) not in calls
+
+    calls.clear()
+    with RunManifest(path, resume=True) as manifest:
+        stats = run(manifest, make_stages(), poems)
+        assert manifest.checkpoint(2, "ba")["filled"] == "BA!"
+    # Only the fill of the last row is done again
+    assert calls == [("fill", 2)]
+    assert stats["stages"]["mask"]["skipped"] == 3 and stats["stages"]["fill"]["skipped"] == 2
+
+
+def test_failed_rows_are_recorded_and_left_out_after_too_many_failures(tmp_path):
+    path = str(tmp_path / "run_manifest.jsonl")
+    max_failures = 2
+
+    async def fill(stanza):
+        if stanza["poem"] == "hai":
+            raise ValueError("no poem in the answer")
+        return {**stanza, "filled": True}
+
+    def run(manifest, poems):
+        stanzas = [
+            {**(manifest.checkpoint(row, poem) or {}), "row": row, "poem": poem}
+            for row, poem in enumerate(poems)
+            if manifest.failures(row, poem) < max_failures
+        ]
+        pipeline = StagedPipeline(
+            [Stage("fill", fill, skip=lambda stanza: "filled" in stanza)],
+            report_every=0,
+            on_result=lambda stage, stanza: manifest.record(stanza["row"], stanza["poem"], stage, {"filled": True}),
+            on_error=lambda stage, stanza, error: manifest.record_failure(stanza["row"], stanza["poem"], stage, str(error))
+        )
+        return asyncio.run(pipeline.run(stanzas))
+
+    poems = ["một", "hai", "ba"]
+    with RunManifest(path) as manifest:
+        assert run(manifest, poems)["failed"] == 1
+    for runs in (1, 2):
+        with RunManifest(path, resume=True) as manifest:
+            assert manifest.failures(1, "hai") == runs
+            assert manifest.failed[1]["error"] == "no poem in the answer"
+            assert manifest.summary() == {"fill": 2, "failed": 1}
+            stats = run(manifest, poems)
+    # The third resumed run leaves the row out instead of failing on it again
+    assert stats["items"] == 2 and stats["failed"] == 0
+    with RunManifest(path, resume=True) as manifest:
+        assert manifest.failures(1, "hai") == max_failures
+        # Another input at that row starts from scratch
+        assert manifest.failures(1, "bốn") == 0
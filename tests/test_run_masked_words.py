@@ -14,8 +14,6 @@ if __name__ == "__main__":
             special_tone_dict_path = SPECIAL_TONE_DICT_PATH
         ),
         count_syllable_config = CountSyllablePoemsConfig(
-            masked_words = CS_MASKED_WORDS,
-            idx_masked_words = CS_IDX_MASKED_WORDS,
             token_masked_words = CS_TOKEN_MASKED_WORDS
         )
     )
@@ -0,0 +1,111 @@
+import os
+import sys
+import csv
+import json
+import pytest
+# Add the project root to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from mtm.mtm.utils.save_file import RESULT_FIELDS, ResultSink, input_hash
+from test_stanza import BROKEN_LUC_BAT, LUC_BAT
+
+
+def row(poem: str, score: float = 100.0) -> dict:
+    return {
+        "poem_input": poem,
+        "final_poem": poem,
+        "user_prompt": "\n\n**My poem is:**\n" + poem,
+        "time": 1.5,
+        "corrected_score": score,
+        "corrected_score_topk": score,
+        "recall_counts": 1,
+        "input_hash": input_hash(poem),
+        "responses": [{"poem_number": 1, "poem_text": poem, "score": score}],
+    }
+
+
+def read_csv(path: str) -> list:
+    with open(path, encoding="utf-8", newline="") as file:
+        return list(csv.DictReader(file))
+
+
+def test_rows_are_appended_to_jsonl_and_csv(tmp_path):
+    jsonl, table = str(tmp_path / "all_responses.jsonl"), str(tmp_path / "result.csv")
+    with ResultSink(jsonl, table, flush_every=2) as sink:
+        sink.write(row(LUC_BAT))
+        # Kept in memory until flush_every rows
+        assert os.path.getsize(jsonl) == 0
+        sink.write(row(BROKEN_LUC_BAT, 69.9))
+        assert os.path.getsize(jsonl) > 0
+        sink.write(row(LUC_BAT))
+
+    with open(jsonl, encoding="utf-8") as file:
+        lines = [json.loads(line) for line in file]
+    assert [line["poem_input"] for line in lines] == [LUC_BAT, BROKEN_LUC_BAT, LUC_BAT]
+    assert lines[1]["responses"][0]["score"] == 69.9
+
+    rows = read_csv(table)
+    assert list(rows[0]) == list(RESULT_FIELDS)
+    # Multi-line poems survive the CSV quoting, top_k is the repr of the candidates
+    assert rows[1]["poem_input"] == BROKEN_LUC_BAT
+    assert rows[1]["top_k"] == str(lines[1]["responses"])
+    assert rows[1]["corrected_score"] == "69.9"
+
+
+def test_resume_skips_what_is_written_and_drops_a_cut_line(tmp_path):
+    jsonl, table = str(tmp_path / "all_responses.jsonl"), str(tmp_path / "result.csv")
+    with ResultSink(jsonl, table, flush_every=1) as sink:
+        sink.write(row(LUC_BAT))
+        sink.write(row(BROKEN_LUC_BAT))
+    # A crash in the middle of the next write: half a JSONL line, and no CSV row
+    with open(jsonl, "a", encoding="utf-8") as file:
+        file.write(json.dumps(row("trăng khuya"))[:40])
+
+    data = [LUC_BAT, "trăng khuya", BROKEN_LUC_BAT, LUC_BAT]
+    with ResultSink(jsonl, table) as sink:
+        # The second LUC_BAT is another row of the dataset: it is still to do
+        assert sink.pending(data) == ["trăng khuya", LUC_BAT]
+        sink.write(row("trăng khuya"))
+
+    with open(jsonl, encoding="utf-8") as file:
+        assert [json.loads(line)["poem_input"] for line in file] == [LUC_BAT, BROKEN_LUC_BAT, "trăng khuya"]
+    assert [r["poem_input"] for r in read_csv(table)] == [LUC_BAT, BROKEN_LUC_BAT, "trăng khuya"]
+
+
+def test_csv_is_rebuilt_from_the_jsonl_and_an_old_result_is_kept(tmp_path):
+    jsonl, table = str(tmp_path / "all_responses.jsonl"), str(tmp_path / "result.csv")
+    # result.csv of a run before the JSONL file
+    with open(table, "w", encoding="utf-8") as file:
+        file.write("poem_input,final_poem\nold,old\n")
+    with ResultSink(jsonl, table, flush_every=1) as sink:
+        sink.write(row(LUC_BAT))
+    assert open(table + ".bak", encoding="utf-8").read() == "poem_input,final_poem\nold,old\n"
+
+    # The CSV lost its last row: it is written again from the JSONL file
+    with open(table, "r+", encoding="utf-8") as file:
+        file.truncate(len(file.readline().encode("utf-8")))
+    with ResultSink(jsonl, table):
+        pass
+    assert [r["input_hash"] for r in read_csv(table)] == [input_hash(LUC_BAT)]
+    assert os.path.exists(table + ".bak") and os.path.exists(table + ".1.bak")
+
+
+def test_compaction_to_parquet(tmp_path):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("pyarrow")
+    jsonl = str(tmp_path / "all_responses.jsonl")
+    with ResultSink(jsonl) as sink:
+        sink.write(row(LUC_BAT))
+        sink.write(row(BROKEN_LUC_BAT, 69.9))
+        path = sink.to_parquet(str(tmp_path / "all_responses.parquet"))
+    frame = pd.read_parquet(path)
+    assert frame["poem_input"].tolist() == [LUC_BAT, BROKEN_LUC_BAT]
+    assert json.loads(frame["responses"][1])[0]["score"] == 69.9
+
+    # The evaluation exports once its sink is closed
+    with ResultSink(jsonl) as sink:
+        sink.write(row(LUC_BAT, 50.0))
+    path = sink.to_parquet(str(tmp_path / "closed.parquet"))
+    assert pd.read_parquet(path)["corrected_score"].tolist() == [100.0, 69.9, 50.0]
@@ -0,0 +1,41 @@
+import os
+import sys
+# Add the project root to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from mtm.mtm.configs.schemas import PoeticRulesMetricsConfig
+from mtm.mtm.processes.poetic_score import RhymesTonesMetrics
+from test_lexicon import LEXICON_PATHS
+from test_stanza import BROKEN_LUC_BAT, LUC_BAT, STANZA
+
+THAT_NGON = "\n".join([
+    "thơ đề ba bức mực chưa phai",
+    "một gánh giang sơn một gánh sầu",
+    "tấc dạ nhớ quê lòng lại nhớ",
+    "non sông cách trở biển thêm sầu",
+])
+
+
+def test_score_batch_matches_calculate_score():
+    metrics = RhymesTonesMetrics(PoeticRulesMetricsConfig(**LEXICON_PATHS))
+    poems = [
+        LUC_BAT,
+        BROKEN_LUC_BAT,
+        LUC_BAT + "\n\n" + BROKEN_LUC_BAT,
+        STANZA,
+        THAT_NGON,
+        THAT_NGON + " thêm",
+        "\n".join(THAT_NGON.split("\n")[:3]),
+        LUC_BAT,
+    ]
+    tags = ["68", "68", "68", "68", "78", "78", "78", "00"]
+
+    batch = metrics.score_batch(poems, tags)
+    assert batch.scores.tolist() == [metrics.calculate_score(poem, tag) for poem, tag in zip(poems, tags)]
+    assert batch.rhyme_errors[1] == 2 and batch.tone_errors[1] == 1
+    assert batch.rhyme_errors[2] == 2 and batch.tone_errors[2] == 1
+
+    same_tag = metrics.score_batch([LUC_BAT, BROKEN_LUC_BAT], "68")
+    assert same_tag.scores.tolist() == batch.scores[:2].tolist()
@@ -0,0 +1,76 @@
+import os
+import random
+import sys
+import pytest
+# Add the project root to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from mtm.mtm.configs.schemas import PoeticRulesMetricsConfig
+from mtm.mtm.processes.poetic_score import RhymesTonesMetrics
+
+from test_lexicon import LEXICON_PATHS
+from test_score_batch import THAT_NGON
+from test_stanza import BROKEN_LUC_BAT, LUC_BAT
+
+
+@pytest.fixture(scope="module")
+def metrics():
+    return RhymesTonesMetrics(PoeticRulesMetricsConfig(**LEXICON_PATHS))
+
+
+def test_session_score_matches_calculate_score(metrics):
+    poems = [
+        (LUC_BAT, "68"),
+        (BROKEN_LUC_BAT, "68"),
+        (BROKEN_LUC_BAT, "00"),
+        (LUC_BAT + "\n\n" + BROKEN_LUC_BAT, "68"),
+        (THAT_NGON, "78"),
+        (THAT_NGON + " thêm", "78"),
+    ]
+    for poem, tag in poems:
+        session = metrics.score_session(poem, tag)
+        assert session.score == metrics.calculate_score(poem, tag)
+        assert session.text == poem
+
+
+def test_replace_rescores_like_calculate_score(metrics):
+    rng = random.Random(3)
+    words = [word for word in metrics.dictionary_vi if " " not in word]
+    for _ in range(60):
+        tag = rng.choice(["68", "78", "00"])
+        lengths = [6, 8] * 2 if tag != "78" else [7] * rng.choice([3, 4, 8])
+        poem = "\n".join(" ".join(rng.choice(words) for _ in range(length)) for length in lengths)
+        session = metrics.score_session(poem, tag)
+        for _ in range(10):
+            line = rng.randrange(len(session))
+            position = rng.randrange(len(session.line(line)))
+            # Word 2 of line 1 selects the tone patterns of THẤT NGÔN
+            if rng.random() < 0.2:
+                line, position = 0, 1
+            score = session.replace(line, position, rng.choice(words))
+            assert score == metrics.calculate_score(session.text, tag)
+
+
+def test_replace_updates_line_results(metrics):
+    session = metrics.score_session(BROKEN_LUC_BAT, "68")
+    before = session.tone_errors(1)
+    session.replace(1, 7, session.word(1, 7))
+    assert session.tone_errors(1) == before
+
+    session.replace(0, 1, "trời")
+    assert session.line(0)[1] == "trời"
+    assert session.score == metrics.calculate_score(session.text, "68")
+
+    with pytest.raises(ValueError):
+        session.replace(0, 1, "hai chữ")
+    with pytest.raises(IndexError):
+        session.replace(0, 6, "trời")
+
+
+def test_irregular_stanza_is_rescored_from_text(metrics):
+    poem = "cởi trời xanh cởi đất\ngió mây hờn dỗi bạc nâu nhớ nhung"
+    session = metrics.score_session(poem, "68")
+    assert session.tone_errors(0) is None
+    assert session.replace(0, 4, "nâu") == metrics.calculate_score(session.text, "68")
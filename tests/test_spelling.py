@@ -0,0 +1,79 @@
+import os
+import sys
+# Add the project root to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from mtm.mtm.configs.schemas import PoeticRulesMetricsConfig
+from mtm.mtm.processes.lexicon import get_lexicon
+from mtm.mtm.processes.poetic_score import RhymesTonesMetrics
+from mtm.mtm.processes.spelling import SpellingSuggester, get_spelling_suggester, strip_tone_marks
+from mtm.mtm.processes.stanza import Stanza
+
+from test_lexicon import LEXICON_PATHS
+
+WORDS = ["hoa", "hòa", "hóa", "họa", "hoàng", "hoang", "hoàn", "mùa", "mưa", "người"]
+FREQUENCIES = {"hòa": 5, "hoa": 3, "hóa": 1}
+
+
+def test_suggestions_are_ranked_by_distance_then_frequency():
+    suggester = SpellingSuggester(WORDS, frequencies=FREQUENCIES)
+
+    assert suggester.suggest("hoàng") == (("hoàng", 0), ("hoang", 1), ("hoàn", 1))
+    assert suggester.suggest("hxa", top_k=4) == (("hòa", 1), ("hoa", 1), ("hóa", 1), ("họa", 1))
+    assert suggester.suggest("hoà", top_k=2) == (("hoa", 1), ("hoàn", 1))
+    assert suggester.suggest("ngừoi", top_k=1) == (("người", 2),)
+    assert suggester.suggest("xyzxyz") == ()
+
+
+def test_suggestions_match_brute_force():
+    lexicon = get_lexicon(**LEXICON_PATHS)
+    suggester = get_spelling_suggester(lexicon.dictionary_vi)
+    assert get_spelling_suggester(lexicon.dictionary_vi) is suggester
+
+    for word in ("hoàg", "bìh", "mưởng", "ngừoi", "xyz"):
+        expected = sorted(
+            (candidate, distance)
+            for candidate, distance in lexicon.dictionary_vi.within_distance(word, 2)
+            if " " not in candidate
+        )
+        assert sorted(suggester.suggest(word, top_k=len(suggester))) == expected
+
+
+def test_tone_insensitive_suggestions():
+    assert strip_tone_marks("Người mưởng") == "Ngươi mương"
+
+    suggester = SpellingSuggester(WORDS, frequencies=FREQUENCIES, ignore_tones=True)
+    # Every tone of hoa is at distance 0, then the distance as written and the frequency decide
+    assert suggester.suggest("hoá", top_k=4) == (("hoa", 0), ("hòa", 0), ("hóa", 0), ("họa", 0))
+    assert suggester.suggest("mừa", top_k=2) == (("mưa", 0), ("mùa", 1))
+    assert suggester.suggest("ngưởi", top_k=1) == (("người", 0),)
+
+
+def test_spelling_check_keeps_top_k_suggestions():
+    metrics = RhymesTonesMetrics(PoeticRulesMetricsConfig(spelling_suggestions=3, **LEXICON_PATHS))
+    stanza = Stanza("bay bìh ai", metrics.lexicon)
+
+    total, recommend = metrics.check_spelling_vietnamese(stanza, [], {})
+    assert total == 1
+    assert list(recommend) == ["bìh(E_S)"]
+    suggester = get_spelling_suggester(metrics.dictionary_vi)
+    assert recommend["bìh(E_S)"] == [word for word, _ in suggester.suggest("bìh", 3)]
+    assert len(recommend["bìh(E_S)"]) == 3
+
+    # The batch scorer only needs the count
+    assert metrics.check_spelling_vietnamese(stanza, [], None) == (1, None)
+
+
+def test_scores_without_render_skip_the_suggestions():
+    metrics = RhymesTonesMetrics(PoeticRulesMetricsConfig(**LEXICON_PATHS))
+    suggester = get_spelling_suggester(metrics.dictionary_vi, metrics.spelling_max_distance, metrics.spelling_ignore_tones)
+    lookups = suggester.suggest.cache_info()
+
+    score = metrics.calculate_score("bay bìhx ai", "00")
+    assert metrics.calculate_stanza_score("bay bìhx ai", "00", render=False) == (score, None, None)
+    assert suggester.suggest.cache_info() == lookups
+
+    _, _, recommend = metrics.calculate_stanza_score("bay bìhx ai", "00")
+    assert list(recommend) == ["bìhx(E_S)"]
@@ -0,0 +1,72 @@
+import os
+import sys
+# Add the project root to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from mtm.mtm.configs.schemas import CountSyllablePoemsConfig, PoeticRulesMetricsConfig
+from mtm.mtm.processes.count_syllables import CountSyllablePoems
+from mtm.mtm.processes.errors import MISSING_WORD, RHYME, TONE, PoemError
+from mtm.mtm.processes.poetic_rule import PoeticRules
+from mtm.mtm.processes.poetic_score import RhymesTonesMetrics
+from mtm.mtm.processes.stanza import Stanza, render_stanza
+from test_lexicon import LEXICON_PATHS
+
+STANZA = "cởi trời xanh cởi  đất nâu\ngió mây hờn dỗi bạc nâu nhớ nhung\n\nbạc đầu tóc trắng da nhung"
+LUC_BAT = "cởi trời xanh cởi đất nâu\ngió mây hờn dỗi bạc nâu nhớ nhung\nbạc đầu tóc trắng da nhung\ncõi tình thế giới ai nhung lưng sầu"
+# "đất" breaks the tone of line 1, "sầu" / "nhung" break the rhyme with "lưng"
+BROKEN_LUC_BAT = "cởi đất xanh cởi đất nâu\ngió mây hờn dỗi bạc nâu nhớ lưng\nbạc đầu tóc trắng da sầu\ncõi tình thế giới ai nhung lưng sầu"
+
+
+def test_stanza_is_parsed_once_into_arrays():
+    metrics = RhymesTonesMetrics(PoeticRulesMetricsConfig(**LEXICON_PATHS))
+    stanza = Stanza(STANZA, metrics.lexicon)
+
+    assert len(stanza) == 4
+    assert [stanza.line_length(line) for line in range(4)] == [6, 8, 1, 6]
+    assert stanza.word_count == 20
+    assert not stanza.is_stanza
+    assert list(stanza.lines[:7]) == [0, 0, 0, 0, 0, 0, 1]
+    assert stanza.word(1, -1) == "nhung"
+    assert stanza.rime_id(0, 5) == metrics.lexicon.analyze("nâu").rime_id
+    assert stanza.tone(0, 1) == metrics.get_tone("trời")
+
+
+def test_annotations_are_rendered_on_request():
+    metrics = RhymesTonesMetrics(PoeticRulesMetricsConfig(**LEXICON_PATHS))
+    stanza = metrics.analyze_stanza(LUC_BAT)
+
+    annotated, length_errors, rhyme_errors, wrong_tone, mixed = metrics.check_rule(stanza, "68")
+    assert metrics.check_rule(stanza, "68", render=False) == (None, length_errors, rhyme_errors, wrong_tone, None)
+    assert mixed.split("\n")[0].endswith("(R)")
+    assert render_stanza(stanza, [(2, None, "(L)"), (2, 0, "(E_V)")]).split("\n")[2] == "(L)bạc(E_V) đầu tóc trắng da nhung"
+
+    score, _, _ = metrics.calculate_stanza_score(LUC_BAT, "68")
+    assert metrics.calculate_stanza_score(LUC_BAT, "68", render=False)[0] == score
+
+
+def test_rule_checks_return_error_records():
+    metrics = RhymesTonesMetrics(PoeticRulesMetricsConfig(**LEXICON_PATHS))
+    errors = metrics.find_errors(BROKEN_LUC_BAT, "68")
+    assert errors == [
+        PoemError(RHYME, 2, 5, "lưng", "sầu"),
+        PoemError(RHYME, 3, 5, "lưng", "nhung"),
+        PoemError(TONE, 0, 1, "even", "uneven"),
+    ]
+
+    annotated, length_errors, rhyme_errors, wrong_tone, _ = metrics.check_rule(BROKEN_LUC_BAT, "68")
+    assert rhyme_errors == sum(error.kind == RHYME for error in errors)
+    assert wrong_tone == sum(error.kind == TONE for error in errors)
+    for error in errors:
+        if error.kind == TONE:
+            assert annotated.split("\n")[error.line].split(" ")[error.position].endswith("(E_T)")
+            assert error.actual == metrics.get_tone(Stanza(BROKEN_LUC_BAT, metrics.lexicon).word(error.line, error.position))
+
+    rules = PoeticRules(*LEXICON_PATHS.values())
+    rule_errors = rules.check_poem(BROKEN_LUC_BAT, "68", render=False)
+    assert [(error.line, error.position) for error in rule_errors if error.kind == TONE] == \
+        [(error.line, error.position) for error in errors if error.kind == TONE]
+
+    short = CountSyllablePoems(CountSyllablePoemsConfig()).count_syllables("cởi trời xanh cởi đất", luc_bat=True)
+    assert short == [PoemError(MISSING_WORD, 0, 5, 6, 5)]